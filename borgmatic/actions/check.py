@@ -1,6 +1,8 @@
 import logging
+import time
 
 import borgmatic.borg.check
+import borgmatic.borg.history
 import borgmatic.config.validate
 import borgmatic.hooks.command
 
@@ -26,6 +28,7 @@ def run_check(
     ):
         return
 
+    start_time = time.time()
     borgmatic.hooks.command.execute_hook(
         config.get('before_check'),
         config.get('umask'),
@@ -35,7 +38,7 @@ def run_check(
         **hook_context,
     )
     logger.info(f'{repository.get("label", repository["path"])}: Running consistency checks')
-    borgmatic.borg.check.check_archives(
+    checks_run = borgmatic.borg.check.check_archives(
         repository['path'],
         config,
         local_borg_version,
@@ -55,3 +58,9 @@ def run_check(
         global_arguments.dry_run,
         **hook_context,
     )
+
+    # Don't record a duration when every check was skipped because its frequency hasn't elapsed.
+    if checks_run:
+        borgmatic.borg.history.record_action_run(
+            config, repository['path'], 'check', start_time, global_arguments.dry_run
+        )
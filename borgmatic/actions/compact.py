@@ -1,7 +1,9 @@
 import logging
+import time
 
 import borgmatic.borg.compact
 import borgmatic.borg.feature
+import borgmatic.borg.history
 import borgmatic.config.validate
 import borgmatic.hooks.command
 
@@ -28,6 +30,18 @@ def run_compact(
     ):
         return
 
+    if not compact_arguments.ignore_compact_frequency:
+        compact_reason = borgmatic.borg.compact.compact_due(repository['path'], config)
+
+        if not compact_reason:
+            logger.info(
+                f'{repository.get("label", repository["path"])}: Skipping compact (not enough reclaimable space and compact_frequency not yet elapsed)'
+            )
+            return
+    else:
+        compact_reason = 'ignoring compact frequency'
+
+    start_time = time.time()
     borgmatic.hooks.command.execute_hook(
         config.get('before_compact'),
         config.get('umask'),
@@ -38,7 +52,7 @@ def run_compact(
     )
     if borgmatic.borg.feature.available(borgmatic.borg.feature.Feature.COMPACT, local_borg_version):
         logger.info(
-            f'{repository.get("label", repository["path"])}: Compacting segments{dry_run_label}'
+            f'{repository.get("label", repository["path"])}: Compacting segments ({compact_reason}){dry_run_label}'
         )
         borgmatic.borg.compact.compact_segments(
             global_arguments.dry_run,
@@ -52,6 +66,8 @@ def run_compact(
             cleanup_commits=compact_arguments.cleanup_commits,
             threshold=compact_arguments.threshold,
         )
+        if not global_arguments.dry_run:
+            borgmatic.borg.compact.record_compaction(repository['path'], config)
     else:  # pragma: nocover
         logger.info(
             f'{repository.get("label", repository["path"])}: Skipping compact (only available/needed in Borg 1.2+)'
@@ -64,3 +80,6 @@ def run_compact(
         global_arguments.dry_run,
         **hook_context,
     )
+    borgmatic.borg.history.record_action_run(
+        config, repository['path'], 'compact', start_time, global_arguments.dry_run
+    )
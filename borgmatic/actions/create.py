@@ -1,6 +1,8 @@
+import datetime
 import json
 import logging
 import os
+import time
 
 try:
     import importlib_metadata
@@ -8,6 +10,8 @@ except ModuleNotFoundError:  # pragma: nocover
     import importlib.metadata as importlib_metadata
 
 import borgmatic.borg.create
+import borgmatic.borg.history
+import borgmatic.borg.retention
 import borgmatic.borg.state
 import borgmatic.config.validate
 import borgmatic.hooks.command
@@ -68,6 +72,7 @@ def run_create(
     ):
         return
 
+    start_time = time.time()
     borgmatic.hooks.command.execute_hook(
         config.get('before_backup'),
         config.get('umask'),
@@ -96,6 +101,18 @@ def run_create(
             config, global_arguments.used_config_paths, global_arguments.dry_run
         )
     stream_processes = [process for processes in active_dumps.values() for process in processes]
+    record_history = borgmatic.borg.history.history_enabled(config) and not global_arguments.dry_run
+
+    if record_history:
+        estimated_duration = borgmatic.borg.history.estimate_action_duration(
+            config, repository['path'], 'create'
+        )
+
+        if estimated_duration:
+            finish_time = datetime.datetime.now() + datetime.timedelta(seconds=estimated_duration)
+            logger.info(
+                f'{repository.get("label", repository["path"])}: Estimated to take {datetime.timedelta(seconds=round(estimated_duration))} based on previous backups, finishing around {finish_time:%H:%M}'
+            )
 
     json_output = borgmatic.borg.create.create_archive(
         global_arguments.dry_run,
@@ -109,8 +126,30 @@ def run_create(
         stats=create_arguments.stats,
         json=create_arguments.json,
         list_files=create_arguments.list_files,
+        list_summary=create_arguments.list_summary,
         stream_processes=stream_processes,
     )
+    if not global_arguments.dry_run:
+        borgmatic.borg.retention.invalidate_archive_list(repository['path'], config)
+
+    if record_history:
+        borgmatic.borg.history.record_create_statistics(
+            config,
+            repository['path'],
+            (
+                json.loads(json_output)
+                if json_output
+                else borgmatic.borg.history.fetch_latest_archive_statistics(
+                    repository['path'],
+                    config,
+                    local_borg_version,
+                    global_arguments,
+                    local_path=local_path,
+                    remote_path=remote_path,
+                )
+            ),
+        )
+
     if json_output:  # pragma: nocover
         yield json.loads(json_output)
 
@@ -129,3 +168,6 @@ def run_create(
         global_arguments.dry_run,
         **hook_context,
     )
+    borgmatic.borg.history.record_action_run(
+        config, repository['path'], 'create', start_time, global_arguments.dry_run
+    )
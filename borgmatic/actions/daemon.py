@@ -0,0 +1,73 @@
+import datetime
+import logging
+
+import borgmatic.daemon.control
+import borgmatic.daemon.run
+
+logger = logging.getLogger(__name__)
+
+
+def format_timestamp(timestamp):
+    '''
+    Given a timestamp, return it formatted as a local date and time string.
+    '''
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def format_status(status):
+    '''
+    Given a status dict from a running daemon, return a list of human-readable lines describing
+    it.
+    '''
+    lines = [
+        f"Daemon running as PID {status['pid']} since {format_timestamp(status['started_time'])}"
+    ]
+
+    if status['running']:
+        lines.append(f"Currently running {status['running']}")
+
+    for config_filename, config_status in status['configuration_files'].items():
+        details = [
+            f"next run at {format_timestamp(config_status['next_run'])}"
+            if config_status['next_run']
+            else 'not scheduled'
+        ]
+
+        if config_status['pending']:
+            details.append('waiting to run')
+
+        last_run = config_status['last_run']
+
+        if last_run:
+            details.append(
+                f"last run at {format_timestamp(last_run['start_time'])} ({', '.join(last_run['actions'])}) "
+                + ('succeeded' if last_run['succeeded'] else 'failed')
+                + f" after {last_run['duration']:.0f}s"
+            )
+
+        lines.append(f"{config_filename}: {'; '.join(details)}")
+
+    return lines
+
+
+def run_daemon(daemon_arguments, global_arguments):
+    '''
+    Run the "daemon" action: Either run borgmatic as a daemon until interrupted, or, if a command
+    flag is given, send that command to a running daemon and log its response.
+
+    Raise ValueError if the daemon can't start or responds with an error.
+    Raise OSError if the control socket can't be opened or there's no daemon listening on it.
+    '''
+    socket_path = borgmatic.daemon.control.make_socket_path(daemon_arguments.socket)
+
+    if daemon_arguments.status:
+        for line in format_status(borgmatic.daemon.control.send_command(socket_path, 'status')):
+            logger.answer(line)
+    elif daemon_arguments.trigger:
+        response = borgmatic.daemon.control.send_command(socket_path, 'trigger')
+        logger.answer(f"Triggered runs of {len(response['triggered'])} configuration files")
+    elif daemon_arguments.reload:
+        response = borgmatic.daemon.control.send_command(socket_path, 'reload')
+        logger.answer(f"Reloaded {len(response['configuration_files'])} configuration files")
+    else:
+        borgmatic.daemon.run.run_daemon(daemon_arguments, global_arguments)
@@ -0,0 +1,23 @@
+import logging
+
+import borgmatic.hooks.outbox
+
+logger = logging.getLogger(__name__)
+
+
+def run_monitor_flush(config_filename, config, global_arguments):
+    '''
+    Run the "monitor-flush" action for the given configuration file, delivering any monitoring
+    requests saved to the outbox after earlier runs failed to send them.
+    '''
+    (
+        delivered_count,
+        discarded_count,
+        remaining_count,
+    ) = borgmatic.hooks.outbox.flush_undelivered_requests(
+        config, config_filename, global_arguments.dry_run
+    )
+
+    logger.answer(
+        f'{config_filename}: Delivered {delivered_count} saved monitoring requests, discarded {discarded_count}, {remaining_count} remaining'
+    )
@@ -1,6 +1,10 @@
 import logging
+import time
 
+import borgmatic.borg.compact
+import borgmatic.borg.history
 import borgmatic.borg.prune
+import borgmatic.borg.retention
 import borgmatic.config.validate
 import borgmatic.hooks.command
 
@@ -27,6 +31,22 @@ def run_prune(
     ):
         return
 
+    if prune_arguments.simulate:
+        logger.info(
+            f'{repository.get("label", repository["path"])}: Simulating pruning with the configured retention policy'
+        )
+        borgmatic.borg.retention.preview_prune(
+            repository['path'],
+            config,
+            local_borg_version,
+            prune_arguments,
+            global_arguments,
+            local_path=local_path,
+            remote_path=remote_path,
+        )
+        return
+
+    start_time = time.time()
     borgmatic.hooks.command.execute_hook(
         config.get('before_prune'),
         config.get('umask'),
@@ -36,6 +56,22 @@ def run_prune(
         **hook_context,
     )
     logger.info(f'{repository.get("label", repository["path"])}: Pruning archives{dry_run_label}')
+
+    # Only measure the space freed by pruning if it's needed to decide when to compact.
+    track_reclaimable_space = (
+        config.get('compact_threshold_bytes') is not None and not global_arguments.dry_run
+    )
+
+    if track_reclaimable_space:
+        size_before_prune = borgmatic.borg.compact.get_repository_unique_size(
+            repository['path'],
+            config,
+            local_borg_version,
+            global_arguments,
+            local_path=local_path,
+            remote_path=remote_path,
+        )
+
     borgmatic.borg.prune.prune_archives(
         global_arguments.dry_run,
         repository['path'],
@@ -46,6 +82,29 @@ def run_prune(
         local_path=local_path,
         remote_path=remote_path,
     )
+    if not global_arguments.dry_run:
+        borgmatic.borg.retention.invalidate_archive_list(repository['path'], config)
+
+    if track_reclaimable_space:
+        size_after_prune = borgmatic.borg.compact.get_repository_unique_size(
+            repository['path'],
+            config,
+            local_borg_version,
+            global_arguments,
+            local_path=local_path,
+            remote_path=remote_path,
+        )
+
+        if size_before_prune is None or size_after_prune is None:
+            logger.warning(
+                f'{repository.get("label", repository["path"])}: Could not determine the space freed by pruning, as Borg did not report the repository size; compacting on the next compact action regardless of compact_threshold_bytes'
+            )
+            borgmatic.borg.compact.record_reclaimable_space(repository['path'], config, None)
+        else:
+            borgmatic.borg.compact.record_reclaimable_space(
+                repository['path'], config, size_before_prune - size_after_prune
+            )
+
     borgmatic.hooks.command.execute_hook(
         config.get('after_prune'),
         config.get('umask'),
@@ -54,3 +113,6 @@ def run_prune(
         global_arguments.dry_run,
         **hook_context,
     )
+    borgmatic.borg.history.record_action_run(
+        config, repository['path'], 'prune', start_time, global_arguments.dry_run
+    )
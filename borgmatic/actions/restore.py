@@ -101,9 +101,13 @@ def restore_single_database(
         local_path=local_path,
         remote_path=remote_path,
         destination_path='/',
-        # A directory format dump isn't a single file, and therefore can't extract
-        # to stdout. In this case, the extract_process return value is None.
-        extract_to_stdout=bool(database.get('format') != 'directory'),
+        # A directory, split format, or incremental dump isn't a single file, and therefore can't
+        # extract to stdout. In this case, the extract_process return value is None.
+        extract_to_stdout=bool(
+            database.get('format') not in ('directory', 'split')
+            and not database.get('binlog_incrementals')
+            and not database.get('wal_archive_directory')
+        ),
     )
 
     # Run a single database restore, consuming the extract stdout (if any).
@@ -305,6 +309,7 @@ def run_restore(
         'username': restore_arguments.username,
         'password': restore_arguments.password,
         'restore_path': restore_arguments.restore_path,
+        'target_time': restore_arguments.target_time,
     }
 
     for hook_name, database_names in restore_names.items():
@@ -0,0 +1,88 @@
+import datetime
+import logging
+
+import borgmatic.borg.history
+import borgmatic.borg.retention
+import borgmatic.config.validate
+
+logger = logging.getLogger(__name__)
+
+
+def format_duration(seconds):
+    '''
+    Given a duration in seconds, return it as a human-readable string like "1:02:03".
+    '''
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+
+def run_stats(
+    repository,
+    config,
+    stats_arguments,
+):
+    '''
+    Run the "stats" action for the given repository, reporting trends from the recorded run
+    statistics history.
+
+    If stats_arguments.json is True, yield the summary as JSON.
+    '''
+    if stats_arguments.repository and not borgmatic.config.validate.repositories_match(
+        repository, stats_arguments.repository
+    ):
+        return
+
+    repository_label = repository.get('label', repository['path'])
+
+    if not borgmatic.borg.history.history_enabled(config):
+        logger.warning(
+            f'{repository_label}: No run statistics recorded, as the statistics_history option is not enabled'
+        )
+
+    summary = borgmatic.borg.history.summarize_history(
+        borgmatic.borg.history.read_archive_statistics(config, repository['path']),
+        borgmatic.borg.history.read_action_durations(config, repository['path']),
+    )
+
+    if stats_arguments.json:
+        yield dict(summary, repository=repository['path'])
+        return
+
+    logger.answer(
+        f'{repository_label}: {summary["archive_count"]} archives recorded in run statistics history'
+    )
+    latest_archive = summary['latest_archive']
+
+    if latest_archive:
+        logger.answer(
+            f'Latest archive: {latest_archive["name"]} at {datetime.datetime.fromtimestamp(latest_archive["start_time"])}, '
+            f'{borgmatic.borg.retention.format_size(latest_archive["original_size"] or 0)} original, '
+            f'{borgmatic.borg.retention.format_size(latest_archive["deduplicated_size"] or 0)} deduplicated, '
+            f'{latest_archive["file_count"]} files'
+        )
+
+    if summary['deduplication_ratio']:
+        logger.answer(
+            f'Deduplication ratio: {summary["deduplication_ratio"]:.1f}x overall, {summary["recent_deduplication_ratio"]:.1f}x recently'
+        )
+
+    if summary['growth_per_day'] is not None:
+        forecast = (
+            f', forecasting {borgmatic.borg.retention.format_size(summary["forecast_size"])} in {summary["forecast_days"]} days'
+            if summary['forecast_size'] is not None
+            else ''
+        )
+        logger.answer(
+            f'Repository growth: {borgmatic.borg.retention.format_size(summary["growth_per_day"])} per day{forecast}'
+        )
+
+    for action_name, estimated_duration in sorted(summary['estimated_durations'].items()):
+        if estimated_duration is not None:
+            logger.answer(f'Typical {action_name} duration: {format_duration(estimated_duration)}')
+
+    estimated_create_duration = summary['estimated_durations'].get('create')
+
+    if estimated_create_duration is not None:
+        finish_time = datetime.datetime.now() + datetime.timedelta(
+            seconds=estimated_create_duration
+        )
+        logger.answer(f'A backup started now would finish around {finish_time:%Y-%m-%d %H:%M}')
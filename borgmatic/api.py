@@ -0,0 +1,217 @@
+import asyncio
+import copy
+import functools
+import logging
+import time
+
+import borgmatic.commands.arguments
+import borgmatic.commands.borgmatic
+import borgmatic.events
+from borgmatic.config import load, validate
+from borgmatic.logger import add_custom_log_levels
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACTIONS = ('create', 'prune', 'compact', 'check')
+
+# The configuration filename used in log messages and state for a configuration passed in as a
+# dict, unless the caller names it.
+DEFAULT_CONFIG_FILENAME = '<api>'
+
+# Actions that don't operate on a configuration file's repositories, so they can't run via the API.
+UNSUPPORTED_ACTIONS = ('config', 'bootstrap', 'generate', 'validate', 'daemon')
+
+# Options that actions get by default when run via the API, so that results include structured
+# output instead of only log messages.
+DEFAULT_ACTION_OPTIONS = {'create': {'json': True}}
+
+
+def load_config(config, config_filename=None, overrides=None, resolve_env=True):
+    '''
+    Given a configuration filename or a configuration dict, an optional configuration filename to
+    use for a configuration dict, a sequence of override strings in the form of
+    "option.suboption=value", and whether to resolve environment variables, load and validate the
+    configuration, logging any warnings about it. Return it as a tuple of its configuration filename
+    and its configuration dict. Leave a passed-in configuration dict unmodified.
+
+    Raise ValueError (including validate.Validation_error) if the configuration is invalid, or
+    OSError if the configuration file can't be read.
+    '''
+    if isinstance(config, dict):
+        config_filename = config_filename or DEFAULT_CONFIG_FILENAME
+        config, parse_logs = validate.validate_configuration(
+            config_filename,
+            copy.deepcopy(config),
+            load.load_configuration(validate.schema_filename()),
+            overrides,
+            resolve_env,
+        )
+    else:
+        config_filename = str(config)
+        config, parse_logs = validate.parse_configuration(
+            config_filename, validate.schema_filename(), overrides, resolve_env
+        )
+
+    for log in parse_logs:
+        logger.handle(log)
+
+    return (config_filename, config)
+
+
+def make_arguments(config_filename, actions, dry_run, monitoring_verbosity):
+    '''
+    Given a configuration filename, a sequence of action names or a dict from action name to a dict
+    of its options (as named by the corresponding command-line flags, e.g. {"check": {"only":
+    ["repository"]}}), whether this is a dry run, and a monitoring verbosity, return arguments as a
+    dict from action name (or "global") to an argparse.Namespace, just like the command-line would
+    produce.
+
+    Raise ValueError if an action or option isn't supported.
+    '''
+    action_options = (
+        actions if isinstance(actions, dict) else {action_name: {} for action_name in actions}
+    )
+
+    for action_name in action_options:
+        if action_name in UNSUPPORTED_ACTIONS:
+            raise ValueError(f'The {action_name} action is not supported via the API')
+
+    try:
+        arguments = borgmatic.commands.arguments.parse_arguments(*action_options)
+    except SystemExit:
+        raise ValueError(f"Invalid actions: {', '.join(action_options)}")
+
+    for action_name, options in action_options.items():
+        for option_name, value in dict(
+            DEFAULT_ACTION_OPTIONS.get(action_name, {}), **options
+        ).items():
+            if not hasattr(arguments[action_name], option_name):
+                raise ValueError(f'Unknown option for the {action_name} action: {option_name}')
+
+            setattr(arguments[action_name], option_name, value)
+
+    global_arguments = arguments['global']
+    global_arguments.config_paths = [config_filename]
+    global_arguments.used_config_paths = [config_filename]
+    global_arguments.dry_run = dry_run
+    global_arguments.monitoring_verbosity = monitoring_verbosity
+
+    return arguments
+
+
+def run(
+    config,
+    actions=DEFAULT_ACTIONS,
+    on_event=None,
+    config_filename=None,
+    dry_run=False,
+    overrides=None,
+    resolve_env=True,
+    monitoring_verbosity=0,
+):
+    '''
+    Run borgmatic actions for a single configuration and return the results, without the borgmatic
+    command-line's logging setup, signal handling, or process exit.
+
+    The configuration is either a configuration filename or a configuration dict (with the same
+    structure as a configuration file), and config_filename optionally names a configuration dict
+    in log messages and borgmatic's state. The actions are a sequence of action names or a dict from
+    action name to a dict of its options, named like the corresponding command-line flags. The
+    "create" action produces its statistics as output unless told otherwise with {"create":
+    {"json": False}}.
+
+    If on_event is given, call it with each event dict as it happens. Every event has "type",
+    "time", and "config_filename" keys. The types are:
+
+      * "run_start"
+      * "action_start" and "action_end", with "repository" and "action" keys, plus "duration" for
+        "action_end"
+      * "output", with "repository", "action", and "data" keys, for each action's JSON output
+      * "error", with a "message" key
+      * "run_end", with "succeeded" and "duration" keys
+
+    Return a dict with "config_filename", "succeeded", "duration", "events" (all events, in order),
+    "outputs" (the output events), and "errors" (error messages) keys. Errors during the run get
+    reported in the results rather than raised.
+
+    Raise ValueError if the configuration, actions, or options are invalid, or OSError if the
+    configuration file can't be read.
+
+    Each run sees only its own events, so runs can happen concurrently in different threads. Note
+    though that a few things remain process-wide: the umask while command hooks run and the log
+    buffer that monitoring hooks send. And borgmatic logs to its loggers (named "borgmatic.*") as
+    usual, so configure logging as desired.
+    '''
+    config_filename, config = load_config(config, config_filename, overrides, resolve_env)
+    arguments = make_arguments(config_filename, actions, dry_run, monitoring_verbosity)
+    add_custom_log_levels()
+
+    events = []
+    current_action = {}
+
+    def handle_event(event):
+        event['config_filename'] = config_filename
+
+        if event['type'] == 'action_start':
+            current_action.update(repository=event['repository'], action=event['action'])
+
+        events.append(event)
+
+        if on_event:
+            on_event(event)
+
+    start_time = time.time()
+    token = borgmatic.events.handler.set(handle_event)
+
+    try:
+        borgmatic.events.emit('run_start')
+
+        for result in borgmatic.commands.borgmatic.run_configuration(
+            config_filename, config, arguments
+        ):
+            if isinstance(result, logging.LogRecord):
+                borgmatic.events.emit('error', message=result.getMessage())
+            else:
+                borgmatic.events.emit(
+                    'output',
+                    repository=current_action.get('repository'),
+                    action=current_action.get('action'),
+                    data=result,
+                )
+
+        errors = [event['message'] for event in events if event['type'] == 'error']
+        duration = time.time() - start_time
+        borgmatic.events.emit('run_end', succeeded=not errors, duration=duration)
+    finally:
+        borgmatic.events.handler.reset(token)
+
+    return {
+        'config_filename': config_filename,
+        'succeeded': not errors,
+        'duration': duration,
+        'events': events,
+        'outputs': [event for event in events if event['type'] == 'output'],
+        'errors': errors,
+    }
+
+
+async def run_async(config, actions=DEFAULT_ACTIONS, on_event=None, executor=None, **options):
+    '''
+    Like run(), but run borgmatic in a thread of the given concurrent.futures.Executor (defaulting
+    to the event loop's default executor) and await the results, so that other coroutines keep
+    running in the meantime. If on_event is given, call it with each event on the event loop's
+    thread rather than borgmatic's. Any other keyword arguments get passed through to run().
+
+    Cancelling the returned coroutine stops waiting for the results but doesn't stop the run.
+    '''
+    loop = asyncio.get_running_loop()
+
+    def on_event_threadsafe(event):
+        loop.call_soon_threadsafe(on_event, event)
+
+    return await loop.run_in_executor(
+        executor,
+        functools.partial(
+            run, config, actions, on_event=on_event_threadsafe if on_event else None, **options
+        ),
+    )
@@ -1,19 +1,32 @@
 import argparse
+import concurrent.futures
 import datetime
 import hashlib
-import itertools
 import json
 import logging
+import math
 import os
-import pathlib
+import random
+import shutil
+import sqlite3
+import tempfile
 
-from borgmatic.borg import environment, extract, feature, flags, rinfo, state
-from borgmatic.execute import DO_NOT_CAPTURE, execute_command
+from borgmatic.borg import environment, extract, feature, flags
+from borgmatic.borg import list as borg_list
+from borgmatic.borg import rinfo, rlist, state
+from borgmatic.execute import DO_NOT_CAPTURE, execute_command, execute_command_and_capture_output
 
 DEFAULT_CHECKS = (
     {'name': 'repository', 'frequency': '1 month'},
     {'name': 'archives', 'frequency': '1 month'},
 )
+DEFAULT_SPOT_CHECK_SAMPLE_COUNT = 100
+DEFAULT_SPOT_CHECK_SAMPLE_BYTES = 100 * 1024 * 1024
+SPOT_CHECK_HASH_BLOCK_SIZE = 1024 * 1024
+
+# Allowed difference in seconds between an archived file's modification time and its source file's
+# before the source file is considered changed since the backup.
+SPOT_CHECK_MTIME_TOLERANCE_SECONDS = 1
 
 
 logger = logging.getLogger(__name__)
@@ -70,7 +83,7 @@ def parse_frequency(frequency):
         number, time_unit = frequency.split(' ')
         number = int(number)
     except ValueError:
-        raise ValueError(f"Could not parse consistency check frequency '{frequency}'")
+        raise ValueError(f"Could not parse frequency '{frequency}'")
 
     if not time_unit.endswith('s'):
         time_unit += 's'
@@ -85,7 +98,7 @@ def parse_frequency(frequency):
     try:
         return datetime.timedelta(**{time_unit: number})
     except TypeError:
-        raise ValueError(f"Could not parse consistency check frequency '{frequency}'")
+        raise ValueError(f"Could not parse frequency '{frequency}'")
 
 
 def filter_checks_on_frequency(
@@ -99,10 +112,10 @@ def filter_checks_on_frequency(
     Given a configuration dict with a "checks" sequence of dicts, a Borg repository ID, a sequence
     of checks, whether to force checks to run, and an ID for the archives check potentially being
     run (if any), filter down those checks based on the configured "frequency" for each check as
-    compared to its check time file.
+    compared to its last successful check time in the borgmatic state database.
 
-    In other words, a check whose check time file's timestamp is too new (based on the configured
-    frequency) will get cut from the returned sequence of checks. Example:
+    In other words, a check whose last check time is too recent (based on the configured frequency)
+    will get cut from the returned sequence of checks. Example:
 
     config = {
         'checks': [
@@ -114,12 +127,16 @@ def filter_checks_on_frequency(
     }
 
     When this function is called with that config and "archives" in checks, "archives" will get
-    filtered out of the returned result if its check time file is newer than 2 weeks old, indicating
+    filtered out of the returned result if its last check time is newer than 2 weeks old, indicating
     that it's not yet time to run that check again.
 
+    All check times for the repository are read from the state database with a single query, and
+    only if at least one check has a frequency configured.
+
     Raise ValueError if a frequency cannot be parsed.
     '''
     filtered_checks = list(checks)
+    check_times = None
 
     if force:
         return tuple(filtered_checks)
@@ -133,7 +150,10 @@ def filter_checks_on_frequency(
         if not frequency_delta:
             continue
 
-        check_time = probe_for_check_time(config, borg_repository_id, check, archives_check_id)
+        if check_times is None:
+            check_times = read_check_times(config, borg_repository_id)
+
+        check_time = probe_for_check_time(check_times, check, archives_check_id)
         if not check_time:
             continue
 
@@ -234,8 +254,11 @@ def make_check_flags(checks, archive_filter_flags):
 def make_check_time_path(config, borg_repository_id, check_type, archives_check_id=None):
     '''
     Given a configuration dict, a Borg repository ID, the name of a check type ("repository",
-    "archives", etc.), and a unique hash of the archives filter flags, return a path for recording
-    that check's time (the time of that check last occurring).
+    "archives", etc.), and a unique hash of the archives filter flags, return a legacy path for
+    recording that check's time (the time of that check last occurring).
+
+    Check times are now stored in the borgmatic state database instead, so these paths are only used
+    to find and migrate check time files written by older versions of borgmatic.
     '''
     borgmatic_source_directory = os.path.expanduser(
         config.get('borgmatic_source_directory', state.DEFAULT_BORGMATIC_SOURCE_DIRECTORY)
@@ -258,20 +281,10 @@ def make_check_time_path(config, borg_repository_id, check_type, archives_check_
     )
 
 
-def write_check_time(path):  # pragma: no cover
-    '''
-    Record a check time of now as the modification time of the given path.
-    '''
-    logger.debug(f'Writing check time at {path}')
-
-    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
-    pathlib.Path(path, mode=0o600).touch()
-
-
 def read_check_time(path):
     '''
-    Return the check time based on the modification time of the given path. Return None if the path
-    doesn't exist.
+    Return the check time based on the modification time of the given legacy check time path.
+    Return None if the path doesn't exist.
     '''
     logger.debug(f'Reading check time from {path}')
 
@@ -281,46 +294,150 @@ def read_check_time(path):
         return None
 
 
-def probe_for_check_time(config, borg_repository_id, check, archives_check_id):
+def make_check_time_key(check_type, archives_check_id=None):
     '''
-    Given a configuration dict, a Borg repository ID, the name of a check type ("repository",
-    "archives", etc.), and a unique hash of the archives filter flags, return a the corresponding
-    check time or None if such a check time does not exist.
+    Given the name of a check type ("repository", "archives", etc.) and a unique hash of the
+    archives filter flags, return a (check type, archives check ID) tuple for looking up that
+    check's time in the state database. Check types that don't filter archives always get an
+    archives check ID of "all".
+    '''
+    if check_type in ('archives', 'data'):
+        return (check_type, archives_check_id if archives_check_id else 'all')
 
-    When the check type is "archives" or "data", this function probes two different paths to find
-    the check time, e.g.:
+    return (check_type, 'all')
 
-      ~/.borgmatic/checks/1234567890/archives/9876543210
-      ~/.borgmatic/checks/1234567890/archives/all
 
-    ... and returns the maximum modification time of the files found (if any). The first path
-    represents a more specific archives check time (a check on a subset of archives), and the second
-    is a fallback to the last "all" archives check.
+def read_check_times(config, borg_repository_id):
+    '''
+    Given a configuration dict and a Borg repository ID, read the last successful check times for
+    that repository from the borgmatic state database in a single query. Return them as a dict from
+    (check type, archives check ID) tuple to datetime.datetime.
+    '''
+    logger.debug(f'Reading check times for repository {borg_repository_id}')
+
+    with state.open_state_database(config) as connection:
+        return {
+            (check_type, archives_check_id): datetime.datetime.fromtimestamp(last_success_time)
+            for check_type, archives_check_id, last_success_time in connection.execute(
+                '''
+                SELECT check_type, archives_check_id, last_success_time FROM check_times
+                WHERE repository_id = ? AND last_success_time IS NOT NULL
+                ''',
+                (borg_repository_id,),
+            )
+        }
 
-    For other check types, this function reads from a single check time path, e.g.:
 
-      ~/.borgmatic/checks/1234567890/repository
+def write_check_times(
+    config,
+    borg_repository_id,
+    checks,
+    archives_check_id=None,
+    archive_filter_flags=(),
+    run_time=None,
+    duration=None,
+    succeeded=True,
+):
     '''
-    check_times = (
-        read_check_time(group[0])
-        for group in itertools.groupby(
+    Given a configuration dict, a Borg repository ID, a sequence of check types that just ran, a
+    unique hash of the archives filter flags, the archives filter flags themselves, the
+    datetime.datetime when the checks started, their duration as a datetime.timedelta, and whether
+    they succeeded, record the results in the borgmatic state database as a single transaction.
+
+    A failed check updates its last run time, duration, and outcome, but leaves its last successful
+    check time alone, so that it doesn't count towards the check's configured frequency.
+    '''
+    if run_time is None:
+        run_time = datetime.datetime.now()
+
+    run_timestamp = run_time.timestamp()
+    duration_seconds = duration.total_seconds() if duration is not None else None
+    archive_filter = ' '.join(archive_filter_flags) or None
+    outcome = 'success' if succeeded else 'failure'
+
+    logger.debug(f'Writing {outcome} check times for repository {borg_repository_id}')
+
+    with state.open_state_database(config) as connection:
+        for check in checks:
+            check_type, check_archives_id = make_check_time_key(check, archives_check_id)
+            connection.execute(
+                '''
+                INSERT OR IGNORE INTO check_times
+                (repository_id, check_type, archives_check_id, last_run_time, last_outcome)
+                VALUES (?, ?, ?, ?, ?)
+                ''',
+                (borg_repository_id, check_type, check_archives_id, run_timestamp, outcome),
+            )
+            connection.execute(
+                '''
+                UPDATE check_times SET
+                    archive_filter = ?,
+                    last_success_time = CASE WHEN ? THEN ? ELSE last_success_time END,
+                    last_run_time = ?,
+                    last_duration = ?,
+                    last_outcome = ?
+                WHERE repository_id = ? AND check_type = ? AND archives_check_id = ?
+                ''',
+                (
+                    archive_filter if check_type in ('archives', 'data') else None,
+                    succeeded,
+                    run_timestamp,
+                    run_timestamp,
+                    duration_seconds,
+                    outcome,
+                    borg_repository_id,
+                    check_type,
+                    check_archives_id,
+                ),
+            )
+
+
+def write_failed_check_times(config, borg_repository_id, checks, *args, **kwargs):
+    '''
+    Given the same arguments as write_check_times() except for "succeeded", record the given checks
+    as failed in the borgmatic state database.
+
+    Log rather than raise any error writing to the state database, so that it doesn't mask the
+    error that made the checks fail in the first place.
+    '''
+    try:
+        write_check_times(config, borg_repository_id, checks, *args, **kwargs, succeeded=False)
+    except (sqlite3.Error, OSError) as error:
+        logger.warning(
+            f'Cannot record failed {"/".join(checks)} check times for repository {borg_repository_id}: {error}'
+        )
+
+
+def probe_for_check_time(check_times, check, archives_check_id):
+    '''
+    Given a dict of check times as returned by read_check_times(), the name of a check type
+    ("repository", "archives", etc.), and a unique hash of the archives filter flags, return the
+    corresponding check time or None if such a check time does not exist.
+
+    When the check type is "archives" or "data", this function probes for two different check
+    times: a more specific archives check time (a check on a subset of archives) and a fallback to
+    the last "all" archives check. It returns the maximum of the check times found (if any).
+    '''
+    found_check_times = (
+        check_times.get(key)
+        for key in dict.fromkeys(
             (
-                make_check_time_path(config, borg_repository_id, check, archives_check_id),
-                make_check_time_path(config, borg_repository_id, check),
+                make_check_time_key(check, archives_check_id),
+                make_check_time_key(check),
             )
         )
     )
 
     try:
-        return max(check_time for check_time in check_times if check_time)
+        return max(check_time for check_time in found_check_times if check_time)
     except ValueError:
         return None
 
 
 def upgrade_check_times(config, borg_repository_id):
     '''
-    Given a configuration dict and a Borg repository ID, upgrade any corresponding check times on
-    disk from old-style paths to new-style paths.
+    Given a configuration dict and a Borg repository ID, upgrade any corresponding legacy check
+    times on disk from old-style paths to new-style paths.
 
     Currently, the only upgrade performed is renaming an archive or data check path that looks like:
 
@@ -349,6 +466,358 @@ def upgrade_check_times(config, borg_repository_id):
         os.rename(temporary_path, new_path)
 
 
+def migrate_check_time_files(config, borg_repository_id):
+    '''
+    Given a configuration dict and a Borg repository ID, import any check time files written by
+    older versions of borgmatic, e.g.:
+
+      ~/.borgmatic/checks/1234567890/repository
+      ~/.borgmatic/checks/1234567890/archives/9876543210
+
+    ... into the borgmatic state database, and then delete them. Check times already present in the
+    state database take precedence over imported ones.
+    '''
+    checks_path = os.path.dirname(make_check_time_path(config, borg_repository_id, 'repository'))
+
+    if not os.path.isdir(checks_path):
+        return
+
+    upgrade_check_times(config, borg_repository_id)
+    logger.debug(f'Migrating check times from {checks_path} to the state database')
+
+    check_time_paths = []
+
+    for check_type in sorted(os.listdir(checks_path)):
+        check_type_path = os.path.join(checks_path, check_type)
+
+        if os.path.isdir(check_type_path):
+            check_time_paths.extend(
+                (check_type, archives_check_id, os.path.join(check_type_path, archives_check_id))
+                for archives_check_id in sorted(os.listdir(check_type_path))
+            )
+        else:
+            check_time_paths.append((check_type, 'all', check_type_path))
+
+    check_times = tuple(
+        (check_type, archives_check_id, check_time.timestamp())
+        for check_type, archives_check_id, path in check_time_paths
+        for check_time in (read_check_time(path),)
+        if check_time
+    )
+
+    with state.open_state_database(config) as connection:
+        connection.executemany(
+            '''
+            INSERT OR IGNORE INTO check_times
+            (
+                repository_id, check_type, archives_check_id, last_success_time, last_run_time,
+                last_outcome
+            )
+            VALUES (?, ?, ?, ?, ?, 'success')
+            ''',
+            (
+                (borg_repository_id, check_type, archives_check_id, check_time, check_time)
+                for check_type, archives_check_id, check_time in check_times
+            ),
+        )
+
+    shutil.rmtree(checks_path)
+
+
+def get_check_config(config, check):
+    '''
+    Given a configuration dict and the name of a check type, return the configured options dict for
+    that check, or an empty dict if it's not configured.
+    '''
+    return next(
+        (
+            check_config
+            for check_config in (config.get('checks', None) or ())
+            if check_config.get('name', '').lower() == check
+        ),
+        {},
+    )
+
+
+def collect_spot_check_archive_files(
+    repository_path,
+    archive,
+    config,
+    local_borg_version,
+    global_arguments,
+    local_path='borg',
+    remote_path=None,
+):
+    '''
+    Given a local or remote repository path, an archive name, a configuration dict, the local Borg
+    version, global arguments as an argparse.Namespace, and local and remote Borg paths, list the
+    regular files in the archive and return them as a tuple of dicts with "path", "size", and
+    "mtime" keys.
+
+    Skip anything within the borgmatic source directory, as its contents (like database dumps) don't
+    outlive the backup.
+    '''
+    borgmatic_source_directory = (
+        os.path.expanduser(
+            config.get('borgmatic_source_directory', state.DEFAULT_BORGMATIC_SOURCE_DIRECTORY)
+        )
+        .lstrip(os.path.sep)
+        .rstrip(os.path.sep)
+    )
+
+    output = execute_command_and_capture_output(
+        borg_list.make_list_command(
+            repository_path,
+            config,
+            local_borg_version,
+            argparse.Namespace(
+                repository=repository_path,
+                archive=archive,
+                paths=None,
+                find_paths=None,
+                json=None,
+                json_lines=True,
+            ),
+            global_arguments,
+            local_path,
+            remote_path,
+        ),
+        extra_environment=environment.make_environment(config),
+        borg_local_path=local_path,
+    )
+
+    archive_files = []
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+
+        item = json.loads(line)
+
+        if item.get('type') != '-':
+            continue
+
+        path = item['path']
+
+        if path == borgmatic_source_directory or path.startswith(
+            borgmatic_source_directory + os.path.sep
+        ):
+            continue
+
+        archive_files.append({'path': path, 'size': item.get('size', 0), 'mtime': item['mtime']})
+
+    return tuple(archive_files)
+
+
+def sample_spot_check_files(archive_files, sample_count, sample_bytes):
+    '''
+    Given a sequence of archive file dicts as returned by collect_spot_check_archive_files(), a
+    maximum number of files to sample, and a maximum total number of bytes to sample, return a
+    random, size-weighted sample of those files as a tuple.
+
+    Larger files are more likely to be sampled (as they hold more of the data that could be
+    corrupted), but files that would put the sample over its byte budget get skipped.
+    '''
+    # Weighted random sampling without replacement (Efraimidis-Spirakis): Give each file a random
+    # key that favors larger files, and then take the files with the largest keys.
+    weighted_files = sorted(
+        archive_files,
+        key=lambda archive_file: math.log(1.0 - random.random()) / (archive_file['size'] + 1),
+        reverse=True,
+    )
+
+    sampled_files = []
+    sampled_bytes = 0
+
+    for archive_file in weighted_files:
+        if len(sampled_files) >= sample_count:
+            break
+
+        if sampled_bytes + archive_file['size'] > sample_bytes:
+            continue
+
+        sampled_files.append(archive_file)
+        sampled_bytes += archive_file['size']
+
+    return tuple(sampled_files)
+
+
+def hash_file(path):
+    '''
+    Return the hex SHA-256 digest of the file at the given path, or None if the file doesn't exist.
+    '''
+    digest = hashlib.sha256()
+
+    try:
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(SPOT_CHECK_HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+
+    return digest.hexdigest()
+
+
+def make_spot_check_source_path(archive_path, working_directory=None):
+    '''
+    Given a path as stored in an archive and an optional configured working directory, return the
+    corresponding path of the source file on the local filesystem. Borg stores absolute source paths
+    without their leading slash and relative source paths relative to the working directory.
+    '''
+    if working_directory:
+        relative_source_path = os.path.join(os.path.expanduser(working_directory), archive_path)
+
+        if os.path.exists(relative_source_path):
+            return relative_source_path
+
+    return os.path.join(os.path.sep, archive_path)
+
+
+def source_file_changed(archive_file, source_path):
+    '''
+    Given an archive file dict and the path of its source file, return whether the source file has
+    been modified or deleted since the archive was created, in which case comparing its contents
+    isn't meaningful.
+    '''
+    try:
+        source_mtime = os.stat(source_path).st_mtime
+    except FileNotFoundError:
+        return True
+
+    archive_mtime = datetime.datetime.fromisoformat(archive_file['mtime']).timestamp()
+
+    return abs(source_mtime - archive_mtime) > SPOT_CHECK_MTIME_TOLERANCE_SECONDS
+
+
+def compare_spot_check_files(sampled_files, extract_directory, working_directory=None):
+    '''
+    Given a sequence of sampled archive file dicts, the directory they were extracted to, and an
+    optional configured working directory, hash each extracted file along with its source file in
+    parallel and compare them.
+
+    Return a tuple of (archive paths whose contents differ from their source files, number of files
+    skipped because their source files changed since the backup).
+    '''
+    comparable_files = []
+    skipped_count = 0
+
+    for archive_file in sampled_files:
+        source_path = make_spot_check_source_path(archive_file['path'], working_directory)
+
+        if source_file_changed(archive_file, source_path):
+            logger.debug(f'Skipping spot check of changed source file {source_path}')
+            skipped_count += 1
+            continue
+
+        comparable_files.append(
+            (
+                archive_file['path'],
+                os.path.join(extract_directory, archive_file['path']),
+                source_path,
+            )
+        )
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        extracted_hashes = executor.map(
+            hash_file, tuple(extracted_path for _, extracted_path, _ in comparable_files)
+        )
+        source_hashes = executor.map(
+            hash_file, tuple(source_path for _, _, source_path in comparable_files)
+        )
+
+        mismatched_paths = tuple(
+            archive_path
+            for (archive_path, _, _), extracted_hash, source_hash in zip(
+                comparable_files, extracted_hashes, source_hashes
+            )
+            if extracted_hash is None or extracted_hash != source_hash
+        )
+
+    return (mismatched_paths, skipped_count)
+
+
+def spot_check(
+    repository_path,
+    config,
+    local_borg_version,
+    global_arguments,
+    local_path='borg',
+    remote_path=None,
+):
+    '''
+    Given a local or remote repository path, a configuration dict, the local Borg version, global
+    arguments as an argparse.Namespace, and local and remote Borg paths, perform a spot check of the
+    most recent archive: Extract a random, size-weighted sample of its files to a temporary
+    directory, and compare their contents with the corresponding source files. If there are no
+    archives, skip the spot check.
+
+    Raise ValueError if any sampled file's contents differ from its unchanged source file.
+    '''
+    try:
+        archive = rlist.resolve_archive_name(
+            repository_path,
+            'latest',
+            config,
+            local_borg_version,
+            global_arguments,
+            local_path,
+            remote_path,
+        )
+    except ValueError:
+        logger.warning('No archives found. Skipping spot consistency check.')
+        return
+
+    check_config = get_check_config(config, 'spot')
+    sampled_files = sample_spot_check_files(
+        collect_spot_check_archive_files(
+            repository_path,
+            archive,
+            config,
+            local_borg_version,
+            global_arguments,
+            local_path,
+            remote_path,
+        ),
+        check_config.get('sample_count', DEFAULT_SPOT_CHECK_SAMPLE_COUNT),
+        check_config.get('sample_bytes', DEFAULT_SPOT_CHECK_SAMPLE_BYTES),
+    )
+
+    if not sampled_files:
+        logger.warning('No files to sample in the latest archive. Skipping spot check.')
+        return
+
+    logger.debug(f'{repository_path}: Spot checking {len(sampled_files)} files from {archive}')
+
+    with tempfile.TemporaryDirectory(prefix='borgmatic-spot-check-') as extract_directory:
+        extract.extract_archive(
+            dry_run=False,
+            repository=repository_path,
+            archive=archive,
+            paths=tuple(archive_file['path'] for archive_file in sampled_files),
+            config=config,
+            local_borg_version=local_borg_version,
+            global_arguments=global_arguments,
+            local_path=local_path,
+            remote_path=remote_path,
+            destination_path=extract_directory,
+        )
+
+        mismatched_paths, skipped_count = compare_spot_check_files(
+            sampled_files, extract_directory, config.get('working_directory')
+        )
+
+    compared_count = len(sampled_files) - skipped_count
+
+    if mismatched_paths:
+        raise ValueError(
+            f'Spot check failed: {len(mismatched_paths)} of {compared_count} sampled files in archive {archive} differ from their source files: {", ".join(mismatched_paths[:10])}'
+        )
+
+    logger.info(
+        f'{repository_path}: Spot check passed for {compared_count} sampled files ({skipped_count} skipped as changed since the backup)'
+    )
+
+
 def check_archives(
     repository_path,
     config,
@@ -366,7 +835,8 @@ def check_archives(
     whether to include progress information, whether to attempt a repair, and an optional list of
     checks to use instead of configured checks, check the contained Borg archives for consistency.
 
-    If there are no consistency checks to run, skip running them.
+    If there are no consistency checks to run, skip running them. Record the time, duration, and
+    outcome of each check that does run in the borgmatic state database. Return the checks that ran.
 
     Raises ValueError if the Borg repository ID cannot be determined.
     '''
@@ -385,7 +855,7 @@ def check_archives(
     except (json.JSONDecodeError, KeyError):
         raise ValueError(f'Cannot determine Borg repository ID for {repository_path}')
 
-    upgrade_check_times(config, borg_repository_id)
+    migrate_check_time_files(config, borg_repository_id)
 
     check_last = config.get('check_last', None)
     prefix = config.get('prefix')
@@ -428,29 +898,99 @@ def check_archives(
         )
 
         borg_environment = environment.make_environment(config)
+        borg_checks = tuple(check for check in checks if check not in ('extract', 'spot'))
+        run_time = datetime.datetime.now()
 
-        # The Borg repair option triggers an interactive prompt, which won't work when output is
-        # captured. And progress messes with the terminal directly.
-        if repair or progress:
-            execute_command(
-                full_command, output_file=DO_NOT_CAPTURE, extra_environment=borg_environment
+        try:
+            # The Borg repair option triggers an interactive prompt, which won't work when output
+            # is captured. And progress messes with the terminal directly.
+            if repair or progress:
+                execute_command(
+                    full_command, output_file=DO_NOT_CAPTURE, extra_environment=borg_environment
+                )
+            else:
+                execute_command(full_command, extra_environment=borg_environment)
+        except Exception:
+            write_failed_check_times(
+                config,
+                borg_repository_id,
+                borg_checks,
+                archives_check_id,
+                archive_filter_flags,
+                run_time,
+                datetime.datetime.now() - run_time,
             )
-        else:
-            execute_command(full_command, extra_environment=borg_environment)
+            raise
 
-        for check in checks:
-            write_check_time(
-                make_check_time_path(config, borg_repository_id, check, archives_check_id)
-            )
+        write_check_times(
+            config,
+            borg_repository_id,
+            borg_checks,
+            archives_check_id,
+            archive_filter_flags,
+            run_time,
+            datetime.datetime.now() - run_time,
+        )
 
     if 'extract' in checks:
-        extract.extract_last_archive_dry_run(
+        run_time = datetime.datetime.now()
+
+        try:
+            extract.extract_last_archive_dry_run(
+                config,
+                local_borg_version,
+                global_arguments,
+                repository_path,
+                lock_wait,
+                local_path,
+                remote_path,
+            )
+        except Exception:
+            write_failed_check_times(
+                config,
+                borg_repository_id,
+                ('extract',),
+                run_time=run_time,
+                duration=datetime.datetime.now() - run_time,
+            )
+            raise
+
+        write_check_times(
             config,
-            local_borg_version,
-            global_arguments,
-            repository_path,
-            lock_wait,
-            local_path,
-            remote_path,
+            borg_repository_id,
+            ('extract',),
+            run_time=run_time,
+            duration=datetime.datetime.now() - run_time,
+        )
+
+    if 'spot' in checks:
+        run_time = datetime.datetime.now()
+
+        try:
+            spot_check(
+                repository_path,
+                config,
+                local_borg_version,
+                global_arguments,
+                local_path,
+                remote_path,
+            )
+        except Exception:
+            write_failed_check_times(
+                config,
+                borg_repository_id,
+                ('spot',),
+                run_time=run_time,
+                duration=datetime.datetime.now() - run_time,
+            )
+            raise
+
+        write_check_times(
+            config,
+            borg_repository_id,
+            ('spot',),
+            run_time=run_time,
+            duration=datetime.datetime.now() - run_time,
         )
-        write_check_time(make_check_time_path(config, borg_repository_id, 'extract'))
+
+    return checks
@@ -1,11 +1,135 @@
+import argparse
+import datetime
+import json
 import logging
 
-from borgmatic.borg import environment, flags
+from borgmatic.borg import check, environment, flags, rinfo, state
 from borgmatic.execute import execute_command
 
 logger = logging.getLogger(__name__)
 
 
+COMPACT_STATE_NAMESPACE = 'compact'
+
+
+def get_repository_unique_size(
+    repository_path,
+    config,
+    local_borg_version,
+    global_arguments,
+    local_path='borg',
+    remote_path=None,
+):
+    '''
+    Given a local or remote repository path, a configuration dict, the local Borg version, global
+    arguments as an argparse.Namespace, and local and remote Borg paths, return the repository's
+    deduplicated, compressed size in bytes as reported by "borg rinfo --json", or None if it's
+    not available.
+    '''
+    repository_info = json.loads(
+        rinfo.display_repository_info(
+            repository_path,
+            config,
+            local_borg_version,
+            argparse.Namespace(json=True),
+            global_arguments,
+            local_path,
+            remote_path,
+        )
+    )
+
+    return repository_info.get('cache', {}).get('stats', {}).get('unique_csize')
+
+
+def record_reclaimable_space(repository_path, config, freed_bytes):
+    '''
+    Given a local or remote repository path, a configuration dict, and a number of bytes that a
+    prune just freed, add those bytes to the space that a subsequent compact can reclaim, as
+    tracked in the borgmatic state database. If the number of bytes is None (because it couldn't
+    be determined), record that the reclaimable space is unknown instead, so that the next compact
+    isn't held up waiting on a threshold it can't measure.
+    '''
+    with state.open_state_database(config, immediate=True) as connection:
+        compact_state = state.get_value(
+            connection, COMPACT_STATE_NAMESPACE, repository_path, default={}
+        )
+
+        if freed_bytes is None:
+            compact_state['reclaimable_unknown'] = True
+        else:
+            compact_state['reclaimable_bytes'] = compact_state.get('reclaimable_bytes', 0) + max(
+                freed_bytes, 0
+            )
+
+        state.set_value(connection, COMPACT_STATE_NAMESPACE, repository_path, compact_state)
+
+
+def record_compaction(repository_path, config, compact_time=None):
+    '''
+    Given a local or remote repository path, a configuration dict, and the time of a successful
+    compact as a datetime.datetime (defaulting to now), record that compact in the borgmatic state
+    database and reset the space tracked as reclaimable.
+    '''
+    if compact_time is None:
+        compact_time = datetime.datetime.now()
+
+    with state.open_state_database(config) as connection:
+        state.set_value(
+            connection,
+            COMPACT_STATE_NAMESPACE,
+            repository_path,
+            {'last_compact_time': compact_time.timestamp(), 'reclaimable_bytes': 0},
+        )
+
+
+def compact_due(repository_path, config, now=None):
+    '''
+    Given a local or remote repository path, a configuration dict, and the current time as a
+    datetime.datetime (defaulting to now), return a reason string if compact should run on the
+    repository or None if it should be skipped.
+
+    Without "compact_frequency" or "compact_threshold_bytes" configured, compact is always due.
+    Otherwise, it's due if it has never run according to the borgmatic state database, if the
+    space that prunes have freed since the last compact reaches the threshold, or if the frequency
+    has elapsed since the last compact.
+
+    Raise ValueError if the configured frequency cannot be parsed.
+    '''
+    frequency_delta = check.parse_frequency(config.get('compact_frequency'))
+    threshold_bytes = config.get('compact_threshold_bytes')
+
+    if frequency_delta is None and threshold_bytes is None:
+        return 'always'
+
+    if now is None:
+        now = datetime.datetime.now()
+
+    with state.open_state_database(config) as connection:
+        compact_state = state.get_value(
+            connection, COMPACT_STATE_NAMESPACE, repository_path, default={}
+        )
+
+    last_compact_timestamp = compact_state.get('last_compact_time')
+
+    if last_compact_timestamp is None:
+        return 'no previous compact recorded'
+
+    if threshold_bytes is not None and compact_state.get('reclaimable_unknown'):
+        return 'reclaimable space unknown'
+
+    reclaimable_bytes = compact_state.get('reclaimable_bytes', 0)
+
+    if threshold_bytes is not None and reclaimable_bytes >= threshold_bytes:
+        return f'{reclaimable_bytes} bytes reclaimable'
+
+    last_compact_time = datetime.datetime.fromtimestamp(last_compact_timestamp)
+
+    if frequency_delta is not None and now >= last_compact_time + frequency_delta:
+        return f'last compact at {last_compact_time}'
+
+    return None
+
+
 def compact_segments(
     dry_run,
     repository_path,
@@ -7,7 +7,7 @@ import stat
 import tempfile
 
 import borgmatic.logger
-from borgmatic.borg import environment, feature, flags, state
+from borgmatic.borg import environment, feature, file_status, flags, state
 from borgmatic.execute import (
     DO_NOT_CAPTURE,
     execute_command,
@@ -335,6 +335,7 @@ def create_archive(
     json=False,
     list_files=False,
     stream_processes=None,
+    list_summary=False,
 ):
     '''
     Given vebosity/dry-run flags, a local or remote repository path, and a configuration dict,
@@ -342,8 +343,12 @@ def create_archive(
 
     If a sequence of stream processes is given (instances of subprocess.Popen), then execute the
     create command while also triggering the given processes to produce output.
+
+    If list summary is True, list files as with list files, but log a summary of file statuses per
+    top-level directory instead of each file.
     '''
     borgmatic.logger.add_custom_log_levels()
+    list_files = list_files or list_summary
     borgmatic_source_directories = expand_directories(
         collect_borgmatic_source_directories(config.get('borgmatic_source_directory'))
     )
@@ -500,29 +505,43 @@ def create_archive(
         + (('--json',) if json else ())
     )
 
-    if stream_processes:
-        return execute_command_with_processes(
-            create_command,
-            stream_processes,
-            output_log_level,
-            output_file,
-            borg_local_path=local_path,
-            working_directory=working_directory,
-            extra_environment=borg_environment,
-        )
-    elif output_log_level is None:
-        return execute_command_and_capture_output(
-            create_command,
-            working_directory=working_directory,
-            extra_environment=borg_environment,
-            borg_local_path=local_path,
-        )
-    else:
-        execute_command(
-            create_command,
-            output_log_level,
-            output_file,
-            borg_local_path=local_path,
-            working_directory=working_directory,
-            extra_environment=borg_environment,
-        )
+    # Rather than logging a line per file, optionally summarize the file listing.
+    file_list_summarizer = (
+        file_status.File_list_summarizer(repository_path, config.get('list_files_log_path'))
+        if list_summary and not json and not progress
+        else None
+    )
+    line_handler = file_list_summarizer.handle_line if file_list_summarizer else None
+
+    try:
+        if stream_processes:
+            return execute_command_with_processes(
+                create_command,
+                stream_processes,
+                output_log_level,
+                output_file,
+                borg_local_path=local_path,
+                working_directory=working_directory,
+                extra_environment=borg_environment,
+                line_handler=line_handler,
+            )
+        elif output_log_level is None:
+            return execute_command_and_capture_output(
+                create_command,
+                working_directory=working_directory,
+                extra_environment=borg_environment,
+                borg_local_path=local_path,
+            )
+        else:
+            execute_command(
+                create_command,
+                output_log_level,
+                output_file,
+                borg_local_path=local_path,
+                working_directory=working_directory,
+                extra_environment=borg_environment,
+                line_handler=line_handler,
+            )
+    finally:
+        if file_list_summarizer:
+            file_list_summarizer.finish()
@@ -0,0 +1,149 @@
+import collections
+import gzip
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Matches a line of "borg create --list" output: a single status character, a space, and a path.
+FILE_STATUS_PATTERN = re.compile(r'^([AMUECdbchsfix?+-]) (.+)$')
+
+# How often to log a running total while Borg is still listing files.
+ROLLUP_INTERVAL_SECONDS = 60
+
+# The order to show statuses in summaries, with any others after these.
+STATUS_ORDER = 'AMUEC-+x'
+
+
+def parse_file_status(line):
+    '''
+    Given a line of output from "borg create --list", either in plain text or as a "--log-json"
+    file_status record, return a (status, path) tuple. If the line isn't a file status, return
+    None.
+    '''
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+        if not isinstance(record, dict) or record.get('type') != 'file_status':
+            return None
+
+        return (record.get('status') or '?', record.get('path', ''))
+
+    match = FILE_STATUS_PATTERN.match(line)
+
+    if not match:
+        return None
+
+    return match.groups()
+
+
+def top_level_directory(path):
+    '''
+    Given a file path from Borg, return its top-level directory, e.g. "/home" for
+    "/home/user/file.txt" or "etc" for "etc/hosts". A path without any parent directory is returned
+    as-is.
+    '''
+    leading_slash = '/' if path.startswith('/') else ''
+
+    return leading_slash + path.lstrip('/').split('/', 1)[0]
+
+
+def format_counts(counts):
+    '''
+    Given a collections.Counter from file status to count, return the counts as a string like
+    "A 12, M 3, U 4052", ordered per STATUS_ORDER.
+    '''
+    return ', '.join(
+        f'{status} {counts[status]}'
+        for status in sorted(
+            counts,
+            key=lambda status: (status not in STATUS_ORDER, STATUS_ORDER.find(status), status),
+        )
+    )
+
+
+class File_list_summarizer:
+    '''
+    A consumer of "borg create --list" output lines that, rather than logging one line per file,
+    aggregates file statuses per top-level directory. It logs a running total every
+    ROLLUP_INTERVAL_SECONDS and a final table when finished. Optionally, it also writes the full
+    listing to a gzip-compressed file.
+    '''
+
+    def __init__(self, repository_label, listing_path=None, clock=time.monotonic):
+        '''
+        Given a repository label to prefix log messages with, an optional path of a gzip-compressed
+        file to write the full listing to, and a function returning the current time in seconds,
+        start a new summary.
+        '''
+        self.repository_label = repository_label
+        self.clock = clock
+        self.counts = collections.defaultdict(collections.Counter)
+        self.total_counts = collections.Counter()
+        self.last_rollup_time = clock()
+        self.listing_file = None
+
+        if listing_path:
+            listing_path = os.path.expanduser(listing_path)
+            os.makedirs(os.path.dirname(listing_path) or '.', exist_ok=True)
+            self.listing_file = gzip.open(listing_path, 'wt')
+
+    def handle_line(self, line):
+        '''
+        Given a line of Borg output, count it if it's a file status and return True. Otherwise,
+        return False so that the caller logs it as usual.
+        '''
+        file_status = parse_file_status(line)
+
+        if not file_status:
+            return False
+
+        status, path = file_status
+        self.counts[top_level_directory(path)][status] += 1
+        self.total_counts[status] += 1
+
+        if self.listing_file:
+            self.listing_file.write(f'{status} {path}\n')
+
+        now = self.clock()
+
+        if now - self.last_rollup_time >= ROLLUP_INTERVAL_SECONDS:
+            self.last_rollup_time = now
+            logger.log(
+                logging.ANSWER,
+                f'{self.repository_label}: {sum(self.total_counts.values())} files so far ({format_counts(self.total_counts)})',
+            )
+
+        return True
+
+    def finish(self):
+        '''
+        Log a final table of file counts per top-level directory and status, and close any listing
+        file.
+        '''
+        if self.listing_file:
+            self.listing_file.close()
+            self.listing_file = None
+
+        if not self.total_counts:
+            return
+
+        logger.log(
+            logging.ANSWER,
+            f'{self.repository_label}: {sum(self.total_counts.values())} files listed ({format_counts(self.total_counts)})',
+        )
+
+        width = max(len(directory) for directory in self.counts)
+
+        for directory in sorted(self.counts):
+            logger.log(
+                logging.ANSWER,
+                f'{directory.ljust(width)}  {sum(self.counts[directory].values()):>10}  {format_counts(self.counts[directory])}',
+            )
@@ -0,0 +1,274 @@
+import argparse
+import datetime
+import json
+import logging
+import statistics
+import time
+
+from borgmatic.borg import info, state
+
+logger = logging.getLogger(__name__)
+
+
+# How many of the most recent runs to consider when estimating durations and recent trends.
+RECENT_RUN_COUNT = 10
+
+# How far ahead to forecast repository growth.
+FORECAST_DAYS = 30
+
+
+def history_enabled(config):
+    '''
+    Given a configuration dict, return whether run statistics history is enabled, either explicitly
+    or because the Prometheus hook exports metrics from it.
+    '''
+    return bool(config.get('statistics_history', False) or config.get('prometheus'))
+
+
+def parse_archive_statistics(archive):
+    '''
+    Given an archive dict from "borg create --json" or "borg info --json", return a dict of the
+    statistics to record for it: "name", "start_time" (a timestamp), "duration" (in seconds),
+    "original_size", "compressed_size", "deduplicated_size", and "file_count".
+    '''
+    archive_stats = archive.get('stats', {})
+
+    return {
+        'name': archive['name'],
+        'start_time': datetime.datetime.fromisoformat(archive['start']).timestamp(),
+        'duration': archive.get('duration'),
+        'original_size': archive_stats.get('original_size'),
+        'compressed_size': archive_stats.get('compressed_size'),
+        'deduplicated_size': archive_stats.get('deduplicated_size'),
+        'file_count': archive_stats.get('nfiles'),
+    }
+
+
+def fetch_latest_archive_statistics(
+    repository_path,
+    config,
+    local_borg_version,
+    global_arguments,
+    local_path='borg',
+    remote_path=None,
+):
+    '''
+    Given a local or remote repository path, a configuration dict, the local Borg version, global
+    arguments as an argparse.Namespace, and local and remote Borg paths, return the JSON dict from
+    "borg info --json" for the most recent archive, which includes "archives" and "cache" keys.
+    '''
+    return json.loads(
+        info.display_archives_info(
+            repository_path,
+            config,
+            local_borg_version,
+            argparse.Namespace(
+                repository=repository_path,
+                archive=None,
+                json=True,
+                prefix=None,
+                match_archives=None,
+                sort_by=None,
+                first=None,
+                last=1,
+                oldest=None,
+                newest=None,
+                older=None,
+                newer=None,
+            ),
+            global_arguments,
+            local_path,
+            remote_path,
+        )
+    )
+
+
+def record_create_statistics(config, repository_path, create_output):
+    '''
+    Given a configuration dict, a local or remote repository path, and the parsed JSON output of
+    "borg create --json" (or of "borg info --json" for the newly created archive), record the
+    archive's statistics along with the repository's deduplicated size in the state database.
+    '''
+    archive = create_output.get('archive') or create_output['archives'][-1]
+    archive_statistics = parse_archive_statistics(archive)
+
+    with state.open_state_database(config) as connection:
+        connection.execute(
+            '''
+            INSERT OR REPLACE INTO archive_statistics (
+                repository, archive_name, start_time, duration, original_size, compressed_size,
+                deduplicated_size, file_count, repository_unique_size
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (
+                repository_path,
+                archive_statistics['name'],
+                archive_statistics['start_time'],
+                archive_statistics['duration'],
+                archive_statistics['original_size'],
+                archive_statistics['compressed_size'],
+                archive_statistics['deduplicated_size'],
+                archive_statistics['file_count'],
+                create_output.get('cache', {}).get('stats', {}).get('unique_csize'),
+            ),
+        )
+
+
+def record_action_duration(config, repository_path, action_name, start_time, duration):
+    '''
+    Given a configuration dict, a local or remote repository path, the name of an action that just
+    completed successfully, its start time as a timestamp, and its duration in seconds, record the
+    duration in the state database.
+    '''
+    with state.open_state_database(config) as connection:
+        connection.execute(
+            'INSERT INTO action_durations (repository, action, start_time, duration) VALUES (?, ?, ?, ?)',
+            (repository_path, action_name, start_time, duration),
+        )
+
+
+def record_action_run(config, repository_path, action_name, start_time, dry_run):
+    '''
+    Given a configuration dict, a local or remote repository path, the name of an action that just
+    ran to completion, its start time as a timestamp, and whether this was a dry run, record how long
+    the action took if statistics history is enabled and this wasn't a dry run.
+
+    Call this only once an action has actually done its work, not when it bails out early (e.g.
+    because its frequency hasn't elapsed), so that skipped runs don't drag down duration estimates.
+    '''
+    if not history_enabled(config) or dry_run:
+        return
+
+    record_action_duration(
+        config, repository_path, action_name, start_time, time.time() - start_time
+    )
+
+
+def read_archive_statistics(config, repository_path):
+    '''
+    Given a configuration dict and a local or remote repository path, return the recorded archive
+    statistics for the repository as a list of dicts, oldest first.
+    '''
+    with state.open_state_database(config) as connection:
+        cursor = connection.execute(
+            '''
+            SELECT archive_name, start_time, duration, original_size, compressed_size,
+                deduplicated_size, file_count, repository_unique_size
+            FROM archive_statistics WHERE repository = ? ORDER BY start_time
+            ''',
+            (repository_path,),
+        )
+        names = tuple(
+            'name' if column[0] == 'archive_name' else column[0] for column in cursor.description
+        )
+
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def read_action_durations(config, repository_path):
+    '''
+    Given a configuration dict and a local or remote repository path, return a dict from action name
+    to a list of recorded durations in seconds for that action on the repository, oldest first.
+    '''
+    durations = {}
+
+    with state.open_state_database(config) as connection:
+        for action_name, duration in connection.execute(
+            'SELECT action, duration FROM action_durations WHERE repository = ? ORDER BY start_time',
+            (repository_path,),
+        ):
+            durations.setdefault(action_name, []).append(duration)
+
+    return durations
+
+
+def estimate_duration(durations):
+    '''
+    Given a sequence of recorded durations in seconds, oldest first, return the median of the most
+    recent ones as an estimate of the next duration, or None if there aren't any.
+    '''
+    recent_durations = [duration for duration in durations[-RECENT_RUN_COUNT:] if duration]
+
+    if not recent_durations:
+        return None
+
+    return statistics.median(recent_durations)
+
+
+def estimate_action_duration(config, repository_path, action_name):
+    '''
+    Given a configuration dict, a local or remote repository path, and an action name, return an
+    estimate in seconds of how long the action will take on the repository based on its recorded
+    history, or None if there's no history for it.
+    '''
+    return estimate_duration(read_action_durations(config, repository_path).get(action_name, ()))
+
+
+def deduplication_ratio(archive_statistics):
+    '''
+    Given a sequence of archive statistics dicts, return the ratio of total original size to total
+    deduplicated size across them, or None if it can't be computed.
+    '''
+    original_size = sum(archive.get('original_size') or 0 for archive in archive_statistics)
+    deduplicated_size = sum(archive.get('deduplicated_size') or 0 for archive in archive_statistics)
+
+    if not deduplicated_size:
+        return None
+
+    return original_size / deduplicated_size
+
+
+def growth_per_day(archive_statistics):
+    '''
+    Given a sequence of archive statistics dicts, oldest first, fit a least-squares line to the
+    repository's deduplicated size over time and return its slope in bytes per day. Return None if
+    there are fewer than two data points spanning some time.
+    '''
+    points = [
+        (archive['start_time'] / 86400, archive['repository_unique_size'])
+        for archive in archive_statistics
+        if archive.get('repository_unique_size') is not None
+    ]
+
+    if len(points) < 2:
+        return None
+
+    # Not statistics.fmean(), which requires Python 3.8.
+    mean_day = sum(day for day, size in points) / len(points)
+    mean_size = sum(size for day, size in points) / len(points)
+    variance = sum((day - mean_day) ** 2 for day, size in points)
+
+    if not variance:
+        return None
+
+    return sum((day - mean_day) * (size - mean_size) for day, size in points) / variance
+
+
+def summarize_history(archive_statistics, action_durations):
+    '''
+    Given a sequence of archive statistics dicts, oldest first, and a dict from action name to its
+    recorded durations, return a dict summarizing trends: archive count, the latest archive,
+    deduplication ratios overall and for recent archives, repository growth per day with a forecast
+    of the repository size, and estimated durations for each action.
+    '''
+    latest_archive = archive_statistics[-1] if archive_statistics else None
+    daily_growth = growth_per_day(archive_statistics)
+    latest_unique_size = latest_archive.get('repository_unique_size') if latest_archive else None
+
+    return {
+        'archive_count': len(archive_statistics),
+        'latest_archive': latest_archive,
+        'deduplication_ratio': deduplication_ratio(archive_statistics),
+        'recent_deduplication_ratio': deduplication_ratio(archive_statistics[-RECENT_RUN_COUNT:]),
+        'growth_per_day': daily_growth,
+        'forecast_days': FORECAST_DAYS,
+        'forecast_size': (
+            latest_unique_size + daily_growth * FORECAST_DAYS
+            if daily_growth is not None and latest_unique_size is not None
+            else None
+        ),
+        'estimated_durations': {
+            action_name: estimate_duration(durations)
+            for action_name, durations in action_durations.items()
+        },
+    }
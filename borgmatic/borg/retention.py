@@ -0,0 +1,417 @@
+import argparse
+import collections
+import datetime
+import fnmatch
+import json
+import logging
+import os
+import pwd
+import re
+import socket
+
+import borgmatic.logger
+from borgmatic.borg import check, info, prune, state
+
+logger = logging.getLogger(__name__)
+
+
+# The same retention periods, in the same order, as Borg's own prune implementation.
+PRUNING_PATTERNS = collections.OrderedDict(
+    (
+        ('secondly', '%Y-%m-%d %H:%M:%S'),
+        ('minutely', '%Y-%m-%d %H:%M'),
+        ('hourly', '%Y-%m-%d %H'),
+        ('daily', '%Y-%m-%d'),
+        ('weekly', '%G-%V'),
+        ('monthly', '%Y-%m'),
+        ('yearly', '%Y'),
+    )
+)
+KEEP_WITHIN_HOURS_PER_UNIT = {'H': 1, 'd': 24, 'w': 24 * 7, 'm': 24 * 31, 'y': 24 * 365}
+CHECKPOINT_PATTERN = re.compile(r'(\.checkpoint|\.checkpoint\.\d+)$')
+ARCHIVE_LIST_STATE_NAMESPACE = 'archive_list'
+DEFAULT_ARCHIVE_LIST_CACHE_MAX_AGE = '1 hour'
+
+# The Borg placeholders that stay the same from one run to the next on a given host, and so can
+# appear in an archive match pattern.
+STABLE_PLACEHOLDER_PATTERN = re.compile(r'\{(hostname|fqdn|reverse-fqdn|user)\}')
+
+
+def parse_keep_within(keep_within):
+    '''
+    Given a Borg "--keep-within" interval string like "3H" or "2w", return it as a
+    datetime.timedelta.
+
+    Raise ValueError if the interval cannot be parsed.
+    '''
+    match = re.fullmatch(r'(\d+)([HdwmyY])', keep_within.strip())
+
+    if not match:
+        raise ValueError(f'Could not parse keep_within interval "{keep_within}"')
+
+    number, unit = match.groups()
+
+    return datetime.timedelta(
+        hours=int(number) * KEEP_WITHIN_HOURS_PER_UNIT[unit.replace('Y', 'y')]
+    )
+
+
+def expand_placeholders(pattern):
+    '''
+    Given an archive match pattern, replace any "{hostname}", "{fqdn}", "{reverse-fqdn}", and
+    "{user}" Borg placeholders in it with their values, determined the same way Borg does.
+    '''
+    fqdn = socket.getfqdn()
+    values = {
+        # Like Borg, use the short hostname even if the system's hostname is fully qualified.
+        'hostname': socket.gethostname().split('.')[0],
+        'fqdn': fqdn,
+        'reverse-fqdn': '.'.join(reversed(fqdn.split('.'))),
+        'user': pwd.getpwuid(os.getuid()).pw_name,
+    }
+
+    return STABLE_PLACEHOLDER_PATTERN.sub(lambda match: values[match.group(1)], pattern)
+
+
+def make_archive_matcher(match_flags):
+    '''
+    Given a dict from Borg archive matching flag name ("--match-archives" or "--glob-archives") to
+    its pattern, return a function that takes an archive name and returns whether it matches, the
+    same way Borg would, placeholders included. Without any such flags, every archive matches.
+    '''
+    if '--glob-archives' in match_flags:
+        pattern = re.compile(fnmatch.translate(expand_placeholders(match_flags['--glob-archives'])))
+
+        return lambda name: bool(pattern.match(name))
+
+    match_archives = match_flags.get('--match-archives')
+
+    if not match_archives:
+        return lambda name: True
+
+    match_archives = expand_placeholders(match_archives)
+    style, _, pattern = match_archives.partition(':')
+
+    if style == 'sh' or style == 'fm':
+        compiled_pattern = re.compile(fnmatch.translate(pattern))
+        return lambda name: bool(compiled_pattern.match(name))
+    if style == 're':
+        compiled_pattern = re.compile(pattern)
+        return lambda name: bool(compiled_pattern.search(name))
+    if style == 'pp':
+        return lambda name: name.startswith(pattern)
+
+    return lambda name: name == match_archives
+
+
+def parse_archive_time(archive):
+    '''
+    Given an archive dict from "borg rlist --json", return its creation time as a naive local
+    datetime.datetime, which is what Borg's retention periods are computed from.
+    '''
+    archive_time = datetime.datetime.fromisoformat(archive['time'])
+
+    if archive_time.tzinfo:
+        return archive_time.astimezone().replace(tzinfo=None)
+
+    return archive_time
+
+
+def prune_within(archives, interval, kept_because, now):
+    '''
+    Given a sequence of (archive name, archive time) tuples sorted newest first, a
+    datetime.timedelta retention interval, a dict from archive name to the (rule, count) it's kept
+    by, and the current time, keep every archive newer than the interval. Record each one in
+    kept_because and return them as a list.
+    '''
+    target = now - interval
+    keep = []
+
+    for name, archive_time in archives:
+        if archive_time > target:
+            keep.append(name)
+            kept_because[name] = ('within', len(keep))
+
+    return keep
+
+
+def prune_split(archives, rule, count, kept_because):
+    '''
+    Given a sequence of (archive name, archive time) tuples sorted newest first, a retention rule
+    name from PRUNING_PATTERNS, the number of periods to keep for that rule, and a dict from archive
+    name to the (rule, count) it's kept by, keep the newest archive in each of the most recent
+    periods. Record each one in kept_because and return them as a list.
+
+    Just like Borg, if there aren't enough periods to reach the count, also keep the oldest archive.
+    '''
+    pattern = PRUNING_PATTERNS[rule]
+    last_period = None
+    keep = []
+    name = None
+
+    if count == 0:
+        return keep
+
+    for name, archive_time in archives:
+        period = archive_time.strftime(pattern)
+
+        if period != last_period:
+            last_period = period
+
+            if name not in kept_because:
+                keep.append(name)
+                kept_because[name] = (rule, len(keep))
+
+                if len(keep) == count:
+                    break
+
+    if name is not None and len(keep) < count and name not in kept_because:
+        keep.append(name)
+        kept_because[name] = (f'{rule}[oldest]', len(keep))
+
+    return keep
+
+
+def simulate_prune(archives, prune_flags, now=None):
+    '''
+    Given a sequence of archive dicts from "borg rlist --json", the flags from
+    prune.make_prune_flags(), and the current time as a datetime.datetime, apply Borg's retention
+    algorithm locally without touching the repository.
+
+    Return a tuple of (dict from name of each kept archive to the (rule, count) that keeps it,
+    tuple of the names of archives that would get pruned, newest first). Archives that don't match
+    the configured archive filters are neither kept nor pruned.
+
+    Raise ValueError if the retention options cannot be parsed.
+    '''
+    if now is None:
+        now = datetime.datetime.now()
+
+    flag_values = dict(zip(prune_flags[::2], prune_flags[1::2]))
+    archive_matches = make_archive_matcher(flag_values)
+
+    matching_archives = sorted(
+        (
+            (archive['name'], parse_archive_time(archive))
+            for archive in archives
+            if archive_matches(archive['name'])
+        ),
+        key=lambda archive: archive[1],
+        reverse=True,
+    )
+    checkpoints = tuple(
+        (name, archive_time)
+        for name, archive_time in matching_archives
+        if CHECKPOINT_PATTERN.search(name)
+    )
+    checkpoint_names = {name for name, archive_time in checkpoints}
+
+    # Keep the latest checkpoint only if there's no later completed archive, and otherwise ignore
+    # checkpoints entirely, as Borg does.
+    kept_because = {}
+
+    if checkpoints and matching_archives[0] == checkpoints[0]:
+        kept_because[checkpoints[0][0]] = ('checkpoint', 1)
+
+    completed_archives = tuple(
+        (name, archive_time)
+        for name, archive_time in matching_archives
+        if name not in checkpoint_names
+    )
+
+    if '--keep-within' in flag_values:
+        prune_within(
+            completed_archives, parse_keep_within(flag_values['--keep-within']), kept_because, now
+        )
+
+    for rule in PRUNING_PATTERNS:
+        count = flag_values.get(f'--keep-{rule}')
+
+        if count is not None:
+            prune_split(completed_archives, rule, int(count), kept_because)
+
+    return (
+        kept_because,
+        tuple(name for name, archive_time in matching_archives if name not in kept_because),
+    )
+
+
+def get_archive_list_age(archive_list, now=None):
+    '''
+    Given a cached archive list dict as returned by get_archive_list() and the current time as a
+    datetime.datetime, return how long ago the archive list was fetched as a datetime.timedelta.
+    '''
+    if now is None:
+        now = datetime.datetime.now()
+
+    return now - datetime.datetime.fromisoformat(archive_list['cached_at'])
+
+
+def get_archive_list(
+    repository_path,
+    config,
+    local_borg_version,
+    global_arguments,
+    local_path='borg',
+    remote_path=None,
+):
+    '''
+    Given a local or remote repository path, a configuration dict, the local Borg version, global
+    arguments as an argparse.Namespace, and local and remote Borg paths, return a dict with
+    "archives" (a list of dicts with each archive's "name", "time", and "deduplicated_size" from
+    "borg info --json") and "cached_at" (an ISO timestamp).
+
+    Use the archive list cached in the borgmatic state database if present and younger than the
+    configured archive_list_cache_max_age. Otherwise, fetch it from the repository and cache it.
+
+    Raise ValueError if the configured archive_list_cache_max_age cannot be parsed.
+    '''
+    max_age = check.parse_frequency(
+        config.get('archive_list_cache_max_age', DEFAULT_ARCHIVE_LIST_CACHE_MAX_AGE)
+    )
+
+    with state.open_state_database(config) as connection:
+        archive_list = state.get_value(connection, ARCHIVE_LIST_STATE_NAMESPACE, repository_path)
+
+    if archive_list and max_age is not None:
+        if get_archive_list_age(archive_list) < max_age:
+            logger.debug(
+                f'{repository_path}: Using archive list cached at {archive_list["cached_at"]}'
+            )
+            return archive_list
+
+        logger.debug(
+            f'{repository_path}: Archive list cached at {archive_list["cached_at"]} is stale'
+        )
+
+    logger.debug(f'{repository_path}: Fetching archive list to cache')
+
+    # Unlike "borg rlist", "borg info" also reports how much space each archive uses on its own, at
+    # the cost of a slower fetch. Cache all archives, as the archives to prune are filtered during
+    # simulation.
+    archives = json.loads(
+        info.display_archives_info(
+            repository_path,
+            config,
+            local_borg_version,
+            argparse.Namespace(
+                repository=repository_path,
+                archive=None,
+                json=True,
+                prefix=None,
+                match_archives='sh:*',
+                sort_by=None,
+                first=None,
+                last=None,
+                oldest=None,
+                newest=None,
+                older=None,
+                newer=None,
+            ),
+            global_arguments,
+            local_path,
+            remote_path,
+        )
+    ).get('archives', [])
+
+    archive_list = {
+        'archives': [
+            {
+                'name': archive['name'],
+                'time': archive['start'],
+                'deduplicated_size': archive.get('stats', {}).get('deduplicated_size'),
+            }
+            for archive in archives
+        ],
+        'cached_at': datetime.datetime.now().isoformat(),
+    }
+
+    with state.open_state_database(config) as connection:
+        state.set_value(connection, ARCHIVE_LIST_STATE_NAMESPACE, repository_path, archive_list)
+
+    return archive_list
+
+
+def invalidate_archive_list(repository_path, config):
+    '''
+    Given a local or remote repository path and a configuration dict, discard any archive list
+    cached for that repository, for instance because archives have been created or pruned since.
+    '''
+    with state.open_state_database(config) as connection:
+        state.delete_value(connection, ARCHIVE_LIST_STATE_NAMESPACE, repository_path)
+
+
+def format_size(size):
+    '''
+    Given a size in bytes, return it as a human-readable string like "1.50 GB".
+    '''
+    for unit in ('B', 'kB', 'MB', 'GB', 'TB'):
+        if abs(size) < 1000 or unit == 'TB':
+            break
+
+        size /= 1000
+
+    return f'{size:.2f} {unit}' if unit != 'B' else f'{size} B'
+
+
+def preview_prune(
+    repository_path,
+    config,
+    local_borg_version,
+    prune_arguments,
+    global_arguments,
+    local_path='borg',
+    remote_path=None,
+):
+    '''
+    Given a local or remote repository path, a configuration dict, the local Borg version, the
+    arguments to the prune action, global arguments as an argparse.Namespace, and local and remote
+    Borg paths, simulate pruning with the configured retention policy against the (cached) archive
+    list, and log which archives would be kept or pruned, a lower bound on how much space that would
+    free, and how old the archive list is.
+
+    This never locks or modifies the repository.
+    '''
+    borgmatic.logger.add_custom_log_levels()
+
+    archive_list = get_archive_list(
+        repository_path,
+        config,
+        local_borg_version,
+        global_arguments,
+        local_path,
+        remote_path,
+    )
+    archive_times = {archive['name']: archive['time'] for archive in archive_list['archives']}
+    kept_because, pruned_names = simulate_prune(
+        archive_list['archives'], prune.make_prune_flags(config, local_borg_version)
+    )
+
+    if prune_arguments.list_archives:
+        for name in sorted(
+            tuple(kept_because) + pruned_names, key=lambda name: archive_times[name], reverse=True
+        ):
+            if name in kept_because:
+                rule, count = kept_because[name]
+                logger.answer(
+                    f'Keeping archive (rule: {rule} #{count}): {name} {archive_times[name]}'
+                )
+            else:
+                logger.answer(f'Would prune: {name} {archive_times[name]}')
+
+    # Each archive's deduplicated size only counts chunks that no other archive references, so
+    # pruning several archives together can free more than the sum, but never less.
+    archive_sizes = {
+        archive['name']: archive.get('deduplicated_size') for archive in archive_list['archives']
+    }
+    pruned_sizes = tuple(archive_sizes[name] for name in pruned_names)
+    estimate = (
+        f'; at least {format_size(sum(pruned_sizes))} freed once compacted'
+        if pruned_sizes and None not in pruned_sizes
+        else ''
+    )
+    age = datetime.timedelta(seconds=round(get_archive_list_age(archive_list).total_seconds()))
+
+    logger.answer(
+        f'{repository_path}: Would keep {len(kept_because)} and prune {len(pruned_names)} of {len(kept_because) + len(pruned_names)} matching archives{estimate} (archive list cached {age} ago)'
+    )
@@ -1 +1,159 @@
+import contextlib
+import json
+import os
+import sqlite3
+
 DEFAULT_BORGMATIC_SOURCE_DIRECTORY = '~/.borgmatic'
+STATE_DATABASE_FILENAME = 'state.db'
+
+# How long to wait on another borgmatic process holding a write lock on the state database.
+STATE_DATABASE_TIMEOUT_SECONDS = 60
+
+STATE_DATABASE_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS check_times (
+        repository_id TEXT NOT NULL,
+        check_type TEXT NOT NULL,
+        archives_check_id TEXT NOT NULL,
+        archive_filter TEXT,
+        last_success_time REAL,
+        last_run_time REAL NOT NULL,
+        last_duration REAL,
+        last_outcome TEXT NOT NULL,
+        PRIMARY KEY (repository_id, check_type, archives_check_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS state_values (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (namespace, key)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS archive_statistics (
+        repository TEXT NOT NULL,
+        archive_name TEXT NOT NULL,
+        start_time REAL NOT NULL,
+        duration REAL,
+        original_size INTEGER,
+        compressed_size INTEGER,
+        deduplicated_size INTEGER,
+        file_count INTEGER,
+        repository_unique_size INTEGER,
+        PRIMARY KEY (repository, archive_name)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS action_durations (
+        repository TEXT NOT NULL,
+        action TEXT NOT NULL,
+        start_time REAL NOT NULL,
+        duration REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS monitor_outbox (
+        hook_name TEXT NOT NULL,
+        config_filename TEXT NOT NULL,
+        state TEXT NOT NULL,
+        created_time REAL NOT NULL,
+        details TEXT NOT NULL,
+        PRIMARY KEY (hook_name, config_filename, state)
+    )
+    ''',
+)
+
+
+def make_state_database_path(config):
+    '''
+    Given a configuration dict, return the path of the borgmatic state database within the
+    borgmatic source directory.
+    '''
+    return os.path.join(
+        os.path.expanduser(
+            config.get('borgmatic_source_directory', DEFAULT_BORGMATIC_SOURCE_DIRECTORY)
+        ),
+        STATE_DATABASE_FILENAME,
+    )
+
+
+@contextlib.contextmanager
+def open_state_database(config, immediate=False):
+    '''
+    Given a configuration dict, open (creating if necessary) the borgmatic state database and yield
+    a sqlite3.Connection to it. Everything done with the connection within the context is committed
+    as a single transaction when the context exits without error and rolled back otherwise.
+
+    If immediate is True, take the database's write lock when the transaction begins (waiting for
+    any other borgmatic process to release it). Use this for a transaction that reads a value and
+    then writes based on it, as otherwise upgrading to the write lock partway through fails right
+    away when another process holds it.
+    '''
+    path = make_state_database_path(config)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+
+    connection = sqlite3.connect(path, timeout=STATE_DATABASE_TIMEOUT_SECONDS)
+
+    try:
+        os.chmod(path, 0o600)
+
+        with connection:
+            if immediate:
+                connection.execute('BEGIN IMMEDIATE')
+
+            for statement in STATE_DATABASE_SCHEMA:
+                connection.execute(statement)
+
+            yield connection
+    finally:
+        connection.close()
+
+
+def get_value(connection, namespace, key, default=None):
+    '''
+    Given a state database connection, a namespace (like "archive_list"), and a key within that
+    namespace, return the corresponding JSON-decoded value. Return the given default if no such
+    value is stored.
+    '''
+    row = connection.execute(
+        'SELECT value FROM state_values WHERE namespace = ? AND key = ?', (namespace, key)
+    ).fetchone()
+
+    if row is None:
+        return default
+
+    return json.loads(row[0])
+
+
+def get_values(connection, namespace):
+    '''
+    Given a state database connection and a namespace, return a dict from each key stored in that
+    namespace to its JSON-decoded value.
+    '''
+    return {
+        key: json.loads(value)
+        for key, value in connection.execute(
+            'SELECT key, value FROM state_values WHERE namespace = ?', (namespace,)
+        )
+    }
+
+
+def set_value(connection, namespace, key, value):
+    '''
+    Given a state database connection, a namespace, a key within that namespace, and a
+    JSON-serializable value, store the value, replacing any existing value for the key.
+    '''
+    connection.execute(
+        'INSERT OR REPLACE INTO state_values (namespace, key, value) VALUES (?, ?, ?)',
+        (namespace, key, json.dumps(value)),
+    )
+
+
+def delete_value(connection, namespace, key):
+    '''
+    Given a state database connection, a namespace, and a key within that namespace, delete any
+    stored value for the key.
+    '''
+    connection.execute('DELETE FROM state_values WHERE namespace = ? AND key = ?', (namespace, key))
@@ -1,18 +1,48 @@
 import logging
+import os
+import shutil
 
 from borgmatic.borg import environment
 from borgmatic.execute import execute_command_and_capture_output
 
 logger = logging.getLogger(__name__)
 
+# Dict from the resolved path and modification time of a Borg binary to its version string, so that
+# a borgmatic process running many configuration files (or the borgmatic daemon) only runs "borg
+# --version" again once Borg gets replaced, e.g. by an upgrade.
+version_cache = {}
+
+
+def get_version_cache_key(local_path):
+    '''
+    Given a local Borg binary path, return a tuple of its resolved path and modification time for
+    use as a version cache key, or None if the binary can't be found.
+    '''
+    resolved_path = shutil.which(local_path)
+
+    if not resolved_path:
+        return None
+
+    try:
+        return (resolved_path, os.stat(resolved_path).st_mtime)
+    except OSError:
+        return None
+
 
 def local_borg_version(config, local_path='borg'):
     '''
     Given a configuration dict and a local Borg binary path, return a version string for it.
 
+    Cache the version, so later calls with the same unchanged Borg binary don't run Borg at all.
+
     Raise OSError or CalledProcessError if there is a problem running Borg.
     Raise ValueError if the version cannot be parsed.
     '''
+    cache_key = get_version_cache_key(local_path)
+
+    if cache_key and cache_key in version_cache:
+        return version_cache[cache_key]
+
     full_command = (
         (local_path, '--version')
         + (('--info',) if logger.getEffectiveLevel() == logging.INFO else ())
@@ -25,6 +55,11 @@ def local_borg_version(config, local_path='borg'):
     )
 
     try:
-        return output.split(' ')[1].strip()
+        version = output.split(' ')[1].strip()
     except IndexError:
         raise ValueError('Could not parse Borg version string')
+
+    if cache_key:
+        version_cache[cache_key] = version
+
+    return version
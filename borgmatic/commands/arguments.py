@@ -24,6 +24,9 @@ ACTION_ALIASES = {
     'transfer': [],
     'break-lock': [],
     'borg': [],
+    'stats': [],
+    'monitor-flush': [],
+    'daemon': [],
 }
 
 
@@ -485,6 +488,12 @@ def make_parsers():
     prune_group.add_argument(
         '--list', dest='list_archives', action='store_true', help='List archives kept/pruned'
     )
+    prune_group.add_argument(
+        '--simulate',
+        default=False,
+        action='store_true',
+        help='Preview which archives the retention policy would prune, computed locally from a cached archive list without locking or modifying the repository',
+    )
     prune_group.add_argument(
         '--oldest',
         metavar='TIMESPAN',
@@ -539,6 +548,13 @@ def make_parsers():
         dest='threshold',
         help='Minimum saved space percentage threshold for compacting a segment, defaults to 10',
     )
+    compact_group.add_argument(
+        '--ignore-compact-frequency',
+        dest='ignore_compact_frequency',
+        default=False,
+        action='store_true',
+        help='Ignore configured compact_frequency and compact_threshold_bytes, and compact anyway',
+    )
     compact_group.add_argument(
         '-h', '--help', action='help', help='Show this help message and exit'
     )
@@ -572,6 +588,13 @@ def make_parsers():
     create_group.add_argument(
         '--list', '--files', dest='list_files', action='store_true', help='Show per-file details'
     )
+    create_group.add_argument(
+        '--list-summary',
+        '--files-summary',
+        dest='list_summary',
+        action='store_true',
+        help='Summarize per-file details by top-level directory and status instead of showing each file',
+    )
     create_group.add_argument(
         '--json', dest='json', default=False, action='store_true', help='Output results as JSON'
     )
@@ -606,10 +629,10 @@ def make_parsers():
     check_group.add_argument(
         '--only',
         metavar='CHECK',
-        choices=('repository', 'archives', 'data', 'extract'),
+        choices=('repository', 'archives', 'data', 'extract', 'spot'),
         dest='only',
         action='append',
-        help='Run a particular consistency check (repository, archives, data, or extract) instead of configured checks (subject to configured frequency, can specify flag multiple times)',
+        help='Run a particular consistency check (repository, archives, data, extract, or spot) instead of configured checks (subject to configured frequency, can specify flag multiple times)',
     )
     check_group.add_argument(
         '--force',
@@ -951,6 +974,11 @@ def make_parsers():
         '--restore-path',
         help='Path to restore SQLite database dumps to. Defaults to the "restore_path" option in borgmatic\'s configuration',
     )
+    restore_group.add_argument(
+        '--target-time',
+        metavar='TIME',
+        help='Point in time to restore databases to, e.g. "2024-01-31 12:00:00" (local time). Only supported for databases with incremental backups, and defaults to the time of the archive',
+    )
     restore_group.add_argument(
         '-h', '--help', action='help', help='Show this help message and exit'
     )
@@ -1176,6 +1204,68 @@ def make_parsers():
         '-h', '--help', action='help', help='Show this help message and exit'
     )
 
+    stats_parser = action_parsers.add_parser(
+        'stats',
+        aliases=ACTION_ALIASES['stats'],
+        help='Show trends and duration estimates from the recorded run statistics history',
+        description='Show trends and duration estimates from the recorded run statistics history (requires the statistics_history option)',
+        add_help=False,
+    )
+    stats_group = stats_parser.add_argument_group('stats arguments')
+    stats_group.add_argument(
+        '--repository',
+        help='Path of specific existing repository to show statistics for (must be already specified in a borgmatic configuration file)',
+    )
+    stats_group.add_argument(
+        '--json', dest='json', default=False, action='store_true', help='Output results as JSON'
+    )
+    stats_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
+
+    monitor_flush_parser = action_parsers.add_parser(
+        'monitor-flush',
+        aliases=ACTION_ALIASES['monitor-flush'],
+        help='Deliver monitoring pings saved after earlier runs failed to send them',
+        description='Deliver monitoring pings (finish and fail) saved to the outbox after earlier runs failed to send them, discarding any older than the monitor_outbox_max_age option',
+        add_help=False,
+    )
+    monitor_flush_group = monitor_flush_parser.add_argument_group('monitor-flush arguments')
+    monitor_flush_group.add_argument(
+        '-h', '--help', action='help', help='Show this help message and exit'
+    )
+
+    daemon_parser = action_parsers.add_parser(
+        'daemon',
+        aliases=ACTION_ALIASES['daemon'],
+        help='Run borgmatic as a daemon that runs configuration files on their schedules',
+        description='Run borgmatic as a long-running daemon that keeps configuration files loaded, runs their actions on the schedules in their schedule options, and accepts commands on a control socket. Or, with --status, --trigger, or --reload, send a command to a running daemon.',
+        add_help=False,
+    )
+    daemon_group = daemon_parser.add_argument_group('daemon arguments')
+    daemon_group.add_argument(
+        '--socket',
+        metavar='PATH',
+        help='Path of the daemon control socket, defaults to ~/.borgmatic/daemon.sock',
+    )
+    daemon_group.add_argument(
+        '--status',
+        default=False,
+        action='store_true',
+        help='Show the status of a running daemon instead of starting one',
+    )
+    daemon_group.add_argument(
+        '--trigger',
+        default=False,
+        action='store_true',
+        help='Tell a running daemon to run the default actions for every configuration file now',
+    )
+    daemon_group.add_argument(
+        '--reload',
+        default=False,
+        action='store_true',
+        help='Tell a running daemon to reload all configuration files now',
+    )
+    daemon_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
+
     borg_parser = action_parsers.add_parser(
         'borg',
         aliases=ACTION_ALIASES['borg'],
@@ -1217,7 +1307,7 @@ def parse_arguments(*unparsed_arguments):
     if not arguments['global'].config_paths:
         arguments['global'].config_paths = collect.get_default_config_paths(expand_home=True)
 
-    for action_name in ('bootstrap', 'generate', 'validate'):
+    for action_name in ('bootstrap', 'generate', 'validate', 'daemon'):
         if (
             action_name in arguments.keys() and len(arguments.keys()) > 2
         ):  # 2 = 1 for 'global' + 1 for the action
@@ -1237,13 +1327,23 @@ def parse_arguments(*unparsed_arguments):
             f"Unrecognized argument{'s' if len(unknown_arguments) > 1 else ''}: {' '.join(unknown_arguments)}"
         )
 
-    if 'create' in arguments and arguments['create'].list_files and arguments['create'].progress:
-        raise ValueError(
-            'With the create action, only one of --list (--files) and --progress flags can be used.'
-        )
-    if 'create' in arguments and arguments['create'].list_files and arguments['create'].json:
+    if 'create' in arguments:
+        list_files = arguments['create'].list_files or arguments['create'].list_summary
+
+        if list_files and arguments['create'].progress:
+            raise ValueError(
+                'With the create action, only one of --list (--files) or --list-summary and --progress flags can be used.'
+            )
+        if list_files and arguments['create'].json:
+            raise ValueError(
+                'With the create action, only one of --list (--files) or --list-summary and --json flags can be used.'
+            )
+
+    if 'daemon' in arguments and (
+        arguments['daemon'].status + arguments['daemon'].trigger + arguments['daemon'].reload > 1
+    ):
         raise ValueError(
-            'With the create action, only one of --list (--files) and --json flags can be used.'
+            'With the daemon action, only one of --status, --trigger, or --reload flags can be used.'
         )
 
     if (
@@ -22,25 +22,36 @@ import borgmatic.actions.config.bootstrap
 import borgmatic.actions.config.generate
 import borgmatic.actions.config.validate
 import borgmatic.actions.create
+import borgmatic.actions.daemon
 import borgmatic.actions.export_tar
 import borgmatic.actions.extract
 import borgmatic.actions.info
 import borgmatic.actions.list
+import borgmatic.actions.monitor_flush
 import borgmatic.actions.mount
 import borgmatic.actions.prune
 import borgmatic.actions.rcreate
 import borgmatic.actions.restore
 import borgmatic.actions.rinfo
 import borgmatic.actions.rlist
+import borgmatic.actions.stats
 import borgmatic.actions.transfer
 import borgmatic.commands.completion.bash
 import borgmatic.commands.completion.fish
+import borgmatic.events
+import borgmatic.hooks.outbox
 from borgmatic.borg import umount as borg_umount
 from borgmatic.borg import version as borg_version
 from borgmatic.commands.arguments import parse_arguments
 from borgmatic.config import checks, collect, validate
 from borgmatic.hooks import command, dispatch, monitor
-from borgmatic.logger import DISABLED, add_custom_log_levels, configure_logging, should_do_markup
+from borgmatic.logger import (
+    DISABLED,
+    add_custom_log_levels,
+    configure_logging,
+    flush_logging,
+    should_do_markup,
+)
 from borgmatic.signals import configure_signals
 from borgmatic.verbosity import verbosity_to_log_level
 
@@ -69,6 +80,7 @@ def run_configuration(config_filename, config, arguments):
     using_primary_action = {'create', 'prune', 'compact', 'check'}.intersection(arguments)
     monitoring_log_level = verbosity_to_log_level(global_arguments.monitoring_verbosity)
     monitoring_hooks_are_activated = using_primary_action and monitoring_log_level != DISABLED
+    start_pings = {}
 
     try:
         local_borg_version = borg_version.local_borg_version(config, local_path)
@@ -76,6 +88,9 @@ def run_configuration(config_filename, config, arguments):
         yield from log_error_records(f'{config_filename}: Error getting local Borg version', error)
         return
 
+    if 'monitor-flush' in arguments:
+        borgmatic.actions.monitor_flush.run_monitor_flush(config_filename, config, global_arguments)
+
     try:
         if monitoring_hooks_are_activated:
             dispatch.call_hooks(
@@ -87,7 +102,8 @@ def run_configuration(config_filename, config, arguments):
                 global_arguments.dry_run,
             )
 
-            dispatch.call_hooks(
+            # Let the start pings complete in the background while the actions run.
+            start_pings = dispatch.call_hooks_concurrently(
                 'ping_monitor',
                 config,
                 config_filename,
@@ -161,15 +177,28 @@ def run_configuration(config_filename, config, arguments):
 
     try:
         if monitoring_hooks_are_activated:
+            dispatch.wait_for_hooks(start_pings)
+
+            # Deliver any monitoring requests that earlier runs failed to send only now, so a slow or
+            # unreachable monitoring service doesn't delay the actions, but still before this run's
+            # finish or fail pings, so the monitoring services receive those last. Skip this if the
+            # "monitor-flush" action already delivered them.
+            if 'monitor-flush' not in arguments:
+                borgmatic.hooks.outbox.flush_undelivered_requests(
+                    config, config_filename, global_arguments.dry_run
+                )
+
             # send logs irrespective of error
-            dispatch.call_hooks(
-                'ping_monitor',
-                config,
-                config_filename,
-                monitor.MONITOR_HOOK_NAMES,
-                monitor.State.LOG,
-                monitoring_log_level,
-                global_arguments.dry_run,
+            dispatch.wait_for_hooks(
+                dispatch.call_hooks_concurrently(
+                    'ping_monitor',
+                    config,
+                    config_filename,
+                    monitor.MONITOR_HOOK_NAMES,
+                    monitor.State.LOG,
+                    monitoring_log_level,
+                    global_arguments.dry_run,
+                )
             )
     except (OSError, CalledProcessError) as error:
         if command.considered_soft_failure(config_filename, error):
@@ -181,14 +210,16 @@ def run_configuration(config_filename, config, arguments):
     if not encountered_error:
         try:
             if monitoring_hooks_are_activated:
-                dispatch.call_hooks(
-                    'ping_monitor',
-                    config,
-                    config_filename,
-                    monitor.MONITOR_HOOK_NAMES,
-                    monitor.State.FINISH,
-                    monitoring_log_level,
-                    global_arguments.dry_run,
+                dispatch.wait_for_hooks(
+                    dispatch.call_hooks_concurrently(
+                        'ping_monitor',
+                        config,
+                        config_filename,
+                        monitor.MONITOR_HOOK_NAMES,
+                        monitor.State.FINISH,
+                        monitoring_log_level,
+                        global_arguments.dry_run,
+                    )
                 )
                 dispatch.call_hooks(
                     'destroy_monitor',
@@ -217,14 +248,16 @@ def run_configuration(config_filename, config, arguments):
                 error=encountered_error,
                 output=getattr(encountered_error, 'output', ''),
             )
-            dispatch.call_hooks(
-                'ping_monitor',
-                config,
-                config_filename,
-                monitor.MONITOR_HOOK_NAMES,
-                monitor.State.FAIL,
-                monitoring_log_level,
-                global_arguments.dry_run,
+            dispatch.wait_for_hooks(
+                dispatch.call_hooks_concurrently(
+                    'ping_monitor',
+                    config,
+                    config_filename,
+                    monitor.MONITOR_HOOK_NAMES,
+                    monitor.State.FAIL,
+                    monitoring_log_level,
+                    global_arguments.dry_run,
+                )
             )
             dispatch.call_hooks(
                 'destroy_monitor',
@@ -284,6 +317,12 @@ def run_actions(
     )
 
     for action_name, action_arguments in arguments.items():
+        if action_name == 'global':
+            continue
+
+        borgmatic.events.emit('action_start', repository=repository_path, action=action_name)
+        action_start_time = time.time()
+
         if action_name == 'rcreate':
             borgmatic.actions.rcreate.run_rcreate(
                 repository,
@@ -458,6 +497,19 @@ def run_actions(
                 local_path,
                 remote_path,
             )
+        elif action_name == 'stats':
+            yield from borgmatic.actions.stats.run_stats(
+                repository,
+                config,
+                action_arguments,
+            )
+
+        borgmatic.events.emit(
+            'action_end',
+            repository=repository_path,
+            action=action_name,
+            duration=time.time() - action_start_time,
+        )
 
     command.execute_hook(
         config.get('after_actions'),
@@ -662,6 +714,29 @@ def collect_highlander_action_summary_logs(configs, arguments, configuration_par
 
         return
 
+    if 'daemon' in arguments:
+        try:
+            borgmatic.actions.daemon.run_daemon(arguments['daemon'], arguments['global'])
+            yield logging.makeLogRecord(
+                dict(
+                    levelno=logging.ANSWER,
+                    levelname='ANSWER',
+                    msg='Daemon command successful'
+                    if arguments['daemon'].status
+                    or arguments['daemon'].trigger
+                    or arguments['daemon'].reload
+                    else 'Daemon stopped',
+                )
+            )
+        except (
+            CalledProcessError,
+            ValueError,
+            OSError,
+        ) as error:
+            yield from log_error_records('Error running daemon', error)
+
+        return
+
     if 'validate' in arguments:
         if configuration_parse_errors:
             yield logging.makeLogRecord(
@@ -772,6 +847,7 @@ def collect_configuration_run_summary_logs(configs, arguments):
             yield from log_error_records('Error unmounting mount point', error)
 
     if json_results:
+        flush_logging()
         sys.stdout.write(json.dumps(json_results))
 
     if 'create' in arguments:
@@ -109,6 +109,19 @@ def parse_configuration(config_filename, schema_filename, overrides=None, resolv
     except (ruamel.yaml.error.YAMLError, RecursionError) as error:
         raise Validation_error(config_filename, (str(error),))
 
+    return validate_configuration(config_filename, config, schema, overrides, resolve_env)
+
+
+def validate_configuration(config_filename, config, schema, overrides=None, resolve_env=True):
+    '''
+    Given a config filename (used only in messages), an already loaded configuration as a data
+    structure of nested dicts and lists, the loaded schema, a sequence of configuration file
+    override strings in the form of "option.suboption=value", and whether to resolve environment
+    variables, apply the overrides, normalize and validate the configuration in place, and return it
+    along with a sequence of logging.LogRecord instances containing any warnings about it.
+
+    Raise Validation_error if the config does not match the schema.
+    '''
     override.apply_overrides(config, overrides)
     logs = normalize.normalize(config_filename, config)
     if resolve_env:
@@ -0,0 +1,124 @@
+import json
+import os
+import socket
+
+from borgmatic.borg import state
+
+DEFAULT_SOCKET_FILENAME = 'daemon.sock'
+
+# How long a client waits for the daemon to respond to a command.
+CLIENT_TIMEOUT_SECONDS = 10
+
+# How long the daemon waits for a client to send its command.
+SERVER_TIMEOUT_SECONDS = 5
+
+COMMANDS = ('status', 'trigger', 'reload')
+
+
+def make_socket_path(socket_path=None):
+    '''
+    Given a control socket path (or None), return it with any "~" expanded, defaulting to a socket
+    in the default borgmatic source directory.
+    '''
+    return os.path.expanduser(
+        socket_path
+        or os.path.join(state.DEFAULT_BORGMATIC_SOURCE_DIRECTORY, DEFAULT_SOCKET_FILENAME)
+    )
+
+
+def open_control_socket(socket_path):
+    '''
+    Given a control socket path, listen on it for commands, replacing any stale socket file left
+    behind by a daemon that didn't exit cleanly, and return the listening socket.socket. Only the
+    current user can connect to it.
+
+    The caller must already hold the daemon lock, so that this doesn't replace the socket of a
+    daemon that's still running.
+    '''
+    os.makedirs(os.path.dirname(socket_path), mode=0o700, exist_ok=True)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        server_socket.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        server_socket.listen()
+    except OSError:
+        server_socket.close()
+        raise
+
+    return server_socket
+
+
+def read_message(connection):
+    '''
+    Given a connected socket.socket, read a single newline-terminated JSON message from it and
+    return it decoded.
+
+    Raise ValueError if the message isn't valid JSON or the connection closes before the message
+    ends.
+    '''
+    data = b''
+
+    while not data.endswith(b'\n'):
+        chunk = connection.recv(4096)
+
+        if not chunk:
+            raise ValueError('Connection closed before the end of the message')
+
+        data += chunk
+
+    return json.loads(data)
+
+
+def write_message(connection, message):
+    '''
+    Given a connected socket.socket and a JSON-serializable message, send the message as a single
+    line of JSON.
+    '''
+    connection.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+def handle_connection(connection, handle_command):
+    '''
+    Given a socket.socket for a client connection and a function that takes a command name and
+    returns a JSON-serializable response dict, read the client's command, respond to it, and close
+    the connection. Respond with an "error" key instead if the command isn't valid.
+    '''
+    with connection:
+        connection.settimeout(SERVER_TIMEOUT_SECONDS)
+
+        try:
+            command = read_message(connection).get('command')
+        except (OSError, ValueError, AttributeError) as error:
+            write_message(connection, {'error': f'Invalid request: {error}'})
+            return
+
+        if command not in COMMANDS:
+            write_message(connection, {'error': f'Unknown command: {command}'})
+            return
+
+        write_message(connection, handle_command(command))
+
+
+def send_command(socket_path, command):
+    '''
+    Given a control socket path and a command name, send the command to the daemon listening there
+    and return its response dict.
+
+    Raise OSError if there's no daemon listening or it doesn't respond in time.
+    Raise ValueError if the daemon responds with an error.
+    '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.settimeout(CLIENT_TIMEOUT_SECONDS)
+        client_socket.connect(socket_path)
+        write_message(client_socket, {'command': command})
+        response = read_message(client_socket)
+
+    if 'error' in response:
+        raise ValueError(response['error'])
+
+    return response
@@ -0,0 +1,150 @@
+import datetime
+
+# Each cron field's name along with its minimum and maximum values.
+FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day of month', 1, 31),
+    ('month', 1, 12),
+    ('day of week', 0, 7),
+)
+
+MONTH_NAMES = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+DAY_OF_WEEK_NAMES = ('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat')
+
+NAMED_VALUES = {
+    'month': {name: number for number, name in enumerate(MONTH_NAMES, start=1)},
+    'day of week': {name: number for number, name in enumerate(DAY_OF_WEEK_NAMES)},
+}
+
+EXPRESSION_ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+# Give up looking for the next matching time after this many years, as the expression probably
+# can't ever match (e.g. "0 0 30 2 *").
+MAXIMUM_SEARCH_YEARS = 5
+
+
+def parse_value(value, field_name):
+    '''
+    Given a single value from a cron field (a number or, for months and days of the week, a
+    three-letter name) and the field's name, return it as an integer.
+
+    Raise ValueError if the value can't be parsed.
+    '''
+    named_value = NAMED_VALUES.get(field_name, {}).get(value.lower())
+
+    if named_value is not None:
+        return named_value
+
+    return int(value)
+
+
+def parse_field(field, field_name, minimum, maximum):
+    '''
+    Given a cron field string like "*/15" or "1-5,7", its name, and its minimum and maximum values,
+    return the values it matches as a frozenset of integers.
+
+    Raise ValueError if the field can't be parsed or has values out of range.
+    '''
+    values = set()
+
+    for part in field.split(','):
+        range_part, _, step = part.partition('/')
+        step = int(step) if step else 1
+
+        if range_part == '*':
+            start, end = minimum, maximum
+        elif '-' in range_part:
+            start, end = (parse_value(value, field_name) for value in range_part.split('-', 1))
+        else:
+            start = parse_value(range_part, field_name)
+            end = maximum if step > 1 else start
+
+        if step < 1 or start < minimum or end > maximum or start > end:
+            raise ValueError(f'Invalid {field_name} field in cron expression: {field}')
+
+        values.update(range(start, end + 1, step))
+
+    return frozenset(values)
+
+
+def parse_expression(expression):
+    '''
+    Given a cron expression string with five fields (minute, hour, day of month, month, and day of
+    week) or an alias like "@daily", return a dict from field name to the frozenset of values it
+    matches, plus a "day_or" key indicating whether a day matches when either the day of month or the
+    day of week does (as in cron when both are restricted) rather than when both do.
+
+    Raise ValueError if the expression can't be parsed.
+    '''
+    expression = EXPRESSION_ALIASES.get(expression.strip().lower(), expression)
+    fields = expression.split()
+
+    if len(fields) != len(FIELDS):
+        raise ValueError(f'Invalid cron expression, expected {len(FIELDS)} fields: {expression}')
+
+    try:
+        parsed = {
+            field_name: parse_field(field, field_name, minimum, maximum)
+            for field, (field_name, minimum, maximum) in zip(fields, FIELDS)
+        }
+    except ValueError as error:
+        raise ValueError(f'Invalid cron expression "{expression}": {error}')
+
+    # Cron accepts both 0 and 7 for Sunday.
+    if 7 in parsed['day of week']:
+        parsed['day of week'] = parsed['day of week'] - {7} | {0}
+
+    parsed['day_or'] = not fields[2].startswith('*') and not fields[4].startswith('*')
+
+    return parsed
+
+
+def day_matches(parsed, moment):
+    '''
+    Given a parsed cron expression and a datetime, return whether the expression matches the
+    datetime's day.
+    '''
+    day_of_month_matches = moment.day in parsed['day of month']
+    day_of_week_matches = (moment.weekday() + 1) % 7 in parsed['day of week']
+
+    if parsed['day_or']:
+        return day_of_month_matches or day_of_week_matches
+
+    return day_of_month_matches and day_of_week_matches
+
+
+def next_run_time(expression, after):
+    '''
+    Given a cron expression string and a naive local datetime, return the first datetime strictly
+    after it (to the minute) that the expression matches.
+
+    Raise ValueError if the expression can't be parsed or never matches.
+    '''
+    parsed = parse_expression(expression)
+    moment = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+    last_year = after.year + MAXIMUM_SEARCH_YEARS
+
+    while moment.year <= last_year:
+        if moment.month not in parsed['month']:
+            moment = (moment.replace(day=1) + datetime.timedelta(days=32)).replace(
+                day=1, hour=0, minute=0
+            )
+        elif not day_matches(parsed, moment):
+            moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+        elif moment.hour not in parsed['hour']:
+            moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+        elif moment.minute not in parsed['minute']:
+            moment += datetime.timedelta(minutes=1)
+        else:
+            return moment
+
+    raise ValueError(f'Cron expression never matches: {expression}')
@@ -0,0 +1,393 @@
+import contextlib
+import datetime
+import fcntl
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+import borgmatic.commands.arguments
+import borgmatic.commands.borgmatic
+from borgmatic.config import collect
+from borgmatic.daemon import control, cron
+
+logger = logging.getLogger(__name__)
+
+# The actions that a schedule entry runs if it doesn't list any, and that a triggered run runs.
+DEFAULT_SCHEDULED_ACTIONS = ('create', 'prune', 'compact', 'check')
+
+# How often to check whether any configuration files have changed and need reloading.
+RELOAD_CHECK_INTERVAL_SECONDS = 5
+
+
+def get_modification_times(config_paths):
+    '''
+    Given a sequence of configuration paths, return a dict from each configuration filename found
+    there to its modification time, or None if it can't be determined (e.g. because the file
+    doesn't exist).
+    '''
+    modification_times = {}
+
+    for config_filename in collect.collect_config_filenames(config_paths):
+        try:
+            modification_times[config_filename] = os.stat(config_filename).st_mtime
+        except OSError:
+            modification_times[config_filename] = None
+
+    return modification_times
+
+
+def make_schedule_entries(configs, now):
+    '''
+    Given a dict from configuration filename to its parsed configuration dict and the current time
+    as a naive local datetime, return a list of schedule entry dicts, each with the
+    "config_filename", "cron" expression, "actions" to run, and time of the "next_run". Log and skip
+    any schedule entry with an invalid cron expression.
+    '''
+    entries = []
+
+    for config_filename, config in configs.items():
+        for schedule in config.get('schedule', ()):
+            try:
+                next_run = cron.next_run_time(schedule['cron'], now)
+            except ValueError as error:
+                logger.warning(f'{config_filename}: Ignoring schedule entry: {error}')
+                continue
+
+            entries.append(
+                {
+                    'config_filename': config_filename,
+                    'cron': schedule['cron'],
+                    'actions': tuple(schedule.get('actions') or DEFAULT_SCHEDULED_ACTIONS),
+                    'next_run': next_run,
+                }
+            )
+
+    return entries
+
+
+def run_scheduled_configuration(config_filename, config, action_names, global_arguments):
+    '''
+    Given a configuration filename, its parsed configuration dict, a collection of action names,
+    and global arguments as an argparse.Namespace, run those actions for the configuration file
+    (in borgmatic's usual order) just as the borgmatic command-line would. Log a summary of the run
+    and return whether it succeeded.
+    '''
+    ordered_action_names = sorted(action_names, key=DEFAULT_SCHEDULED_ACTIONS.index)
+    logger.info(f'{config_filename}: Running scheduled actions: {", ".join(ordered_action_names)}')
+
+    arguments = borgmatic.commands.arguments.parse_arguments(*ordered_action_names)
+    arguments['global'] = global_arguments
+
+    summary_logs = tuple(
+        borgmatic.commands.borgmatic.collect_configuration_run_summary_logs(
+            {config_filename: config}, arguments
+        )
+    )
+
+    for log in summary_logs:
+        logger.handle(log)
+
+    return all(log.levelno < logging.CRITICAL for log in summary_logs)
+
+
+@contextlib.contextmanager
+def acquire_daemon_lock(socket_path):
+    '''
+    Given a control socket path, take an exclusive lock on a lock file next to it for as long as
+    the context lasts, so that only one daemon at a time uses the socket and runs backups.
+
+    Raise ValueError if another daemon already holds the lock.
+    '''
+    lock_path = f'{socket_path}.lock'
+    os.makedirs(os.path.dirname(lock_path), mode=0o700, exist_ok=True)
+
+    with open(lock_path, 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ValueError(
+                f'Another borgmatic daemon is already running with the control socket {socket_path}'
+            )
+
+        yield
+
+
+class Daemon:
+    '''
+    A long-running borgmatic process that keeps configuration files loaded (reloading them when they
+    change), runs their actions on their configured schedules, and answers commands from a control
+    socket.
+
+    Runs happen one at a time on a worker thread, so they never overlap, while the main thread
+    keeps the schedule and responds to commands. A configuration file that comes due while it's
+    already waiting to run gets run only once.
+    '''
+
+    def __init__(self, global_arguments):
+        self.global_arguments = global_arguments
+        self.started_time = time.time()
+        self.configs = {}
+        self.modification_times = {}
+        self.schedule_entries = []
+        self.pending_actions = {}
+        self.last_runs = {}
+        self.running_config_filename = None
+        self.lock = threading.Lock()
+        self.work_queue = queue.Queue()
+
+    def reload(self, force=False):
+        '''
+        Load any configuration files that are new or have changed since they were last loaded (or
+        all of them if force is True), and then recompute the schedule. Keep the previously loaded
+        configuration for a file that no longer parses. Return whether anything changed.
+        '''
+        modification_times = get_modification_times(self.global_arguments.config_paths)
+
+        if modification_times == self.modification_times and not force:
+            return False
+
+        changed_filenames = tuple(
+            config_filename
+            for config_filename, modification_time in modification_times.items()
+            if force or self.modification_times.get(config_filename, -1) != modification_time
+        )
+        logger.info(f'Loading {len(changed_filenames)} configuration files')
+        loaded_configs, parse_logs = borgmatic.commands.borgmatic.load_configurations(
+            changed_filenames, self.global_arguments.overrides, self.global_arguments.resolve_env
+        )
+
+        for log in parse_logs:
+            logger.handle(log)
+
+        configs = {}
+
+        for config_filename in modification_times:
+            if config_filename in loaded_configs:
+                configs[config_filename] = loaded_configs[config_filename]
+            elif config_filename in self.configs:
+                if config_filename in changed_filenames:
+                    logger.warning(
+                        f'{config_filename}: Keeping the previously loaded configuration'
+                    )
+
+                configs[config_filename] = self.configs[config_filename]
+
+        with self.lock:
+            self.configs = configs
+            self.modification_times = modification_times
+            self.schedule_entries = make_schedule_entries(configs, datetime.datetime.now())
+            self.global_arguments.used_config_paths = list(configs)
+
+        for config_filename in configs:
+            if not any(
+                entry['config_filename'] == config_filename for entry in self.schedule_entries
+            ):
+                logger.info(f'{config_filename}: No schedule, so only running when triggered')
+
+        return True
+
+    def enqueue(self, config_filename, action_names):
+        '''
+        Given a configuration filename and a collection of action names, queue those actions to
+        run for the configuration file. If it's already waiting to run, add the actions to that run
+        instead.
+        '''
+        with self.lock:
+            if config_filename in self.pending_actions:
+                self.pending_actions[config_filename].update(action_names)
+                return
+
+            self.pending_actions[config_filename] = set(action_names)
+
+        self.work_queue.put(config_filename)
+
+    def enqueue_due_runs(self, now):
+        '''
+        Given the current time as a naive local datetime, queue a run for each schedule entry
+        that's come due, and schedule the entry's next run.
+        '''
+        for entry in self.schedule_entries:
+            if entry['next_run'] <= now:
+                self.enqueue(entry['config_filename'], entry['actions'])
+                entry['next_run'] = cron.next_run_time(entry['cron'], now)
+
+    def seconds_until_next_run(self, now):
+        '''
+        Given the current time as a naive local datetime, return the number of seconds until the
+        next scheduled run, or None if nothing is scheduled.
+        '''
+        if not self.schedule_entries:
+            return None
+
+        return max(
+            min(entry['next_run'] for entry in self.schedule_entries) - now,
+            datetime.timedelta(0),
+        ).total_seconds()
+
+    def run_next(self):
+        '''
+        Wait for a configuration file to get queued, and then run its pending actions and record
+        the outcome, treating any unexpected error as a failed run. Return False if the daemon is
+        stopping instead, and True otherwise.
+        '''
+        config_filename = self.work_queue.get()
+
+        if config_filename is None:
+            return False
+
+        with self.lock:
+            action_names = self.pending_actions.pop(config_filename)
+            config = self.configs.get(config_filename)
+            self.running_config_filename = config_filename
+
+        start_time = time.time()
+
+        try:
+            if config is None:
+                logger.warning(f'{config_filename}: Skipping run of removed configuration file')
+                return True
+
+            try:
+                succeeded = run_scheduled_configuration(
+                    config_filename, config, action_names, self.global_arguments
+                )
+            # Any error that gets this far would otherwise kill the worker thread, and with it all
+            # future runs, so log it and carry on.
+            except Exception as error:
+                logger.exception(f'{config_filename}: Error running scheduled actions: {error}')
+                succeeded = False
+
+            with self.lock:
+                self.last_runs[config_filename] = {
+                    'start_time': start_time,
+                    'duration': time.time() - start_time,
+                    'actions': sorted(action_names, key=DEFAULT_SCHEDULED_ACTIONS.index),
+                    'succeeded': succeeded,
+                }
+        finally:
+            with self.lock:
+                self.running_config_filename = None
+
+        return True
+
+    def run_worker(self):
+        '''
+        Run queued configuration files one at a time until the daemon stops.
+        '''
+        while self.run_next():
+            pass
+
+    def stop_worker(self):
+        '''
+        Tell the worker thread to stop once it finishes any run in progress.
+        '''
+        self.work_queue.put(None)
+
+    def status(self):
+        '''
+        Return a JSON-serializable dict describing the daemon: its process ID, when it started,
+        which configuration file is running (if any), and for each configuration file, its next
+        scheduled run, whether it's waiting to run, and the outcome of its last run.
+        '''
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'started_time': self.started_time,
+                'running': self.running_config_filename,
+                'configuration_files': {
+                    config_filename: {
+                        'next_run': min(
+                            (
+                                entry['next_run'].timestamp()
+                                for entry in self.schedule_entries
+                                if entry['config_filename'] == config_filename
+                            ),
+                            default=None,
+                        ),
+                        'pending': config_filename in self.pending_actions,
+                        'last_run': self.last_runs.get(config_filename),
+                    }
+                    for config_filename in self.configs
+                },
+            }
+
+    def handle_command(self, command):
+        '''
+        Given the name of a command from the control socket, carry it out and return a
+        JSON-serializable response dict.
+        '''
+        if command == 'trigger':
+            for config_filename in tuple(self.configs):
+                self.enqueue(config_filename, DEFAULT_SCHEDULED_ACTIONS)
+
+            return {'triggered': list(self.configs)}
+
+        if command == 'reload':
+            self.reload(force=True)
+
+            return {'configuration_files': list(self.configs)}
+
+        return self.status()
+
+    def tick(self, server_socket):
+        '''
+        Given the listening control socket, queue any runs that have come due, reload configuration
+        files if they've changed, and then wait until the next scheduled run or reload check for a
+        command on the socket, handling it if one arrives.
+        '''
+        now = datetime.datetime.now()
+        self.enqueue_due_runs(now)
+
+        if self.reload():
+            now = datetime.datetime.now()
+
+        seconds_until_next_run = self.seconds_until_next_run(now)
+        timeout = (
+            RELOAD_CHECK_INTERVAL_SECONDS
+            if seconds_until_next_run is None
+            else min(seconds_until_next_run, RELOAD_CHECK_INTERVAL_SECONDS)
+        )
+        readable, _, _ = select.select((server_socket,), (), (), timeout)
+
+        if not readable:
+            return
+
+        try:
+            connection, _ = server_socket.accept()
+            control.handle_connection(connection, self.handle_command)
+        except OSError as error:
+            logger.warning(f'Error handling control socket command: {error}')
+
+
+def run_daemon(daemon_arguments, global_arguments):
+    '''
+    Given daemon arguments and global arguments as argparse.Namespace instances, run borgmatic as a
+    daemon until interrupted: Take the daemon lock, load the configuration files, listen on the
+    control socket, and run each configuration file on its schedule.
+
+    Raise ValueError if another daemon is already running.
+    Raise OSError if the control socket can't be opened.
+    '''
+    socket_path = control.make_socket_path(daemon_arguments.socket)
+
+    with acquire_daemon_lock(socket_path):
+        server_socket = control.open_control_socket(socket_path)
+        daemon = Daemon(global_arguments)
+        worker = threading.Thread(target=daemon.run_worker, daemon=True)
+        worker.start()
+        logger.answer(f'borgmatic daemon started, listening on {socket_path}')
+
+        try:
+            while True:
+                daemon.tick(server_socket)
+        except KeyboardInterrupt:
+            logger.answer('borgmatic daemon stopping')
+        finally:
+            daemon.stop_worker()
+            server_socket.close()
+            os.remove(socket_path)
+
+        worker.join()
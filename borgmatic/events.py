@@ -0,0 +1,21 @@
+import contextvars
+import time
+
+# The function to call with each event from a borgmatic run in the current context, if any. The
+# library API (borgmatic.api) sets this for the duration of each run, and because it's a context
+# variable, concurrent runs in different threads each get their own events.
+handler = contextvars.ContextVar('borgmatic_event_handler', default=None)
+
+
+def emit(event_type, **details):
+    '''
+    Given an event type string (like "action_start") and any details about the event as keyword
+    arguments, pass the event as a dict to the current context's event handler, if any. Without a
+    handler, do nothing.
+    '''
+    event_handler = handler.get()
+
+    if event_handler is None:
+        return
+
+    event_handler(dict(type=event_type, time=time.time(), **details))
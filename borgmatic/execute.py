@@ -4,6 +4,8 @@ import os
 import select
 import subprocess
 
+import borgmatic.logger
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,11 +45,12 @@ def output_buffer_for_process(process, exclude_stdouts):
     return process.stderr if process.stdout in exclude_stdouts else process.stdout
 
 
-def append_last_lines(last_lines, captured_output, line, output_log_level):
+def append_last_lines(last_lines, captured_output, line, output_log_level, line_handler=None):
     '''
-    Given a rolling list of last lines, a list of captured output, a line to append, and an output
-    log level, append the line to the last lines and (if necessary) the captured output. Then log
-    the line at the requested output log level.
+    Given a rolling list of last lines, a list of captured output, a line to append, an output log
+    level, and an optional line handler function, append the line to the last lines and (if
+    necessary) the captured output. Then log the line at the requested output log level, unless the
+    line handler takes the line and returns True to indicate that it has dealt with it.
     '''
     last_lines.append(line)
 
@@ -56,17 +59,20 @@ def append_last_lines(last_lines, captured_output, line, output_log_level):
 
     if output_log_level is None:
         captured_output.append(line)
-    else:
+    elif not (line_handler and line_handler(line)):
         logger.log(output_log_level, line)
 
 
-def log_outputs(processes, exclude_stdouts, output_log_level, borg_local_path):
+def log_outputs(processes, exclude_stdouts, output_log_level, borg_local_path, line_handler=None):
     '''
     Given a sequence of subprocess.Popen() instances for multiple processes, log the output for each
     process with the requested log level. Additionally, raise a CalledProcessError if a process
     exits with an error (or a warning for exit code 1, if that process does not match the Borg local
     path).
 
+    If a line handler function is given, pass it each line of output first, and only log the lines
+    for which it returns a falsy value.
+
     If output log level is None, then instead of logging, capture output for each process and return
     it as a dict from the process to its output.
 
@@ -120,6 +126,7 @@ def log_outputs(processes, exclude_stdouts, output_log_level, borg_local_path):
                         captured_outputs[ready_process],
                         line,
                         output_log_level,
+                        line_handler,
                     )
 
         if not still_running:
@@ -199,6 +206,7 @@ def execute_command(
     working_directory=None,
     borg_local_path=None,
     run_to_completion=True,
+    line_handler=None,
 ):
     '''
     Execute the given command (a sequence of command/argument strings) and log its output at the
@@ -209,7 +217,8 @@ def execute_command(
     given, use that as the present working directory when running the command. If a Borg local path
     is given, and the command matches it (regardless of arguments), treat exit code 1 as a warning
     instead of an error. If run to completion is False, then return the process for the command
-    without executing it to completion.
+    without executing it to completion. If a line handler function is given, pass it each line of
+    output and only log the lines for which it returns a falsy value.
 
     Raise subprocesses.CalledProcessError if an error occurs while running the command.
     '''
@@ -218,6 +227,10 @@ def execute_command(
     do_not_capture = bool(output_file is DO_NOT_CAPTURE)
     command = ' '.join(full_command) if shell else full_command
 
+    # The command writes straight to the console, so get any pending logs out of the way first.
+    if do_not_capture:
+        borgmatic.logger.flush_logging()
+
     process = subprocess.Popen(
         command,
         stdin=input_file,
@@ -231,7 +244,11 @@ def execute_command(
         return process
 
     log_outputs(
-        (process,), (input_file, output_file), output_log_level, borg_local_path=borg_local_path
+        (process,),
+        (input_file, output_file),
+        output_log_level,
+        borg_local_path=borg_local_path,
+        line_handler=line_handler,
     )
 
 
@@ -284,6 +301,7 @@ def execute_command_with_processes(
     extra_environment=None,
     working_directory=None,
     borg_local_path=None,
+    line_handler=None,
 ):
     '''
     Execute the given command (a sequence of command/argument strings) and log its output at the
@@ -298,7 +316,8 @@ def execute_command_with_processes(
     use it to augment the current environment, and pass the result into the command. If a working
     directory is given, use that as the present working directory when running the command. If a
     Borg local path is given, then for any matching command or process (regardless of arguments),
-    treat exit code 1 as a warning instead of an error.
+    treat exit code 1 as a warning instead of an error. If a line handler function is given, pass it
+    each line of output and only log the lines for which it returns a falsy value.
 
     Raise subprocesses.CalledProcessError if an error occurs while running the command or in the
     upstream process.
@@ -308,6 +327,10 @@ def execute_command_with_processes(
     do_not_capture = bool(output_file is DO_NOT_CAPTURE)
     command = ' '.join(full_command) if shell else full_command
 
+    # The command writes straight to the console, so get any pending logs out of the way first.
+    if do_not_capture:
+        borgmatic.logger.flush_logging()
+
     try:
         command_process = subprocess.Popen(
             command,
@@ -334,6 +357,7 @@ def execute_command_with_processes(
         (input_file, output_file),
         output_log_level,
         borg_local_path=borg_local_path,
+        line_handler=line_handler,
     )
 
     if output_log_level is None:
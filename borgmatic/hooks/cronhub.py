@@ -2,7 +2,7 @@ import logging
 
 import requests
 
-from borgmatic.hooks import monitor
+from borgmatic.hooks import monitor, outbox
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +22,22 @@ def initialize_monitor(
     pass
 
 
+def make_request(hook_config, config, config_filename, state, details):
+    '''
+    Given a hook config, a configuration dict, a configuration filename, a monitor.State, and an
+    unused details dict, return the Cronhub ping for that state as a tuple of HTTP method, URL, and
+    a dict of keyword arguments for requests.Session.request().
+    '''
+    formatted_state = f'/{MONITOR_STATE_TO_CRONHUB[state]}/'
+    ping_url = (
+        hook_config['ping_url']
+        .replace('/start/', formatted_state)
+        .replace('/ping/', formatted_state)
+    )
+
+    return ('GET', ping_url, {'timeout': monitor.get_timeout(hook_config)})
+
+
 def ping_monitor(hook_config, config, config_filename, state, monitoring_log_level, dry_run):
     '''
     Ping the configured Cronhub URL, modified with the monitor.State. Use the given configuration
@@ -34,11 +50,9 @@ def ping_monitor(hook_config, config, config_filename, state, monitoring_log_lev
         return
 
     dry_run_label = ' (dry run; not actually pinging)' if dry_run else ''
-    formatted_state = f'/{MONITOR_STATE_TO_CRONHUB[state]}/'
-    ping_url = (
-        hook_config['ping_url']
-        .replace('/start/', formatted_state)
-        .replace('/ping/', formatted_state)
+    details = {}
+    (method, ping_url, request_kwargs) = make_request(
+        hook_config, config, config_filename, state, details
     )
 
     logger.info(f'{config_filename}: Pinging Cronhub {state.name.lower()}{dry_run_label}')
@@ -46,12 +60,16 @@ def ping_monitor(hook_config, config, config_filename, state, monitoring_log_lev
 
     if not dry_run:
         logging.getLogger('urllib3').setLevel(logging.ERROR)
+
         try:
-            response = requests.get(ping_url)
+            response = monitor.get_session().request(method, ping_url, **request_kwargs)
             if not response.ok:
                 response.raise_for_status()
         except requests.exceptions.RequestException as error:
             logger.warning(f'{config_filename}: Cronhub error: {error}')
+            outbox.save_undelivered_request(
+                error, config, config_filename, 'cronhub', state, details
+            )
 
 
 def destroy_monitor(
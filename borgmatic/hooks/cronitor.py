@@ -2,7 +2,7 @@ import logging
 
 import requests
 
-from borgmatic.hooks import monitor
+from borgmatic.hooks import monitor, outbox
 
 logger = logging.getLogger(__name__)
 
@@ -12,20 +12,44 @@ MONITOR_STATE_TO_CRONITOR = {
     monitor.State.FAIL: 'fail',
 }
 
+# Cronitor truncates ping messages beyond this length.
+MESSAGE_LIMIT_BYTES = 2000
 
-def initialize_monitor(
-    ping_url, config, config_filename, monitoring_log_level, dry_run
-):  # pragma: no cover
+
+def initialize_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    No initialization is necessary for this monitor.
+    If the "send_logs" option is true, make sure the root logger has a handler that stores in memory
+    the logs emitted, so the most recent ones can get sent to Cronitor as a ping message.
     '''
-    pass
+    if not hook_config.get('send_logs'):
+        return
+
+    monitor.add_log_buffering_handler('cronitor', MESSAGE_LIMIT_BYTES, monitoring_log_level)
+
+
+def make_request(hook_config, config, config_filename, state, details):
+    '''
+    Given a hook config, a configuration dict, a configuration filename, a monitor.State, and a
+    details dict with an optional "message" string to send, return the Cronitor ping for that state
+    as a tuple of HTTP method, URL, and a dict of keyword arguments for requests.Session.request().
+    '''
+    message = details.get('message')
+
+    return (
+        'GET',
+        f"{hook_config['ping_url']}/{MONITOR_STATE_TO_CRONITOR[state]}",
+        {
+            'params': {'msg': message} if message is not None else None,
+            'timeout': monitor.get_timeout(hook_config),
+        },
+    )
 
 
 def ping_monitor(hook_config, config, config_filename, state, monitoring_log_level, dry_run):
     '''
     Ping the configured Cronitor URL, modified with the monitor.State. Use the given configuration
-    filename in any log entries. If this is a dry run, then don't actually ping anything.
+    filename in any log entries. If this is a dry run, then don't actually ping anything. If the
+    "send_logs" option is true, send the buffered logs along with finish and fail pings.
     '''
     if state not in MONITOR_STATE_TO_CRONITOR:
         logger.debug(
@@ -34,25 +58,35 @@ def ping_monitor(hook_config, config, config_filename, state, monitoring_log_lev
         return
 
     dry_run_label = ' (dry run; not actually pinging)' if dry_run else ''
-    ping_url = f"{hook_config['ping_url']}/{MONITOR_STATE_TO_CRONITOR[state]}"
+    details = (
+        {'message': monitor.format_buffered_logs_for_payload(MESSAGE_LIMIT_BYTES)}
+        if hook_config.get('send_logs') and state != monitor.State.START
+        else {}
+    )
+    (method, ping_url, request_kwargs) = make_request(
+        hook_config, config, config_filename, state, details
+    )
 
     logger.info(f'{config_filename}: Pinging Cronitor {state.name.lower()}{dry_run_label}')
     logger.debug(f'{config_filename}: Using Cronitor ping URL {ping_url}')
 
     if not dry_run:
         logging.getLogger('urllib3').setLevel(logging.ERROR)
+
         try:
-            response = requests.get(ping_url)
+            response = monitor.get_session().request(method, ping_url, **request_kwargs)
             if not response.ok:
                 response.raise_for_status()
         except requests.exceptions.RequestException as error:
             logger.warning(f'{config_filename}: Cronitor error: {error}')
+            outbox.save_undelivered_request(
+                error, config, config_filename, 'cronitor', state, details
+            )
 
 
-def destroy_monitor(
-    ping_url_or_uuid, config, config_filename, monitoring_log_level, dry_run
-):  # pragma: no cover
+def destroy_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    No destruction is necessary for this monitor.
+    Stop using any log handler that was added to the root logger, removing it if no other monitor is
+    using it.
     '''
-    pass
+    monitor.remove_log_buffering_handler('cronitor')
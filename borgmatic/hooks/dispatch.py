@@ -1,3 +1,4 @@
+import concurrent.futures
 import logging
 
 from borgmatic.hooks import (
@@ -10,6 +11,7 @@ from borgmatic.hooks import (
     ntfy,
     pagerduty,
     postgresql,
+    prometheus,
     sqlite,
 )
 
@@ -25,6 +27,7 @@ HOOK_NAME_TO_MODULE = {
     'ntfy': ntfy,
     'pagerduty': pagerduty,
     'postgresql_databases': postgresql,
+    'prometheus': prometheus,
     'sqlite_databases': sqlite,
 }
 
@@ -71,6 +74,60 @@ def call_hooks(function_name, config, log_prefix, hook_names, *args, **kwargs):
     }
 
 
+def call_hooks_concurrently(function_name, config, log_prefix, hook_names, *args, **kwargs):
+    '''
+    Given a configuration dict and a prefix to use in log entries, start calling the requested
+    function of the Python module corresponding to each given hook name, each in its own thread, and
+    return without waiting for the calls to complete. Supply each call with the configuration for
+    that hook, the log prefix, and any given args and kwargs.
+
+    If the hook name is not present in the hooks configuration, then don't call the function for it.
+
+    Return a dict from hook name to a concurrent.futures.Future for its call. Pass that dict to
+    wait_for_hooks() to wait for the calls and collect their return values.
+
+    Raise ValueError if the hook name is unknown.
+    '''
+    configured_hook_names = tuple(hook_name for hook_name in hook_names if config.get(hook_name))
+
+    for hook_name in configured_hook_names:
+        if hook_name not in HOOK_NAME_TO_MODULE:
+            raise ValueError(f'Unknown hook name: {hook_name}')
+
+    if not configured_hook_names:
+        return {}
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(configured_hook_names), thread_name_prefix='hook'
+    )
+
+    try:
+        return {
+            hook_name: executor.submit(
+                call_hook, function_name, config, log_prefix, hook_name, *args, **kwargs
+            )
+            for hook_name in configured_hook_names
+        }
+    finally:
+        # Let the calls run to completion in the background.
+        executor.shutdown(wait=False)
+
+
+def wait_for_hooks(hook_futures):
+    '''
+    Given a dict from hook name to a concurrent.futures.Future for a call started by
+    call_hooks_concurrently(), wait for all of the calls to complete. Collect any return values into
+    a dict from hook name to return value.
+
+    Raise AttributeError if the function name is not found in a module.
+    Raise anything else that a called function raises, but only after waiting for all of the calls
+    to complete. If several calls raise, raise the error from the first hook name given.
+    '''
+    concurrent.futures.wait(tuple(hook_futures.values()))
+
+    return {hook_name: future.result() for hook_name, future in hook_futures.items()}
+
+
 def call_hooks_even_if_unconfigured(function_name, config, log_prefix, hook_names, *args, **kwargs):
     '''
     Given a configuration dict and a prefix to use in log entries, call the requested function of
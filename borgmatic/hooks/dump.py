@@ -54,6 +54,19 @@ def create_named_pipe_for_dump(dump_path):
     os.mkfifo(dump_path, mode=0o600)
 
 
+def link_or_copy(source_path, destination_path):
+    '''
+    Hard link the given source file to the given destination path, falling back to copying it on
+    filesystems without hard links.
+    '''
+    try:
+        os.link(source_path, destination_path)
+    except (FileNotFoundError, FileExistsError):
+        raise
+    except OSError:
+        shutil.copyfile(source_path, destination_path)
+
+
 def remove_database_dumps(dump_path, database_type_name, log_prefix, dry_run):
     '''
     Remove all database dumps in the given dump directory path (including the directory itself). If
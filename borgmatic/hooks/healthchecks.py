@@ -2,7 +2,7 @@ import logging
 
 import requests
 
-from borgmatic.hooks import monitor
+from borgmatic.hooks import monitor, outbox
 
 logger = logging.getLogger(__name__)
 
@@ -13,80 +13,49 @@ MONITOR_STATE_TO_HEALTHCHECKS = {
     monitor.State.LOG: 'log',
 }
 
-PAYLOAD_TRUNCATION_INDICATOR = '...\n'
 DEFAULT_PING_BODY_LIMIT_BYTES = 100000
 
 
-class Forgetful_buffering_handler(logging.Handler):
-    '''
-    A buffering log handler that stores log messages in memory, and throws away messages (oldest
-    first) once a particular capacity in bytes is reached. But if the given byte capacity is zero,
-    don't throw away any messages.
-    '''
-
-    def __init__(self, byte_capacity, log_level):
-        super().__init__()
-
-        self.byte_capacity = byte_capacity
-        self.byte_count = 0
-        self.buffer = []
-        self.forgot = False
-        self.setLevel(log_level)
-
-    def emit(self, record):
-        message = record.getMessage() + '\n'
-        self.byte_count += len(message)
-        self.buffer.append(message)
-
-        if not self.byte_capacity:
-            return
-
-        while self.byte_count > self.byte_capacity and self.buffer:
-            self.byte_count -= len(self.buffer[0])
-            self.buffer.pop(0)
-            self.forgot = True
-
-
-def format_buffered_logs_for_payload():
+def initialize_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    Get the handler previously added to the root logger, and slurp buffered logs out of it to
-    send to Healthchecks.
+    Make sure the root logger has a handler that stores in memory the logs emitted. That way, we
+    can send them to Healthchecks upon a finish or failure state. But skip this if the "send_logs"
+    option is false.
     '''
-    try:
-        buffering_handler = next(
-            handler
-            for handler in logging.getLogger().handlers
-            if isinstance(handler, Forgetful_buffering_handler)
-        )
-    except StopIteration:
-        # No handler means no payload.
-        return ''
-
-    payload = ''.join(message for message in buffering_handler.buffer)
-
-    if buffering_handler.forgot:
-        return PAYLOAD_TRUNCATION_INDICATOR + payload
+    if hook_config.get('send_logs') is False:
+        return
 
-    return payload
+    monitor.add_log_buffering_handler(
+        'healthchecks',
+        hook_config.get('ping_body_limit', DEFAULT_PING_BODY_LIMIT_BYTES),
+        monitoring_log_level,
+    )
 
 
-def initialize_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
+def make_request(hook_config, config, config_filename, state, details):
     '''
-    Add a handler to the root logger that stores in memory the most recent logs emitted. That way,
-    we can send them all to Healthchecks upon a finish or failure state. But skip this if the
-    "send_logs" option is false.
+    Given a hook config, a configuration dict, a configuration filename, a monitor.State, and a
+    details dict with the "payload" string to send, return the Healthchecks ping for that state as a
+    tuple of HTTP method, URL, and a dict of keyword arguments for requests.Session.request().
     '''
-    if hook_config.get('send_logs') is False:
-        return
-
-    ping_body_limit = max(
-        hook_config.get('ping_body_limit', DEFAULT_PING_BODY_LIMIT_BYTES)
-        - len(PAYLOAD_TRUNCATION_INDICATOR),
-        0,
+    ping_url = (
+        hook_config['ping_url']
+        if hook_config['ping_url'].startswith('http')
+        else f"https://hc-ping.com/{hook_config['ping_url']}"
     )
 
-    logging.getLogger().addHandler(
-        Forgetful_buffering_handler(ping_body_limit, monitoring_log_level)
+    healthchecks_state = MONITOR_STATE_TO_HEALTHCHECKS.get(state)
+    if healthchecks_state:
+        ping_url = f'{ping_url}/{healthchecks_state}'
+
+    return (
+        'POST',
+        ping_url,
+        {
+            'data': details['payload'].encode('utf-8'),
+            'verify': hook_config.get('verify_tls', True),
+            'timeout': monitor.get_timeout(hook_config),
+        },
     )
 
 
@@ -96,11 +65,6 @@ def ping_monitor(hook_config, config, config_filename, state, monitoring_log_lev
     configuration filename in any log entries, and log to Healthchecks with the giving log level.
     If this is a dry run, then don't actually ping anything.
     '''
-    ping_url = (
-        hook_config['ping_url']
-        if hook_config['ping_url'].startswith('http')
-        else f"https://hc-ping.com/{hook_config['ping_url']}"
-    )
     dry_run_label = ' (dry run; not actually pinging)' if dry_run else ''
 
     if 'states' in hook_config and state.name.lower() not in hook_config['states']:
@@ -109,37 +73,38 @@ def ping_monitor(hook_config, config, config_filename, state, monitoring_log_lev
         )
         return
 
-    healthchecks_state = MONITOR_STATE_TO_HEALTHCHECKS.get(state)
-    if healthchecks_state:
-        ping_url = f'{ping_url}/{healthchecks_state}'
-
-    logger.info(f'{config_filename}: Pinging Healthchecks {state.name.lower()}{dry_run_label}')
-    logger.debug(f'{config_filename}: Using Healthchecks ping URL {ping_url}')
-
     if state in (monitor.State.FINISH, monitor.State.FAIL, monitor.State.LOG):
-        payload = format_buffered_logs_for_payload()
+        payload = monitor.format_buffered_logs_for_payload(
+            hook_config.get('ping_body_limit', DEFAULT_PING_BODY_LIMIT_BYTES)
+        )
     else:
         payload = ''
 
+    details = {'payload': payload}
+    (method, ping_url, request_kwargs) = make_request(
+        hook_config, config, config_filename, state, details
+    )
+
+    logger.info(f'{config_filename}: Pinging Healthchecks {state.name.lower()}{dry_run_label}')
+    logger.debug(f'{config_filename}: Using Healthchecks ping URL {ping_url}')
+
     if not dry_run:
         logging.getLogger('urllib3').setLevel(logging.ERROR)
+
         try:
-            response = requests.post(
-                ping_url, data=payload.encode('utf-8'), verify=hook_config.get('verify_tls', True)
-            )
+            response = monitor.get_session().request(method, ping_url, **request_kwargs)
             if not response.ok:
                 response.raise_for_status()
         except requests.exceptions.RequestException as error:
             logger.warning(f'{config_filename}: Healthchecks error: {error}')
+            outbox.save_undelivered_request(
+                error, config, config_filename, 'healthchecks', state, details
+            )
 
 
 def destroy_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    Remove the monitor handler that was added to the root logger. This prevents the handler from
-    getting reused by other instances of this monitor.
+    Stop using the log handler that was added to the root logger, removing it if no other monitor is
+    using it. This prevents the handler from getting reused by other instances of this monitor.
     '''
-    logger = logging.getLogger()
-
-    for handler in tuple(logger.handlers):
-        if isinstance(handler, Forgetful_buffering_handler):
-            logger.removeHandler(handler)
+    monitor.remove_log_buffering_handler('healthchecks')
@@ -15,6 +15,11 @@ def make_dump_path(config):  # pragma: no cover
     )
 
 
+# Formats that dump to a directory with a file per collection, rather than to a single archive
+# stream. "split" is the same as "directory", for consistency with the other database hooks.
+DIRECTORY_FORMATS = ('directory', 'split')
+
+
 def dump_databases(databases, config, log_prefix, dry_run):
     '''
     Dump the given MongoDB databases to a named pipe. The databases are supplied as a sequence of
@@ -44,7 +49,7 @@ def dump_databases(databases, config, log_prefix, dry_run):
 
         command = build_dump_command(database, dump_filename, dump_format)
 
-        if dump_format == 'directory':
+        if dump_format in DIRECTORY_FORMATS:
             dump.create_parent_directory_for_dump(dump_filename)
             execute_command(command, shell=True)
         else:
@@ -59,10 +64,11 @@ def build_dump_command(database, dump_filename, dump_format):
     Return the mongodump command from a single database configuration.
     '''
     all_databases = database['name'] == 'all'
+    directory_format = dump_format in DIRECTORY_FORMATS
 
     return (
         ('mongodump',)
-        + (('--out', dump_filename) if dump_format == 'directory' else ())
+        + (('--out', dump_filename) if directory_format else ())
         + (('--host', database['hostname']) if 'hostname' in database else ())
         + (('--port', str(database['port'])) if 'port' in database else ())
         + (('--username', database['username']) if 'username' in database else ())
@@ -73,8 +79,13 @@ def build_dump_command(database, dump_filename, dump_format):
             else ()
         )
         + (('--db', database['name']) if not all_databases else ())
+        + (
+            ('--numParallelCollections', str(database['parallel_collections']))
+            if 'parallel_collections' in database
+            else ()
+        )
         + (tuple(database['options'].split(' ')) if 'options' in database else ())
-        + (('--archive', '>', dump_filename) if dump_format != 'directory' else ())
+        + (('--archive', '>', dump_filename) if not directory_format else ())
     )
 
 
@@ -176,6 +187,15 @@ def build_restore_command(extract_process, database, dump_filename, connection_p
         command.extend(('--password', password))
     if 'authentication_database' in database:
         command.extend(('--authenticationDatabase', database['authentication_database']))
+    if 'parallel_collections' in database:
+        command.extend(('--numParallelCollections', str(database['parallel_collections'])))
+    if 'insertion_workers_per_collection' in database:
+        command.extend(
+            (
+                '--numInsertionWorkersPerCollection',
+                str(database['insertion_workers_per_collection']),
+            )
+        )
     if 'restore_options' in database:
         command.extend(database['restore_options'].split(' '))
     if database['schemas']:
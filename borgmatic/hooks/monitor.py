@@ -1,6 +1,29 @@
+import collections
+import gzip
+import logging
+import threading
 from enum import Enum
 
-MONITOR_HOOK_NAMES = ('healthchecks', 'cronitor', 'cronhub', 'pagerduty', 'ntfy')
+import requests
+import urllib3
+
+MONITOR_HOOK_NAMES = ('healthchecks', 'cronitor', 'cronhub', 'pagerduty', 'ntfy', 'prometheus')
+
+# How long to wait for a monitoring service to respond to each request, unless a hook's "timeout"
+# option says otherwise.
+DEFAULT_TIMEOUT_SECONDS = 10
+
+# How many times to retry a request to a monitoring service after a connection error or a transient
+# server error, with exponential backoff between attempts.
+MAX_RETRIES = 2
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+PAYLOAD_TRUNCATION_INDICATOR = '...\n'
+
+# The portion of a log buffer's capacity reserved for the start of the run, with the remainder going
+# to the most recent logs.
+HEAD_BYTE_FRACTION = 0.2
 
 
 class State(Enum):
@@ -8,3 +31,224 @@ class State(Enum):
     FINISH = 2
     FAIL = 3
     LOG = 4
+
+
+session = None
+session_lock = threading.Lock()
+
+
+def make_session():
+    '''
+    Return a new requests.Session for talking to monitoring services. It keeps connections alive
+    across requests, pools enough of them for every monitoring hook to ping at once, and retries
+    failed requests with backoff. Retries include POSTs, as re-sending a ping is harmless.
+    '''
+    new_session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=len(MONITOR_HOOK_NAMES),
+        pool_maxsize=len(MONITOR_HOOK_NAMES),
+        max_retries=urllib3.util.Retry(
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=None,
+            raise_on_status=False,
+        ),
+    )
+    new_session.mount('http://', adapter)
+    new_session.mount('https://', adapter)
+
+    return new_session
+
+
+def get_session():
+    '''
+    Return the requests.Session shared by all monitoring hooks, creating it on first use. This is
+    safe to call from multiple threads.
+    '''
+    global session
+
+    with session_lock:
+        if session is None:
+            session = make_session()
+
+        return session
+
+
+def get_timeout(hook_config):
+    '''
+    Given a monitoring hook's configuration dict, return the number of seconds to wait for the
+    monitoring service to respond to each request.
+    '''
+    return hook_config.get('timeout', DEFAULT_TIMEOUT_SECONDS)
+
+
+class Forgetful_buffering_handler(logging.Handler):
+    '''
+    A buffering log handler that stores log messages in memory, and throws away messages once a
+    particular capacity in bytes is reached. It keeps the first messages up to the given head
+    capacity (the start of the run) and, with the rest of the capacity, the most recent messages
+    (the end of the run, including any final error), forgetting messages in between, oldest first.
+    But if the given byte capacity is zero, don't throw away any messages.
+
+    The handler is shared among all monitoring hooks that send logs, so it tracks the names of the
+    hooks using it.
+    '''
+
+    def __init__(self, byte_capacity, log_level, head_byte_capacity=0):
+        super().__init__()
+
+        self.byte_capacity = byte_capacity
+        self.head_byte_capacity = head_byte_capacity
+        self.head = []
+        self.head_byte_count = 0
+        self.buffer = collections.deque()
+        self.byte_count = 0
+        self.forgot = False
+        self.hook_names = set()
+        self.setLevel(log_level)
+
+    def emit(self, record):
+        message = record.getMessage() + '\n'
+
+        # Only messages from the very start of the run go in the head, before anything's been
+        # added to the rest of the buffer.
+        if (
+            self.byte_capacity
+            and not self.buffer
+            and self.head_byte_count + len(message) <= self.head_byte_capacity
+        ):
+            self.head.append(message)
+            self.head_byte_count += len(message)
+            return
+
+        self.byte_count += len(message)
+        self.buffer.append(message)
+
+        if not self.byte_capacity:
+            return
+
+        while self.byte_count > self.byte_capacity - self.head_byte_count and self.buffer:
+            self.byte_count -= len(self.buffer.popleft())
+            self.forgot = True
+
+    def format_payload(self, byte_limit=None):
+        '''
+        Return the buffered log messages as a single string. If a byte limit is given, return at
+        most that many bytes: a share of the first messages and as many of the most recent messages
+        as fit. Either way, mark any forgotten messages with a truncation indicator.
+        '''
+        head = list(self.head)
+        tail = list(self.buffer)
+        forgot = self.forgot
+
+        if byte_limit and len(make_payload(head, tail, forgot)) > byte_limit:
+            budget = max(byte_limit - len(PAYLOAD_TRUNCATION_INDICATOR), 0)
+            head = take_messages(
+                head, min(self.head_byte_capacity, int(budget * HEAD_BYTE_FRACTION))
+            )
+            budget -= sum(len(message) for message in head)
+            tail = take_messages(reversed(tail), budget)[::-1]
+            forgot = True
+
+        return make_payload(head, tail, forgot)
+
+
+def make_payload(head, tail, forgot):
+    '''
+    Given a sequence of log messages from the start of a run, a sequence of the most recent log
+    messages, and whether any messages in between were forgotten, join them into a single string,
+    marking any forgotten messages with a truncation indicator.
+    '''
+    return ''.join(head) + (PAYLOAD_TRUNCATION_INDICATOR if forgot else '') + ''.join(tail)
+
+
+def take_messages(messages, byte_limit):
+    '''
+    Given an iterable of log messages and a byte limit, return a list of messages from the start of
+    the iterable that fit within the limit.
+    '''
+    taken = []
+    byte_count = 0
+
+    for message in messages:
+        byte_count += len(message)
+
+        if byte_count > byte_limit:
+            break
+
+        taken.append(message)
+
+    return taken
+
+
+def get_log_buffering_handler():
+    '''
+    Return the Forgetful_buffering_handler previously added to the root logger, or None if there
+    isn't one.
+    '''
+    return next(
+        (
+            handler
+            for handler in logging.getLogger().handlers
+            if isinstance(handler, Forgetful_buffering_handler)
+        ),
+        None,
+    )
+
+
+def add_log_buffering_handler(hook_name, byte_capacity, log_level):
+    '''
+    Given the name of a monitoring hook that wants to send logs, a byte capacity for the logs it
+    sends (zero for unlimited), and a log level, make sure that the root logger has a shared
+    Forgetful_buffering_handler big enough for it, and register the hook as a user of the handler.
+    '''
+    handler = get_log_buffering_handler()
+
+    if handler is None:
+        handler = Forgetful_buffering_handler(
+            byte_capacity, log_level, int(byte_capacity * HEAD_BYTE_FRACTION)
+        )
+        logging.getLogger().addHandler(handler)
+    elif handler.byte_capacity and (not byte_capacity or byte_capacity > handler.byte_capacity):
+        handler.byte_capacity = byte_capacity
+        handler.head_byte_capacity = int(byte_capacity * HEAD_BYTE_FRACTION)
+
+    handler.hook_names.add(hook_name)
+
+
+def format_buffered_logs_for_payload(byte_limit=None):
+    '''
+    Get the handler previously added to the root logger, and slurp buffered logs out of it to send
+    to a monitoring service, limited to the given number of bytes if any.
+    '''
+    handler = get_log_buffering_handler()
+
+    if handler is None:
+        # No handler means no payload.
+        return ''
+
+    return handler.format_payload(byte_limit)
+
+
+def compress_payload(payload):
+    '''
+    Given a log payload string, return it gzip-compressed as bytes.
+    '''
+    return gzip.compress(payload.encode('utf-8'))
+
+
+def remove_log_buffering_handler(hook_name):
+    '''
+    Given the name of a monitoring hook, unregister it as a user of the shared log buffering
+    handler, and remove the handler from the root logger once no hooks are using it. This prevents
+    the handler from getting reused for subsequent configuration files.
+    '''
+    logger = logging.getLogger()
+
+    for handler in tuple(logger.handlers):
+        if isinstance(handler, Forgetful_buffering_handler):
+            handler.hook_names.discard(hook_name)
+
+            if not handler.hook_names:
+                logger.removeHandler(handler)
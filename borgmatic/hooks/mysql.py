@@ -1,13 +1,16 @@
 import copy
+import functools
 import logging
 import os
+import re
+import subprocess
 
 from borgmatic.execute import (
     execute_command,
     execute_command_and_capture_output,
     execute_command_with_processes,
 )
-from borgmatic.hooks import dump
+from borgmatic.hooks import dump, mysql_binlog, mysql_fast_restore, mysql_parallel, mysql_split
 
 logger = logging.getLogger(__name__)
 
@@ -55,8 +58,53 @@ def database_names_to_dump(database, extra_environment, log_prefix, dry_run):
     )
 
 
+def order_database_names_by_size(database, database_names, extra_environment, log_prefix):
+    '''
+    Given a requested database config, a sequence of database names on its host, an extra
+    environment dict, and a log prefix, query for the size of each database and return the names
+    ordered from largest to smallest.
+    '''
+    size_command = (
+        ('mysql',)
+        + (tuple(database['list_options'].split(' ')) if 'list_options' in database else ())
+        + (('--host', database['hostname']) if 'hostname' in database else ())
+        + (('--port', str(database['port'])) if 'port' in database else ())
+        + (('--protocol', 'tcp') if 'hostname' in database or 'port' in database else ())
+        + (('--user', database['username']) if 'username' in database else ())
+        + ('--skip-column-names', '--batch')
+        + ('--execute', mysql_parallel.DATABASE_SIZES_QUERY)
+    )
+    logger.debug(f'{log_prefix}: Querying for the sizes of MySQL databases to dump')
+
+    return mysql_parallel.order_by_size(
+        database_names,
+        execute_command_and_capture_output(size_command, extra_environment=extra_environment),
+    )
+
+
+def make_lock_command(database):
+    '''
+    Given a database config, return a client command for holding a global read lock on its host.
+    '''
+    return (
+        ('mysql',)
+        + (('--host', database['hostname']) if 'hostname' in database else ())
+        + (('--port', str(database['port'])) if 'port' in database else ())
+        + (('--protocol', 'tcp') if 'hostname' in database or 'port' in database else ())
+        + (('--user', database['username']) if 'username' in database else ())
+        + ('--skip-column-names', '--batch', '--unbuffered')
+    )
+
+
 def execute_dump_command(
-    database, log_prefix, dump_path, database_names, extra_environment, dry_run, dry_run_label
+    database,
+    log_prefix,
+    dump_path,
+    database_names,
+    extra_environment,
+    dry_run,
+    dry_run_label,
+    snapshot_started=None,
 ):
     '''
     Kick off a dump for the given MySQL/MariaDB database (provided as a configuration dict) to a
@@ -64,7 +112,12 @@ def execute_dump_command(
     any log entries.
 
     Return a subprocess.Popen instance for the dump process ready to spew to a named pipe. But if
-    this is a dry run, then don't actually dump anything and return None.
+    this is a dry run, then don't actually dump anything and return None. And for the "split" format,
+    dump to a directory instead, with the dump complete by the time this returns None.
+
+    If a snapshot started function is given, dump the database within a single transaction to a
+    regular file (or "split" directory), calling the function once the transaction has started, and
+    return None once the dump is complete. This is for dumping databases in parallel.
     '''
     database_name = database['name']
     dump_filename = dump.make_database_dump_filename(
@@ -76,6 +129,8 @@ def execute_dump_command(
         )
         return None
 
+    split = database.get('format') == 'split'
+    to_file = split or snapshot_started is not None
     dump_command = (
         ('mysqldump',)
         + (tuple(database['options'].split(' ')) if 'options' in database else ())
@@ -84,9 +139,12 @@ def execute_dump_command(
         + (('--port', str(database['port'])) if 'port' in database else ())
         + (('--protocol', 'tcp') if 'hostname' in database or 'port' in database else ())
         + (('--user', database['username']) if 'username' in database else ())
+        # Dump every table from a single consistent snapshot, in a stable order.
+        + (('--single-transaction',) if to_file else ())
+        + (('--order-by-primary', '--skip-dump-date') if split else ())
         + ('--databases',)
         + database_names
-        + ('--result-file', dump_filename)
+        + (() if to_file else ('--result-file', dump_filename))
     )
 
     logger.debug(
@@ -95,6 +153,22 @@ def execute_dump_command(
     if dry_run:
         return None
 
+    if to_file:
+        dump.create_parent_directory_for_dump(dump_filename)
+        dump_process = execute_command(
+            dump_command,
+            output_file=subprocess.PIPE,
+            extra_environment=extra_environment,
+            run_to_completion=False,
+        )
+
+        if split:
+            mysql_split.split_dump(dump_process, dump_filename, snapshot_started)
+        else:
+            mysql_parallel.copy_dump(dump_process, dump_filename, snapshot_started)
+
+        return None
+
     dump.create_named_pipe_for_dump(dump_filename)
 
     return execute_command(
@@ -104,6 +178,125 @@ def execute_dump_command(
     )
 
 
+def execute_parallel_dump_command(
+    database, log_prefix, dump_path, extra_environment, dump_name, snapshot_started
+):
+    '''
+    Given a requested database config, a log prefix, a dump path, an extra environment dict, the
+    name of one of the config's databases to dump, and a function to call once the dump's
+    transaction has started, dump that database to completion.
+    '''
+    renamed_database = copy.copy(database)
+    renamed_database['name'] = dump_name
+
+    execute_dump_command(
+        renamed_database,
+        log_prefix,
+        dump_path,
+        (dump_name,),
+        extra_environment,
+        dry_run=False,
+        dry_run_label='',
+        snapshot_started=snapshot_started,
+    )
+
+
+# mysqldump renamed "--master-data" to "--source-data" in MySQL 8.0.26, deprecating the old name.
+SOURCE_DATA_MINIMUM_VERSION = (8, 0, 26)
+
+# Matches the version in "mysqldump --version" output like "mysqldump  Ver 8.0.36 for Linux ..." or
+# the older "mysqldump  Ver 10.13 Distrib 5.7.44, for Linux ...".
+MYSQLDUMP_VERSION_PATTERN = re.compile(r'(?:Ver|Distrib)\s+(\d+)\.(\d+)\.(\d+)')
+
+
+def make_source_data_flag(extra_environment, log_prefix):
+    '''
+    Given an extra environment dict and a log prefix, return the mysqldump flag that records the
+    binary log coordinates of a dump's snapshot as a comment in it: "--source-data=2", or
+    "--master-data=2" for a mysqldump from before MySQL 8.0.26 or from MariaDB, which doesn't know
+    the newer name. If the version can't be determined, assume a recent MySQL mysqldump.
+    '''
+    version_output = execute_command_and_capture_output(
+        ('mysqldump', '--version'), extra_environment=extra_environment
+    )
+    match = MYSQLDUMP_VERSION_PATTERN.search(version_output)
+
+    if 'MariaDB' in version_output or (
+        match and tuple(int(part) for part in match.groups()) < SOURCE_DATA_MINIMUM_VERSION
+    ):
+        logger.debug(f'{log_prefix}: Using --master-data with older mysqldump')
+        return '--master-data=2'
+
+    return '--source-data=2'
+
+
+def execute_binlog_dump_command(
+    database,
+    config,
+    log_prefix,
+    dump_path,
+    database_names,
+    extra_environment,
+    dry_run,
+    dry_run_label,
+):
+    '''
+    Bring the binary log incremental dump of the given MySQL/MariaDB database (provided as a
+    configuration dict) up to date, and put it in a dump directory constructed from the given dump
+    path and database name. Use the given configuration dict to construct the cache path and the
+    given log prefix in any log entries. If this is a dry run, then don't actually dump anything.
+    '''
+    database_name = database['name']
+    dump_directory = dump.make_database_dump_filename(
+        dump_path, database['name'], database.get('hostname')
+    )
+    if os.path.exists(dump_directory):
+        logger.warning(
+            f'{log_prefix}: Skipping duplicate dump of MySQL database "{database_name}" to {dump_directory}'
+        )
+        return
+
+    connection_flags = (
+        (('--host', database['hostname']) if 'hostname' in database else ())
+        + (('--port', str(database['port'])) if 'port' in database else ())
+        + (('--protocol', 'tcp') if 'hostname' in database or 'port' in database else ())
+        + (('--user', database['username']) if 'username' in database else ())
+    )
+    logger.debug(
+        f'{log_prefix}: Dumping MySQL database "{database_name}" with binary log incrementals to {dump_directory}{dry_run_label}'
+    )
+    if dry_run:
+        return
+
+    full_dump_command = (
+        ('mysqldump',)
+        + (tuple(database['options'].split(' ')) if 'options' in database else ())
+        + (('--add-drop-database',) if database.get('add_drop_database', True) else ())
+        + connection_flags
+        # Start a new binary log file at the dump's snapshot, and record its coordinates.
+        + (
+            '--single-transaction',
+            '--flush-logs',
+            make_source_data_flag(extra_environment, log_prefix),
+        )
+        + ('--databases',)
+        + database_names
+    )
+
+    dump.create_parent_directory_for_dump(dump_directory)
+    mysql_binlog.dump_incrementally(
+        config,
+        database,
+        mysql_binlog.make_cache_directory(config, 'mysql_binlog_cache', database),
+        dump_directory,
+        full_dump_command,
+        ('mysql',) + connection_flags + ('--skip-column-names', '--batch'),
+        ('mysqlbinlog', '--read-from-remote-server') + connection_flags,
+        extra_environment,
+        log_prefix,
+    )
+
+
 def dump_databases(databases, config, log_prefix, dry_run):
     '''
     Dump the given MySQL/MariaDB databases to a named pipe. The databases are supplied as a sequence
@@ -131,7 +324,42 @@ def dump_databases(databases, config, log_prefix, dry_run):
 
             raise ValueError('Cannot find any MySQL databases to dump.')
 
-        if database['name'] == 'all' and database.get('format'):
+        if database.get('binlog_incrementals'):
+            execute_binlog_dump_command(
+                database,
+                config,
+                log_prefix,
+                dump_path,
+                dump_database_names,
+                extra_environment,
+                dry_run,
+                dry_run_label,
+            )
+        elif database['name'] == 'all' and database.get('jobs') and not dry_run:
+            dump_database_names = order_database_names_by_size(
+                database, dump_database_names, extra_environment, log_prefix
+            )
+            lock_process = (
+                mysql_parallel.hold_global_read_lock(
+                    make_lock_command(database), extra_environment, log_prefix
+                )
+                if database.get('global_read_lock')
+                else None
+            )
+            mysql_parallel.dump_in_parallel(
+                functools.partial(
+                    execute_parallel_dump_command,
+                    database,
+                    log_prefix,
+                    dump_path,
+                    extra_environment,
+                ),
+                dump_database_names,
+                database['jobs'],
+                lock_process,
+                log_prefix,
+            )
+        elif database['name'] == 'all' and (database.get('format') or database.get('jobs')):
             for dump_name in dump_database_names:
                 renamed_database = copy.copy(database)
                 renamed_database['name'] = dump_name
@@ -189,6 +417,16 @@ def restore_database_dump(
     only the database corresponding to the given database name is restored. Use the given log
     prefix in any log entries. If this is a dry run, then don't actually restore anything. Trigger
     the given active extract process (an instance of subprocess.Popen) to produce output to consume.
+
+    For the "split" format, there's no extract process. Instead, restore from the dump directory
+    already extracted to the filesystem, loading tables concurrently.
+
+    With "fast_restore" enabled, wrap the restore in session settings that skip constraint checks,
+    commit once at the end, and (if permitted) skip the binary log.
+
+    With "binlog_incrementals" enabled, restore from the dump directory already extracted to the
+    filesystem: the full dump, and then its binary logs replayed up to any "target_time" in the
+    given connection params.
     '''
     dry_run_label = ' (dry run; not actually restoring anything)' if dry_run else ''
 
@@ -228,6 +466,51 @@ def restore_database_dump(
     if dry_run:
         return
 
+    session_statements = (
+        mysql_fast_restore.make_session_statements(
+            mysql_fast_restore.can_disable_binary_log(
+                restore_command, extra_environment, log_prefix
+            )
+        )
+        if database.get('fast_restore')
+        else None
+    )
+
+    if database.get('binlog_incrementals'):
+        mysql_binlog.restore_incrementally(
+            restore_command,
+            # Replay transactions even if the server has already seen their GTIDs.
+            ('mysqlbinlog', '--skip-gtids'),
+            dump.make_database_dump_filename(
+                make_dump_path(config), database['name'], database.get('hostname')
+            ),
+            database['name'],
+            connection_params['target_time'],
+            extra_environment,
+            log_prefix,
+            session_statements,
+        )
+        return
+
+    if database.get('format') == 'split':
+        mysql_split.restore_split_dump(
+            restore_command,
+            dump.make_database_dump_filename(
+                make_dump_path(config), database['name'], database.get('hostname')
+            ),
+            database.get('jobs', 1),
+            extra_environment,
+            log_prefix,
+            session_statements,
+        )
+        return
+
+    if session_statements:
+        mysql_fast_restore.restore_stream(
+            restore_command, extract_process, session_statements, extra_environment
+        )
+        return
+
     # Don't give Borg local path so as to error on warnings, as "borg extract" only gives a warning
     # if the restore paths don't exist in the archive.
     execute_command_with_processes(
@@ -0,0 +1,294 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+
+from borgmatic.borg import check, state
+from borgmatic.execute import (
+    execute_command,
+    execute_command_and_capture_output,
+    execute_command_with_processes,
+)
+from borgmatic.hooks import dump, mysql_parallel, mysql_split
+
+logger = logging.getLogger(__name__)
+
+# The state namespace recording, for each database dumped with binary log incrementals, when its
+# last full dump happened and which binary log file to copy from next. Keyed by cache directory.
+POSITIONS_NAMESPACE = 'mysql_binlog_positions'
+
+DEFAULT_FULL_DUMP_FREQUENCY = '1 day'
+
+FULL_DUMP_FILENAME = 'full.sql'
+BINLOGS_DIRECTORY_NAME = 'binlogs'
+
+# With "--source-data=2" (or MariaDB's "--master-data=2"), a dump's header records the binary log
+# coordinates of its snapshot in a comment like:
+#
+#     -- CHANGE REPLICATION SOURCE TO SOURCE_LOG_FILE='binlog.000003', SOURCE_LOG_POS=157;
+BINLOG_COORDINATES_PATTERN = re.compile(
+    rb"(?:MASTER|SOURCE)_LOG_FILE='([^']+)',\s*(?:MASTER|SOURCE)_LOG_POS=(\d+)"
+)
+
+# Closing the active binary log file makes everything written so far safe to copy.
+LIST_BINARY_LOGS_STATEMENTS = 'FLUSH BINARY LOGS; SHOW BINARY LOGS'
+
+
+def make_cache_directory(config, cache_directory_name, database):
+    '''
+    Given a configuration dict, the name of a hook's binary log cache directory, and a database
+    config, return the path of the directory caching the database's full dump and binary logs. This
+    lives outside of the "*_databases" dump paths, so restores never mistake it for a dump.
+    '''
+    return os.path.join(
+        os.path.expanduser(
+            config.get('borgmatic_source_directory') or state.DEFAULT_BORGMATIC_SOURCE_DIRECTORY
+        ),
+        cache_directory_name,
+        database.get('hostname', 'localhost'),
+        database['name'],
+    )
+
+
+def get_full_dump_reason(database, position, cache_directory, now=None):
+    '''
+    Given a database config, its recorded position dict (if any), its cache directory, and the
+    current time as a Unix timestamp, return a string describing why a full dump is due, or None if
+    it isn't. A full dump is due if there's no previous full dump to build on or if the configured
+    "full_dump_frequency" has elapsed since the last one.
+
+    Raise ValueError if the configured frequency cannot be parsed.
+    '''
+    frequency_delta = check.parse_frequency(
+        database.get('full_dump_frequency', DEFAULT_FULL_DUMP_FREQUENCY)
+    )
+
+    if frequency_delta is None:
+        return 'always'
+
+    if not position:
+        return 'no previous full dump recorded'
+
+    if not os.path.exists(os.path.join(cache_directory, FULL_DUMP_FILENAME)):
+        return 'previous full dump missing'
+
+    if now is None:
+        now = time.time()
+
+    if now >= position['full_dump_time'] + frequency_delta.total_seconds():
+        return f"last full dump at {time.ctime(position['full_dump_time'])}"
+
+    return None
+
+
+def read_binlog_coordinates(full_dump_path):
+    '''
+    Given the path of a full dump, return the binary log coordinates recorded in its header as a
+    (filename, position) tuple.
+
+    Raise ValueError if the dump doesn't record any coordinates.
+    '''
+    with open(full_dump_path, 'rb') as full_dump_file:
+        for line in full_dump_file:
+            match = BINLOG_COORDINATES_PATTERN.search(line)
+
+            if match:
+                return (match.group(1).decode(), int(match.group(2)))
+
+            if line.startswith(mysql_parallel.CURRENT_DATABASE_TITLE):
+                break
+
+    raise ValueError(
+        f'The dump at {full_dump_path} has no binary log coordinates; is binary logging enabled?'
+    )
+
+
+def dump_full(full_dump_command, cache_directory, extra_environment):
+    '''
+    Given a full dump command that writes to stdout and records binary log coordinates, a cache
+    directory, and an extra environment dict, replace the cache directory's contents with a new full
+    dump. Return the name of the binary log file in which changes made after the dump begin.
+
+    Raise subprocess.CalledProcessError if the dump errors or ValueError if it doesn't record any
+    binary log coordinates.
+    '''
+    shutil.rmtree(cache_directory, ignore_errors=True)
+    os.makedirs(os.path.join(cache_directory, BINLOGS_DIRECTORY_NAME), mode=0o700)
+    full_dump_path = os.path.join(cache_directory, FULL_DUMP_FILENAME)
+
+    mysql_parallel.copy_dump(
+        execute_command(
+            full_dump_command,
+            output_file=subprocess.PIPE,
+            extra_environment=extra_environment,
+            run_to_completion=False,
+        ),
+        full_dump_path,
+    )
+
+    return read_binlog_coordinates(full_dump_path)[0]
+
+
+def list_binary_logs(client_command, extra_environment):
+    '''
+    Given a client command (like "mysql --skip-column-names --batch" with connection flags) and an
+    extra environment dict, close the server's active binary log file and return the names of all
+    of its binary log files in order. The last one is the new active file.
+    '''
+    output = execute_command_and_capture_output(
+        tuple(client_command) + ('--execute', LIST_BINARY_LOGS_STATEMENTS),
+        extra_environment=extra_environment,
+    )
+
+    return tuple(line.split('\t')[0] for line in output.strip().splitlines() if line)
+
+
+def fetch_binary_logs(binlog_command, binlog_names, cache_directory, extra_environment):
+    '''
+    Given a binary log command (like "mysqlbinlog --read-from-remote-server" with connection flags),
+    a sequence of binary log file names, a cache directory, and an extra environment dict, copy the
+    named files from the server into the cache directory as-is.
+    '''
+    execute_command(
+        tuple(binlog_command)
+        + (
+            '--raw',
+            '--result-file=' + os.path.join(cache_directory, BINLOGS_DIRECTORY_NAME) + os.path.sep,
+        )
+        + tuple(binlog_names),
+        extra_environment=extra_environment,
+    )
+
+
+def link_cache(cache_directory, dump_directory):
+    '''
+    Given a cache directory and a dump directory, put a copy of the cached full dump and binary logs
+    in the dump directory. Cached files never change once written, so the copy is made of hard links
+    where possible.
+    '''
+    shutil.copytree(cache_directory, dump_directory, copy_function=dump.link_or_copy)
+
+
+def dump_incrementally(
+    config,
+    database,
+    cache_directory,
+    dump_directory,
+    full_dump_command,
+    client_command,
+    binlog_command,
+    extra_environment,
+    log_prefix,
+):
+    '''
+    Given a configuration dict, a database config, its cache directory, the dump directory to put
+    its dump in, a full dump command that writes to stdout and records binary log coordinates, a
+    client command (like "mysql --skip-column-names --batch" with connection flags), a binary log
+    command (like "mysqlbinlog --read-from-remote-server" with connection flags), an extra
+    environment dict, and a log prefix, bring the cached dump up to date and put it in the dump
+    directory.
+
+    Bringing the cache up to date means a new full dump if one is due. Otherwise, it means copying
+    just the binary log files written since the last backup, which together with the last full dump
+    can restore the database to any point in between.
+
+    Raise subprocess.CalledProcessError if a dump command errors or ValueError if the configured
+    full dump frequency can't be parsed or a full dump doesn't record binary log coordinates.
+    '''
+    with state.open_state_database(config) as connection:
+        position = state.get_value(connection, POSITIONS_NAMESPACE, cache_directory)
+
+    reason = get_full_dump_reason(database, position, cache_directory)
+    binlog_names = ()
+
+    if not reason:
+        binlog_names = list_binary_logs(client_command, extra_environment)
+
+        if position['next_file'] not in binlog_names:
+            reason = f"binary log {position['next_file']} no longer on the server"
+
+    if reason:
+        logger.debug(f'{log_prefix}: Making a full dump ({reason})')
+
+        # Forget the old position first, so an interruption never pairs it with a new dump.
+        with state.open_state_database(config) as connection:
+            state.delete_value(connection, POSITIONS_NAMESPACE, cache_directory)
+
+        position = {
+            'full_dump_time': time.time(),
+            'next_file': dump_full(full_dump_command, cache_directory, extra_environment),
+        }
+    else:
+        closed_names = binlog_names[binlog_names.index(position['next_file']) : -1]
+        logger.debug(f'{log_prefix}: Copying {len(closed_names)} new binary log files')
+
+        if closed_names:
+            fetch_binary_logs(binlog_command, closed_names, cache_directory, extra_environment)
+
+        position = dict(position, next_file=binlog_names[-1])
+
+    with state.open_state_database(config) as connection:
+        state.set_value(connection, POSITIONS_NAMESPACE, cache_directory, position)
+
+    link_cache(cache_directory, dump_directory)
+
+
+def restore_incrementally(
+    restore_command,
+    replay_command,
+    dump_directory,
+    database_name,
+    target_time,
+    extra_environment,
+    log_prefix,
+    session_statements=None,
+):
+    '''
+    Given a restore command (like "mysql --batch" with connection flags), a binary log replay
+    command (like "mysqlbinlog"), a dump directory written by dump_incrementally(), the name of the
+    database to restore (or "all"), an optional time to stop replaying changes at (like
+    "2024-01-31 12:00:00"), an extra environment dict, a log prefix, and an optional (prelude,
+    epilogue) tuple of bytes to wrap the full dump in, restore the full dump and then replay the
+    binary logs on top of it.
+
+    Raise subprocess.CalledProcessError if any part of the restore errors or ValueError if the full
+    dump doesn't record binary log coordinates.
+    '''
+    full_dump_path = os.path.join(dump_directory, FULL_DUMP_FILENAME)
+    (start_file, start_position) = read_binlog_coordinates(full_dump_path)
+    binlogs_directory = os.path.join(dump_directory, BINLOGS_DIRECTORY_NAME)
+    binlog_paths = tuple(
+        os.path.join(binlogs_directory, filename)
+        for filename in sorted(os.listdir(binlogs_directory))
+        if filename >= start_file
+    )
+
+    mysql_split.restore_file(restore_command, full_dump_path, extra_environment, session_statements)
+
+    if not binlog_paths:
+        return
+
+    logger.debug(
+        f'{log_prefix}: Replaying {len(binlog_paths)} binary log files'
+        + (f' up to {target_time}' if target_time else '')
+    )
+
+    replay_process = execute_command(
+        tuple(replay_command)
+        + ('--start-position', str(start_position))
+        + (('--stop-datetime', target_time) if target_time else ())
+        + (('--database', database_name) if database_name != 'all' else ())
+        + binlog_paths,
+        output_file=subprocess.PIPE,
+        run_to_completion=False,
+    )
+
+    execute_command_with_processes(
+        restore_command,
+        [replay_process],
+        output_log_level=logging.DEBUG,
+        input_file=replay_process.stdout,
+        extra_environment=extra_environment,
+    )
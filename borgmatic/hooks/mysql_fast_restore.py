@@ -0,0 +1,125 @@
+import contextlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+from borgmatic.execute import execute_command, execute_command_and_capture_output, log_outputs
+
+logger = logging.getLogger(__name__)
+
+# Save the session's settings, and then skip per-row constraint checks and commit once at the end
+# instead of after every statement.
+PRELUDE = (
+    b'SET @borgmatic_foreign_key_checks = @@foreign_key_checks, '
+    b'@borgmatic_unique_checks = @@unique_checks, @borgmatic_autocommit = @@autocommit;\n'
+    b'SET SESSION foreign_key_checks = 0, unique_checks = 0, autocommit = 0;\n'
+)
+EPILOGUE = (
+    b'COMMIT;\n'
+    b'SET SESSION foreign_key_checks = @borgmatic_foreign_key_checks, '
+    b'unique_checks = @borgmatic_unique_checks, autocommit = @borgmatic_autocommit;\n'
+)
+
+# Disabling the binary log needs extra privileges, so these only get used if permitted.
+DISABLE_BINARY_LOG_STATEMENT = 'SET SESSION sql_log_bin = 0'
+BINARY_LOG_PRELUDE = (
+    b'SET @borgmatic_sql_log_bin = @@sql_log_bin;\n'
+    + DISABLE_BINARY_LOG_STATEMENT.encode()
+    + b';\n'
+)
+BINARY_LOG_EPILOGUE = b'SET SESSION sql_log_bin = @borgmatic_sql_log_bin;\n'
+
+
+def can_disable_binary_log(client_command, extra_environment, log_prefix):
+    '''
+    Given a client command (like "mysql --batch" with connection flags), an extra environment dict,
+    and a log prefix, return whether the client's user is permitted to disable the binary log for
+    its session.
+    '''
+    try:
+        execute_command_and_capture_output(
+            tuple(client_command) + ('--execute', DISABLE_BINARY_LOG_STATEMENT),
+            capture_stderr=True,
+            extra_environment=extra_environment,
+        )
+    except subprocess.CalledProcessError:
+        logger.debug(f'{log_prefix}: Not permitted to disable the binary log during restore')
+        return False
+
+    return True
+
+
+def make_session_statements(disable_binary_log):
+    '''
+    Given whether to disable the binary log, return the SQL statements to run before and after a
+    restore as a (prelude, epilogue) tuple of bytes. The epilogue commits the restored data and puts
+    the session's settings back the way they were.
+    '''
+    if disable_binary_log:
+        return (PRELUDE + BINARY_LOG_PRELUDE, EPILOGUE + BINARY_LOG_EPILOGUE)
+
+    return (PRELUDE, EPILOGUE)
+
+
+def write_restore_input(input_pipe, input_file, session_statements):
+    '''
+    Given a writable pipe, a binary input file, and a (prelude, epilogue) tuple of bytes, write the
+    prelude, the contents of the input file, and the epilogue to the pipe, and then close it.
+    '''
+    (prelude, epilogue) = session_statements
+
+    try:
+        with input_pipe:
+            input_pipe.write(prelude)
+            shutil.copyfileobj(input_file, input_pipe)
+            input_pipe.write(epilogue)
+    except BrokenPipeError:
+        # The restore command exited early, and whatever ran it reports its error.
+        pass
+
+
+@contextlib.contextmanager
+def restore_input(input_file, session_statements):
+    '''
+    Given a binary input file and a (prelude, epilogue) tuple of bytes, yield a pipe to read the
+    input file's contents from, wrapped in the prelude and epilogue. A background thread feeds the
+    pipe, so the input can be as large as it likes.
+    '''
+    (read_descriptor, write_descriptor) = os.pipe()
+    threading.Thread(
+        target=write_restore_input,
+        args=(os.fdopen(write_descriptor, 'wb'), input_file, session_statements),
+        daemon=True,
+    ).start()
+
+    with os.fdopen(read_descriptor, 'rb') as input_pipe:
+        yield input_pipe
+
+
+def restore_stream(restore_command, extract_process, session_statements, extra_environment):
+    '''
+    Given a restore command (like "mysql --batch" with connection flags), an active extract process
+    (an instance of subprocess.Popen) producing a dump on its stdout, a (prelude, epilogue) tuple of
+    bytes, and an extra environment dict, restore the dump wrapped in the prelude and epilogue.
+
+    Raise subprocess.CalledProcessError if the extract or restore errors.
+    '''
+    with restore_input(extract_process.stdout, session_statements) as input_file:
+        restore_process = execute_command(
+            restore_command,
+            input_file=input_file,
+            extra_environment=extra_environment,
+            run_to_completion=False,
+        )
+
+        # Don't give Borg local path so as to error on warnings, as "borg extract" only gives a
+        # warning if the restore paths don't exist in the archive. And only log the extract
+        # process's stderr, as its stdout is being fed to the restore.
+        log_outputs(
+            (extract_process, restore_process),
+            (extract_process.stdout,),
+            output_log_level=logging.DEBUG,
+            borg_local_path=None,
+        )
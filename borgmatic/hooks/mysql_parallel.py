@@ -0,0 +1,168 @@
+import concurrent.futures
+import logging
+import shutil
+import subprocess
+import threading
+
+from borgmatic.execute import execute_command, log_outputs
+
+logger = logging.getLogger(__name__)
+
+# A query for the size of each database, for the client's "--skip-column-names --batch" output of a
+# tab-separated name and size per line.
+DATABASE_SIZES_QUERY = (
+    'SELECT table_schema, SUM(data_length + index_length) FROM information_schema.tables '
+    'GROUP BY table_schema'
+)
+
+# In a dump of a single database with "--databases", this header follows the dump's preamble. By
+# then, a "--single-transaction" dump has started its transaction.
+CURRENT_DATABASE_TITLE = b'-- Current Database: '
+
+LOCK_STATEMENTS = b"FLUSH TABLES WITH READ LOCK;\nSELECT 'locked';\n"
+
+
+def order_by_size(database_names, sizes_output):
+    '''
+    Given a sequence of database names and the output of DATABASE_SIZES_QUERY, return the names
+    ordered from largest to smallest database, so that the longest dumps start first. Keep databases
+    of unknown size in their given order, after the rest.
+    '''
+    sizes = {}
+
+    for line in sizes_output.splitlines():
+        name, _, size = line.partition('\t')
+
+        try:
+            sizes[name] = int(size)
+        except ValueError:
+            pass
+
+    return tuple(sorted(database_names, key=lambda name: -sizes.get(name, -1)))
+
+
+def copy_dump(dump_process, dump_filename, snapshot_started=None):
+    '''
+    Given an active dump process (an instance of subprocess.Popen) writing a single database's
+    mysqldump or mariadb-dump output to its stdout and a dump filename, copy the dump to the file.
+    If a snapshot started function is given, call it once the dump is past its preamble, by which
+    point a "--single-transaction" dump has started its transaction.
+
+    Raise subprocess.CalledProcessError if the dump process errors.
+    '''
+    with open(dump_filename, 'wb') as dump_file:
+        for line in dump_process.stdout:
+            dump_file.write(line)
+
+            if line.startswith(CURRENT_DATABASE_TITLE):
+                break
+
+        if snapshot_started:
+            snapshot_started()
+
+        shutil.copyfileobj(dump_process.stdout, dump_file)
+
+    # Log the dump's stderr and raise if it errored.
+    log_outputs(
+        (dump_process,),
+        (dump_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    )
+
+
+def hold_global_read_lock(lock_command, extra_environment, log_prefix):
+    '''
+    Given a client command (like "mysql --skip-column-names --batch" with connection flags), an
+    extra environment dict, and a log prefix, take a global read lock on the database server in a
+    new client session, blocking writes to all databases until release_global_read_lock() is called
+    with the returned process.
+
+    Raise subprocess.CalledProcessError or ValueError if the lock can't be taken.
+    '''
+    logger.debug(f'{log_prefix}: Taking a global read lock')
+
+    lock_process = execute_command(
+        lock_command,
+        output_file=subprocess.PIPE,
+        input_file=subprocess.PIPE,
+        extra_environment=extra_environment,
+        run_to_completion=False,
+    )
+    lock_process.stdin.write(LOCK_STATEMENTS)
+    lock_process.stdin.flush()
+
+    if lock_process.stdout.readline().strip() != b'locked':
+        release_global_read_lock(lock_process, log_prefix)
+
+        raise ValueError('Could not take a global read lock')
+
+    return lock_process
+
+
+def release_global_read_lock(lock_process, log_prefix):
+    '''
+    Given the process returned by hold_global_read_lock() and a log prefix, end its session and with
+    it the global read lock.
+
+    Raise subprocess.CalledProcessError if the session errored.
+    '''
+    logger.debug(f'{log_prefix}: Releasing the global read lock')
+    lock_process.stdin.close()
+
+    log_outputs(
+        (lock_process,),
+        (lock_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    )
+
+
+def run_dump(dump_function, database_name, snapshot_started):
+    '''
+    Given a dump function, a database name, and a threading.Event, call the dump function with the
+    database name and a function that sets the event once the dump's transaction has started. Set
+    the event regardless when the dump function returns or raises, so nothing waits on a dump that
+    never started.
+    '''
+    try:
+        dump_function(database_name, snapshot_started.set)
+    finally:
+        snapshot_started.set()
+
+
+def dump_in_parallel(dump_function, database_names, jobs, lock_process=None, log_prefix=None):
+    '''
+    Given a dump function, a sequence of database names, the number of dumps to run at once, an
+    optional process returned by hold_global_read_lock(), and a log prefix, call the dump function
+    for each database name on a pool of threads. The dump function takes a database name and a
+    function to call once the dump's transaction has started, and it runs the dump to completion.
+
+    If a lock process is given, release its global read lock once every dump has started its
+    transaction, so all the dumps see the databases as of the same moment.
+
+    Raise the error of the first dump to fail, if any, once all the dumps are done.
+    '''
+    snapshots_started = [threading.Event() for database_name in database_names]
+
+    logger.debug(f'{log_prefix}: Dumping {len(database_names)} databases, {jobs} at a time')
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(run_dump, dump_function, database_name, snapshot_started)
+                for database_name, snapshot_started in zip(database_names, snapshots_started)
+            ]
+
+            if lock_process:
+                for snapshot_started in snapshots_started:
+                    snapshot_started.wait()
+
+                release_global_read_lock(lock_process, log_prefix)
+                lock_process = None
+    finally:
+        if lock_process:
+            release_global_read_lock(lock_process, log_prefix)
+
+    for future in futures:
+        future.result()
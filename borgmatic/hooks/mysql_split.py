@@ -0,0 +1,236 @@
+import concurrent.futures
+import logging
+import os
+import urllib.parse
+
+from borgmatic.execute import execute_command, log_outputs
+from borgmatic.hooks import mysql_fast_restore
+
+logger = logging.getLogger(__name__)
+
+PRE_DATA_FILENAME = 'pre-data.sql'
+TABLES_DIRECTORY_NAME = 'tables'
+POST_DATA_FILENAME = 'post-data.sql'
+
+# Every section of a mysqldump/mariadb-dump stream starts with a comment block like:
+#
+#     --
+#     -- Dumping data for table `name`
+#     --
+SECTION_MARKER = b'--\n'
+DATA_TITLE = b'-- Dumping data for table '
+PRE_DATA_TITLES = (
+    b'-- Current Database: ',
+    b'-- Table structure for table ',
+    b'-- Temporary view structure for view ',
+    b'-- Temporary table structure for view ',
+)
+POST_DATA_TITLES = (
+    b'-- Dumping routines for database ',
+    b'-- Dumping events for database ',
+    b'-- Final view structure for view ',
+)
+
+# Statements (and comments) that can appear within the data section for a table. Anything else after
+# it (like the table's triggers) belongs after all the data is loaded.
+DATA_STATEMENT_PREFIXES = (
+    b'INSERT ',
+    b'REPLACE ',
+    b'LOCK TABLES ',
+    b'UNLOCK TABLES',
+    b'/*!40000 ALTER TABLE ',
+    b'--',
+    b'set autocommit=0;',
+    b'commit;',
+)
+
+
+def make_table_filename(dump_directory, title):
+    '''
+    Given a split dump directory and a data section title line like b"-- Dumping data for table
+    `name`\\n", return the path of the file for that table's data, with any characters that aren't
+    safe in a filename percent-encoded.
+    '''
+    quoted_name = title[len(DATA_TITLE) :].strip()
+    name = quoted_name[1:-1].replace(b'``', b'`')
+
+    return os.path.join(
+        dump_directory, TABLES_DIRECTORY_NAME, f"{urllib.parse.quote(name, safe='')}.sql"
+    )
+
+
+def open_split_file(path, session_lines):
+    '''
+    Given the path of a file within a split dump and the dump's session setting lines so far, open
+    the file for writing, start it with those lines, and return it.
+    '''
+    split_file = open(path, 'wb')
+    split_file.writelines(session_lines)
+
+    return split_file
+
+
+def split_dump(dump_process, dump_directory, snapshot_started=None):
+    '''
+    Given an active dump process (an instance of subprocess.Popen) writing a single database's
+    mysqldump or mariadb-dump output to its stdout, split the dump into files in the given
+    directory: the schema to load before any data ("pre-data.sql"), one file per table with its data
+    ("tables/<table>.sql"), and the triggers, routines, events, and views to create after all the
+    data ("post-data.sql"). The table and post-data files start with the dump's session settings, so
+    each can be loaded on its own.
+
+    If a snapshot started function is given, call it once the dump is past its header, by which
+    point a "--single-transaction" dump has started its transaction.
+
+    Raise subprocess.CalledProcessError if the dump process errors.
+    '''
+    os.makedirs(os.path.join(dump_directory, TABLES_DIRECTORY_NAME), mode=0o700)
+    post_data_path = os.path.join(dump_directory, POST_DATA_FILENAME)
+    pre_data_file = open(os.path.join(dump_directory, PRE_DATA_FILENAME), 'wb')
+    post_data_file = None
+    table_file = None
+    destination = pre_data_file
+    session_lines = []
+    in_prelude = True
+    pending_marker = False
+    previous_line = b''
+
+    try:
+        for line in dump_process.stdout:
+            in_table = destination is table_file
+
+            if pending_marker:
+                pending_marker = False
+
+                if in_table:
+                    table_file.close()
+                    destination = post_data_file = post_data_file or open_split_file(
+                        post_data_path, session_lines
+                    )
+
+                if line.startswith(DATA_TITLE):
+                    destination = table_file = open_split_file(
+                        make_table_filename(dump_directory, line), session_lines
+                    )
+                elif line.startswith(PRE_DATA_TITLES):
+                    destination = pre_data_file
+                elif line.startswith(POST_DATA_TITLES):
+                    destination = post_data_file = post_data_file or open_split_file(
+                        post_data_path, session_lines
+                    )
+
+                if in_prelude and line.startswith(
+                    (DATA_TITLE,) + PRE_DATA_TITLES + POST_DATA_TITLES
+                ):
+                    in_prelude = False
+
+                    if snapshot_started:
+                        snapshot_started()
+
+                destination.write(SECTION_MARKER)
+            elif line == SECTION_MARKER and not previous_line.startswith(b'-- '):
+                # Hold onto the marker until the next line says which section it starts.
+                pending_marker = True
+                previous_line = line
+                continue
+            elif in_table and line.strip() and not line.startswith(DATA_STATEMENT_PREFIXES):
+                table_file.close()
+                destination = post_data_file = post_data_file or open_split_file(
+                    post_data_path, session_lines
+                )
+            elif (in_prelude and line.strip() and not line.startswith(b'--')) or line.startswith(
+                b'USE '
+            ):
+                session_lines.append(line)
+
+            destination.write(line)
+            previous_line = line
+
+        if pending_marker:
+            destination.write(SECTION_MARKER)
+    finally:
+        for split_file in (pre_data_file, table_file, post_data_file):
+            if split_file:
+                split_file.close()
+
+    if not post_data_file:
+        open_split_file(post_data_path, session_lines).close()
+
+    # Log the dump's stderr and raise if it errored.
+    log_outputs(
+        (dump_process,),
+        (dump_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    )
+
+
+def restore_file(restore_command, path, extra_environment, session_statements=None):
+    '''
+    Given a restore command, the path of a SQL file, an extra environment dict, and an optional
+    (prelude, epilogue) tuple of bytes to wrap the file's contents in, run the command with the file
+    as its input.
+    '''
+    with open(path, 'rb') as input_file:
+        if session_statements:
+            with mysql_fast_restore.restore_input(input_file, session_statements) as input_pipe:
+                execute_command(
+                    restore_command,
+                    output_log_level=logging.DEBUG,
+                    input_file=input_pipe,
+                    extra_environment=extra_environment,
+                )
+
+            return
+
+        execute_command(
+            restore_command,
+            output_log_level=logging.DEBUG,
+            input_file=input_file,
+            extra_environment=extra_environment,
+        )
+
+
+def restore_split_dump(
+    restore_command, dump_directory, jobs, extra_environment, log_prefix, session_statements=None
+):
+    '''
+    Given a restore command (like "mysql --batch" with connection flags), a dump directory written
+    by split_dump(), the number of tables to load at once, an extra environment dict, a log prefix,
+    and an optional (prelude, epilogue) tuple of bytes to wrap each file in, load the dump: first
+    the schema, then the tables' data concurrently, and finally everything that depends on the
+    data.
+
+    Raise subprocess.CalledProcessError if any part of the restore errors.
+    '''
+    tables_directory = os.path.join(dump_directory, TABLES_DIRECTORY_NAME)
+    table_paths = sorted(
+        os.path.join(tables_directory, filename) for filename in os.listdir(tables_directory)
+    )
+
+    restore_file(
+        restore_command,
+        os.path.join(dump_directory, PRE_DATA_FILENAME),
+        extra_environment,
+        session_statements,
+    )
+
+    logger.debug(f'{log_prefix}: Loading {len(table_paths)} tables, {jobs} at a time')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                restore_file, restore_command, path, extra_environment, session_statements
+            )
+            for path in table_paths
+        ]
+
+    for future in futures:
+        future.result()
+
+    restore_file(
+        restore_command,
+        os.path.join(dump_directory, POST_DATA_FILENAME),
+        extra_environment,
+        session_statements,
+    )
@@ -2,22 +2,93 @@ import logging
 
 import requests
 
+from borgmatic.hooks import monitor, outbox
+
 logger = logging.getLogger(__name__)
 
+# The maximum size of logs to attach (before compression), so as to stay well under ntfy's default
+# attachment size limit.
+LOGS_LIMIT_BYTES = 1000000
+LOGS_FILENAME = 'borgmatic.log.gz'
+
 
-def initialize_monitor(
-    ping_url, config, config_filename, monitoring_log_level, dry_run
-):  # pragma: no cover
+def initialize_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    No initialization is necessary for this monitor.
+    If the "send_logs" option is true, make sure the root logger has a handler that stores in memory
+    the logs emitted, so they can get attached to ntfy notifications.
     '''
-    pass
+    if not hook_config.get('send_logs'):
+        return
+
+    monitor.add_log_buffering_handler('ntfy', LOGS_LIMIT_BYTES, monitoring_log_level)
+
+
+def make_request(hook_config, config, config_filename, state, details):
+    '''
+    Given a hook config, a configuration dict, a configuration filename, a monitor.State, and a
+    details dict with an optional "logs" string to attach, return the ntfy notification for that
+    state as a tuple of HTTP method, URL, and a dict of keyword arguments for
+    requests.Session.request().
+    '''
+    state_config = hook_config.get(
+        state.name.lower(),
+        {
+            'title': f'A borgmatic {state.name} event happened',
+            'message': f'A borgmatic {state.name} event happened',
+            'priority': 'default',
+            'tags': 'borgmatic',
+        },
+    )
+
+    base_url = hook_config.get('server', 'https://ntfy.sh')
+    topic = hook_config.get('topic')
+
+    headers = {
+        'X-Title': state_config.get('title'),
+        'X-Message': state_config.get('message'),
+        'X-Priority': state_config.get('priority'),
+        'X-Tags': state_config.get('tags'),
+    }
+
+    username = hook_config.get('username')
+    password = hook_config.get('password')
+
+    auth = None
+    if (username and password) is not None:
+        auth = requests.auth.HTTPBasicAuth(username, password)
+        logger.info(f'{config_filename}: Using basic auth with user {username} for ntfy')
+    elif username is not None:
+        logger.warning(
+            f'{config_filename}: Password missing for ntfy authentication, defaulting to no auth'
+        )
+    elif password is not None:
+        logger.warning(
+            f'{config_filename}: Username missing for ntfy authentication, defaulting to no auth'
+        )
+
+    data = None
+
+    if details.get('logs'):
+        data = monitor.compress_payload(details['logs'])
+        headers['X-Filename'] = LOGS_FILENAME
+
+    return (
+        'POST',
+        f'{base_url}/{topic}',
+        {
+            'headers': headers,
+            'auth': auth,
+            'data': data,
+            'timeout': monitor.get_timeout(hook_config),
+        },
+    )
 
 
 def ping_monitor(hook_config, config, config_filename, state, monitoring_log_level, dry_run):
     '''
     Ping the configured Ntfy topic. Use the given configuration filename in any log entries.
-    If this is a dry run, then don't actually ping anything.
+    If this is a dry run, then don't actually ping anything. If the "send_logs" option is true,
+    attach the buffered logs as a gzip-compressed file.
     '''
 
     run_states = hook_config.get('states', ['fail'])
@@ -25,59 +96,36 @@ def ping_monitor(hook_config, config, config_filename, state, monitoring_log_lev
     if state.name.lower() in run_states:
         dry_run_label = ' (dry run; not actually pinging)' if dry_run else ''
 
-        state_config = hook_config.get(
-            state.name.lower(),
-            {
-                'title': f'A borgmatic {state.name} event happened',
-                'message': f'A borgmatic {state.name} event happened',
-                'priority': 'default',
-                'tags': 'borgmatic',
-            },
-        )
-
-        base_url = hook_config.get('server', 'https://ntfy.sh')
         topic = hook_config.get('topic')
+        details = (
+            {'logs': monitor.format_buffered_logs_for_payload(LOGS_LIMIT_BYTES)}
+            if hook_config.get('send_logs') and state != monitor.State.START
+            else {}
+        )
 
         logger.info(f'{config_filename}: Pinging ntfy topic {topic}{dry_run_label}')
-        logger.debug(f'{config_filename}: Using Ntfy ping URL {base_url}/{topic}')
-
-        headers = {
-            'X-Title': state_config.get('title'),
-            'X-Message': state_config.get('message'),
-            'X-Priority': state_config.get('priority'),
-            'X-Tags': state_config.get('tags'),
-        }
-
-        username = hook_config.get('username')
-        password = hook_config.get('password')
-
-        auth = None
-        if (username and password) is not None:
-            auth = requests.auth.HTTPBasicAuth(username, password)
-            logger.info(f'{config_filename}: Using basic auth with user {username} for ntfy')
-        elif username is not None:
-            logger.warning(
-                f'{config_filename}: Password missing for ntfy authentication, defaulting to no auth'
-            )
-        elif password is not None:
-            logger.warning(
-                f'{config_filename}: Username missing for ntfy authentication, defaulting to no auth'
-            )
+        (method, url, request_kwargs) = make_request(
+            hook_config, config, config_filename, state, details
+        )
+        logger.debug(f'{config_filename}: Using Ntfy ping URL {url}')
 
         if not dry_run:
             logging.getLogger('urllib3').setLevel(logging.ERROR)
+
             try:
-                response = requests.post(f'{base_url}/{topic}', headers=headers, auth=auth)
+                response = monitor.get_session().request(method, url, **request_kwargs)
                 if not response.ok:
                     response.raise_for_status()
             except requests.exceptions.RequestException as error:
                 logger.warning(f'{config_filename}: ntfy error: {error}')
+                outbox.save_undelivered_request(
+                    error, config, config_filename, 'ntfy', state, details
+                )
 
 
-def destroy_monitor(
-    ping_url_or_uuid, config, config_filename, monitoring_log_level, dry_run
-):  # pragma: no cover
+def destroy_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    No destruction is necessary for this monitor.
+    Stop using any log handler that was added to the root logger, removing it if no other monitor is
+    using it.
     '''
-    pass
+    monitor.remove_log_buffering_handler('ntfy')
@@ -0,0 +1,233 @@
+import json
+import logging
+import sqlite3
+import time
+
+import requests
+
+import borgmatic.hooks.dispatch
+from borgmatic.borg import check, state
+from borgmatic.hooks import monitor
+
+logger = logging.getLogger(__name__)
+
+# Only these monitoring states are worth delivering late. A late start or log ping would just
+# confuse the monitoring service about when the backup ran.
+OUTBOX_STATES = (monitor.State.FINISH, monitor.State.FAIL)
+
+DEFAULT_MAX_AGE = '1 day'
+
+# Status codes indicating that a request could succeed if sent again later.
+TRANSIENT_STATUS_CODES = (408, 429)
+
+
+def get_max_age_seconds(config):
+    '''
+    Given a configuration dict, return the number of seconds that an undelivered monitoring request
+    stays in the outbox before it's discarded. Zero means that the outbox is disabled.
+
+    Raise ValueError if the configured maximum age can't be parsed.
+    '''
+    max_age = check.parse_frequency(config.get('monitor_outbox_max_age', DEFAULT_MAX_AGE))
+
+    return max_age.total_seconds() if max_age is not None else 0
+
+
+def is_transient_error(error):
+    '''
+    Given a requests.exceptions.RequestException, return whether the request could succeed if sent
+    again later: Connection problems and timeouts could, but most error responses from the
+    monitoring service (like "404 Not Found") won't.
+    '''
+    response = getattr(error, 'response', None)
+
+    if response is None:
+        return True
+
+    return response.status_code in TRANSIENT_STATUS_CODES or response.status_code >= 500
+
+
+def save_undelivered_request(error, config, config_filename, hook_name, state_to_save, details):
+    '''
+    Given the requests.exceptions.RequestException from failing to send a monitoring request, a
+    configuration dict, the configuration filename, the name of the monitoring hook that sent the
+    request, its monitor.State, and a JSON-serializable dict of the request details that the hook's
+    make_request() function needs to make the request again (like the logs sent with it), save the
+    request to the outbox in the state database so it can get delivered on a later run.
+
+    Never save the request itself, as its URL and authentication are often secrets and the state
+    database gets backed up. Instead, the request gets made again from the hook's configuration
+    when it's delivered.
+
+    Only save finish and fail requests that failed for a transient reason, and then only if the
+    outbox is enabled. Any newer request for the same hook, configuration file, and state replaces
+    an older one still in the outbox, as there's no point in delivering both.
+
+    Log rather than raise any error saving the request, as the monitoring hook has already failed.
+    '''
+    if state_to_save not in OUTBOX_STATES or not is_transient_error(error):
+        return
+
+    try:
+        if not get_max_age_seconds(config):
+            return
+
+        with state.open_state_database(config) as connection:
+            connection.execute(
+                '''
+                INSERT OR REPLACE INTO monitor_outbox (
+                    hook_name, config_filename, state, created_time, details
+                ) VALUES (?, ?, ?, ?, ?)
+                ''',
+                (
+                    hook_name,
+                    config_filename,
+                    state_to_save.name.lower(),
+                    time.time(),
+                    json.dumps(details),
+                ),
+            )
+    except (sqlite3.Error, OSError, ValueError) as error:
+        logger.warning(
+            f'{config_filename}: Error saving undelivered {hook_name} {state_to_save.name.lower()} request: {error}'
+        )
+        return
+
+    logger.info(
+        f'{config_filename}: Saved undelivered {hook_name} {state_to_save.name.lower()} request for a later run'
+    )
+
+
+def read_undelivered_requests(config, config_filename):
+    '''
+    Given a configuration dict and a configuration filename, return the undelivered requests saved
+    to the outbox for that configuration file as a list of (hook name, state name, created time,
+    serialized details) tuples, oldest first.
+    '''
+    with state.open_state_database(config) as connection:
+        return connection.execute(
+            '''
+            SELECT hook_name, state, created_time, details FROM monitor_outbox
+            WHERE config_filename = ? ORDER BY created_time
+            ''',
+            (config_filename,),
+        ).fetchall()
+
+
+def delete_undelivered_requests(config, config_filename, requests_to_delete):
+    '''
+    Given a configuration dict, a configuration filename, and a sequence of (hook name, state name,
+    created time) tuples, delete those requests from the outbox. Leave alone any request saved in
+    their place since they were read.
+    '''
+    with state.open_state_database(config) as connection:
+        connection.executemany(
+            '''
+            DELETE FROM monitor_outbox
+            WHERE config_filename = ? AND hook_name = ? AND state = ? AND created_time = ?
+            ''',
+            (
+                (config_filename, hook_name, state_name, created_time)
+                for hook_name, state_name, created_time in requests_to_delete
+            ),
+        )
+
+
+def flush_undelivered_requests(config, config_filename, dry_run):
+    '''
+    Given a configuration dict, a configuration filename, and whether this is a dry run, try to
+    deliver the requests saved to the outbox for that configuration file, oldest first, making each
+    one again from its hook's configuration. Delete requests that get delivered, requests rejected
+    outright by the monitoring service, requests for hooks that are no longer configured, and
+    requests older than the configured maximum age. Keep any other undelivered requests for a later
+    run, and stop delivering requests for a hook after its first failure so that the monitoring
+    service still receives them in order.
+
+    Return a tuple of the counts of requests delivered, discarded, and remaining in the outbox. Log
+    rather than raise any error accessing the outbox.
+    '''
+    dry_run_label = ' (dry run; not actually sending)' if dry_run else ''
+
+    try:
+        max_age_seconds = get_max_age_seconds(config)
+        undelivered_requests = read_undelivered_requests(config, config_filename)
+    except (sqlite3.Error, OSError, ValueError) as error:
+        logger.warning(f'{config_filename}: Error reading undelivered monitoring requests: {error}')
+        return (0, 0, 0)
+
+    now = time.time()
+    delivered = []
+    discarded = []
+    blocked_hook_names = set()
+
+    for hook_name, state_name, created_time, serialized_details in undelivered_requests:
+        if max_age_seconds and now - created_time > max_age_seconds:
+            logger.warning(
+                f'{config_filename}: Discarding {hook_name} {state_name} request older than the monitor_outbox_max_age'
+            )
+            discarded.append((hook_name, state_name, created_time))
+            continue
+
+        if not config.get(hook_name):
+            logger.warning(
+                f'{config_filename}: Discarding {hook_name} {state_name} request for a hook that is no longer configured'
+            )
+            discarded.append((hook_name, state_name, created_time))
+            continue
+
+        if hook_name in blocked_hook_names:
+            continue
+
+        logger.info(
+            f'{config_filename}: Delivering saved {hook_name} {state_name} request{dry_run_label}'
+        )
+
+        if dry_run:
+            continue
+
+        (method, url, request_kwargs) = borgmatic.hooks.dispatch.call_hook(
+            'make_request',
+            config,
+            config_filename,
+            hook_name,
+            monitor.State[state_name.upper()],
+            json.loads(serialized_details),
+        )
+        logging.getLogger('urllib3').setLevel(logging.ERROR)
+
+        try:
+            response = monitor.get_session().request(method, url, **request_kwargs)
+            if not response.ok:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as error:
+            if is_transient_error(error):
+                logger.warning(
+                    f'{config_filename}: Error delivering saved {hook_name} {state_name} request, keeping it for a later run: {error}'
+                )
+                blocked_hook_names.add(hook_name)
+            else:
+                logger.warning(
+                    f'{config_filename}: Discarding saved {hook_name} {state_name} request rejected by the monitoring service: {error}'
+                )
+                discarded.append((hook_name, state_name, created_time))
+
+            continue
+
+        delivered.append((hook_name, state_name, created_time))
+
+    if dry_run:
+        return (0, 0, len(undelivered_requests))
+
+    if delivered or discarded:
+        try:
+            delete_undelivered_requests(config, config_filename, delivered + discarded)
+        except (sqlite3.Error, OSError) as error:
+            logger.warning(
+                f'{config_filename}: Error updating undelivered monitoring requests: {error}'
+            )
+
+    return (
+        len(delivered),
+        len(discarded),
+        len(undelivered_requests) - len(delivered) - len(discarded),
+    )
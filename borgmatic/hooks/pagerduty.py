@@ -5,44 +5,36 @@ import platform
 
 import requests
 
-from borgmatic.hooks import monitor
+from borgmatic.hooks import monitor, outbox
 
 logger = logging.getLogger(__name__)
 
 EVENTS_API_URL = 'https://events.pagerduty.com/v2/enqueue'
 
-
-def initialize_monitor(
-    integration_key, config, config_filename, monitoring_log_level, dry_run
-):  # pragma: no cover
-    '''
-    No initialization is necessary for this monitor.
-    '''
-    pass
+# The maximum size of logs to include in an event, so as to stay well under PagerDuty's event size
+# limit.
+LOGS_LIMIT_BYTES = 100000
 
 
-def ping_monitor(hook_config, config, config_filename, state, monitoring_log_level, dry_run):
+def initialize_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    If this is an error state, create a PagerDuty event with the configured integration key. Use
-    the given configuration filename in any log entries. If this is a dry run, then don't actually
-    create an event.
+    If the "send_logs" option is true, make sure the root logger has a handler that stores in memory
+    the logs emitted, so they can get included in PagerDuty events.
     '''
-    if state != monitor.State.FAIL:
-        logger.debug(
-            f'{config_filename}: Ignoring unsupported monitoring {state.name.lower()} in PagerDuty hook',
-        )
+    if not hook_config.get('send_logs'):
         return
 
-    dry_run_label = ' (dry run; not actually sending)' if dry_run else ''
-    logger.info(f'{config_filename}: Sending failure event to PagerDuty {dry_run_label}')
+    monitor.add_log_buffering_handler('pagerduty', LOGS_LIMIT_BYTES, monitoring_log_level)
 
-    if dry_run:
-        return
 
+def make_request(hook_config, config, config_filename, state, details):
+    '''
+    Given a hook config, a configuration dict, a configuration filename, a monitor.State, and a
+    details dict with the "timestamp" of the failure and optional "logs" string to include, return
+    the PagerDuty failure event as a tuple of HTTP method, URL, and a dict of keyword arguments for
+    requests.Session.request().
+    '''
     hostname = platform.node()
-    local_timestamp = (
-        datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).astimezone().isoformat()
-    )
     payload = json.dumps(
         {
             'routing_key': hook_config['integration_key'],
@@ -51,33 +43,80 @@ def ping_monitor(hook_config, config, config_filename, state, monitoring_log_lev
                 'summary': f'backup failed on {hostname}',
                 'severity': 'error',
                 'source': hostname,
-                'timestamp': local_timestamp,
+                'timestamp': details['timestamp'],
                 'component': 'borgmatic',
                 'group': 'backups',
                 'class': 'backup failure',
                 'custom_details': {
                     'hostname': hostname,
                     'configuration filename': config_filename,
-                    'server time': local_timestamp,
+                    'server time': details['timestamp'],
+                    **({'logs': details['logs']} if 'logs' in details else {}),
                 },
             },
         }
     )
-    logger.debug(f'{config_filename}: Using PagerDuty payload: {payload}')
+
+    return (
+        'POST',
+        EVENTS_API_URL,
+        {
+            'data': payload.encode('utf-8'),
+            'timeout': monitor.get_timeout(hook_config),
+        },
+    )
+
+
+def ping_monitor(hook_config, config, config_filename, state, monitoring_log_level, dry_run):
+    '''
+    If this is an error state, create a PagerDuty event with the configured integration key. Use
+    the given configuration filename in any log entries. If this is a dry run, then don't actually
+    create an event. If the "send_logs" option is true, include the buffered logs in the event.
+    '''
+    if state != monitor.State.FAIL:
+        logger.debug(
+            f'{config_filename}: Ignoring unsupported monitoring {state.name.lower()} in PagerDuty hook',
+        )
+        return
+
+    dry_run_label = ' (dry run; not actually sending)' if dry_run else ''
+    logger.info(f'{config_filename}: Sending failure event to PagerDuty {dry_run_label}')
+
+    if dry_run:
+        return
+
+    details = {
+        'timestamp': (
+            datetime.datetime.utcnow()
+            .replace(tzinfo=datetime.timezone.utc)
+            .astimezone()
+            .isoformat()
+        ),
+        **(
+            {'logs': monitor.format_buffered_logs_for_payload(LOGS_LIMIT_BYTES)}
+            if hook_config.get('send_logs')
+            else {}
+        ),
+    }
+    (method, url, request_kwargs) = make_request(
+        hook_config, config, config_filename, state, details
+    )
+    logger.debug(f"{config_filename}: Using PagerDuty payload: {request_kwargs['data'].decode()}")
 
     logging.getLogger('urllib3').setLevel(logging.ERROR)
+
     try:
-        response = requests.post(EVENTS_API_URL, data=payload.encode('utf-8'))
+        response = monitor.get_session().request(method, url, **request_kwargs)
         if not response.ok:
             response.raise_for_status()
     except requests.exceptions.RequestException as error:
         logger.warning(f'{config_filename}: PagerDuty error: {error}')
+        outbox.save_undelivered_request(error, config, config_filename, 'pagerduty', state, details)
 
 
-def destroy_monitor(
-    ping_url_or_uuid, config, config_filename, monitoring_log_level, dry_run
-):  # pragma: no cover
+def destroy_monitor(hook_config, config, config_filename, monitoring_log_level, dry_run):
     '''
-    No destruction is necessary for this monitor.
+    Stop using any log handler that was added to the root logger, removing it if no other monitor is
+    using it.
     '''
-    pass
+    monitor.remove_log_buffering_handler('pagerduty')
@@ -9,7 +9,7 @@ from borgmatic.execute import (
     execute_command_and_capture_output,
     execute_command_with_processes,
 )
-from borgmatic.hooks import dump
+from borgmatic.hooks import dump, postgresql_wal
 
 logger = logging.getLogger(__name__)
 
@@ -59,14 +59,14 @@ def database_names_to_dump(database, extra_environment, log_prefix, dry_run):
     '''
     Given a requested database config, return the corresponding sequence of database names to dump.
     In the case of "all" when a database format is given, query for the names of databases on the
-    configured host and return them. For "all" without a database format, just return a sequence
-    containing "all".
+    configured host and return them. For "all" without a database format (or with the "physical"
+    format), just return a sequence containing "all".
     '''
     requested_name = database['name']
 
     if requested_name != 'all':
         return (requested_name,)
-    if not database.get('format'):
+    if not database.get('format') or database.get('format') == 'physical':
         return ('all',)
     if dry_run:
         return ()
@@ -92,6 +92,53 @@ def database_names_to_dump(database, extra_environment, log_prefix, dry_run):
     )
 
 
+def make_physical_dump_command(database, dump_filename):
+    '''
+    Given a database config and a dump filename, return a pg_basebackup command for a physical
+    backup of the whole database cluster as a single tar stream, including the WAL needed to start
+    a server from it.
+    '''
+    return (
+        (
+            database.get('pg_basebackup_command') or 'pg_basebackup',
+            '--no-password',
+            '--pgdata',
+            '-',
+            '--format',
+            'tar',
+            '--wal-method',
+            'fetch',
+        )
+        + (('--host', database['hostname']) if 'hostname' in database else ())
+        + (('--port', str(database['port'])) if 'port' in database else ())
+        + (('--username', database['username']) if 'username' in database else ())
+        + (tuple(database['options'].split(' ')) if 'options' in database else ())
+        + ('>', dump_filename)
+    )
+
+
+def dump_with_wal_archive(database, config, log_prefix, dump_filename, extra_environment):
+    '''
+    Given a database config with a "wal_archive_directory", a configuration dict, a log prefix, a
+    dump filename, and an extra environment dict, bring the cluster's cached base backup and WAL up
+    to date, and put them in a directory at the dump filename.
+    '''
+    cache_directory = postgresql_wal.make_cache_directory(config, database)
+    dump.create_parent_directory_for_dump(dump_filename)
+
+    postgresql_wal.dump_incrementally(
+        config,
+        database,
+        cache_directory,
+        dump_filename,
+        make_physical_dump_command(
+            database, os.path.join(cache_directory, postgresql_wal.BASE_BACKUP_FILENAME)
+        ),
+        extra_environment,
+        log_prefix,
+    )
+
+
 def dump_databases(databases, config, log_prefix, dry_run):
     '''
     Dump the given PostgreSQL databases to a named pipe. The databases are supplied as a sequence of
@@ -102,6 +149,10 @@ def dump_databases(databases, config, log_prefix, dry_run):
     Return a sequence of subprocess.Popen instances for the dump processes ready to spew to a named
     pipe. But if this is a dry run, then don't actually dump anything and return an empty sequence.
 
+    For the "physical" format, stream a pg_basebackup of the whole database cluster instead. Or with a
+    "wal_archive_directory" too, make a base backup only periodically and otherwise just ingest the
+    WAL archived since.
+
     Raise ValueError if the databases to dump cannot be determined.
     '''
     dry_run_label = ' (dry run; not actually dumping anything)' if dry_run else ''
@@ -110,6 +161,16 @@ def dump_databases(databases, config, log_prefix, dry_run):
     logger.info(f'{log_prefix}: Dumping PostgreSQL databases{dry_run_label}')
 
     for database in databases:
+        if database.get('format') == 'physical' and database['name'] != 'all':
+            raise ValueError(
+                'A PostgreSQL "physical" backup covers the whole cluster, so its database name must be "all".'
+            )
+
+        if database.get('wal_archive_directory') and database.get('format') != 'physical':
+            raise ValueError(
+                'A PostgreSQL "wal_archive_directory" needs the "physical" format for its base backups.'
+            )
+
         extra_environment = make_extra_environment(database)
         dump_path = make_dump_path(config)
         dump_database_names = database_names_to_dump(
@@ -124,6 +185,9 @@ def dump_databases(databases, config, log_prefix, dry_run):
 
         for database_name in dump_database_names:
             dump_format = database.get('format', None if database_name == 'all' else 'custom')
+            # A "split" dump is a directory format dump with a file per table, left uncompressed so
+            # that Borg can deduplicate each table on its own.
+            pg_dump_format = 'directory' if dump_format == 'split' else dump_format
             default_dump_command = 'pg_dumpall' if database_name == 'all' else 'pg_dump'
             dump_command = database.get('pg_dump_command') or default_dump_command
             dump_filename = dump.make_database_dump_filename(
@@ -135,26 +199,36 @@ def dump_databases(databases, config, log_prefix, dry_run):
                 )
                 continue
 
-            command = (
-                (
-                    dump_command,
-                    '--no-password',
-                    '--clean',
-                    '--if-exists',
+            if dump_format == 'physical':
+                command = make_physical_dump_command(database, dump_filename)
+            else:
+                command = (
+                    (
+                        dump_command,
+                        '--no-password',
+                        '--clean',
+                        '--if-exists',
+                    )
+                    + (('--host', database['hostname']) if 'hostname' in database else ())
+                    + (('--port', str(database['port'])) if 'port' in database else ())
+                    + (('--username', database['username']) if 'username' in database else ())
+                    + (('--no-owner',) if database.get('no_owner', False) else ())
+                    + (('--format', pg_dump_format) if pg_dump_format else ())
+                    + (('--compress', '0') if dump_format == 'split' else ())
+                    + (
+                        ('--jobs', str(database['jobs']))
+                        if dump_format == 'split' and 'jobs' in database
+                        else ()
+                    )
+                    + (('--file', dump_filename) if pg_dump_format == 'directory' else ())
+                    + (tuple(database['options'].split(' ')) if 'options' in database else ())
+                    + (() if database_name == 'all' else (database_name,))
+                    # Use shell redirection rather than the --file flag to sidestep synchronization
+                    # issues when pg_dump/pg_dumpall tries to write to a named pipe. But for the
+                    # directory dump format in a particular, a named destination is required, and
+                    # redirection doesn't work.
+                    + (('>', dump_filename) if pg_dump_format != 'directory' else ())
                 )
-                + (('--host', database['hostname']) if 'hostname' in database else ())
-                + (('--port', str(database['port'])) if 'port' in database else ())
-                + (('--username', database['username']) if 'username' in database else ())
-                + (('--no-owner',) if database.get('no_owner', False) else ())
-                + (('--format', dump_format) if dump_format else ())
-                + (('--file', dump_filename) if dump_format == 'directory' else ())
-                + (tuple(database['options'].split(' ')) if 'options' in database else ())
-                + (() if database_name == 'all' else (database_name,))
-                # Use shell redirection rather than the --file flag to sidestep synchronization issues
-                # when pg_dump/pg_dumpall tries to write to a named pipe. But for the directory dump
-                # format in a particular, a named destination is required, and redirection doesn't work.
-                + (('>', dump_filename) if dump_format != 'directory' else ())
-            )
 
             logger.debug(
                 f'{log_prefix}: Dumping PostgreSQL database "{database_name}" to {dump_filename}{dry_run_label}'
@@ -162,7 +236,11 @@ def dump_databases(databases, config, log_prefix, dry_run):
             if dry_run:
                 continue
 
-            if dump_format == 'directory':
+            if dump_format == 'physical' and database.get('wal_archive_directory'):
+                dump_with_wal_archive(
+                    database, config, log_prefix, dump_filename, extra_environment
+                )
+            elif pg_dump_format == 'directory':
                 dump.create_parent_directory_for_dump(dump_filename)
                 execute_command(
                     command,
@@ -217,6 +295,13 @@ def restore_database_dump(
 
     Use the given connection parameters to connect to the database. The connection parameters are
     hostname, port, username, and password.
+
+    For the "physical" format, unpack the backup into the configured data directory instead. With a
+    "wal_archive_directory", also set up the data directory to recover from the backup's WAL up to
+    any "target_time" in the given connection params.
+
+    After restoring, analyze the restored database(s) to update their statistics: with "psql" by
+    default, or in stages with "analyze_jobs" tables at a time via "vacuumdb" if that's configured.
     '''
     dry_run_label = ' (dry run; not actually restoring anything)' if dry_run else ''
 
@@ -254,6 +339,16 @@ def restore_database_dump(
         + (tuple(database['analyze_options'].split(' ')) if 'analyze_options' in database else ())
         + ('--command', 'ANALYZE')
     )
+    vacuumdb_command = shlex.split(database.get('vacuumdb_command') or 'vacuumdb')
+    analyze_in_stages_command = (
+        tuple(vacuumdb_command)
+        + ('--no-password', '--analyze-in-stages')
+        + ('--jobs', str(database.get('analyze_jobs')))
+        + (('--host', hostname) if hostname else ())
+        + (('--port', port) if port else ())
+        + (('--username', username) if username else ())
+        + (('--all',) if all_databases else ('--dbname', database['name']))
+    )
     use_psql_command = all_databases or database.get('format') == 'plain'
     pg_restore_command = shlex.split(database.get('pg_restore_command') or 'pg_restore')
     restore_command = (
@@ -265,6 +360,11 @@ def restore_database_dump(
         + (('--port', port) if port else ())
         + (('--username', username) if username else ())
         + (('--no-owner',) if database.get('no_owner', False) else ())
+        + (
+            ('--jobs', str(database['jobs']))
+            if database.get('format') == 'split' and 'jobs' in database
+            else ()
+        )
         + (tuple(database['restore_options'].split(' ')) if 'restore_options' in database else ())
         + (() if extract_process else (dump_filename,))
         + tuple(
@@ -282,6 +382,12 @@ def restore_database_dump(
     if dry_run:
         return
 
+    if database.get('format') == 'physical':
+        restore_physical_backup(
+            database, extract_process, dump_filename, connection_params['target_time']
+        )
+        return
+
     # Don't give Borg local path so as to error on warnings, as "borg extract" only gives a warning
     # if the restore paths don't exist in the archive.
     execute_command_with_processes(
@@ -291,4 +397,46 @@ def restore_database_dump(
         input_file=extract_process.stdout if extract_process else None,
         extra_environment=extra_environment,
     )
-    execute_command(analyze_command, extra_environment=extra_environment)
+    execute_command(
+        analyze_in_stages_command if database.get('analyze_jobs') else analyze_command,
+        extra_environment=extra_environment,
+    )
+
+
+def restore_physical_backup(database, extract_process, dump_filename, target_time=None):
+    '''
+    Given a database config, an active extract process (an instance of subprocess.Popen) producing
+    a "physical" backup on its stdout or None to read the given dump filename instead, and an
+    optional time to recover to, unpack the backup into the config's restore data directory, ready
+    for a PostgreSQL server to start from.
+
+    With a "wal_archive_directory", the dump filename is a directory with a base backup and the WAL
+    archived since, and the server replays that WAL up to the target time when it starts.
+
+    Raise ValueError if there's no restore data directory configured or it isn't empty.
+    '''
+    data_directory = database.get('restore_data_directory')
+
+    if not data_directory:
+        raise ValueError(
+            'A "restore_data_directory" is needed to restore a PostgreSQL "physical" backup.'
+        )
+
+    os.makedirs(data_directory, mode=0o700, exist_ok=True)
+
+    if os.listdir(data_directory):
+        raise ValueError(
+            f'Cannot restore a PostgreSQL "physical" backup into non-empty {data_directory}.'
+        )
+
+    if database.get('wal_archive_directory'):
+        postgresql_wal.restore_incrementally(dump_filename, data_directory, target_time)
+        return
+
+    execute_command_with_processes(
+        ('tar', '--extract', '--file', '-' if extract_process else dump_filename)
+        + ('--directory', data_directory),
+        [extract_process] if extract_process else [],
+        output_log_level=logging.DEBUG,
+        input_file=extract_process.stdout if extract_process else None,
+    )
@@ -0,0 +1,223 @@
+import logging
+import os
+import re
+import shutil
+import time
+
+from borgmatic.borg import check, state
+from borgmatic.execute import execute_command
+from borgmatic.hooks import dump
+
+logger = logging.getLogger(__name__)
+
+# The state namespace recording, for each cluster backed up with WAL archive ingestion, when its
+# last base backup happened and the last WAL file ingested since. Keyed by cache directory.
+POSITIONS_NAMESPACE = 'postgresql_wal_positions'
+
+# Where cached base backups and WAL live within the borgmatic source directory. This doesn't match
+# the "*_databases" dump paths, so restores never mistake the cache for a dump to restore.
+CACHE_DIRECTORY_NAME = 'postgresql_wal_cache'
+
+DEFAULT_BASE_BACKUP_FREQUENCY = '1 day'
+
+BASE_BACKUP_FILENAME = 'base.tar'
+WAL_DIRECTORY_NAME = 'wal'
+
+# The names of the files that PostgreSQL archives: WAL segments, backup history files, and timeline
+# history files. In order of name, these are also in the order that PostgreSQL writes them. Any
+# other files, like an archive_command's temporary files, get skipped.
+WAL_FILENAME_PATTERN = re.compile(
+    r'^([0-9A-F]{24}|[0-9A-F]{24}\.[0-9A-F]{8}\.backup|[0-9A-F]{8}\.history)$'
+)
+
+# Where a restore puts the WAL within the restored data directory, relative to it.
+RESTORE_WAL_DIRECTORY_NAME = 'borgmatic_wal'
+
+
+def make_cache_directory(config, database):
+    '''
+    Given a configuration dict and a database config, return the path of the directory caching the
+    cluster's base backup and WAL.
+    '''
+    return os.path.join(
+        os.path.expanduser(
+            config.get('borgmatic_source_directory') or state.DEFAULT_BORGMATIC_SOURCE_DIRECTORY
+        ),
+        CACHE_DIRECTORY_NAME,
+        database.get('hostname', 'localhost'),
+        database['name'],
+    )
+
+
+def get_base_backup_reason(database, position, cache_directory, now=None):
+    '''
+    Given a database config, its recorded position dict (if any), its cache directory, and the
+    current time as a Unix timestamp, return a string describing why a base backup is due, or None
+    if it isn't. A base backup is due if there's no previous base backup to build on or if the
+    configured "base_backup_frequency" has elapsed since the last one.
+
+    Raise ValueError if the configured frequency cannot be parsed.
+    '''
+    frequency_delta = check.parse_frequency(
+        database.get('base_backup_frequency', DEFAULT_BASE_BACKUP_FREQUENCY)
+    )
+
+    if frequency_delta is None:
+        return 'always'
+
+    if not position:
+        return 'no previous base backup recorded'
+
+    if not os.path.exists(os.path.join(cache_directory, BASE_BACKUP_FILENAME)):
+        return 'previous base backup missing'
+
+    if now is None:
+        now = time.time()
+
+    if now >= position['base_backup_time'] + frequency_delta.total_seconds():
+        return f"last base backup at {time.ctime(position['base_backup_time'])}"
+
+    return None
+
+
+def list_archived_wal(wal_archive_directory, after=None):
+    '''
+    Given the directory that PostgreSQL's archive_command copies WAL to and the name of a WAL file,
+    return the names of the WAL files in the directory that come after the given one, in order. If
+    no name is given, return all of them.
+    '''
+    return tuple(
+        sorted(
+            filename
+            for filename in os.listdir(wal_archive_directory)
+            if WAL_FILENAME_PATTERN.match(filename) and (after is None or filename > after)
+        )
+    )
+
+
+def ingest_wal(wal_archive_directory, wal_names, cache_directory):
+    '''
+    Given the directory that PostgreSQL's archive_command copies WAL to, a sequence of WAL file
+    names within it, and a cache directory, put the named files in the cache directory. Archived
+    WAL files never change, so they're hard linked where possible.
+    '''
+    for wal_name in wal_names:
+        dump.link_or_copy(
+            os.path.join(wal_archive_directory, wal_name),
+            os.path.join(cache_directory, WAL_DIRECTORY_NAME, wal_name),
+        )
+
+
+def dump_incrementally(
+    config,
+    database,
+    cache_directory,
+    dump_directory,
+    base_backup_command,
+    extra_environment,
+    log_prefix,
+):
+    '''
+    Given a configuration dict, a database config with a "wal_archive_directory", its cache
+    directory, the dump directory to put its backup in, a pg_basebackup command that writes a base
+    backup into the cache directory, an extra environment dict, and a log prefix, bring the cached
+    backup up to date and put it in the dump directory.
+
+    Bringing the cache up to date means a new base backup if one is due. Otherwise, it means
+    ingesting just the WAL files archived since the last backup, which together with the last base
+    backup can restore the cluster to any point in between. The newest archived WAL file waits for
+    the next backup, as it could still be getting written.
+
+    Raise subprocess.CalledProcessError if pg_basebackup errors or ValueError if the configured base
+    backup frequency can't be parsed.
+    '''
+    wal_archive_directory = database['wal_archive_directory']
+
+    with state.open_state_database(config) as connection:
+        position = state.get_value(connection, POSITIONS_NAMESPACE, cache_directory)
+
+    reason = get_base_backup_reason(database, position, cache_directory)
+
+    if reason:
+        logger.debug(f'{log_prefix}: Making a base backup ({reason})')
+
+        # Forget the old position first, so an interruption never pairs it with a new base backup.
+        with state.open_state_database(config) as connection:
+            state.delete_value(connection, POSITIONS_NAMESPACE, cache_directory)
+
+        shutil.rmtree(cache_directory, ignore_errors=True)
+        os.makedirs(os.path.join(cache_directory, WAL_DIRECTORY_NAME), mode=0o700)
+
+        # WAL archived before the base backup starts isn't needed to restore from it.
+        archived_names = list_archived_wal(wal_archive_directory)
+        base_backup_time = time.time()
+        execute_command(base_backup_command, shell=True, extra_environment=extra_environment)
+
+        position = {
+            'base_backup_time': base_backup_time,
+            'last_wal': archived_names[-1] if archived_names else None,
+        }
+    else:
+        # PostgreSQL archives one WAL file at a time, so only the newest file could still be in the
+        # middle of getting copied by the archive_command. Leave it for the next backup rather than
+        # cache a truncated copy of it for good.
+        new_names = list_archived_wal(wal_archive_directory, position['last_wal'])[:-1]
+        logger.debug(f'{log_prefix}: Ingesting {len(new_names)} newly archived WAL files')
+
+        if new_names:
+            ingest_wal(wal_archive_directory, new_names, cache_directory)
+            position = dict(position, last_wal=new_names[-1])
+
+    with state.open_state_database(config) as connection:
+        state.set_value(connection, POSITIONS_NAMESPACE, cache_directory, position)
+
+    shutil.copytree(cache_directory, dump_directory, copy_function=dump.link_or_copy)
+
+
+def make_recovery_settings(target_time):
+    '''
+    Given an optional time to stop recovery at (like "2024-01-31 12:00:00"), return the
+    postgresql.conf settings for a server to recover from the WAL that restore_incrementally() puts
+    in its data directory.
+    '''
+    return (
+        '\n# Added by borgmatic to recover from the restored WAL.\n'
+        f"restore_command = 'cp {RESTORE_WAL_DIRECTORY_NAME}/%f %p'\n"
+        + (
+            f"recovery_target_time = '{target_time}'\nrecovery_target_action = 'promote'\n"
+            if target_time
+            else ''
+        )
+    )
+
+
+def restore_incrementally(dump_directory, data_directory, target_time=None):
+    '''
+    Given a dump directory written by dump_incrementally(), an empty data directory, and an
+    optional time to stop recovery at (like "2024-01-31 12:00:00"), unpack the base backup into the
+    data directory along with the WAL archived since. Then configure the data directory so that a
+    PostgreSQL server started on it replays the WAL up to the target time (if any), and then
+    promotes itself.
+    '''
+    execute_command(
+        (
+            'tar',
+            '--extract',
+            '--file',
+            os.path.join(dump_directory, BASE_BACKUP_FILENAME),
+            '--directory',
+            data_directory,
+        ),
+        output_log_level=logging.DEBUG,
+    )
+    shutil.copytree(
+        os.path.join(dump_directory, WAL_DIRECTORY_NAME),
+        os.path.join(data_directory, RESTORE_WAL_DIRECTORY_NAME),
+        copy_function=dump.link_or_copy,
+    )
+
+    with open(os.path.join(data_directory, 'postgresql.auto.conf'), 'a') as settings_file:
+        settings_file.write(make_recovery_settings(target_time))
+
+    with open(os.path.join(data_directory, 'recovery.signal'), 'w'):
+        pass
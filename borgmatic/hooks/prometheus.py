@@ -0,0 +1,301 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+from borgmatic.borg import history, state
+from borgmatic.hooks import monitor
+
+logger = logging.getLogger(__name__)
+
+# The namespace in the state database for each configuration file's latest metrics.
+METRICS_NAMESPACE = 'prometheus_metrics'
+
+# Metric name, type, help text, and the key of the value in a configuration file's metrics dict.
+CONFIG_METRICS = (
+    (
+        'borgmatic_last_run_timestamp_seconds',
+        'gauge',
+        'When borgmatic last ran for the configuration file.',
+        'last_run_time',
+    ),
+    (
+        'borgmatic_last_run_success',
+        'gauge',
+        'Whether the last borgmatic run for the configuration file succeeded (1) or failed (0).',
+        'last_run_success',
+    ),
+    (
+        'borgmatic_errors_total',
+        'counter',
+        'How many borgmatic runs for the configuration file have failed.',
+        'error_count',
+    ),
+)
+
+REPOSITORY_METRICS = (
+    (
+        'borgmatic_last_success_timestamp_seconds',
+        'gauge',
+        'When borgmatic last ran successfully for the repository.',
+        'last_success_time',
+    ),
+    (
+        'borgmatic_archive_timestamp_seconds',
+        'gauge',
+        'When the most recent archive recorded in the repository was started.',
+        'start_time',
+    ),
+    (
+        'borgmatic_archive_original_size_bytes',
+        'gauge',
+        'Original size of the most recent archive recorded in the repository.',
+        'original_size',
+    ),
+    (
+        'borgmatic_archive_compressed_size_bytes',
+        'gauge',
+        'Compressed size of the most recent archive recorded in the repository.',
+        'compressed_size',
+    ),
+    (
+        'borgmatic_archive_deduplicated_size_bytes',
+        'gauge',
+        'Deduplicated size of the most recent archive recorded in the repository.',
+        'deduplicated_size',
+    ),
+    (
+        'borgmatic_archive_files',
+        'gauge',
+        'Number of files in the most recent archive recorded in the repository.',
+        'file_count',
+    ),
+    (
+        'borgmatic_archive_deduplication_ratio',
+        'gauge',
+        'Ratio of original size to deduplicated size for the most recent archive.',
+        'deduplication_ratio',
+    ),
+    (
+        'borgmatic_repository_unique_size_bytes',
+        'gauge',
+        'Deduplicated size of the whole repository as of the most recent archive.',
+        'repository_unique_size',
+    ),
+)
+
+ACTION_DURATION_METRIC = (
+    'borgmatic_action_duration_seconds',
+    'gauge',
+    'How long the action last took to run for the repository.',
+)
+
+
+def initialize_monitor(
+    hook_config, config, config_filename, monitoring_log_level, dry_run
+):  # pragma: no cover
+    '''
+    No initialization is necessary for this monitor.
+    '''
+    pass
+
+
+def collect_repository_metrics(config, repository_path):
+    '''
+    Given a configuration dict and a repository path, return a dict of metrics for the repository
+    from the run statistics recorded in the state database: the most recent archive's statistics
+    along with an "action_durations" dict from action name to its most recent duration in seconds.
+    '''
+    archive_statistics = history.read_archive_statistics(config, repository_path)
+    latest_archive = archive_statistics[-1] if archive_statistics else {}
+
+    return dict(
+        {key: value for key, value in latest_archive.items() if key not in ('name', 'duration')},
+        deduplication_ratio=(
+            history.deduplication_ratio((latest_archive,)) if latest_archive else None
+        ),
+        action_durations={
+            action_name: durations[-1]
+            for action_name, durations in history.read_action_durations(
+                config, repository_path
+            ).items()
+            if durations
+        },
+    )
+
+
+def update_metrics(metrics, textfile_path, metrics_by_repository, state_to_record, now):
+    '''
+    Given the previously stored metrics dict for a configuration file (or None), the configured text
+    file path, a dict from repository path to its current metrics dict, the monitor.State of the run
+    that just ended, and the current time as a timestamp, return an updated metrics dict for the
+    configuration file.
+    '''
+    succeeded = state_to_record == monitor.State.FINISH
+    previous_metrics_by_repository = (metrics or {}).get('repositories', {})
+    updated_metrics_by_repository = {}
+
+    for repository_path, repository_metrics in metrics_by_repository.items():
+        last_success_time = (
+            now
+            if succeeded
+            else previous_metrics_by_repository.get(repository_path, {}).get('last_success_time')
+        )
+        updated_metrics_by_repository[repository_path] = dict(
+            repository_metrics, last_success_time=last_success_time
+        )
+
+    return {
+        'textfile_path': textfile_path,
+        'last_run_time': now,
+        'last_run_success': 1 if succeeded else 0,
+        'error_count': (metrics or {}).get('error_count', 0) + (0 if succeeded else 1),
+        'repositories': updated_metrics_by_repository,
+    }
+
+
+def escape_label_value(value):
+    '''
+    Given a label value string, return it escaped for the Prometheus text format.
+    '''
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_sample(metric_name, labels, value):
+    '''
+    Given a metric name, a dict of label names to values, and a numeric value, return a sample
+    line in the Prometheus text format.
+    '''
+    formatted_labels = ','.join(
+        f'{name}="{escape_label_value(str(label_value))}"' for name, label_value in labels.items()
+    )
+
+    return f'{metric_name}{{{formatted_labels}}} {float(value)!r}\n'
+
+
+def format_metrics(metrics_by_config_filename):
+    '''
+    Given a dict from configuration filename to its metrics dict, return the metrics formatted in
+    the Prometheus text format (as read by node_exporter's textfile collector), with each metric's
+    samples grouped under a single HELP and TYPE header.
+    '''
+    samples = {}
+    headers = {}
+
+    def add_sample(metric_name, metric_type, help_text, labels, value):
+        if value is None:
+            return
+
+        if metric_name not in headers:
+            headers[metric_name] = (metric_type, help_text)
+
+        samples.setdefault(metric_name, []).append(format_sample(metric_name, labels, value))
+
+    for config_filename, metrics in sorted(metrics_by_config_filename.items()):
+        for metric_name, metric_type, help_text, key in CONFIG_METRICS:
+            add_sample(
+                metric_name, metric_type, help_text, {'config': config_filename}, metrics.get(key)
+            )
+
+        for repository_path, repository_metrics in sorted(metrics.get('repositories', {}).items()):
+            labels = {'config': config_filename, 'repository': repository_path}
+
+            for metric_name, metric_type, help_text, key in REPOSITORY_METRICS:
+                add_sample(metric_name, metric_type, help_text, labels, repository_metrics.get(key))
+
+            for action_name, duration in sorted(
+                repository_metrics.get('action_durations', {}).items()
+            ):
+                add_sample(*ACTION_DURATION_METRIC, dict(labels, action=action_name), duration)
+
+    return ''.join(
+        f'# HELP {metric_name} {headers[metric_name][1]}\n'
+        f'# TYPE {metric_name} {headers[metric_name][0]}\n' + ''.join(samples[metric_name])
+        for metric_name in samples
+    )
+
+
+def write_textfile(textfile_path, content):
+    '''
+    Given a path and the content to write there, write it atomically: to a temporary file in the
+    same directory that then replaces any existing file, so that a scrape never sees a partially
+    written file.
+    '''
+    directory = os.path.dirname(os.path.abspath(textfile_path))
+    os.makedirs(directory, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        'w', dir=directory, prefix='.borgmatic-', suffix='.tmp', delete=False
+    ) as temporary_file:
+        temporary_file.write(content)
+
+    try:
+        os.chmod(temporary_file.name, 0o644)
+        os.replace(temporary_file.name, textfile_path)
+    except OSError:
+        os.remove(temporary_file.name)
+        raise
+
+
+def ping_monitor(
+    hook_config, config, config_filename, state_to_record, monitoring_log_level, dry_run
+):
+    '''
+    When a run finishes or fails, record metrics for the given configuration file in the state
+    database, and then write the metrics for every configuration file using the same text file path
+    to that file for node_exporter's textfile collector. Drop metrics for configuration files that
+    no longer exist. If this is a dry run, then don't actually record or write anything.
+    '''
+    if state_to_record not in (monitor.State.FINISH, monitor.State.FAIL):
+        return
+
+    textfile_path = os.path.expanduser(hook_config['textfile_path'])
+    dry_run_label = ' (dry run; not actually writing)' if dry_run else ''
+    logger.info(f'{config_filename}: Writing Prometheus metrics to {textfile_path}{dry_run_label}')
+
+    if dry_run:
+        return
+
+    try:
+        metrics_by_repository = {
+            repository['path']: collect_repository_metrics(config, repository['path'])
+            for repository in config['repositories']
+        }
+
+        with state.open_state_database(config, immediate=True) as connection:
+            state.set_value(
+                connection,
+                METRICS_NAMESPACE,
+                config_filename,
+                update_metrics(
+                    state.get_value(connection, METRICS_NAMESPACE, config_filename),
+                    hook_config['textfile_path'],
+                    metrics_by_repository,
+                    state_to_record,
+                    time.time(),
+                ),
+            )
+
+            metrics_by_config_filename = {}
+
+            for other_config_filename, metrics in state.get_values(
+                connection, METRICS_NAMESPACE
+            ).items():
+                if not os.path.exists(other_config_filename):
+                    state.delete_value(connection, METRICS_NAMESPACE, other_config_filename)
+                elif metrics['textfile_path'] == hook_config['textfile_path']:
+                    metrics_by_config_filename[other_config_filename] = metrics
+
+        write_textfile(textfile_path, format_metrics(metrics_by_config_filename))
+    except (sqlite3.Error, OSError) as error:
+        logger.warning(f'{config_filename}: Error writing Prometheus metrics: {error}')
+
+
+def destroy_monitor(
+    hook_config, config, config_filename, monitoring_log_level, dry_run
+):  # pragma: no cover
+    '''
+    No destruction is necessary for this monitor.
+    '''
+    pass
@@ -1,11 +1,31 @@
 import logging
 import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
 
-from borgmatic.execute import execute_command, execute_command_with_processes
+from borgmatic.borg import state
+from borgmatic.execute import execute_command, execute_command_with_processes, log_outputs
 from borgmatic.hooks import dump
 
 logger = logging.getLogger(__name__)
 
+# The number of database pages to copy per step of a "binary" format dump. Between steps, SQLite
+# releases its lock on the source database, so writers only ever wait for a single step.
+BACKUP_PAGES_PER_STEP = 1024
+
+# Every SQLite database file starts with this header.
+SQLITE_FILE_HEADER = b'SQLite format 3\x00'
+
+# The state namespace recording the fingerprint of each database whose dump is cached, keyed by
+# database name.
+FINGERPRINTS_NAMESPACE = 'sqlite_dump_fingerprints'
+
+# Where cached dumps live within the borgmatic source directory. This doesn't match the "*_databases"
+# dump paths, so restores never mistake a cached dump for a dump to restore.
+DUMP_CACHE_DIRECTORY_NAME = 'sqlite_dump_cache'
+
 
 def make_dump_path(config):  # pragma: no cover
     '''
@@ -22,6 +42,9 @@ def dump_databases(databases, config, log_prefix, dry_run):
     configuration dicts, as per the configuration schema. Use the given configuration dict to
     construct the destination path and the given log prefix in any log entries. If this is a dry
     run, then don't actually dump anything.
+
+    Return a sequence of subprocess.Popen instances for the "sql" format dumps. "binary" format
+    dumps happen before this returns, so there are no processes for them.
     '''
     dry_run_label = ' (dry run; not actually dumping anything)' if dry_run else ''
     processes = []
@@ -46,6 +69,24 @@ def dump_databases(databases, config, log_prefix, dry_run):
             )
             continue
 
+        logger.debug(
+            f'{log_prefix}: Dumping SQLite database at {database_path} to {dump_filename}{dry_run_label}'
+        )
+        if dry_run:
+            continue
+
+        dump.create_parent_directory_for_dump(dump_filename)
+        skip_unchanged = database.get('skip_unchanged', False)
+
+        if skip_unchanged:
+            fingerprint = get_database_fingerprint(database_path, database.get('format', 'sql'))
+
+            if link_cached_dump(config, database['name'], fingerprint, dump_filename):
+                logger.debug(
+                    f'{log_prefix}: SQLite database at {database_path} is unchanged; reusing its previous dump'
+                )
+                continue
+
         command = (
             'sqlite3',
             database_path,
@@ -53,18 +94,199 @@ def dump_databases(databases, config, log_prefix, dry_run):
             '>',
             dump_filename,
         )
-        logger.debug(
-            f'{log_prefix}: Dumping SQLite database at {database_path} to {dump_filename}{dry_run_label}'
-        )
-        if dry_run:
-            continue
 
-        dump.create_parent_directory_for_dump(dump_filename)
-        processes.append(execute_command(command, shell=True, run_to_completion=False))
+        if database.get('format') == 'binary':
+            backup_database(database_path, dump_filename)
+        elif skip_unchanged:
+            # Caching the dump requires it to be complete, so don't run it alongside Borg.
+            execute_command(command, shell=True)
+        else:
+            processes.append(execute_command(command, shell=True, run_to_completion=False))
+
+        if skip_unchanged and fingerprint:
+            cache_dump(config, database['name'], fingerprint, dump_filename)
 
     return processes
 
 
+def get_database_fingerprint(database_path, dump_format):
+    '''
+    Given the path of a SQLite database and its dump format, return a JSON-serializable fingerprint
+    of the database that changes whenever the database's contents might have: the inode, size, and
+    modification time of the database file and any write-ahead log file, the database header's file
+    change counter, and the write-ahead log header's checkpoint sequence number and salts (which
+    change whenever the log restarts). Return None if there's no database at the path.
+    '''
+    fingerprint = [os.path.abspath(database_path), dump_format]
+
+    for path, header_offsets in (
+        (database_path, (24, 28)),
+        (database_path + '-wal', (12, 24)),
+    ):
+        try:
+            with open(path, 'rb') as database_file:
+                file_stat = os.fstat(database_file.fileno())
+                header = database_file.read(header_offsets[1])
+        except FileNotFoundError:
+            if path == database_path:
+                return None
+
+            fingerprint.append(None)
+            continue
+
+        fingerprint.append(
+            [
+                file_stat.st_ino,
+                file_stat.st_size,
+                file_stat.st_mtime_ns,
+                header[header_offsets[0] :].hex(),
+            ]
+        )
+
+    return fingerprint
+
+
+def make_dump_cache_filename(config, database_name):
+    '''
+    Given a configuration dict and a database name, return the path of the database's cached dump.
+    '''
+    return os.path.join(
+        os.path.expanduser(
+            config.get('borgmatic_source_directory') or state.DEFAULT_BORGMATIC_SOURCE_DIRECTORY
+        ),
+        DUMP_CACHE_DIRECTORY_NAME,
+        database_name,
+    )
+
+
+def link_cached_dump(config, database_name, fingerprint, dump_filename):
+    '''
+    Given a configuration dict, a database name, the database's current fingerprint as returned by
+    get_database_fingerprint(), and a dump filename, put the database's cached dump at the dump
+    filename and return True if the fingerprint recorded with the cached dump matches. Otherwise,
+    return False.
+    '''
+    if fingerprint is None:
+        return False
+
+    with state.open_state_database(config) as connection:
+        if state.get_value(connection, FINGERPRINTS_NAMESPACE, database_name) != fingerprint:
+            return False
+
+    try:
+        dump.link_or_copy(make_dump_cache_filename(config, database_name), dump_filename)
+    except FileNotFoundError:
+        return False
+
+    return True
+
+
+def cache_dump(config, database_name, fingerprint, dump_filename):
+    '''
+    Given a configuration dict, a database name, the fingerprint the database had when it was
+    dumped, and the complete dump's filename, replace the database's cached dump with the dump and
+    record the fingerprint with it. A dump file is never written to once it's cached, so the two
+    can share a hard link.
+    '''
+    cache_filename = make_dump_cache_filename(config, database_name)
+    temporary_filename = f'{cache_filename}.tmp'
+    os.makedirs(os.path.dirname(cache_filename), mode=0o700, exist_ok=True)
+
+    # Forget the old fingerprint first, so an interruption never pairs it with the new dump.
+    with state.open_state_database(config) as connection:
+        state.delete_value(connection, FINGERPRINTS_NAMESPACE, database_name)
+
+    try:
+        os.remove(temporary_filename)
+    except FileNotFoundError:
+        pass
+
+    dump.link_or_copy(dump_filename, temporary_filename)
+    os.replace(temporary_filename, cache_filename)
+
+    with state.open_state_database(config) as connection:
+        state.set_value(connection, FINGERPRINTS_NAMESPACE, database_name, fingerprint)
+
+
+def backup_database(database_path, dump_filename):
+    '''
+    Given the path of a SQLite database and a dump filename, copy the database to the dump file
+    with SQLite's online backup API. This makes a consistent, page-level copy of the database
+    without converting it to SQL. The copy happens a few pages at a time, so writers to the database
+    aren't blocked for the duration, although a write by another connection makes the copy start
+    over.
+
+    Raise ValueError if SQLite can't back up the database.
+    '''
+    source = sqlite3.connect(database_path)
+
+    try:
+        destination = sqlite3.connect(dump_filename)
+
+        try:
+            source.backup(destination, pages=BACKUP_PAGES_PER_STEP)
+        finally:
+            destination.close()
+    except sqlite3.Error as error:
+        raise ValueError(f'Error backing up SQLite database at {database_path}: {error}')
+    finally:
+        source.close()
+
+
+def restore_database_file(extract_process, database_path, log_prefix):
+    '''
+    Given an active extract process (an instance of subprocess.Popen) producing a "binary" format
+    dump on its stdout, the path of the SQLite database to restore to, and a log prefix, copy the
+    dump to a temporary file next to the database and then replace the database (and any of its
+    leftover journal files) with it. That way, the existing database stays intact if anything goes
+    wrong.
+
+    Raise ValueError if the dump isn't a SQLite database file, or subprocess.CalledProcessError if
+    the extract process errors.
+    '''
+    header = extract_process.stdout.read(len(SQLITE_FILE_HEADER))
+
+    # An empty file is an empty database.
+    if header and header != SQLITE_FILE_HEADER:
+        extract_process.kill()
+        extract_process.wait()
+
+        raise ValueError(
+            f'The SQLite database dump for {database_path} is not a database file; set its "format" option to "sql" to restore it'
+        )
+
+    temporary_file = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(os.path.abspath(database_path)),
+        prefix='.borgmatic-restore-',
+        delete=False,
+    )
+
+    try:
+        with temporary_file:
+            temporary_file.write(header)
+            shutil.copyfileobj(extract_process.stdout, temporary_file)
+
+        # Log the extract's stderr and raise if it errored.
+        log_outputs(
+            (extract_process,),
+            (extract_process.stdout,),
+            output_log_level=logging.DEBUG,
+            borg_local_path=None,
+        )
+
+        for journal_suffix in ('-journal', '-wal', '-shm'):
+            try:
+                os.remove(database_path + journal_suffix)
+            except FileNotFoundError:
+                pass
+
+        os.replace(temporary_file.name, database_path)
+        logger.debug(f'{log_prefix}: Replaced SQLite database at {database_path}')
+    except (OSError, subprocess.CalledProcessError):
+        os.remove(temporary_file.name)
+        raise
+
+
 def remove_database_dumps(databases, config, log_prefix, dry_run):  # pragma: no cover
     '''
     Remove the given SQLite3 database dumps from the filesystem. The databases are supplied as a
@@ -114,6 +336,10 @@ def restore_database_dump(
     if dry_run:
         return
 
+    if database.get('format') == 'binary':
+        restore_database_file(extract_process, database_path, log_prefix)
+        return
+
     try:
         os.remove(database_path)
         logger.warning(f'{log_prefix}: Removed existing SQLite database at {database_path}')
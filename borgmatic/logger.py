@@ -1,7 +1,11 @@
+import atexit
+import copy
 import logging
 import logging.handlers
 import os
+import queue
 import sys
+import threading
 
 import colorama
 
@@ -49,6 +53,16 @@ def should_do_markup(no_color, configs):
     return interactive_console()
 
 
+def flush_handler_batch(handler):
+    '''
+    Given a logging handler, flush any records it has written since its last flush. For handlers
+    that defer flushing (see Batched_flush_mixin), this is the only thing that flushes them.
+    '''
+    flush_batch = getattr(handler, 'flush_batch', None)
+
+    (flush_batch or handler.flush)()
+
+
 class Multi_stream_handler(logging.Handler):
     '''
     A logging handler that dispatches each log record to one of multiple stream handlers depending
@@ -66,6 +80,13 @@ class Multi_stream_handler(logging.Handler):
         for handler in self.handlers:
             handler.flush()
 
+    def flush_batch(self):
+        '''
+        Flush each of the stream handlers, including any that defer flushing.
+        '''
+        for handler in self.handlers:
+            flush_handler_batch(handler)
+
     def emit(self, record):
         '''
         Dispatch the log record to the appropriate stream handler for the record's log level.
@@ -85,6 +106,184 @@ class Multi_stream_handler(logging.Handler):
             handler.setLevel(level)
 
 
+class Batched_flush_mixin:
+    '''
+    A mixin for stream-based logging handlers that skips the flush after every record, leaving it
+    to flush_batch() instead. That way, a Log_queue_listener can write out a whole batch of records
+    with a single flush.
+    '''
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class Batched_stream_handler(Batched_flush_mixin, logging.StreamHandler):
+    pass
+
+
+class Batched_watched_file_handler(Batched_flush_mixin, logging.handlers.WatchedFileHandler):
+    pass
+
+
+# The maximum number of log records to buffer for writing on a background thread. Once it's full,
+# logging calls wait for room, so a slow log destination slows borgmatic down rather than
+# exhausting its memory.
+LOG_QUEUE_MAX_RECORDS = 10000
+
+# How often to check that the background thread writing log records is still alive while waiting
+# on it, so a dead thread can't hang borgmatic.
+LOG_QUEUE_POLL_SECONDS = 1
+
+
+class Log_queue(queue.Queue):
+    '''
+    A bounded queue of log records. Unlike a plain queue.Queue, its lock is reentrant, so a signal
+    handler that logs while interrupting a log call in progress doesn't deadlock.
+    '''
+
+    def __init__(self, maxsize=0):
+        super(Log_queue, self).__init__(maxsize)
+
+        self.mutex = threading.RLock()
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+        self.all_tasks_done = threading.Condition(self.mutex)
+
+    def put_while(self, item, keep_waiting):
+        '''
+        Put the given item onto the queue, waiting for room as long as the given keep_waiting()
+        function returns True. Return whether the item got put.
+        '''
+        while keep_waiting():
+            try:
+                self.put(item, timeout=LOG_QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def join_while(self, keep_waiting):
+        '''
+        Wait until every item put onto the queue has been processed, but only as long as the given
+        keep_waiting() function returns True.
+        '''
+        with self.all_tasks_done:
+            while self.unfinished_tasks and keep_waiting():
+                self.all_tasks_done.wait(LOG_QUEUE_POLL_SECONDS)
+
+
+class Blocking_queue_handler(logging.handlers.QueueHandler):
+    '''
+    A logging handler that puts each log record onto a bounded queue for a Log_queue_listener to
+    write out, waiting for room if the queue is full instead of dropping the record.
+    '''
+
+    def __init__(self, log_queue, listener):
+        super(Blocking_queue_handler, self).__init__(log_queue)
+        self.listener = listener
+
+    def prepare(self, record):
+        '''
+        Return a copy of the given record with its message merged with its arguments, so later
+        changes to the arguments don't affect the record. Unlike the default implementation, don't
+        format the record here, as each of the listener's handlers formats it with its own formatter.
+        '''
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+
+        return record
+
+    def enqueue(self, record):
+        # If the listener isn't around to write out the record (for instance, because it's already
+        # been stopped at exit), write the record directly instead.
+        if not self.queue.put_while(record, self.listener.alive):
+            self.listener.handle(record)
+
+
+class Log_queue_listener(logging.handlers.QueueListener):
+    '''
+    A queue listener that formats and writes queued log records to its handlers on a background
+    thread. Rather than flushing after every record, it flushes its handlers whenever it catches up
+    with the queue, so a burst of records (like Borg output) gets written as one batch.
+
+    Errors writing or flushing a record go to the handler's handleError() rather than killing the
+    background thread.
+    '''
+
+    def __init__(self, log_queue, *handlers):
+        super(Log_queue_listener, self).__init__(log_queue, *handlers, respect_handler_level=True)
+
+    def alive(self):
+        '''
+        Return whether the background thread is running.
+        '''
+        return bool(self._thread and self._thread.is_alive())
+
+    def enqueue_sentinel(self):
+        self.queue.put_while(self._sentinel, self.alive)
+
+    def stop(self):
+        '''
+        Write out any queued log records, flush the handlers, and stop the background thread.
+        '''
+        if self.alive():
+            super(Log_queue_listener, self).stop()
+
+        self._thread = None
+        self.flush_handlers()
+
+    def handle(self, record):
+        record = self.prepare(record)
+
+        for handler in self.handlers:
+            if record.levelno < handler.level:
+                continue
+
+            try:
+                handler.handle(record)
+            except Exception:
+                handler.handleError(record)
+
+        if self.queue.empty():
+            self.flush_handlers(record)
+
+    def flush_handlers(self, record=None):
+        for handler in self.handlers:
+            try:
+                flush_handler_batch(handler)
+            except Exception:
+                handler.handleError(record)
+
+
+def start_log_queue(handlers):
+    '''
+    Given a sequence of logging handlers, start writing to them on a background thread via a
+    bounded queue. Stop and flush everything when borgmatic exits, including when exiting due to a
+    signal. Return a logging handler that puts records onto the queue.
+    '''
+    log_queue = Log_queue(LOG_QUEUE_MAX_RECORDS)
+    listener = Log_queue_listener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+    return Blocking_queue_handler(log_queue, listener)
+
+
+def flush_logging():
+    '''
+    Wait until every log record logged so far has been written out by the background thread. This
+    is useful before something else writes directly to the console, so as to preserve ordering.
+    '''
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, Blocking_queue_handler):
+            handler.queue.join_while(handler.listener.alive)
+
+
 class Console_color_formatter(logging.Formatter):
     def format(self, record):
         add_custom_log_levels()
@@ -162,7 +361,8 @@ def configure_logging(
 ):
     '''
     Configure logging to go to both the console and (syslog or log file). Use the given log levels,
-    respectively.
+    respectively. Records get written to these destinations on a background thread, so that a slow
+    destination doesn't hold up borgmatic (or the Borg output it's logging).
 
     Raise FileNotFoundError or PermissionError if the log file could not be opened for writing.
     '''
@@ -178,8 +378,8 @@ def configure_logging(
     # Log certain log levels to console stderr and others to stdout. This supports use cases like
     # grepping (non-error) output.
     console_disabled = logging.NullHandler()
-    console_error_handler = logging.StreamHandler(sys.stderr)
-    console_standard_handler = logging.StreamHandler(sys.stdout)
+    console_error_handler = Batched_stream_handler(sys.stderr)
+    console_standard_handler = Batched_stream_handler(sys.stdout)
     console_handler = Multi_stream_handler(
         {
             logging.DISABLED: console_disabled,
@@ -211,7 +411,7 @@ def configure_logging(
         syslog_handler.setLevel(syslog_log_level)
         handlers = (console_handler, syslog_handler)
     elif log_file and log_file_log_level != logging.DISABLED:
-        file_handler = logging.handlers.WatchedFileHandler(log_file)
+        file_handler = Batched_watched_file_handler(log_file)
         file_handler.setFormatter(
             logging.Formatter(
                 log_file_format or '[{asctime}] {levelname}: {message}', style='{'  # noqa: FS003
@@ -224,5 +424,5 @@ def configure_logging(
 
     logging.basicConfig(
         level=min(console_log_level, syslog_log_level, log_file_log_level, monitoring_log_level),
-        handlers=handlers,
+        handlers=(start_log_queue(handlers),),
     )
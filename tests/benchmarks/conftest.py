@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def scaled():
+    '''
+    Return a function that takes a baseline fixture size and returns it multiplied by the
+    BORGMATIC_BENCHMARK_SCALE environment variable (defaulting to 1), so that the same benchmarks
+    can run quickly as a smoke test or at larger sizes when chasing a particular slowdown.
+    '''
+    scale = float(os.environ.get('BORGMATIC_BENCHMARK_SCALE', '1'))
+
+    return lambda size: max(1, int(size * scale))
+
+
+def pytest_sessionstart(session):
+    '''
+    When asked to compare against a saved baseline and there isn't one yet for this machine, save
+    this run as the baseline instead. Otherwise a comparison only warns that it has nothing to
+    compare against, and a regression could never fail the run.
+    '''
+    benchmark_session = getattr(session.config, '_benchmarksession', None)
+
+    if not benchmark_session or not benchmark_session.compare:
+        return
+
+    if benchmark_session.compared_mapping:
+        return
+
+    benchmark_session.logger.info(
+        f'No baseline to compare against in {benchmark_session.storage}, so saving this run as one'
+    )
+    benchmark_session.save = 'baseline'
+    benchmark_session.compare_fail = None
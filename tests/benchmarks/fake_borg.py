@@ -0,0 +1,356 @@
+'''
+A fake "borg" (and "sqlite3") executable for measuring borgmatic's overhead without a real
+repository. Rather than running this module directly, install shims for it with make_fake_bin(),
+which write executables that call main() with the name of the command they're standing in for.
+
+The fake is configured via environment variables:
+
+  * FAKE_BORG_LOG: Path of a file to which each call appends a JSON line with the command name,
+    arguments, start and end times, and the fake's own CPU time.
+  * FAKE_BORG_STATE: Path of a JSON file that stands in for the repository, recording archive names
+    and the paths and contents of files that "borg create" reads.
+  * FAKE_BORG_SCRIPT: Optional path of a JSON file scripting each subcommand's behavior, as a dict
+    from subcommand name (e.g. "create", or "sqlite3" for the fake sqlite3) to a dict with any of
+    these keys:
+      * "output_lines": Number of lines of output to write to stderr, like "borg create --list".
+      * "lines_per_second": Rate at which to write those lines, or 0 for as fast as possible.
+      * "lock_wait_seconds": Seconds to sleep first, as if waiting on a repository lock.
+      * "exit_code": Exit code to return, e.g. 1 for a Borg warning or 2 for an error.
+'''
+import fnmatch
+import json
+import os
+import stat
+import sys
+import time
+
+BORG_VERSION = '1.2.6'
+REPOSITORY_ID = '0' * 64
+MAXIMUM_KEPT_FILE_SIZE = 1024 * 1024
+
+SHIM_TEMPLATE = '''#!{python} -S
+import sys
+
+sys.path.insert(0, {directory!r})
+
+import fake_borg
+
+sys.exit(fake_borg.main({command_name!r}, sys.argv[1:]))
+'''
+
+
+def make_fake_bin(bin_directory, command_names=('borg', 'sqlite3')):
+    '''
+    Given a directory path, write an executable shim into it for each of the given command names,
+    so that putting the directory first in PATH makes borgmatic call the fake instead of the real
+    commands.
+    '''
+    os.makedirs(bin_directory, exist_ok=True)
+
+    for command_name in command_names:
+        shim_path = os.path.join(bin_directory, command_name)
+
+        with open(shim_path, 'w') as shim_file:
+            shim_file.write(
+                SHIM_TEMPLATE.format(
+                    python=sys.executable,
+                    directory=os.path.dirname(os.path.abspath(__file__)),
+                    command_name=command_name,
+                )
+            )
+
+        os.chmod(shim_path, os.stat(shim_path).st_mode | stat.S_IXUSR)
+
+
+def get_process_start_time():
+    '''
+    Return the time this process started as a Unix timestamp, so that the fake's interpreter startup
+    counts as time spent in the fake (like real Borg's startup) rather than in borgmatic. This is
+    only as precise as the kernel's clock ticks, and it falls back to the current time on platforms
+    without /proc.
+    '''
+    try:
+        with open('/proc/self/stat') as stat_file:
+            # Skip past the command name, which is in parentheses and may contain spaces.
+            start_ticks = int(stat_file.read().rsplit(')', 1)[1].split()[19])
+
+        with open('/proc/uptime') as uptime_file:
+            uptime_seconds = float(uptime_file.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return time.time()
+
+    return time.time() - (uptime_seconds - start_ticks / os.sysconf('SC_CLK_TCK'))
+
+
+def load_json(path, default):
+    '''
+    Load and return the JSON in the file at the given path, or the given default if there's no
+    path or file.
+    '''
+    if not path or not os.path.exists(path):
+        return default
+
+    with open(path) as json_file:
+        return json.load(json_file)
+
+
+def save_json(path, value):
+    '''
+    Atomically write the given value as JSON to the file at the given path.
+    '''
+    temporary_path = f'{path}.tmp'
+
+    with open(temporary_path, 'w') as json_file:
+        json.dump(value, json_file)
+
+    os.replace(temporary_path, path)
+
+
+def get_subcommand(command_name, arguments):
+    '''
+    Given a command name and its arguments, return the name used to look up its scripted behavior:
+    the Borg subcommand (the first argument that isn't a flag) for "borg", or the command name for
+    anything else.
+    '''
+    if command_name != 'borg':
+        return command_name
+
+    return next((argument for argument in arguments if not argument.startswith('-')), None)
+
+
+def get_positional_arguments(arguments):
+    '''
+    Given Borg arguments, return the ones that aren't flags or flag values. This is approximate, as
+    it assumes all flags with values use the "--flag value" form and that anything starting with
+    "--" followed by a non-flag argument takes a value, except for the known boolean flags below.
+    '''
+    boolean_flags = {
+        '--json',
+        '--short',
+        '--stdout',
+        '--stats',
+        '--list',
+        '--progress',
+        '--one-file-system',
+        '--read-special',
+        '--numeric-ids',
+        '--atime',
+        '--noatime',
+        '--nobsdflags',
+        '--noflags',
+        '--exclude-caches',
+        '--keep-exclude-tags',
+        '--exclude-nodump',
+        '--repository-only',
+        '--archives-only',
+        '--verify-data',
+        '--dry-run',
+        '--info',
+        '--debug',
+        '--critical',
+        '--log-json',
+        '--show-rc',
+    }
+    positional_arguments = []
+    skip_next = False
+
+    for argument in arguments:
+        if skip_next:
+            skip_next = False
+        elif argument.startswith('-'):
+            skip_next = argument not in boolean_flags and '=' not in argument
+        else:
+            positional_arguments.append(argument)
+
+    return positional_arguments
+
+
+def read_files(paths):
+    '''
+    Given paths to back up, read the files found within them and return a dict from each file's path
+    (without a leading slash, as Borg stores paths) to its contents. Read named pipes (like database
+    dump streams) until EOF, just like "borg create --read-special" would, but only keep the
+    contents of small regular files, as nothing reads the rest back.
+    '''
+    contents = {}
+
+    for path in paths:
+        for directory, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(directory, filename)
+                file_stat = os.stat(file_path)
+
+                if stat.S_ISFIFO(file_stat.st_mode) or file_stat.st_size <= MAXIMUM_KEPT_FILE_SIZE:
+                    with open(file_path, errors='replace') as file:
+                        contents[file_path.lstrip(os.path.sep)] = file.read()
+                else:
+                    contents[file_path.lstrip(os.path.sep)] = ''
+
+    return contents
+
+
+def write_output_lines(line_count, lines_per_second):
+    '''
+    Write the given number of fake "borg create --list"-style lines to stderr at the given rate
+    (or as fast as possible if the rate is zero).
+    '''
+    start_time = time.time()
+
+    for index in range(line_count):
+        sys.stderr.write(f'A /srv/data/fake/file{index}.dat\n')
+
+        if lines_per_second:
+            delay = start_time + (index + 1) / lines_per_second - time.time()
+
+            if delay > 0:
+                sys.stderr.flush()
+                time.sleep(delay)
+
+    sys.stderr.flush()
+
+
+def run_borg(subcommand, arguments, state):
+    '''
+    Given a Borg subcommand, all the Borg arguments, and the fake repository state as a dict, write
+    whatever output borgmatic expects from that subcommand to stdout, updating the state as needed.
+    '''
+    positional_arguments = get_positional_arguments(arguments)[1:]
+    repository_and_archive = positional_arguments[0] if positional_arguments else ''
+    archive_name = (
+        repository_and_archive.split('::', 1)[1] if '::' in repository_and_archive else None
+    )
+    archives = state.setdefault('archives', [])
+    archive = next(
+        (archive for archive in archives if archive['name'] == archive_name),
+        archives[-1] if archives else {'name': None, 'files': {}},
+    )
+
+    if subcommand == 'create':
+        # A dry run (which borgmatic uses to look for special files) doesn't read anything.
+        if '--dry-run' in arguments:
+            return
+
+        # Rather than expanding placeholders like "{hostname}", just make a unique name.
+        archive_name = f'archive-{len(archives)}'
+        archives.append({'name': archive_name, 'files': read_files(positional_arguments[1:])})
+
+        if '--json' in arguments:
+            sys.stdout.write(
+                json.dumps(
+                    {
+                        'repository': {'id': REPOSITORY_ID},
+                        'archive': {
+                            'name': archive_name,
+                            'stats': {
+                                'original_size': 0,
+                                'compressed_size': 0,
+                                'deduplicated_size': 0,
+                                'nfiles': 0,
+                            },
+                        },
+                    }
+                )
+            )
+    elif subcommand == 'rinfo' or (subcommand == 'info' and not archive_name):
+        sys.stdout.write(
+            json.dumps(
+                {
+                    'repository': {'id': REPOSITORY_ID, 'location': repository_and_archive},
+                    'encryption': {'mode': 'repokey'},
+                    'cache': {'stats': {'unique_csize': 0, 'total_unique_chunks': 0}},
+                }
+            )
+        )
+    elif subcommand in ('rlist', 'list') and not archive_name:
+        if '--json' in arguments:
+            sys.stdout.write(
+                json.dumps({'archives': [{'name': archive['name']} for archive in archives]})
+            )
+        else:
+            last = next(
+                (
+                    int(arguments[index + 1])
+                    for index, argument in enumerate(arguments[:-1])
+                    if argument == '--last'
+                ),
+                None,
+            )
+            names = [archive['name'] for archive in archives]
+            sys.stdout.write('\n'.join(names[-last:] if last else names) + '\n')
+    elif subcommand == 'list':
+        patterns = [
+            argument[len('sh:') :]
+            for argument in positional_arguments
+            if argument.startswith('sh:')
+        ]
+        sys.stdout.write(
+            ''.join(
+                f'{path}\n'
+                for path in sorted(archive['files'])
+                if not patterns or any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+            )
+        )
+    elif subcommand == 'extract' and '--stdout' in arguments:
+        for path in positional_arguments[1:]:
+            sys.stdout.write(archive['files'].get(path, ''))
+
+
+def run_sqlite3(arguments):
+    '''
+    Given sqlite3 arguments, write a fake dump to stdout for ".dump", or otherwise consume a dump
+    from stdin as if restoring it.
+    '''
+    if '.dump' in arguments:
+        sys.stdout.write('CREATE TABLE fake (id INTEGER);\nINSERT INTO fake VALUES(1);\n')
+    else:
+        sys.stdin.read()
+
+
+def main(command_name, arguments):
+    '''
+    Given the name of the command being faked and its arguments, behave as scripted and return an
+    exit code.
+    '''
+    start_time = get_process_start_time()
+    script = load_json(os.environ.get('FAKE_BORG_SCRIPT'), {})
+
+    try:
+        if command_name == 'borg' and '--version' in arguments:
+            sys.stdout.write(f'borg {BORG_VERSION}\n')
+            return 0
+
+        subcommand = get_subcommand(command_name, arguments)
+        behavior = script.get(subcommand, {})
+        time.sleep(behavior.get('lock_wait_seconds', 0))
+
+        if command_name == 'borg':
+            state_path = os.environ.get('FAKE_BORG_STATE')
+            state = load_json(state_path, {})
+            run_borg(subcommand, arguments, state)
+
+            if state_path:
+                save_json(state_path, state)
+        else:
+            run_sqlite3(arguments)
+
+        sys.stdout.flush()
+        write_output_lines(behavior.get('output_lines', 0), behavior.get('lines_per_second', 0))
+
+        return behavior.get('exit_code', 0)
+    finally:
+        log_path = os.environ.get('FAKE_BORG_LOG')
+
+        if log_path:
+            with open(log_path, 'a') as log_file:
+                log_file.write(
+                    json.dumps(
+                        {
+                            'command': command_name,
+                            'arguments': arguments,
+                            'start': start_time,
+                            'end': time.time(),
+                            'cpu_seconds': time.process_time(),
+                        }
+                    )
+                    + '\n'
+                )
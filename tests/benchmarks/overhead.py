@@ -0,0 +1,363 @@
+'''
+A harness for measuring how much wall time, CPU time, and memory borgmatic adds around Borg for each
+action. It runs full borgmatic create, prune, compact, check, and restore cycles against the fake
+Borg in fake_borg.py, so no real repository, database, or network is needed.
+
+Run it from the root of the borgmatic source, for instance:
+
+    python -m tests.benchmarks.overhead --cycles 5 --output-lines 100000
+'''
+import argparse
+import collections
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from tests.benchmarks import fake_borg
+
+ACTIONS = ('create', 'prune', 'compact', 'check', 'restore')
+
+# The Borg subcommands that a scripted lock wait applies to, i.e. the ones that lock the repository.
+LOCKING_SUBCOMMANDS = ('create', 'prune', 'compact', 'check', 'extract', 'list', 'rlist', 'rinfo')
+
+ACTION_FLAGS = {'restore': ('--archive', 'latest')}
+
+# Run borgmatic from this source tree, regardless of any installed borgmatic.
+BORGMATIC_COMMAND = (
+    sys.executable,
+    '-c',
+    'from borgmatic.commands.borgmatic import main; main()',
+)
+
+CONFIG_TEMPLATE = '''
+source_directories:
+    - {source_directory}
+repositories:
+    - path: {repository_path}
+borgmatic_source_directory: {borgmatic_source_directory}
+keep_daily: 7
+checks:
+    - name: repository
+    - name: archives
+sqlite_databases:
+    - name: test
+      path: {database_path}
+'''
+
+Measurement = collections.namedtuple(
+    'Measurement',
+    (
+        'action',
+        'exit_code',
+        'wall_seconds',
+        'fake_seconds',
+        'overhead_seconds',
+        'cpu_seconds',
+        'peak_rss_kilobytes',
+        'subprocess_counts',
+    ),
+)
+
+
+def make_script(output_lines=0, lines_per_second=0, lock_wait_seconds=0):
+    '''
+    Given the number of lines of output for "borg create" to write, the rate at which to write them,
+    and the number of seconds each locking Borg subcommand should wait as if on a lock, return a
+    script for the fake Borg as a dict.
+    '''
+    script = {
+        subcommand: {'lock_wait_seconds': lock_wait_seconds} for subcommand in LOCKING_SUBCOMMANDS
+    }
+    script['create'].update(output_lines=output_lines, lines_per_second=lines_per_second)
+
+    return script
+
+
+def set_up(directory, script):
+    '''
+    Given a working directory path and a script for the fake Borg as a dict, set up everything
+    needed to run borgmatic against the fake Borg there: fake executables, source files, a fake
+    repository, and a borgmatic configuration file. Return the configuration file path and the
+    environment variables to run borgmatic with as a dict.
+    '''
+    bin_directory = os.path.join(directory, 'bin')
+    source_directory = os.path.join(directory, 'source')
+    fake_borg.make_fake_bin(bin_directory)
+    os.makedirs(source_directory, exist_ok=True)
+    database_path = os.path.join(directory, 'test.db')
+    open(database_path, 'w').close()
+
+    script_path = os.path.join(directory, 'script.json')
+    fake_borg.save_json(script_path, script)
+
+    config_path = os.path.join(directory, 'config.yaml')
+
+    with open(config_path, 'w') as config_file:
+        config_file.write(
+            CONFIG_TEMPLATE.format(
+                source_directory=source_directory,
+                repository_path=os.path.join(directory, 'repo.borg'),
+                borgmatic_source_directory=os.path.join(directory, '.borgmatic'),
+                database_path=database_path,
+            )
+        )
+
+    environment = dict(
+        os.environ,
+        PATH=os.pathsep.join((bin_directory, os.environ.get('PATH', ''))),
+        HOME=directory,
+        FAKE_BORG_LOG=os.path.join(directory, 'calls.log'),
+        FAKE_BORG_STATE=os.path.join(directory, 'repository.json'),
+        FAKE_BORG_SCRIPT=script_path,
+    )
+
+    return (config_path, environment)
+
+
+def get_busy_seconds(calls):
+    '''
+    Given a sequence of fake command call dicts with "start" and "end" times, return the total
+    number of seconds during which at least one of them was running. Overlapping calls (like a
+    database dump streaming into "borg create") only count once.
+    '''
+    busy_seconds = 0
+    busy_until = None
+
+    for call in sorted(calls, key=lambda call: call['start']):
+        if busy_until is None or call['start'] > busy_until:
+            busy_seconds += call['end'] - call['start']
+            busy_until = call['end']
+        elif call['end'] > busy_until:
+            busy_seconds += call['end'] - busy_until
+            busy_until = call['end']
+
+    return busy_seconds
+
+
+def run_action(action, config_path, environment, verbosity=0):
+    '''
+    Given an action name, a borgmatic configuration file path, the environment variables from
+    set_up(), and a borgmatic verbosity, run that borgmatic action against the fake Borg and return
+    a Measurement of it.
+    '''
+    log_path = environment['FAKE_BORG_LOG']
+    open(log_path, 'w').close()
+
+    command = BORGMATIC_COMMAND + (
+        '--config',
+        config_path,
+        '--verbosity',
+        str(verbosity),
+        '--syslog-verbosity',
+        '-2',
+        action,
+        *ACTION_FLAGS.get(action, ()),
+    )
+
+    start_time = time.time()
+    process = subprocess.Popen(
+        command, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # Unlike Popen.wait(), os.wait4() also returns the resource usage of borgmatic, including any
+    # processes it waited on.
+    (_, status, resource_usage) = os.wait4(process.pid, 0)
+    wall_seconds = time.time() - start_time
+    process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+
+    with open(log_path) as log_file:
+        calls = [json.loads(line) for line in log_file]
+
+    fake_seconds = get_busy_seconds(calls)
+
+    return Measurement(
+        action=action,
+        exit_code=process.returncode,
+        wall_seconds=wall_seconds,
+        fake_seconds=fake_seconds,
+        overhead_seconds=wall_seconds - fake_seconds,
+        cpu_seconds=resource_usage.ru_utime
+        + resource_usage.ru_stime
+        - sum(call['cpu_seconds'] for call in calls),
+        # On Linux, this is the peak across borgmatic and the processes it waited on, but borgmatic
+        # is much bigger than the fakes.
+        peak_rss_kilobytes=resource_usage.ru_maxrss,
+        subprocess_counts=dict(collections.Counter(call['command'] for call in calls)),
+    )
+
+
+def run_cycles(cycle_count, config_path, environment, actions=ACTIONS, verbosity=0):
+    '''
+    Given a number of cycles, a borgmatic configuration file path, the environment variables from
+    set_up(), a sequence of action names, and a borgmatic verbosity, run each action in turn for
+    each cycle and return all the resulting Measurements.
+    '''
+    return [
+        run_action(action, config_path, environment, verbosity)
+        for cycle in range(cycle_count)
+        for action in actions
+    ]
+
+
+def summarize(measurements):
+    '''
+    Given a sequence of Measurements, return a summary dict per action (in order of first
+    appearance) with the median times, the maximum peak RSS, the subprocess counts of the last run,
+    and the number of runs that failed.
+    '''
+    measurements_by_action = collections.OrderedDict()
+
+    for measurement in measurements:
+        measurements_by_action.setdefault(measurement.action, []).append(measurement)
+
+    return collections.OrderedDict(
+        (
+            action,
+            {
+                'runs': len(action_measurements),
+                'failed_runs': sum(
+                    1 for measurement in action_measurements if measurement.exit_code
+                ),
+                'wall_seconds': statistics.median(
+                    measurement.wall_seconds for measurement in action_measurements
+                ),
+                'borg_seconds': statistics.median(
+                    measurement.fake_seconds for measurement in action_measurements
+                ),
+                'overhead_seconds': statistics.median(
+                    measurement.overhead_seconds for measurement in action_measurements
+                ),
+                'cpu_seconds': statistics.median(
+                    measurement.cpu_seconds for measurement in action_measurements
+                ),
+                'peak_rss_kilobytes': max(
+                    measurement.peak_rss_kilobytes for measurement in action_measurements
+                ),
+                'subprocess_counts': action_measurements[-1].subprocess_counts,
+            },
+        )
+        for action, action_measurements in measurements_by_action.items()
+    )
+
+
+def format_summary(summary):
+    '''
+    Given a summary dict as returned by summarize(), return it formatted as a table for display.
+    '''
+    header = (
+        'action',
+        'wall (s)',
+        'borg (s)',
+        'overhead (s)',
+        'CPU (s)',
+        'peak RSS (MiB)',
+        'failed',
+        'subprocesses',
+    )
+    rows = [
+        (
+            action,
+            f'{values["wall_seconds"]:.3f}',
+            f'{values["borg_seconds"]:.3f}',
+            f'{values["overhead_seconds"]:.3f}',
+            f'{values["cpu_seconds"]:.3f}',
+            f'{values["peak_rss_kilobytes"] / 1024:.1f}',
+            f'{values["failed_runs"]}/{values["runs"]}',
+            ', '.join(
+                f'{command} {count}' for command, count in values['subprocess_counts'].items()
+            ),
+        )
+        for action, values in summary.items()
+    ]
+    widths = [max(len(row[index]) for row in [header] + rows) for index in range(len(header))]
+
+    return '\n'.join(
+        '  '.join(
+            value.ljust(width) if index in (0, len(header) - 1) else value.rjust(width)
+            for index, (value, width) in enumerate(zip(row, widths))
+        ).rstrip()
+        for row in [header] + rows
+    )
+
+
+def parse_arguments(*unparsed_arguments):
+    '''
+    Given command-line arguments with which this harness was invoked, parse them and return them as
+    an argparse.Namespace.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Measure the overhead that borgmatic adds around Borg for each action, using a fake Borg'
+    )
+    parser.add_argument(
+        '--cycles', type=int, default=3, help='Number of times to run each action, default: 3'
+    )
+    parser.add_argument(
+        '--actions',
+        nargs='+',
+        choices=ACTIONS,
+        default=ACTIONS,
+        help='Actions to run in each cycle, default: all of them',
+    )
+    parser.add_argument(
+        '--output-lines',
+        type=int,
+        default=10000,
+        help='Lines of output for the fake "borg create" to write, default: 10000',
+    )
+    parser.add_argument(
+        '--lines-per-second',
+        type=float,
+        default=0,
+        help='Rate at which the fake "borg create" writes output, default: as fast as possible',
+    )
+    parser.add_argument(
+        '--lock-wait',
+        type=float,
+        default=0,
+        help='Seconds each locking fake Borg subcommand waits as if on a repository lock, default: 0',
+    )
+    parser.add_argument(
+        '--script',
+        help='Path of a JSON file scripting the fake Borg (see fake_borg.py), instead of the flags above',
+    )
+    parser.add_argument(
+        '--verbosity', type=int, default=0, help='borgmatic verbosity to run with, default: 0'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Output the per-action summary as JSON instead'
+    )
+
+    return parser.parse_args(unparsed_arguments)
+
+
+def main(*unparsed_arguments):
+    arguments = parse_arguments(*unparsed_arguments)
+    script = (
+        fake_borg.load_json(arguments.script, {})
+        if arguments.script
+        else make_script(arguments.output_lines, arguments.lines_per_second, arguments.lock_wait)
+    )
+    directory = tempfile.mkdtemp(prefix='borgmatic-overhead-')
+
+    try:
+        config_path, environment = set_up(directory, script)
+        summary = summarize(
+            run_cycles(
+                arguments.cycles, config_path, environment, arguments.actions, arguments.verbosity
+            )
+        )
+    finally:
+        shutil.rmtree(directory)
+
+    print(json.dumps(summary, indent=4) if arguments.json else format_summary(summary))
+
+    if any(values['failed_runs'] for values in summary.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
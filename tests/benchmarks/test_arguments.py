@@ -0,0 +1,30 @@
+from borgmatic.commands import arguments as module
+
+
+def test_parse_arguments_with_default_actions(benchmark):
+    benchmark(module.parse_arguments, '--verbosity', '1')
+
+
+def test_parse_arguments_with_multiple_actions_and_flags(benchmark):
+    benchmark(
+        module.parse_arguments,
+        '--config',
+        '/etc/borgmatic/config.yaml',
+        '--verbosity',
+        '1',
+        '--override',
+        'keep_daily=7',
+        'create',
+        '--stats',
+        '--list',
+        'prune',
+        '--stats',
+        'compact',
+        'check',
+        '--only',
+        'repository',
+        '--only',
+        'archives',
+        '--repository',
+        'local',
+    )
@@ -0,0 +1,131 @@
+import pytest
+import ruamel.yaml
+
+from borgmatic.config import load, override, validate
+
+
+def write_include_tree(directory, depth, fan_out, prefix='config'):
+    '''
+    Write a tree of configuration files to the given directory, where each file merge includes
+    fan_out child files until the given depth, and every file sets the same few list and mapping
+    options so that they all need deep merging. Return the path of the root file.
+    '''
+    path = directory / f'{prefix}.yaml'
+    includes = (
+        [
+            write_include_tree(directory, depth - 1, fan_out, f'{prefix}_{child}')
+            for child in range(fan_out)
+        ]
+        if depth
+        else []
+    )
+    include_line = (
+        f'<<: !include [{", ".join(str(include) for include in includes)}]\n' if includes else ''
+    )
+
+    path.write_text(
+        f'''
+source_directories:
+    - /srv/{prefix}
+exclude_patterns:
+    - /srv/{prefix}/cache
+ntfy:
+    topic: {prefix}
+    states:
+        - fail
+keep_daily: 7
+{include_line}'''
+    )
+
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def include_tree_path(tmp_path_factory, scaled):
+    return write_include_tree(tmp_path_factory.mktemp('config'), depth=4, fan_out=scaled(4))
+
+
+@pytest.fixture(scope='module')
+def config_path(tmp_path_factory, scaled):
+    '''
+    Write a realistic configuration file with thousands of source directories and exclude patterns
+    plus a couple of includes, and return its path.
+    '''
+    directory = tmp_path_factory.mktemp('config')
+    (directory / 'retention.yaml').write_text('keep_daily: 7\nkeep_weekly: 4\nkeep_monthly: 6\n')
+    (directory / 'hooks.yaml').write_text(
+        'healthchecks:\n    ping_url: https://hc-ping.com/uuid\nbefore_backup:\n    - echo start\n'
+    )
+    source_directories = ''.join(
+        f'    - /srv/data/project{index}\n' for index in range(scaled(5000))
+    )
+    exclude_patterns = ''.join(
+        f"    - '/srv/data/project{index}/*.tmp'\n" for index in range(scaled(5000))
+    )
+    path = directory / 'config.yaml'
+    path.write_text(
+        f'''
+source_directories:
+{source_directories}
+repositories:
+    - path: ssh://user@backupserver/./sourcehostname.borg
+      label: backupserver
+    - path: /mnt/backup/local.borg
+      label: local
+exclude_patterns:
+{exclude_patterns}
+encryption_passphrase: "!\\"#$%&'()*+,-./:;<=>?@[\\\\]^_`{{|}}~"
+compression: zstd,3
+checks:
+    - name: repository
+    - name: archives
+      frequency: 2 weeks
+<<: !include [retention.yaml, hooks.yaml]
+'''
+    )
+
+    return str(path)
+
+
+def test_load_configuration_with_deep_include_tree(benchmark, include_tree_path):
+    config = benchmark(load.load_configuration, include_tree_path)
+
+    assert config['keep_daily'] == 7
+
+
+def test_deep_merge_nodes(benchmark, scaled):
+    yaml = ruamel.yaml.YAML(typ='safe')
+    nodes = yaml.compose(
+        ''.join(
+            f'''
+source_directories:
+    - /srv/{index}
+ntfy:
+    topic: topic{index}
+    states:
+        - fail
+    priority{index % 50}: {index}
+keep_daily: {index}
+'''
+            for index in range(scaled(2000))
+        )
+    ).value
+
+    merged_nodes = benchmark(load.deep_merge_nodes, nodes)
+
+    assert len(merged_nodes) == 3
+
+
+def test_apply_overrides(benchmark, scaled):
+    raw_overrides = [
+        f'constants.option{index}.suboption=[value{index}, {index}]'
+        for index in range(scaled(1000))
+    ] + ['location.source_directories=[/home, /etc]', 'storage.compression=lz4']
+
+    benchmark(override.apply_overrides, {}, raw_overrides)
+
+
+def test_parse_configuration(benchmark, config_path):
+    config, logs = benchmark(validate.parse_configuration, config_path, validate.schema_filename())
+
+    assert config['keep_weekly'] == 4
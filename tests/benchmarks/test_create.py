@@ -0,0 +1,56 @@
+import pytest
+
+from borgmatic.borg import create as module
+
+
+@pytest.fixture(scope='module')
+def directory_devices(scaled):
+    '''
+    Return a map from directory to device identifier for a few thousand source directories, the
+    kind of thing a handful of globs in "source_directories" expand to on a big file server. About
+    a tenth of them are parents of others, and every hundredth project lives on a second filesystem
+    so that not everything deduplicates away.
+    '''
+    directory_count = scaled(1000)
+    devices = {}
+
+    for index in range(directory_count):
+        project = f'/srv/data/project{index // 50}'
+        device = 2 if (index // 50) % 100 == 99 else 1
+        devices[f'{project}/share{index % 50}/dir{index}'] = device
+
+        if index % 10 == 0:
+            devices[project] = device
+
+    return devices
+
+
+def test_deduplicate_directories(benchmark, directory_devices):
+    # This is slow enough at this size that multiple rounds only add wall-clock time.
+    benchmark.pedantic(
+        module.deduplicate_directories,
+        args=(directory_devices, {'/root/.borgmatic': 1}),
+        rounds=1,
+    )
+
+
+def test_make_exclude_flags(benchmark, scaled):
+    config = {
+        'exclude_from': [f'/etc/borgmatic/excludes/{index}.txt' for index in range(scaled(1000))],
+        'exclude_caches': True,
+        'exclude_if_present': [f'.nobackup{index}' for index in range(scaled(1000))],
+        'keep_exclude_tags': True,
+        'exclude_nodump': True,
+    }
+
+    benchmark(module.make_exclude_flags, config, '/tmp/excludes')
+
+
+def test_write_pattern_file(benchmark, scaled):
+    patterns = [f'- /srv/data/project{index}/**/*.tmp' for index in range(scaled(100000))]
+    sources = [f'/srv/data/project{index}' for index in range(scaled(5000))]
+
+    def write_pattern_file():
+        module.write_pattern_file(patterns, sources).close()
+
+    benchmark(write_pattern_file)
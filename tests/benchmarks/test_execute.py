@@ -0,0 +1,53 @@
+import logging
+import subprocess
+
+import pytest
+
+from borgmatic import execute as module
+
+
+@pytest.fixture(scope='module')
+def borg_output_path(tmp_path_factory, scaled):
+    '''
+    Write a few million lines of fake "borg create --list" output to a file and return its path.
+    '''
+    path = tmp_path_factory.mktemp('borg') / 'output.txt'
+
+    with open(path, 'w') as output_file:
+        for index in range(scaled(2000000)):
+            output_file.write(f'A /srv/data/project{index // 1000}/share/file{index}.dat\n')
+
+    return path
+
+
+def start_fake_borg(borg_output_path):
+    return (
+        (
+            (
+                subprocess.Popen(
+                    ('cat', str(borg_output_path)),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                ),
+            ),
+            (),
+            logging.INFO,
+            'borg',
+        ),
+        {},
+    )
+
+
+def test_log_outputs_logging_lines(benchmark, borg_output_path):
+    benchmark.pedantic(
+        module.log_outputs, setup=lambda: start_fake_borg(borg_output_path), rounds=3
+    )
+
+
+def test_log_outputs_capturing_lines(benchmark, borg_output_path):
+    def start_fake_borg_with_capture():
+        (processes, exclude_stdouts, _, borg_local_path), kwargs = start_fake_borg(borg_output_path)
+
+        return ((processes, exclude_stdouts, None, borg_local_path), kwargs)
+
+    benchmark.pedantic(module.log_outputs, setup=start_fake_borg_with_capture, rounds=3)
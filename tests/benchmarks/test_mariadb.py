@@ -0,0 +1,126 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from borgmatic.hooks import mariadb as module
+
+ROWS_PER_STATEMENT = 100
+
+
+@pytest.fixture(scope='module')
+def database():
+    '''
+    Return the configuration for a MariaDB server to restore into, as given by the
+    BORGMATIC_BENCHMARK_MARIADB_* environment variables, e.g. for the "mariadb" service from the
+    end-to-end tests. Skip the benchmarks if there's no such server or no mariadb client.
+    '''
+    hostname = os.environ.get('BORGMATIC_BENCHMARK_MARIADB_HOSTNAME')
+
+    if not hostname or not shutil.which('mariadb'):
+        pytest.skip(
+            'A local MariaDB server (BORGMATIC_BENCHMARK_MARIADB_HOSTNAME) and the mariadb client are needed'
+        )
+
+    return {
+        'name': 'benchmark',
+        'hostname': hostname,
+        'port': int(os.environ.get('BORGMATIC_BENCHMARK_MARIADB_PORT', '3306')),
+        'username': os.environ.get('BORGMATIC_BENCHMARK_MARIADB_USERNAME', 'root'),
+        'password': os.environ.get('BORGMATIC_BENCHMARK_MARIADB_PASSWORD', 'test'),
+    }
+
+
+@pytest.fixture(scope='module')
+def dump_path(tmp_path_factory, scaled):
+    '''
+    Write a dump in the style of mariadb-dump with a couple hundred thousand rows (scaled by
+    BORGMATIC_BENCHMARK_SCALE) across two InnoDB tables with a unique index and a foreign key, and
+    return its path.
+    '''
+    path = str(tmp_path_factory.mktemp('mariadb') / 'benchmark.sql')
+    row_count = scaled(200000)
+
+    with open(path, 'w') as dump_file:
+        dump_file.write(
+            'DROP DATABASE IF EXISTS `benchmark`;\n'
+            'CREATE DATABASE `benchmark`;\n'
+            'USE `benchmark`;\n'
+            'CREATE TABLE `customers` (`id` int NOT NULL, `email` varchar(64) NOT NULL, '
+            'PRIMARY KEY (`id`), UNIQUE KEY `email` (`email`)) ENGINE=InnoDB;\n'
+            'CREATE TABLE `orders` (`id` int NOT NULL, `customer_id` int NOT NULL, '
+            '`note` varchar(255), PRIMARY KEY (`id`), '
+            'FOREIGN KEY (`customer_id`) REFERENCES `customers` (`id`)) ENGINE=InnoDB;\n'
+        )
+
+        for table, make_row in (
+            ('customers', lambda index: f"({index},'customer{index}@example.org')"),
+            ('orders', lambda index: f"({index},{index},'{'x' * 200}')"),
+        ):
+            for start in range(0, row_count, ROWS_PER_STATEMENT):
+                rows = ','.join(
+                    make_row(index)
+                    for index in range(start, min(start + ROWS_PER_STATEMENT, row_count))
+                )
+                dump_file.write(f'INSERT INTO `{table}` VALUES {rows};\n')
+
+    return path
+
+
+def restore(database, dump_path):
+    '''
+    Restore the given dump with the MariaDB hook, streaming it from a stand-in for "borg extract
+    --stdout".
+    '''
+    with open(dump_path, 'rb') as dump_file:
+        extract_process = subprocess.Popen(
+            ('cat',), stdin=dump_file, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        module.restore_database_dump(
+            [database],
+            {},
+            'benchmark',
+            database_name='benchmark',
+            dry_run=False,
+            extract_process=extract_process,
+            connection_params={
+                'hostname': None,
+                'port': None,
+                'username': None,
+                'password': None,
+            },
+        )
+        extract_process.wait()
+
+
+def count_rows(database):
+    return int(
+        subprocess.check_output(
+            (
+                'mariadb',
+                '--host',
+                database['hostname'],
+                '--port',
+                str(database['port']),
+                '--protocol',
+                'tcp',
+                '--user',
+                database['username'],
+                '--skip-column-names',
+                '--batch',
+                '--execute',
+                'SELECT COUNT(*) FROM benchmark.orders',
+            ),
+            env=dict(os.environ, MYSQL_PWD=database['password']),
+        )
+    )
+
+
+@pytest.mark.parametrize('fast_restore', (False, True))
+def test_restore(benchmark, database, dump_path, fast_restore):
+    database = dict(database, fast_restore=fast_restore)
+
+    benchmark.pedantic(restore, args=(database, dump_path), rounds=3)
+
+    assert count_rows(database) > 0
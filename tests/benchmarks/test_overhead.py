@@ -0,0 +1,32 @@
+import pytest
+
+from tests.benchmarks import overhead
+
+
+@pytest.fixture(scope='module')
+def fake_borg_setup(tmp_path_factory, scaled):
+    '''
+    Set up borgmatic to run against the fake Borg, and run "create" once so that there's an archive
+    for the other actions to work with. Return the configuration file path and environment.
+    '''
+    config_path, environment = overhead.set_up(
+        str(tmp_path_factory.mktemp('overhead')),
+        overhead.make_script(output_lines=scaled(10000)),
+    )
+    assert overhead.run_action('create', config_path, environment).exit_code == 0
+
+    return (config_path, environment)
+
+
+@pytest.mark.parametrize('action', overhead.ACTIONS)
+def test_action_against_fake_borg(benchmark, fake_borg_setup, action):
+    measurements = []
+
+    benchmark.pedantic(
+        lambda: measurements.append(overhead.run_action(action, *fake_borg_setup)), rounds=3
+    )
+
+    summary = overhead.summarize(measurements)[action]
+    benchmark.extra_info.update(summary)
+
+    assert summary['failed_runs'] == 0
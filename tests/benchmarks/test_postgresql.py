@@ -0,0 +1,165 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from borgmatic.hooks import postgresql as module
+
+
+@pytest.fixture(scope='module')
+def server():
+    '''
+    Return the connection configuration for a PostgreSQL server to benchmark against, as given by
+    the BORGMATIC_BENCHMARK_POSTGRESQL_* environment variables. Skip the benchmarks if there's no
+    such server or no PostgreSQL client commands.
+    '''
+    hostname = os.environ.get('BORGMATIC_BENCHMARK_POSTGRESQL_HOSTNAME')
+
+    if not hostname or not shutil.which('pg_basebackup'):
+        pytest.skip(
+            'A PostgreSQL server (BORGMATIC_BENCHMARK_POSTGRESQL_HOSTNAME) and the PostgreSQL client commands are needed'
+        )
+
+    return {
+        'hostname': hostname,
+        'port': int(os.environ.get('BORGMATIC_BENCHMARK_POSTGRESQL_PORT', '5432')),
+        'username': os.environ.get('BORGMATIC_BENCHMARK_POSTGRESQL_USERNAME', 'postgres'),
+        'password': os.environ.get('BORGMATIC_BENCHMARK_POSTGRESQL_PASSWORD', 'test'),
+    }
+
+
+def run_psql(server, database_name, sql):
+    subprocess.check_call(
+        (
+            'psql',
+            '--no-password',
+            '--no-psqlrc',
+            '--quiet',
+            '--host',
+            server['hostname'],
+            '--port',
+            str(server['port']),
+            '--username',
+            server['username'],
+            '--dbname',
+            database_name,
+            '--command',
+            sql,
+        ),
+        env=dict(os.environ, PGPASSWORD=server['password']),
+    )
+
+
+@pytest.fixture(scope='module')
+def benchmark_database(server, scaled):
+    '''
+    Create a "benchmark" database with a table of a few hundred megabytes (scaled by
+    BORGMATIC_BENCHMARK_SCALE) and an index, replacing any existing one.
+    '''
+    run_psql(server, 'postgres', 'DROP DATABASE IF EXISTS benchmark')
+    run_psql(server, 'postgres', 'CREATE DATABASE benchmark')
+    run_psql(
+        server,
+        'benchmark',
+        'CREATE TABLE events AS SELECT id, md5(id::text) AS kind, repeat(md5(id::text), 8) AS payload '
+        f'FROM generate_series(1, {scaled(1000000)}) AS id; '
+        'CREATE INDEX events_kind ON events (kind)',
+    )
+
+    return dict(server, name='benchmark')
+
+
+def dump(database, dump_directory, output_path):
+    '''
+    Dump the given database with the PostgreSQL hook, reading the dump from its named pipe (as Borg
+    would) into the given output path.
+    '''
+    config = {'borgmatic_source_directory': dump_directory}
+    shutil.rmtree(dump_directory, ignore_errors=True)
+    dump_filename = module.dump.make_database_dump_filename(
+        module.make_dump_path(config), database['name'], database['hostname']
+    )
+    processes = module.dump_databases([database], config, 'benchmark', dry_run=False)
+
+    with open(dump_filename, 'rb') as dump_pipe, open(output_path, 'wb') as output_file:
+        shutil.copyfileobj(dump_pipe, output_file)
+
+    for process in processes:
+        assert process.wait() == 0
+
+
+def restore(database, dump_path):
+    '''
+    Restore the given dump with the PostgreSQL hook, streaming it from a stand-in for "borg extract
+    --stdout".
+    '''
+    with open(dump_path, 'rb') as dump_file:
+        extract_process = subprocess.Popen(
+            ('cat',), stdin=dump_file, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        module.restore_database_dump(
+            [database],
+            {},
+            'benchmark',
+            database_name=database['name'],
+            dry_run=False,
+            extract_process=extract_process,
+            connection_params={
+                'hostname': None,
+                'port': None,
+                'username': None,
+                'password': None,
+                'target_time': None,
+            },
+        )
+        extract_process.wait()
+
+
+def make_database(benchmark_database, mode, data_directory=None):
+    '''
+    Return the database config for dumping the benchmark database logically (as its own database)
+    or physically (as the whole cluster).
+    '''
+    if mode == 'logical':
+        return benchmark_database
+
+    return dict(
+        benchmark_database,
+        name='all',
+        format='physical',
+        restore_data_directory=data_directory,
+        options='--checkpoint=fast',
+    )
+
+
+@pytest.mark.parametrize('mode', ('logical', 'physical'))
+def test_dump(benchmark, benchmark_database, tmp_path, mode):
+    database = make_database(benchmark_database, mode)
+    output_path = str(tmp_path / 'dump')
+
+    benchmark.pedantic(dump, args=(database, str(tmp_path / 'borgmatic'), output_path), rounds=3)
+
+    benchmark.extra_info['dump_bytes'] = os.path.getsize(output_path)
+
+
+@pytest.mark.parametrize('mode', ('logical', 'physical'))
+def test_restore(benchmark, benchmark_database, tmp_path, mode):
+    '''
+    Note that a physical restore only unpacks the backup into a data directory. Starting a server
+    on it (and replaying the WAL fetched during the backup) isn't measured.
+    '''
+    data_directory = str(tmp_path / 'restored')
+    database = make_database(benchmark_database, mode, data_directory)
+    output_path = str(tmp_path / 'dump')
+    dump(database, str(tmp_path / 'borgmatic'), output_path)
+
+    def set_up():
+        shutil.rmtree(data_directory, ignore_errors=True)
+
+        return ((database, output_path), {})
+
+    benchmark.pedantic(restore, setup=set_up, rounds=3)
+
+    if mode == 'physical':
+        assert os.path.exists(os.path.join(data_directory, 'PG_VERSION'))
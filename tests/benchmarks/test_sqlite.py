@@ -0,0 +1,108 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+
+import pytest
+
+from borgmatic.hooks import sqlite as module
+
+ROW_SIZE = 1024
+
+
+@pytest.fixture(scope='module')
+def database_path(tmp_path_factory, scaled):
+    '''
+    Create a SQLite database of a few hundred megabytes (or a few gigabytes with a
+    BORGMATIC_BENCHMARK_SCALE of 10 or so), with a mix of text and blob columns and an index, and
+    return its path.
+    '''
+    path = str(tmp_path_factory.mktemp('sqlite') / 'benchmark.db')
+    connection = sqlite3.connect(path)
+    connection.execute(
+        'CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, created TEXT, payload BLOB)'
+    )
+    row_count = scaled(256 * 1024 * 1024) // ROW_SIZE
+    batch_size = 10000
+
+    for batch_start in range(0, row_count, batch_size):
+        connection.executemany(
+            'INSERT INTO events (kind, created, payload) VALUES (?, ?, ?)',
+            (
+                (f'kind{index % 20}', f'2023-01-01T00:00:{index % 60:02}', os.urandom(ROW_SIZE))
+                for index in range(batch_start, min(batch_start + batch_size, row_count))
+            ),
+        )
+        connection.commit()
+
+    connection.execute('CREATE INDEX events_kind ON events (kind)')
+    connection.commit()
+    connection.close()
+
+    return path
+
+
+def dump(database_path, dump_directory, dump_format):
+    '''
+    Dump the given database with the SQLite hook in the given format and return the dump's path.
+    '''
+    config = {'borgmatic_source_directory': dump_directory}
+    database = {'name': 'benchmark', 'path': database_path, 'format': dump_format}
+    shutil.rmtree(dump_directory, ignore_errors=True)
+
+    for process in module.dump_databases([database], config, 'benchmark', dry_run=False):
+        assert process.wait() == 0
+
+    return module.dump.make_database_dump_filename(module.make_dump_path(config), 'benchmark')
+
+
+def restore(dump_path, restore_path, dump_format):
+    '''
+    Restore the given dump with the SQLite hook in the given format, streaming it from a stand-in
+    for "borg extract --stdout".
+    '''
+    with open(dump_path, 'rb') as dump_file:
+        extract_process = subprocess.Popen(
+            ('cat',), stdin=dump_file, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        module.restore_database_dump(
+            [{'name': 'benchmark', 'path': restore_path, 'format': dump_format}],
+            {},
+            'benchmark',
+            database_name='benchmark',
+            dry_run=False,
+            extract_process=extract_process,
+            connection_params={'restore_path': None},
+        )
+        extract_process.wait()
+
+
+def skip_without_sqlite3_command(dump_format):
+    if dump_format == 'sql' and not shutil.which('sqlite3'):
+        pytest.skip('The sqlite3 command is needed for "sql" format dumps')
+
+
+@pytest.mark.parametrize('dump_format', ('sql', 'binary'))
+def test_dump(benchmark, database_path, tmp_path, dump_format):
+    skip_without_sqlite3_command(dump_format)
+    dump_directory = str(tmp_path / 'borgmatic')
+
+    dump_path = benchmark.pedantic(
+        dump, args=(database_path, dump_directory, dump_format), rounds=3
+    )
+
+    benchmark.extra_info['database_bytes'] = os.path.getsize(database_path)
+    benchmark.extra_info['dump_bytes'] = os.path.getsize(dump_path)
+
+
+@pytest.mark.parametrize('dump_format', ('sql', 'binary'))
+def test_restore(benchmark, database_path, tmp_path, dump_format):
+    skip_without_sqlite3_command(dump_format)
+    dump_path = dump(database_path, str(tmp_path / 'borgmatic'), dump_format)
+    restore_path = str(tmp_path / 'restored.db')
+
+    benchmark.pedantic(restore, args=(dump_path, restore_path, dump_format), rounds=3)
+
+    connection = sqlite3.connect(restore_path)
+    assert connection.execute('SELECT count(*) FROM events').fetchone()[0] > 0
+    connection.close()
@@ -0,0 +1,98 @@
+import datetime
+import os
+
+from borgmatic.borg import check as module
+
+
+def test_write_check_times_then_read_check_times_round_trips(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+    run_time = datetime.datetime(2023, 9, 1, 12, 30)
+
+    module.write_check_times(
+        config,
+        '1234',
+        ('repository', 'archives'),
+        archives_check_id='5678',
+        archive_filter_flags=('--last', '3'),
+        run_time=run_time,
+        duration=datetime.timedelta(seconds=5),
+    )
+
+    assert module.read_check_times(config, '1234') == {
+        ('repository', 'all'): run_time,
+        ('archives', '5678'): run_time,
+    }
+    assert module.read_check_times(config, 'other') == {}
+
+
+def test_write_check_times_with_failure_keeps_last_success_time(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+    success_time = datetime.datetime(2023, 9, 1, 12, 30)
+
+    module.write_check_times(config, '1234', ('extract',), run_time=success_time)
+    module.write_check_times(
+        config,
+        '1234',
+        ('extract',),
+        run_time=datetime.datetime(2023, 9, 2, 12, 30),
+        succeeded=False,
+    )
+
+    assert module.read_check_times(config, '1234') == {('extract', 'all'): success_time}
+
+
+def test_write_check_times_with_failure_and_no_prior_success_records_no_check_time(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+
+    module.write_check_times(config, '1234', ('repository',), succeeded=False)
+
+    assert module.read_check_times(config, '1234') == {}
+
+
+def test_migrate_check_time_files_imports_legacy_check_times_and_deletes_them(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+    checks_path = tmp_path / 'checks' / '1234'
+    (checks_path / 'archives').mkdir(parents=True)
+    (checks_path / 'repository').touch()
+    (checks_path / 'archives' / '5678').touch()
+    (checks_path / 'data').touch()
+    os.utime(checks_path / 'repository', (10, 10))
+    os.utime(checks_path / 'archives' / '5678', (20, 20))
+    os.utime(checks_path / 'data', (30, 30))
+
+    module.migrate_check_time_files(config, '1234')
+
+    assert module.read_check_times(config, '1234') == {
+        ('repository', 'all'): datetime.datetime.fromtimestamp(10),
+        ('archives', '5678'): datetime.datetime.fromtimestamp(20),
+        ('data', 'all'): datetime.datetime.fromtimestamp(30),
+    }
+    assert not checks_path.exists()
+
+
+def test_migrate_check_time_files_prefers_existing_state_database_check_times(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+    run_time = datetime.datetime(2023, 9, 1, 12, 30)
+    module.write_check_times(config, '1234', ('repository',), run_time=run_time)
+    checks_path = tmp_path / 'checks' / '1234'
+    checks_path.mkdir(parents=True)
+    (checks_path / 'repository').touch()
+    os.utime(checks_path / 'repository', (10, 10))
+
+    module.migrate_check_time_files(config, '1234')
+
+    assert module.read_check_times(config, '1234') == {('repository', 'all'): run_time}
+
+
+def test_hash_file_hashes_file_contents(tmp_path):
+    path = tmp_path / 'file'
+    path.write_bytes(b'hello')
+
+    assert (
+        module.hash_file(str(path))
+        == '2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824'
+    )
+
+
+def test_hash_file_with_missing_file_returns_none(tmp_path):
+    assert module.hash_file(str(tmp_path / 'missing')) is None
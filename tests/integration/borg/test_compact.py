@@ -0,0 +1,36 @@
+import datetime
+
+from borgmatic.borg import compact as module
+
+
+def test_record_reclaimable_space_then_record_compaction_round_trips(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path), 'compact_threshold_bytes': 1000}
+    compact_time = datetime.datetime(2023, 9, 1, 12, 30)
+
+    module.record_compaction('repo', config, compact_time=compact_time)
+    module.record_reclaimable_space('repo', config, 600)
+
+    assert module.compact_due('repo', config) is None
+
+    module.record_reclaimable_space('repo', config, 600)
+    module.record_reclaimable_space('repo', config, -100)
+
+    assert module.compact_due('repo', config) == '1200 bytes reclaimable'
+
+    module.record_compaction('repo', config, compact_time=compact_time)
+
+    assert module.compact_due('repo', config) is None
+    assert module.compact_due('other', config) == 'no previous compact recorded'
+
+
+def test_record_reclaimable_space_with_unknown_space_makes_compact_due(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path), 'compact_threshold_bytes': 1000}
+
+    module.record_compaction('repo', config)
+    module.record_reclaimable_space('repo', config, None)
+
+    assert module.compact_due('repo', config) == 'reclaimable space unknown'
+
+    module.record_compaction('repo', config)
+
+    assert module.compact_due('repo', config) is None
@@ -0,0 +1,19 @@
+import gzip
+
+from flexmock import flexmock
+
+from borgmatic.borg import file_status as module
+
+
+def test_file_list_summarizer_writes_gzip_compressed_listing(tmp_path):
+    flexmock(module.logger).should_receive('log')
+    listing_path = tmp_path / 'logs' / 'files.log.gz'
+    summarizer = module.File_list_summarizer('repo', str(listing_path))
+
+    summarizer.handle_line('A /home/user/new.txt')
+    summarizer.handle_line('Archive name: archive')
+    summarizer.handle_line('M /etc/hosts')
+    summarizer.finish()
+
+    with gzip.open(listing_path, 'rt') as listing_file:
+        assert listing_file.read() == 'A /home/user/new.txt\nM /etc/hosts\n'
@@ -0,0 +1,53 @@
+import datetime
+
+from borgmatic.borg import history as module
+
+
+def test_record_create_statistics_then_read_archive_statistics_round_trips(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+    archive = {
+        'name': 'archive',
+        'start': '2023-09-01T12:30:00.000000',
+        'duration': 12.5,
+        'stats': {
+            'original_size': 4000,
+            'compressed_size': 3000,
+            'deduplicated_size': 1000,
+            'nfiles': 10,
+        },
+    }
+
+    module.record_create_statistics(
+        config, 'repo', {'archive': archive, 'cache': {'stats': {'unique_csize': 5000}}}
+    )
+    module.record_create_statistics(
+        config, 'other', {'archives': [dict(archive, name='other-archive')]}
+    )
+
+    assert module.read_archive_statistics(config, 'repo') == [
+        {
+            'name': 'archive',
+            'start_time': datetime.datetime(2023, 9, 1, 12, 30).timestamp(),
+            'duration': 12.5,
+            'original_size': 4000,
+            'compressed_size': 3000,
+            'deduplicated_size': 1000,
+            'file_count': 10,
+            'repository_unique_size': 5000,
+        }
+    ]
+    assert module.read_archive_statistics(config, 'other')[0]['repository_unique_size'] is None
+
+
+def test_record_action_duration_then_read_action_durations_round_trips(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+
+    module.record_action_duration(config, 'repo', 'create', 200, 20.0)
+    module.record_action_duration(config, 'repo', 'create', 100, 10.0)
+    module.record_action_duration(config, 'repo', 'prune', 300, 5.0)
+    module.record_action_duration(config, 'other', 'create', 100, 99.0)
+
+    assert module.read_action_durations(config, 'repo') == {
+        'create': [10.0, 20.0],
+        'prune': [5.0],
+    }
@@ -0,0 +1,87 @@
+import pytest
+from flexmock import flexmock
+
+from borgmatic.borg import state as module
+
+
+def test_open_state_database_creates_schema(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path / 'borgmatic')}
+
+    with module.open_state_database(config) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM check_times').fetchone() == (0,)
+
+    assert (tmp_path / 'borgmatic' / 'state.db').stat().st_mode & 0o777 == 0o600
+
+
+def test_open_state_database_rolls_back_on_error(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+
+    with pytest.raises(ValueError):
+        with module.open_state_database(config) as connection:
+            connection.execute(
+                '''
+                INSERT INTO check_times
+                (repository_id, check_type, archives_check_id, last_run_time, last_outcome)
+                VALUES ('1234', 'repository', 'all', 1, 'success')
+                '''
+            )
+            raise ValueError()
+
+    with module.open_state_database(config) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM check_times').fetchone() == (0,)
+
+
+def test_set_value_then_get_value_round_trips(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+
+    with module.open_state_database(config) as connection:
+        module.set_value(connection, 'namespace', 'key', {'foo': [1, 2]})
+
+    with module.open_state_database(config) as connection:
+        assert module.get_value(connection, 'namespace', 'key') == {'foo': [1, 2]}
+        assert module.get_value(connection, 'other', 'key') is None
+        assert module.get_value(connection, 'namespace', 'other', default=5) == 5
+
+
+def test_set_value_replaces_existing_value(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+
+    with module.open_state_database(config) as connection:
+        module.set_value(connection, 'namespace', 'key', 1)
+        module.set_value(connection, 'namespace', 'key', 2)
+
+        assert module.get_value(connection, 'namespace', 'key') == 2
+
+
+def test_get_values_returns_all_values_in_namespace(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+
+    with module.open_state_database(config) as connection:
+        module.set_value(connection, 'namespace', 'key', 1)
+        module.set_value(connection, 'namespace', 'other', [2])
+        module.set_value(connection, 'elsewhere', 'key', 3)
+
+        assert module.get_values(connection, 'namespace') == {'key': 1, 'other': [2]}
+        assert module.get_values(connection, 'nothing') == {}
+
+
+def test_delete_value_removes_value(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+
+    with module.open_state_database(config) as connection:
+        module.set_value(connection, 'namespace', 'key', 1)
+        module.delete_value(connection, 'namespace', 'key')
+
+        assert module.get_value(connection, 'namespace', 'key') is None
+
+
+def test_open_state_database_with_immediate_takes_write_lock_up_front(tmp_path):
+    config = {'borgmatic_source_directory': str(tmp_path)}
+    flexmock(module).STATE_DATABASE_TIMEOUT_SECONDS = 0
+
+    with module.open_state_database(config, immediate=True) as connection:
+        assert connection.in_transaction
+
+        with pytest.raises(module.sqlite3.OperationalError):
+            with module.open_state_database(config, immediate=True):
+                pass
@@ -318,6 +318,29 @@ def test_parse_arguments_disallows_other_actions_with_config_bootstrap():
         module.parse_arguments('config', 'bootstrap', '--repository', 'test.borg', 'list')
 
 
+def test_parse_arguments_disallows_other_actions_with_daemon():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    with pytest.raises(ValueError):
+        module.parse_arguments('daemon', 'create')
+
+
+def test_parse_arguments_disallows_multiple_daemon_commands():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    with pytest.raises(ValueError):
+        module.parse_arguments('daemon', '--status', '--trigger')
+
+
+def test_parse_arguments_allows_daemon_command():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    arguments = module.parse_arguments('daemon', '--socket', '/tmp/daemon.sock', '--status')
+
+    assert arguments['daemon'].socket == '/tmp/daemon.sock'
+    assert arguments['daemon'].status
+
+
 def test_parse_arguments_allows_archive_with_extract():
     flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
 
@@ -449,6 +472,20 @@ def test_parse_arguments_disallows_list_with_json_for_create_action():
         module.parse_arguments('create', '--list', '--json')
 
 
+def test_parse_arguments_disallows_list_summary_with_progress_for_create_action():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    with pytest.raises(ValueError):
+        module.parse_arguments('create', '--list-summary', '--progress')
+
+
+def test_parse_arguments_disallows_list_summary_with_json_for_create_action():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    with pytest.raises(ValueError):
+        module.parse_arguments('create', '--list-summary', '--json')
+
+
 def test_parse_arguments_allows_json_with_list_or_info():
     flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
 
@@ -616,3 +653,12 @@ def test_parse_arguments_config_with_subaction_and_explicit_config_file_does_not
     module.parse_arguments(
         'config', 'bootstrap', '--repository', 'repo.borg', '--config', 'test.yaml'
     )
+
+
+def test_parse_arguments_with_check_force_does_not_ignore_compact_frequency():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    arguments = module.parse_arguments('check', '--force', 'compact')
+
+    assert arguments['check'].force
+    assert not arguments['compact'].ignore_compact_frequency
@@ -266,3 +266,32 @@ def test_parse_configuration_applies_normalization():
         'exclude_if_present': ['.nobackup'],
     }
     assert logs
+
+
+def test_validate_configuration_validates_already_loaded_configuration():
+    schema = module.load.load_configuration(module.schema_filename())
+
+    config, logs = module.validate_configuration(
+        'config.yaml',
+        {'source_directories': ['/home'], 'repositories': [{'path': 'hostname.borg'}]},
+        schema,
+        overrides=['keep_daily=7'],
+    )
+
+    assert config == {
+        'source_directories': ['/home'],
+        'repositories': [{'path': 'hostname.borg'}],
+        'keep_daily': 7,
+    }
+    assert logs == []
+
+
+def test_validate_configuration_raises_for_validation_error():
+    schema = module.load.load_configuration(module.schema_filename())
+
+    with pytest.raises(module.Validation_error):
+        module.validate_configuration(
+            'config.yaml',
+            {'source_directories': True, 'repositories': [{'path': 'hostname.borg'}]},
+            schema,
+        )
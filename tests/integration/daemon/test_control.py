@@ -0,0 +1,97 @@
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from borgmatic.daemon import control as module
+
+
+def serve_one_connection(server_socket, handle_command):
+    connection, _ = server_socket.accept()
+    module.handle_connection(connection, handle_command)
+
+
+def start_server(socket_path, handle_command):
+    server_socket = module.open_control_socket(socket_path)
+    thread = threading.Thread(target=serve_one_connection, args=(server_socket, handle_command))
+    thread.start()
+
+    return server_socket, thread
+
+
+def test_open_control_socket_listens_with_user_only_permissions(tmp_path):
+    socket_path = str(tmp_path / 'borgmatic' / 'daemon.sock')
+
+    with module.open_control_socket(socket_path):
+        assert stat.S_ISSOCK(os.stat(socket_path).st_mode)
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+
+def test_open_control_socket_replaces_stale_socket_file(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    module.open_control_socket(socket_path).close()
+
+    with module.open_control_socket(socket_path):
+        assert os.path.exists(socket_path)
+
+
+def test_open_control_socket_with_bind_error_closes_socket_and_raises(tmp_path):
+    socket_path = str(tmp_path / ('x' * 200))
+
+    with pytest.raises(OSError):
+        module.open_control_socket(socket_path)
+
+
+def test_send_command_returns_response_from_daemon(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    server_socket, thread = start_server(socket_path, lambda command: {'command': command})
+
+    with server_socket:
+        assert module.send_command(socket_path, 'status') == {'command': 'status'}
+        thread.join()
+
+
+def test_send_command_with_unknown_command_raises(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    server_socket, thread = start_server(socket_path, lambda command: {})
+
+    with server_socket:
+        with pytest.raises(ValueError, match='Unknown command'):
+            module.send_command(socket_path, 'explode')
+
+        thread.join()
+
+
+def test_send_command_without_daemon_raises(tmp_path):
+    with pytest.raises(OSError):
+        module.send_command(str(tmp_path / 'daemon.sock'), 'status')
+
+
+def test_handle_connection_with_invalid_request_responds_with_error(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    server_socket, thread = start_server(socket_path, lambda command: {})
+
+    with server_socket, socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect(socket_path)
+        client_socket.sendall(b'not json\n')
+        response = json.loads(client_socket.makefile().readline())
+        thread.join()
+
+    assert 'Invalid request' in response['error']
+
+
+def test_handle_connection_with_connection_closed_early_responds_with_error(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    server_socket, thread = start_server(socket_path, lambda command: {})
+
+    with server_socket, socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect(socket_path)
+        client_socket.sendall(b'{"command": ')
+        client_socket.shutdown(socket.SHUT_WR)
+        response = json.loads(client_socket.makefile().readline())
+        thread.join()
+
+    assert 'Connection closed' in response['error']
@@ -0,0 +1,22 @@
+import pytest
+
+from borgmatic.daemon import run as module
+
+
+def test_acquire_daemon_lock_prevents_second_daemon(tmp_path):
+    socket_path = str(tmp_path / 'borgmatic' / 'daemon.sock')
+
+    with module.acquire_daemon_lock(socket_path):
+        with pytest.raises(ValueError):
+            with module.acquire_daemon_lock(socket_path):
+                pass
+
+
+def test_acquire_daemon_lock_releases_lock_on_exit(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+
+    with module.acquire_daemon_lock(socket_path):
+        pass
+
+    with module.acquire_daemon_lock(socket_path):
+        pass
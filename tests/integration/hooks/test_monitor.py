@@ -0,0 +1,25 @@
+import logging
+
+from borgmatic.hooks import monitor as module
+
+
+def test_log_buffering_handler_is_shared_until_last_hook_removes_it():
+    root_logger = logging.getLogger()
+    original_handlers = list(root_logger.handlers)
+
+    module.add_log_buffering_handler('healthchecks', 1000, logging.WARNING)
+    module.add_log_buffering_handler('ntfy', 2000, logging.WARNING)
+    handler = module.get_log_buffering_handler()
+
+    assert root_logger.handlers == original_handlers + [handler]
+    assert handler.byte_capacity == 2000
+
+    logging.getLogger(__name__).warning('Backing up')
+    module.remove_log_buffering_handler('healthchecks')
+
+    assert module.format_buffered_logs_for_payload() == 'Backing up\n'
+
+    module.remove_log_buffering_handler('ntfy')
+
+    assert root_logger.handlers == original_handlers
+    assert module.format_buffered_logs_for_payload() == ''
@@ -0,0 +1,21 @@
+import subprocess
+
+from borgmatic.hooks import mysql_fast_restore as module
+
+
+def test_restore_stream_feeds_extract_output_wrapped_in_session_statements(tmp_path):
+    restored_path = tmp_path / 'restored.sql'
+    extract_process = subprocess.Popen(
+        ('printf', 'INSERT INTO foo VALUES (1);\\n'),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    module.restore_stream(
+        ('sh', '-c', f'cat > {restored_path}'),
+        extract_process,
+        (b'prelude;\n', b'epilogue;\n'),
+        None,
+    )
+
+    assert restored_path.read_bytes() == b'prelude;\nINSERT INTO foo VALUES (1);\nepilogue;\n'
@@ -0,0 +1,115 @@
+import http.server
+import threading
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.hooks import monitor
+from borgmatic.hooks import outbox as module
+
+
+class Recording_handler(http.server.BaseHTTPRequestHandler):
+    '''
+    A stand-in for a monitoring service, recording the requests it receives and responding with
+    the status code set on the server.
+    '''
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.received.append((self.path, body))
+        self.send_response(self.server.status_code)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def monitoring_service():
+    server = http.server.HTTPServer(('127.0.0.1', 0), Recording_handler)
+    server.received = []
+    server.status_code = 200
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True
+    )
+    thread.start()
+
+    # Use a fresh session that doesn't sleep between retries.
+    flexmock(monitor).RETRY_BACKOFF_FACTOR = 0
+    flexmock(monitor).session = None
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def save_request(config, state, payload):
+    module.save_undelivered_request(
+        monitor.requests.exceptions.ConnectionError(),
+        config,
+        'test.yaml',
+        'healthchecks',
+        state,
+        {'payload': payload},
+    )
+
+
+def make_config(tmp_path, monitoring_service):
+    return {
+        'borgmatic_source_directory': str(tmp_path),
+        'healthchecks': {
+            'ping_url': f'http://127.0.0.1:{monitoring_service.server_port}/secret-uuid',
+            'timeout': 5,
+        },
+    }
+
+
+def test_save_undelivered_request_does_not_store_ping_url(tmp_path, monitoring_service):
+    config = make_config(tmp_path, monitoring_service)
+    save_request(config, monitor.State.FAIL, 'failure')
+
+    assert b'secret-uuid' not in (tmp_path / 'state.db').read_bytes()
+
+
+def test_flush_undelivered_requests_delivers_saved_requests_in_order_once(
+    tmp_path, monitoring_service
+):
+    config = make_config(tmp_path, monitoring_service)
+    save_request(config, monitor.State.FAIL, 'first failure')
+    save_request(config, monitor.State.FINISH, 'success')
+    save_request(config, monitor.State.FAIL, 'second failure')
+
+    assert module.flush_undelivered_requests(config, 'test.yaml', dry_run=False) == (2, 0, 0)
+    assert monitoring_service.received == [
+        ('/secret-uuid', b'success'),
+        ('/secret-uuid/fail', b'second failure'),
+    ]
+    assert module.flush_undelivered_requests(config, 'test.yaml', dry_run=False) == (0, 0, 0)
+    assert len(monitoring_service.received) == 2
+
+
+def test_flush_undelivered_requests_keeps_requests_while_service_is_unavailable(
+    tmp_path, monitoring_service
+):
+    config = make_config(tmp_path, monitoring_service)
+    save_request(config, monitor.State.FINISH, 'success')
+    monitoring_service.status_code = 503
+
+    assert module.flush_undelivered_requests(config, 'test.yaml', dry_run=False) == (0, 0, 1)
+
+    monitoring_service.status_code = 200
+
+    assert module.flush_undelivered_requests(config, 'test.yaml', dry_run=False) == (1, 0, 0)
+    assert monitoring_service.received[-1] == ('/secret-uuid', b'success')
+
+
+def test_flush_undelivered_requests_discards_requests_rejected_by_service(
+    tmp_path, monitoring_service
+):
+    config = make_config(tmp_path, monitoring_service)
+    save_request(config, monitor.State.FINISH, 'success')
+    monitoring_service.status_code = 404
+
+    assert module.flush_undelivered_requests(config, 'test.yaml', dry_run=False) == (0, 1, 0)
+    assert module.flush_undelivered_requests(config, 'test.yaml', dry_run=False) == (0, 0, 0)
@@ -0,0 +1,76 @@
+import os
+
+from borgmatic.hooks import postgresql_wal as module
+
+
+def test_dump_incrementally_ingests_only_new_wal_and_restores_with_recovery_settings(tmp_path):
+    cluster_directory = tmp_path / 'cluster'
+    cluster_directory.mkdir()
+    (cluster_directory / 'PG_VERSION').write_text('16\n')
+    wal_archive_directory = tmp_path / 'wal_archive'
+    wal_archive_directory.mkdir()
+    (wal_archive_directory / '000000010000000000000001').write_bytes(b'before base backup')
+    config = {'borgmatic_source_directory': str(tmp_path / 'borgmatic')}
+    database = {
+        'name': 'all',
+        'format': 'physical',
+        'wal_archive_directory': str(wal_archive_directory),
+    }
+    cache_directory = module.make_cache_directory(config, database)
+    base_backup_command = (
+        'tar',
+        '--create',
+        '--directory',
+        str(cluster_directory),
+        '.',
+        '>',
+        os.path.join(cache_directory, module.BASE_BACKUP_FILENAME),
+    )
+
+    def dump(dump_directory):
+        module.dump_incrementally(
+            config,
+            database,
+            cache_directory,
+            str(dump_directory),
+            base_backup_command,
+            None,
+            'test.yaml',
+        )
+
+    dump(tmp_path / 'first')
+    (wal_archive_directory / '000000010000000000000002').write_bytes(b'after base backup')
+    (wal_archive_directory / '000000010000000000000003').write_bytes(b'still being arch')
+    (wal_archive_directory / '000000010000000000000004.tmp').write_bytes(b'partial')
+    dump(tmp_path / 'second')
+
+    assert os.listdir(tmp_path / 'first' / 'wal') == []
+    assert os.listdir(tmp_path / 'second' / 'wal') == ['000000010000000000000002']
+
+    (wal_archive_directory / '000000010000000000000003').write_bytes(b'now fully archived')
+    (wal_archive_directory / '000000010000000000000004').write_bytes(b'still being arch')
+    dump(tmp_path / 'third')
+
+    assert sorted(os.listdir(tmp_path / 'third' / 'wal')) == [
+        '000000010000000000000002',
+        '000000010000000000000003',
+    ]
+    assert (tmp_path / 'third' / 'wal' / '000000010000000000000003').read_bytes() == (
+        b'now fully archived'
+    )
+
+    data_directory = tmp_path / 'restored'
+    data_directory.mkdir()
+    module.restore_incrementally(
+        str(tmp_path / 'second'), str(data_directory), '2024-01-31 12:00:00'
+    )
+
+    assert (data_directory / 'PG_VERSION').read_text() == '16\n'
+    assert (data_directory / 'borgmatic_wal' / '000000010000000000000002').read_bytes() == (
+        b'after base backup'
+    )
+    assert (
+        "recovery_target_time = '2024-01-31 12:00:00'"
+        in (data_directory / 'postgresql.auto.conf').read_text()
+    )
+    assert (data_directory / 'recovery.signal').exists()
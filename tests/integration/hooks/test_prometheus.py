@@ -0,0 +1,76 @@
+from flexmock import flexmock
+
+from borgmatic.borg import history
+from borgmatic.hooks import prometheus as module
+
+
+def test_ping_monitor_writes_metrics_for_each_configuration_file_sharing_text_file(tmp_path):
+    textfile_path = tmp_path / 'textfile_collector' / 'borgmatic.prom'
+    hook_config = {'textfile_path': str(textfile_path)}
+    config_paths = (tmp_path / 'first.yaml', tmp_path / 'second.yaml', tmp_path / 'gone.yaml')
+
+    for config_path in config_paths:
+        config_path.write_text('')
+
+    configs = [
+        {
+            'borgmatic_source_directory': str(tmp_path / 'borgmatic'),
+            'repositories': [{'path': f'repo{index}'}],
+            'prometheus': hook_config,
+        }
+        for index in range(3)
+    ]
+    history.record_action_duration(configs[0], 'repo0', 'create', 1000, 42)
+    history.record_create_statistics(
+        configs[0],
+        'repo0',
+        {
+            'archive': {
+                'name': 'archive',
+                'start': '2023-10-01T12:00:00',
+                'duration': 42,
+                'stats': {'original_size': 400, 'deduplicated_size': 100, 'nfiles': 7},
+            }
+        },
+    )
+    flexmock(module.time).should_receive('time').and_return(2000)
+
+    for config, config_path, state in zip(
+        configs, config_paths, (module.monitor.State.FINISH, module.monitor.State.FAIL) * 2
+    ):
+        module.ping_monitor(
+            hook_config, config, str(config_path), state, monitoring_log_level=1, dry_run=False
+        )
+
+    config_paths[2].unlink()
+    module.ping_monitor(
+        hook_config,
+        configs[0],
+        str(config_paths[0]),
+        module.monitor.State.FINISH,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+    metrics = textfile_path.read_text()
+    first = str(config_paths[0])
+    second = str(config_paths[1])
+
+    assert f'borgmatic_last_run_success{{config="{first}"}} 1.0\n' in metrics
+    assert f'borgmatic_last_run_success{{config="{second}"}} 0.0\n' in metrics
+    assert f'borgmatic_errors_total{{config="{second}"}} 1.0\n' in metrics
+    assert (
+        f'borgmatic_last_success_timestamp_seconds{{config="{first}",repository="repo0"}} 2000.0\n'
+        in metrics
+    )
+    assert (
+        f'borgmatic_archive_deduplication_ratio{{config="{first}",repository="repo0"}} 4.0\n'
+        in metrics
+    )
+    assert (
+        f'borgmatic_action_duration_seconds{{config="{first}",repository="repo0",action="create"}} 42.0\n'
+        in metrics
+    )
+    assert 'gone.yaml' not in metrics
+    assert [path.name for path in textfile_path.parent.iterdir()] == ['borgmatic.prom']
+    assert textfile_path.stat().st_mode & 0o777 == 0o644
@@ -0,0 +1,110 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+
+from borgmatic.hooks import sqlite as module
+
+
+def test_binary_dump_and_restore_round_trips_database(tmp_path):
+    database_path = str(tmp_path / 'test.db')
+    dump_path = str(tmp_path / 'dump')
+    connection = sqlite3.connect(database_path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('CREATE TABLE things (id INTEGER PRIMARY KEY, name TEXT)')
+    connection.executemany(
+        'INSERT INTO things (name) VALUES (?)', ((f'thing{index}',) for index in range(5000))
+    )
+    connection.commit()
+
+    module.backup_database(database_path, dump_path)
+    connection.execute('DELETE FROM things')
+    connection.commit()
+    connection.close()
+
+    with open(dump_path, 'rb') as dump_file:
+        extract_process = subprocess.Popen(
+            ('cat',), stdin=dump_file, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        module.restore_database_file(extract_process, database_path, 'test.yaml')
+
+    connection = sqlite3.connect(database_path)
+    assert connection.execute('SELECT count(*) FROM things').fetchone() == (5000,)
+    connection.close()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['dump', 'test.db']
+
+
+def test_get_database_fingerprint_changes_when_database_changes(tmp_path):
+    database_path = str(tmp_path / 'test.db')
+    connection = sqlite3.connect(database_path)
+    connection.execute('CREATE TABLE things (id INTEGER PRIMARY KEY, name TEXT)')
+    connection.commit()
+
+    fingerprint = module.get_database_fingerprint(database_path, 'sql')
+
+    assert fingerprint == module.get_database_fingerprint(database_path, 'sql')
+    assert fingerprint != module.get_database_fingerprint(database_path, 'binary')
+    assert fingerprint[-1] is None
+
+    connection.execute('INSERT INTO things (name) VALUES (?)', ('thing',))
+    connection.commit()
+    connection.close()
+
+    assert fingerprint != module.get_database_fingerprint(database_path, 'sql')
+
+
+def test_get_database_fingerprint_changes_when_write_ahead_log_changes(tmp_path):
+    database_path = str(tmp_path / 'test.db')
+    connection = sqlite3.connect(database_path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA wal_autocheckpoint=0')
+    connection.execute('CREATE TABLE things (id INTEGER PRIMARY KEY, name TEXT)')
+    connection.commit()
+    fingerprint = module.get_database_fingerprint(database_path, 'sql')
+
+    connection.execute('INSERT INTO things (name) VALUES (?)', ('thing',))
+    connection.commit()
+
+    assert fingerprint[-1] is not None
+    assert fingerprint != module.get_database_fingerprint(database_path, 'sql')
+    connection.close()
+
+
+def test_get_database_fingerprint_of_missing_database_is_none(tmp_path):
+    assert module.get_database_fingerprint(str(tmp_path / 'missing.db'), 'sql') is None
+
+
+def test_dump_databases_with_skip_unchanged_reuses_dump_until_database_changes(tmp_path):
+    database_path = str(tmp_path / 'test.db')
+    config = {'borgmatic_source_directory': str(tmp_path / '.borgmatic')}
+    databases = [
+        {'name': 'test', 'path': database_path, 'format': 'binary', 'skip_unchanged': True}
+    ]
+    dump_filename = str(tmp_path / '.borgmatic' / 'sqlite_databases' / 'localhost' / 'test')
+    connection = sqlite3.connect(database_path)
+    connection.execute('CREATE TABLE things (id INTEGER PRIMARY KEY, name TEXT)')
+    connection.commit()
+
+    def dump_and_remove():
+        module.dump_databases(databases, config, 'test.yaml', dry_run=False)
+        with open(dump_filename, 'rb') as dump_file:
+            dump_inode = os.fstat(dump_file.fileno()).st_ino
+            dump_contents = dump_file.read()
+        shutil.rmtree(os.path.dirname(os.path.dirname(dump_filename)))
+
+        return (dump_inode, dump_contents)
+
+    first_inode, first_contents = dump_and_remove()
+    second_inode, second_contents = dump_and_remove()
+
+    assert second_inode == first_inode
+    assert second_contents == first_contents
+
+    connection.execute('INSERT INTO things (name) VALUES (?)', ('thing',))
+    connection.commit()
+    connection.close()
+    third_inode, third_contents = dump_and_remove()
+
+    assert third_inode != first_inode
+    assert third_contents != first_contents
+    assert os.listdir(tmp_path / '.borgmatic' / 'sqlite_dump_cache') == ['test']
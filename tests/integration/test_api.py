@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic import api as module
+
+
+def test_make_arguments_parses_actions_like_the_command_line():
+    arguments = module.make_arguments(
+        'config.yaml', {'create': {}, 'check': {'only': ['repository']}}, False, 0
+    )
+
+    assert set(arguments) == {'global', 'create', 'check'}
+    assert arguments['create'].json is True
+    assert arguments['create'].stats is False
+    assert arguments['check'].only == ['repository']
+
+
+def test_make_arguments_with_unknown_action_raises():
+    with pytest.raises(ValueError, match='Unrecognized argument'):
+        module.make_arguments('config.yaml', ('explode',), False, 0)
+
+
+def make_config(tmp_path, repository_path):
+    return {
+        'source_directories': [str(tmp_path)],
+        'repositories': [{'path': repository_path}],
+        'borgmatic_source_directory': str(tmp_path / '.borgmatic'),
+        'keep_daily': 1,
+    }
+
+
+def test_run_with_config_dict_runs_actions_and_reports_results(tmp_path):
+    flexmock(module.borgmatic.commands.borgmatic.borg_version).should_receive(
+        'local_borg_version'
+    ).and_return('1.2.3')
+    flexmock(module.borgmatic.actions.create).should_receive('run_create').and_yield(
+        {'archive': {'name': 'archive'}}
+    )
+    flexmock(module.borgmatic.actions.prune).should_receive('run_prune').once()
+    received = []
+
+    result = module.run(
+        make_config(tmp_path, 'repo.borg'),
+        actions=('create', 'prune'),
+        on_event=received.append,
+        config_filename='backups',
+    )
+
+    assert result['succeeded'] is True
+    assert result['errors'] == []
+    assert [(output['repository'], output['action']) for output in result['outputs']] == [
+        ('repo.borg', 'create')
+    ]
+    assert result['outputs'][0]['data'] == {'archive': {'name': 'archive'}}
+    assert [event['type'] for event in received] == [
+        'run_start',
+        'action_start',
+        'output',
+        'action_end',
+        'action_start',
+        'action_end',
+        'run_end',
+    ]
+
+
+def test_run_with_failing_action_reports_error(tmp_path):
+    flexmock(module.borgmatic.commands.borgmatic.borg_version).should_receive(
+        'local_borg_version'
+    ).and_return('1.2.3')
+    flexmock(module.borgmatic.actions.check).should_receive('run_check').and_raise(
+        ValueError('Oops')
+    )
+
+    result = module.run(make_config(tmp_path, 'repo.borg'), actions=('check',))
+
+    assert result['succeeded'] is False
+    assert any('Oops' in error for error in result['errors'])
+
+
+def test_concurrent_runs_in_threads_each_see_only_their_own_events(tmp_path):
+    flexmock(module.borgmatic.commands.borgmatic.borg_version).should_receive(
+        'local_borg_version'
+    ).and_return('1.2.3')
+    barrier = threading.Barrier(2)
+
+    def run_check(config_filename, repository, *args, **kwargs):
+        barrier.wait(timeout=10)
+
+    flexmock(module.borgmatic.actions.check).should_receive('run_check').replace_with(run_check)
+    results = {}
+
+    def run(name):
+        results[name] = module.run(
+            make_config(tmp_path / name, f'{name}.borg'), actions=('check',), config_filename=name
+        )
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ('one', 'two')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    for name in ('one', 'two'):
+        assert results[name]['succeeded'] is True
+        assert {event['config_filename'] for event in results[name]['events']} == {name}
+        assert {
+            event['repository'] for event in results[name]['events'] if 'repository' in event
+        } == {f'{name}.borg'}
@@ -58,12 +58,71 @@ def test_run_check_runs_with_selected_repository():
     )
 
 
+def test_run_check_with_checks_run_records_action_run():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.borg.check).should_receive('check_archives').and_return(
+        ('repository',)
+    )
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook')
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').with_args(
+        dict, 'repo', 'check', float, False
+    ).once()
+    check_arguments = flexmock(
+        repository=None,
+        progress=flexmock(),
+        repair=flexmock(),
+        only=flexmock(),
+        force=flexmock(),
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_check(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={'repositories': ['repo']},
+        hook_context={},
+        local_borg_version=None,
+        check_arguments=check_arguments,
+        global_arguments=global_arguments,
+        local_path=None,
+        remote_path=None,
+    )
+
+
+def test_run_check_without_checks_run_does_not_record_action_run():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.borg.check).should_receive('check_archives').and_return(())
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook')
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').never()
+    check_arguments = flexmock(
+        repository=None,
+        progress=flexmock(),
+        repair=flexmock(),
+        only=flexmock(),
+        force=flexmock(),
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_check(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={'repositories': ['repo']},
+        hook_context={},
+        local_borg_version=None,
+        check_arguments=check_arguments,
+        global_arguments=global_arguments,
+        local_path=None,
+        remote_path=None,
+    )
+
+
 def test_run_check_bails_if_repository_does_not_match():
     flexmock(module.logger).answer = lambda message: None
     flexmock(module.borgmatic.config.validate).should_receive(
         'repositories_match'
     ).once().and_return(False)
     flexmock(module.borgmatic.borg.check).should_receive('check_archives').never()
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').never()
     check_arguments = flexmock(
         repository=flexmock(),
         progress=flexmock(),
@@ -7,10 +7,19 @@ def test_compact_actions_calls_hooks_for_configured_repository():
     flexmock(module.logger).answer = lambda message: None
     flexmock(module.borgmatic.borg.feature).should_receive('available').and_return(True)
     flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_due').and_return('always')
     flexmock(module.borgmatic.borg.compact).should_receive('compact_segments').once()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_compaction').once()
     flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').with_args(
+        {}, 'repo', 'compact', float, False
+    ).once()
     compact_arguments = flexmock(
-        repository=None, progress=flexmock(), cleanup_commits=flexmock(), threshold=flexmock()
+        repository=None,
+        progress=flexmock(),
+        cleanup_commits=flexmock(),
+        threshold=flexmock(),
+        ignore_compact_frequency=False,
     )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
 
@@ -34,9 +43,15 @@ def test_compact_runs_with_selected_repository():
         'repositories_match'
     ).once().and_return(True)
     flexmock(module.borgmatic.borg.feature).should_receive('available').and_return(True)
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_due').and_return('always')
     flexmock(module.borgmatic.borg.compact).should_receive('compact_segments').once()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_compaction').once()
     compact_arguments = flexmock(
-        repository=flexmock(), progress=flexmock(), cleanup_commits=flexmock(), threshold=flexmock()
+        repository=flexmock(),
+        progress=flexmock(),
+        cleanup_commits=flexmock(),
+        threshold=flexmock(),
+        ignore_compact_frequency=False,
     )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
 
@@ -62,7 +77,11 @@ def test_compact_bails_if_repository_does_not_match():
     ).once().and_return(False)
     flexmock(module.borgmatic.borg.compact).should_receive('compact_segments').never()
     compact_arguments = flexmock(
-        repository=flexmock(), progress=flexmock(), cleanup_commits=flexmock(), threshold=flexmock()
+        repository=flexmock(),
+        progress=flexmock(),
+        cleanup_commits=flexmock(),
+        threshold=flexmock(),
+        ignore_compact_frequency=False,
     )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
 
@@ -78,3 +97,96 @@ def test_compact_bails_if_repository_does_not_match():
         local_path=None,
         remote_path=None,
     )
+
+
+def test_compact_skips_when_compact_not_due():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_due').and_return(None)
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_segments').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_compaction').never()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').never()
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').never()
+    compact_arguments = flexmock(
+        repository=None,
+        progress=flexmock(),
+        cleanup_commits=flexmock(),
+        threshold=flexmock(),
+        ignore_compact_frequency=False,
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_compact(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={'compact_frequency': '1 week'},
+        hook_context={},
+        local_borg_version=None,
+        compact_arguments=compact_arguments,
+        global_arguments=global_arguments,
+        dry_run_label='',
+        local_path=None,
+        remote_path=None,
+    )
+
+
+def test_compact_with_ignore_compact_frequency_ignores_whether_compact_is_due():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.borg.feature).should_receive('available').and_return(True)
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_due').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_segments').once()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_compaction').once()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    compact_arguments = flexmock(
+        repository=None,
+        progress=flexmock(),
+        cleanup_commits=flexmock(),
+        threshold=flexmock(),
+        ignore_compact_frequency=True,
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_compact(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={'compact_frequency': '1 week'},
+        hook_context={},
+        local_borg_version=None,
+        compact_arguments=compact_arguments,
+        global_arguments=global_arguments,
+        dry_run_label='',
+        local_path=None,
+        remote_path=None,
+    )
+
+
+def test_compact_with_dry_run_does_not_record_compaction():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.borg.feature).should_receive('available').and_return(True)
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_due').and_return('always')
+    flexmock(module.borgmatic.borg.compact).should_receive('compact_segments').once()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_compaction').never()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    compact_arguments = flexmock(
+        repository=None,
+        progress=flexmock(),
+        cleanup_commits=flexmock(),
+        threshold=flexmock(),
+        ignore_compact_frequency=False,
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=True)
+
+    module.run_compact(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={},
+        hook_context={},
+        local_borg_version=None,
+        compact_arguments=compact_arguments,
+        global_arguments=global_arguments,
+        dry_run_label=' (dry run)',
+        local_path=None,
+        remote_path=None,
+    )
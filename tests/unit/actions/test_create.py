@@ -9,8 +9,12 @@ def test_run_create_executes_and_calls_hooks_for_configured_repository():
     flexmock(module.logger).answer = lambda message: None
     flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
     flexmock(module.borgmatic.borg.create).should_receive('create_archive').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
     flexmock(module).should_receive('create_borgmatic_manifest').once()
     flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').with_args(
+        dict, 'repo', 'create', float, False
+    ).once()
     flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').and_return({})
     flexmock(module.borgmatic.hooks.dispatch).should_receive(
         'call_hooks_even_if_unconfigured'
@@ -21,6 +25,7 @@ def test_run_create_executes_and_calls_hooks_for_configured_repository():
         stats=flexmock(),
         json=flexmock(),
         list_files=flexmock(),
+        list_summary=flexmock(),
     )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False, used_config_paths=[])
 
@@ -44,6 +49,7 @@ def test_run_create_with_store_config_files_false_does_not_create_borgmatic_mani
     flexmock(module.logger).answer = lambda message: None
     flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
     flexmock(module.borgmatic.borg.create).should_receive('create_archive').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
     flexmock(module).should_receive('create_borgmatic_manifest').never()
     flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
     flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').and_return({})
@@ -56,6 +62,7 @@ def test_run_create_with_store_config_files_false_does_not_create_borgmatic_mani
         stats=flexmock(),
         json=flexmock(),
         list_files=flexmock(),
+        list_summary=flexmock(),
     )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False, used_config_paths=[])
 
@@ -81,6 +88,7 @@ def test_run_create_runs_with_selected_repository():
         'repositories_match'
     ).once().and_return(True)
     flexmock(module.borgmatic.borg.create).should_receive('create_archive').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
     flexmock(module).should_receive('create_borgmatic_manifest').once()
     flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
     flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').and_return({})
@@ -93,6 +101,7 @@ def test_run_create_runs_with_selected_repository():
         stats=flexmock(),
         json=flexmock(),
         list_files=flexmock(),
+        list_summary=flexmock(),
     )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False, used_config_paths=[])
 
@@ -118,6 +127,7 @@ def test_run_create_bails_if_repository_does_not_match():
         'repositories_match'
     ).once().and_return(False)
     flexmock(module.borgmatic.borg.create).should_receive('create_archive').never()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').never()
     flexmock(module).should_receive('create_borgmatic_manifest').never()
     create_arguments = flexmock(
         repository=flexmock(),
@@ -125,6 +135,7 @@ def test_run_create_bails_if_repository_does_not_match():
         stats=flexmock(),
         json=flexmock(),
         list_files=flexmock(),
+        list_summary=flexmock(),
     )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False, used_config_paths=[])
 
@@ -192,3 +203,98 @@ def test_create_borgmatic_manifest_does_not_create_manifest_file_on_dry_run():
     flexmock(module.os.path).should_receive('expanduser').never()
 
     module.create_borgmatic_manifest({}, 'test.yaml', True)
+
+
+def test_run_create_with_statistics_history_logs_estimate_and_records_statistics():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.history).should_receive('estimate_action_duration').and_return(
+        90.0
+    )
+    flexmock(module.borgmatic.borg.create).should_receive('create_archive').and_return(None)
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
+    fetched_statistics = {'archives': [flexmock()]}
+    flexmock(module.borgmatic.borg.history).should_receive(
+        'fetch_latest_archive_statistics'
+    ).and_return(fetched_statistics)
+    flexmock(module.borgmatic.borg.history).should_receive('record_create_statistics').with_args(
+        {'statistics_history': True}, 'repo', fetched_statistics
+    ).once()
+    flexmock(module).should_receive('create_borgmatic_manifest').once()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').and_return({})
+    flexmock(module.borgmatic.hooks.dispatch).should_receive(
+        'call_hooks_even_if_unconfigured'
+    ).and_return({})
+    create_arguments = flexmock(
+        repository=None,
+        progress=flexmock(),
+        stats=flexmock(),
+        json=False,
+        list_files=flexmock(),
+        list_summary=flexmock(),
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False, used_config_paths=[])
+
+    list(
+        module.run_create(
+            config_filename='test.yaml',
+            repository={'path': 'repo'},
+            config={'statistics_history': True},
+            hook_context={},
+            local_borg_version=None,
+            create_arguments=create_arguments,
+            global_arguments=global_arguments,
+            dry_run_label='',
+            local_path=None,
+            remote_path=None,
+        )
+    )
+
+
+def test_run_create_with_statistics_history_and_json_records_statistics_from_json_output():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.history).should_receive('estimate_action_duration').and_return(
+        None
+    )
+    flexmock(module.borgmatic.borg.create).should_receive('create_archive').and_return(
+        '{"archive": {"name": "archive"}}'
+    )
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
+    flexmock(module.borgmatic.borg.history).should_receive(
+        'fetch_latest_archive_statistics'
+    ).never()
+    flexmock(module.borgmatic.borg.history).should_receive('record_create_statistics').with_args(
+        {'statistics_history': True}, 'repo', {'archive': {'name': 'archive'}}
+    ).once()
+    flexmock(module).should_receive('create_borgmatic_manifest').once()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').and_return({})
+    flexmock(module.borgmatic.hooks.dispatch).should_receive(
+        'call_hooks_even_if_unconfigured'
+    ).and_return({})
+    create_arguments = flexmock(
+        repository=None,
+        progress=flexmock(),
+        stats=flexmock(),
+        json=True,
+        list_files=flexmock(),
+        list_summary=flexmock(),
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False, used_config_paths=[])
+
+    assert list(
+        module.run_create(
+            config_filename='test.yaml',
+            repository={'path': 'repo'},
+            config={'statistics_history': True},
+            hook_context={},
+            local_borg_version=None,
+            create_arguments=create_arguments,
+            global_arguments=global_arguments,
+            dry_run_label='',
+            local_path=None,
+            remote_path=None,
+        )
+    ) == [{'archive': {'name': 'archive'}}]
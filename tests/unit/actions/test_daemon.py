@@ -0,0 +1,127 @@
+from flexmock import flexmock
+
+from borgmatic.actions import daemon as module
+
+
+def make_daemon_arguments(**flags):
+    return flexmock(
+        socket=None,
+        status=flags.get('status', False),
+        trigger=flags.get('trigger', False),
+        reload=flags.get('reload', False),
+    )
+
+
+def test_format_status_describes_daemon_and_each_configuration_file():
+    flexmock(module).should_receive('format_timestamp').replace_with(
+        lambda timestamp: str(timestamp)
+    )
+
+    lines = module.format_status(
+        {
+            'pid': 1234,
+            'started_time': 1,
+            'running': 'a.yaml',
+            'configuration_files': {
+                'a.yaml': {
+                    'next_run': 2,
+                    'pending': False,
+                    'last_run': {
+                        'start_time': 3,
+                        'duration': 41.7,
+                        'actions': ['create', 'prune'],
+                        'succeeded': True,
+                    },
+                },
+                'b.yaml': {
+                    'next_run': None,
+                    'pending': True,
+                    'last_run': {
+                        'start_time': 4,
+                        'duration': 5,
+                        'actions': ['check'],
+                        'succeeded': False,
+                    },
+                },
+                'c.yaml': {'next_run': 6, 'pending': False, 'last_run': None},
+            },
+        }
+    )
+
+    assert lines == [
+        'Daemon running as PID 1234 since 1',
+        'Currently running a.yaml',
+        'a.yaml: next run at 2; last run at 3 (create, prune) succeeded after 42s',
+        'b.yaml: not scheduled; waiting to run; last run at 4 (check) failed after 5s',
+        'c.yaml: next run at 6',
+    ]
+
+
+def test_format_status_without_running_configuration_file_omits_it():
+    flexmock(module).should_receive('format_timestamp').replace_with(
+        lambda timestamp: str(timestamp)
+    )
+
+    assert module.format_status(
+        {'pid': 1234, 'started_time': 1, 'running': None, 'configuration_files': {}}
+    ) == ['Daemon running as PID 1234 since 1']
+
+
+def test_format_timestamp_formats_local_time():
+    assert module.format_timestamp(0) == module.datetime.datetime.fromtimestamp(0).strftime(
+        '%Y-%m-%d %H:%M:%S'
+    )
+
+
+def test_run_daemon_without_command_runs_daemon():
+    daemon_arguments = make_daemon_arguments()
+    global_arguments = flexmock()
+    flexmock(module.borgmatic.daemon.control).should_receive('send_command').never()
+    flexmock(module.borgmatic.daemon.run).should_receive('run_daemon').with_args(
+        daemon_arguments, global_arguments
+    ).once()
+
+    module.run_daemon(daemon_arguments, global_arguments)
+
+
+def test_run_daemon_with_status_logs_daemon_status():
+    flexmock(module.borgmatic.daemon.control).should_receive('make_socket_path').and_return(
+        '/daemon.sock'
+    )
+    flexmock(module.borgmatic.daemon.control).should_receive('send_command').with_args(
+        '/daemon.sock', 'status'
+    ).and_return({'pid': 1234})
+    flexmock(module).should_receive('format_status').and_return(['line 1', 'line 2'])
+    logged = []
+    flexmock(module.logger).answer = logged.append
+    flexmock(module.borgmatic.daemon.run).should_receive('run_daemon').never()
+
+    module.run_daemon(make_daemon_arguments(status=True), flexmock())
+
+    assert logged == ['line 1', 'line 2']
+
+
+def test_run_daemon_with_trigger_tells_daemon_to_run():
+    flexmock(module.borgmatic.daemon.control).should_receive('make_socket_path').and_return(
+        '/daemon.sock'
+    )
+    flexmock(module.borgmatic.daemon.control).should_receive('send_command').with_args(
+        '/daemon.sock', 'trigger'
+    ).and_return({'triggered': ['a.yaml', 'b.yaml']}).once()
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.daemon.run).should_receive('run_daemon').never()
+
+    module.run_daemon(make_daemon_arguments(trigger=True), flexmock())
+
+
+def test_run_daemon_with_reload_tells_daemon_to_reload():
+    flexmock(module.borgmatic.daemon.control).should_receive('make_socket_path').and_return(
+        '/daemon.sock'
+    )
+    flexmock(module.borgmatic.daemon.control).should_receive('send_command').with_args(
+        '/daemon.sock', 'reload'
+    ).and_return({'configuration_files': ['a.yaml']}).once()
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.daemon.run).should_receive('run_daemon').never()
+
+    module.run_daemon(make_daemon_arguments(reload=True), flexmock())
@@ -0,0 +1,12 @@
+from flexmock import flexmock
+
+from borgmatic.actions import monitor_flush as module
+
+
+def test_run_monitor_flush_flushes_outbox_and_logs_counts():
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests').with_args(
+        {}, 'test.yaml', False
+    ).and_return((1, 2, 3)).once()
+    flexmock(module.logger).answer = lambda message: None
+
+    module.run_monitor_flush('test.yaml', {}, flexmock(dry_run=False))
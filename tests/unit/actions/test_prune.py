@@ -7,8 +7,14 @@ def test_run_prune_calls_hooks_for_configured_repository():
     flexmock(module.logger).answer = lambda message: None
     flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
     flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
     flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
-    prune_arguments = flexmock(repository=None, stats=flexmock(), list_archives=flexmock())
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').with_args(
+        {}, 'repo', 'prune', float, False
+    ).once()
+    prune_arguments = flexmock(
+        repository=None, stats=flexmock(), list_archives=flexmock(), simulate=False
+    )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
 
     module.run_prune(
@@ -31,7 +37,10 @@ def test_run_prune_runs_with_selected_repository():
         'repositories_match'
     ).once().and_return(True)
     flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').once()
-    prune_arguments = flexmock(repository=flexmock(), stats=flexmock(), list_archives=flexmock())
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
+    prune_arguments = flexmock(
+        repository=flexmock(), stats=flexmock(), list_archives=flexmock(), simulate=False
+    )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
 
     module.run_prune(
@@ -54,7 +63,9 @@ def test_run_prune_bails_if_repository_does_not_match():
         'repositories_match'
     ).once().and_return(False)
     flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').never()
-    prune_arguments = flexmock(repository=flexmock(), stats=flexmock(), list_archives=flexmock())
+    prune_arguments = flexmock(
+        repository=flexmock(), stats=flexmock(), list_archives=flexmock(), simulate=False
+    )
     global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
 
     module.run_prune(
@@ -69,3 +80,143 @@ def test_run_prune_bails_if_repository_does_not_match():
         local_path=None,
         remote_path=None,
     )
+
+
+def test_run_prune_with_dry_run_does_not_invalidate_archive_list():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').never()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    prune_arguments = flexmock(
+        repository=None, stats=flexmock(), list_archives=flexmock(), simulate=False
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=True)
+
+    module.run_prune(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={},
+        hook_context={},
+        local_borg_version=None,
+        prune_arguments=prune_arguments,
+        global_arguments=global_arguments,
+        dry_run_label='',
+        local_path=None,
+        remote_path=None,
+    )
+
+
+def test_run_prune_with_simulate_previews_prune_without_hooks():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.borg.retention).should_receive('preview_prune').once()
+    flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').never()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').never()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').never()
+    flexmock(module.borgmatic.borg.history).should_receive('record_action_run').never()
+    prune_arguments = flexmock(
+        repository=None, stats=flexmock(), list_archives=flexmock(), simulate=True
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_prune(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={},
+        hook_context={},
+        local_borg_version=None,
+        prune_arguments=prune_arguments,
+        global_arguments=global_arguments,
+        dry_run_label='',
+        local_path=None,
+        remote_path=None,
+    )
+
+
+def test_run_prune_with_compact_threshold_records_reclaimable_space():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('get_repository_unique_size').and_return(
+        5000
+    ).and_return(3000)
+    flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_reclaimable_space').with_args(
+        'repo', {'compact_threshold_bytes': 1000}, 2000
+    ).once()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    prune_arguments = flexmock(
+        repository=None, stats=flexmock(), list_archives=flexmock(), simulate=False
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_prune(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={'compact_threshold_bytes': 1000},
+        hook_context={},
+        local_borg_version=None,
+        prune_arguments=prune_arguments,
+        global_arguments=global_arguments,
+        dry_run_label='',
+        local_path=None,
+        remote_path=None,
+    )
+
+
+def test_run_prune_without_compact_threshold_skips_measuring_reclaimable_space():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('get_repository_unique_size').never()
+    flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_reclaimable_space').never()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    prune_arguments = flexmock(
+        repository=None, stats=flexmock(), list_archives=flexmock(), simulate=False
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_prune(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={'compact_frequency': '1 week'},
+        hook_context={},
+        local_borg_version=None,
+        prune_arguments=prune_arguments,
+        global_arguments=global_arguments,
+        dry_run_label='',
+        local_path=None,
+        remote_path=None,
+    )
+
+
+def test_run_prune_with_compact_threshold_and_unknown_repository_size_records_unknown_space():
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.borg.compact).should_receive('get_repository_unique_size').and_return(
+        None
+    )
+    flexmock(module.borgmatic.borg.prune).should_receive('prune_archives').once()
+    flexmock(module.borgmatic.borg.retention).should_receive('invalidate_archive_list').once()
+    flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.borgmatic.borg.compact).should_receive('record_reclaimable_space').with_args(
+        'repo', {'compact_threshold_bytes': 1000}, None
+    ).once()
+    flexmock(module.borgmatic.hooks.command).should_receive('execute_hook').times(2)
+    prune_arguments = flexmock(
+        repository=None, stats=flexmock(), list_archives=flexmock(), simulate=False
+    )
+    global_arguments = flexmock(monitoring_verbosity=1, dry_run=False)
+
+    module.run_prune(
+        config_filename='test.yaml',
+        repository={'path': 'repo'},
+        config={'compact_threshold_bytes': 1000},
+        hook_context={},
+        local_borg_version=None,
+        prune_arguments=prune_arguments,
+        global_arguments=global_arguments,
+        dry_run_label='',
+        local_path=None,
+        remote_path=None,
+    )
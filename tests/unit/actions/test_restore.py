@@ -266,6 +266,7 @@ def test_run_restore_restores_each_database():
             username=None,
             password=None,
             restore_path=None,
+            target_time=None,
         ),
         global_arguments=flexmock(dry_run=False),
         local_path=flexmock(),
@@ -364,6 +365,7 @@ def test_run_restore_restores_database_configured_with_all_name():
             username=None,
             password=None,
             restore_path=None,
+            target_time=None,
         ),
         global_arguments=flexmock(dry_run=False),
         local_path=flexmock(),
@@ -442,6 +444,7 @@ def test_run_restore_skips_missing_database():
             username=None,
             password=None,
             restore_path=None,
+            target_time=None,
         ),
         global_arguments=flexmock(dry_run=False),
         local_path=flexmock(),
@@ -514,6 +517,7 @@ def test_run_restore_restores_databases_from_different_hooks():
             username=None,
             password=None,
             restore_path=None,
+            target_time=None,
         ),
         global_arguments=flexmock(dry_run=False),
         local_path=flexmock(),
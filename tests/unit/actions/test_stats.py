@@ -0,0 +1,118 @@
+from flexmock import flexmock
+
+from borgmatic.actions import stats as module
+
+
+def test_format_duration_formats_hours_minutes_and_seconds():
+    assert module.format_duration(3723.4) == '1:02:03'
+
+
+def mock_history(archive_statistics, action_durations):
+    flexmock(module.borgmatic.borg.history).should_receive('read_archive_statistics').and_return(
+        archive_statistics
+    )
+    flexmock(module.borgmatic.borg.history).should_receive('read_action_durations').and_return(
+        action_durations
+    )
+
+
+def test_run_stats_logs_summary():
+    mock_history(
+        [
+            {
+                'name': 'archive1',
+                'start_time': 0,
+                'duration': 60,
+                'original_size': 4000,
+                'compressed_size': 3000,
+                'deduplicated_size': 1000,
+                'file_count': 10,
+                'repository_unique_size': 1000,
+            },
+            {
+                'name': 'archive2',
+                'start_time': 86400,
+                'duration': 60,
+                'original_size': 4000,
+                'compressed_size': 3000,
+                'deduplicated_size': 1000,
+                'file_count': 10,
+                'repository_unique_size': 2000,
+            },
+        ],
+        {'create': [60, 60], 'prune': [10]},
+    )
+    logged_messages = []
+    flexmock(module.logger).answer = lambda message: logged_messages.append(message)
+
+    assert (
+        list(
+            module.run_stats(
+                repository={'path': 'repo'},
+                config={'statistics_history': True},
+                stats_arguments=flexmock(repository=None, json=False),
+            )
+        )
+        == []
+    )
+
+    assert logged_messages[:6] == [
+        'repo: 2 archives recorded in run statistics history',
+        f'Latest archive: archive2 at {module.datetime.datetime.fromtimestamp(86400)}, 4.00 kB original, 1.00 kB deduplicated, 10 files',
+        'Deduplication ratio: 4.0x overall, 4.0x recently',
+        'Repository growth: 1.00 kB per day, forecasting 32.00 kB in 30 days',
+        'Typical create duration: 0:01:00',
+        'Typical prune duration: 0:00:10',
+    ]
+    assert logged_messages[6].startswith('A backup started now would finish around ')
+
+
+def test_run_stats_without_history_enabled_warns_and_logs_empty_summary():
+    mock_history([], {})
+    logged_messages = []
+    flexmock(module.logger).answer = lambda message: logged_messages.append(message)
+    flexmock(module.logger).should_receive('warning').once()
+
+    list(
+        module.run_stats(
+            repository={'path': 'repo'},
+            config={},
+            stats_arguments=flexmock(repository=None, json=False),
+        )
+    )
+
+    assert logged_messages == ['repo: 0 archives recorded in run statistics history']
+
+
+def test_run_stats_with_json_yields_summary():
+    mock_history([], {})
+    flexmock(module.borgmatic.borg.history).should_receive('summarize_history').and_return(
+        {'archive_count': 0}
+    )
+    flexmock(module.logger).answer = lambda message: None
+
+    assert list(
+        module.run_stats(
+            repository={'path': 'repo'},
+            config={'statistics_history': True},
+            stats_arguments=flexmock(repository=None, json=True),
+        )
+    ) == [{'archive_count': 0, 'repository': 'repo'}]
+
+
+def test_run_stats_bails_if_repository_does_not_match():
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').and_return(
+        False
+    )
+    flexmock(module.borgmatic.borg.history).should_receive('read_archive_statistics').never()
+
+    assert (
+        list(
+            module.run_stats(
+                repository={'path': 'repo'},
+                config={'statistics_history': True},
+                stats_arguments=flexmock(repository='other', json=False),
+            )
+        )
+        == []
+    )
@@ -1,4 +1,6 @@
 import logging
+import sqlite3
+import subprocess
 
 import pytest
 from flexmock import flexmock
@@ -95,7 +97,7 @@ def test_filter_checks_on_frequency_without_config_uses_default_checks():
     flexmock(module).should_receive('parse_frequency').and_return(
         module.datetime.timedelta(weeks=4)
     )
-    flexmock(module).should_receive('make_check_time_path')
+    flexmock(module).should_receive('read_check_times').and_return({})
     flexmock(module).should_receive('probe_for_check_time').and_return(None)
 
     assert module.filter_checks_on_frequency(
@@ -132,7 +134,7 @@ def test_filter_checks_on_frequency_retains_check_with_elapsed_frequency():
     flexmock(module).should_receive('parse_frequency').and_return(
         module.datetime.timedelta(hours=1)
     )
-    flexmock(module).should_receive('make_check_time_path')
+    flexmock(module).should_receive('read_check_times').and_return({})
     flexmock(module).should_receive('probe_for_check_time').and_return(
         module.datetime.datetime(year=module.datetime.MINYEAR, month=1, day=1)
     )
@@ -150,7 +152,7 @@ def test_filter_checks_on_frequency_retains_check_with_missing_check_time_file()
     flexmock(module).should_receive('parse_frequency').and_return(
         module.datetime.timedelta(hours=1)
     )
-    flexmock(module).should_receive('make_check_time_path')
+    flexmock(module).should_receive('read_check_times').and_return({})
     flexmock(module).should_receive('probe_for_check_time').and_return(None)
 
     assert module.filter_checks_on_frequency(
@@ -166,7 +168,7 @@ def test_filter_checks_on_frequency_skips_check_with_unelapsed_frequency():
     flexmock(module).should_receive('parse_frequency').and_return(
         module.datetime.timedelta(hours=1)
     )
-    flexmock(module).should_receive('make_check_time_path')
+    flexmock(module).should_receive('read_check_times').and_return({})
     flexmock(module).should_receive('probe_for_check_time').and_return(
         module.datetime.datetime.now()
     )
@@ -449,6 +451,30 @@ def test_make_check_time_path_with_repositories_check_ignores_archives_check_id(
     )
 
 
+def test_write_failed_check_times_records_checks_as_failed():
+    flexmock(module).should_receive('write_check_times').with_args(
+        {}, 'repo', ('spot',), run_time=object, duration=object, succeeded=False
+    ).once()
+    flexmock(module.logger).should_receive('warning').never()
+
+    module.write_failed_check_times({}, 'repo', ('spot',), run_time=flexmock(), duration=flexmock())
+
+
+@pytest.mark.parametrize('error', (sqlite3.OperationalError('database is locked'), OSError()))
+def test_write_failed_check_times_logs_rather_than_raises_state_database_error(error):
+    flexmock(module).should_receive('write_check_times').and_raise(error)
+    flexmock(module.logger).should_receive('warning').once()
+
+    module.write_failed_check_times({}, 'repo', ('repository', 'archives'))
+
+
+def test_write_failed_check_times_raises_other_errors():
+    flexmock(module).should_receive('write_check_times').and_raise(ValueError)
+
+    with pytest.raises(ValueError):
+        module.write_failed_check_times({}, 'repo', ('repository',))
+
+
 def test_read_check_time_does_not_raise():
     flexmock(module.os).should_receive('stat').and_return(flexmock(st_mtime=123))
 
@@ -461,49 +487,59 @@ def test_read_check_time_on_missing_file_does_not_raise():
     assert module.read_check_time('/path') is None
 
 
+def test_make_check_time_key_with_archives_check_includes_archives_check_id():
+    assert module.make_check_time_key('archives', '5678') == ('archives', '5678')
+
+
+def test_make_check_time_key_with_archives_check_and_no_archives_check_id_defaults_to_all():
+    assert module.make_check_time_key('data') == ('data', 'all')
+
+
+def test_make_check_time_key_with_repository_check_ignores_archives_check_id():
+    assert module.make_check_time_key('repository', '5678') == ('repository', 'all')
+
+
+def test_read_check_times_converts_timestamps_to_datetimes():
+    connection = flexmock()
+    connection.should_receive('execute').with_args(str, ('1234',)).and_return(
+        (('repository', 'all', 10.0), ('archives', '5678', 20.0))
+    )
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+
+    assert module.read_check_times({}, '1234') == {
+        ('repository', 'all'): module.datetime.datetime.fromtimestamp(10.0),
+        ('archives', '5678'): module.datetime.datetime.fromtimestamp(20.0),
+    }
+
+
 def test_probe_for_check_time_uses_maximum_of_multiple_check_times():
-    flexmock(module).should_receive('make_check_time_path').and_return(
-        '~/.borgmatic/checks/1234/archives/5678'
-    ).and_return('~/.borgmatic/checks/1234/archives/all')
-    flexmock(module).should_receive('read_check_time').and_return(1).and_return(2)
+    check_times = {('archives', '5678'): 1, ('archives', 'all'): 2}
 
-    assert module.probe_for_check_time(flexmock(), flexmock(), flexmock(), flexmock()) == 2
+    assert module.probe_for_check_time(check_times, 'archives', '5678') == 2
 
 
-def test_probe_for_check_time_deduplicates_identical_check_time_paths():
-    flexmock(module).should_receive('make_check_time_path').and_return(
-        '~/.borgmatic/checks/1234/archives/5678'
-    ).and_return('~/.borgmatic/checks/1234/archives/5678')
-    flexmock(module).should_receive('read_check_time').and_return(1).once()
+def test_probe_for_check_time_deduplicates_identical_check_time_keys():
+    flexmock(module).should_receive('make_check_time_key').and_return(('archives', '5678'))
+    check_times = flexmock()
+    check_times.should_receive('get').and_return(1).once()
 
-    assert module.probe_for_check_time(flexmock(), flexmock(), flexmock(), flexmock()) == 1
+    assert module.probe_for_check_time(check_times, 'archives', '5678') == 1
 
 
-def test_probe_for_check_time_skips_none_check_time():
-    flexmock(module).should_receive('make_check_time_path').and_return(
-        '~/.borgmatic/checks/1234/archives/5678'
-    ).and_return('~/.borgmatic/checks/1234/archives/all')
-    flexmock(module).should_receive('read_check_time').and_return(None).and_return(2)
+def test_probe_for_check_time_skips_missing_check_time():
+    check_times = {('archives', 'all'): 2}
 
-    assert module.probe_for_check_time(flexmock(), flexmock(), flexmock(), flexmock()) == 2
+    assert module.probe_for_check_time(check_times, 'archives', '5678') == 2
 
 
 def test_probe_for_check_time_uses_single_check_time():
-    flexmock(module).should_receive('make_check_time_path').and_return(
-        '~/.borgmatic/checks/1234/archives/5678'
-    ).and_return('~/.borgmatic/checks/1234/archives/all')
-    flexmock(module).should_receive('read_check_time').and_return(1).and_return(None)
+    check_times = {('archives', '5678'): 1}
 
-    assert module.probe_for_check_time(flexmock(), flexmock(), flexmock(), flexmock()) == 1
+    assert module.probe_for_check_time(check_times, 'archives', '5678') == 1
 
 
 def test_probe_for_check_time_returns_none_when_no_check_time_found():
-    flexmock(module).should_receive('make_check_time_path').and_return(
-        '~/.borgmatic/checks/1234/archives/5678'
-    ).and_return('~/.borgmatic/checks/1234/archives/all')
-    flexmock(module).should_receive('read_check_time').and_return(None).and_return(None)
-
-    assert module.probe_for_check_time(flexmock(), flexmock(), flexmock(), flexmock()) is None
+    assert module.probe_for_check_time({}, 'archives', '5678') is None
 
 
 def test_upgrade_check_times_renames_old_check_paths_to_all():
@@ -607,13 +643,282 @@ def test_upgrade_check_times_renames_stale_temporary_check_path():
     module.upgrade_check_times(flexmock(), flexmock())
 
 
+def test_migrate_check_time_files_without_check_time_directory_bails():
+    flexmock(module).should_receive('make_check_time_path').and_return(
+        '~/.borgmatic/checks/1234/repository'
+    )
+    flexmock(module.os.path).should_receive('isdir').and_return(False)
+    flexmock(module).should_receive('upgrade_check_times').never()
+    flexmock(module.state).should_receive('open_state_database').never()
+    flexmock(module.shutil).should_receive('rmtree').never()
+
+    module.migrate_check_time_files({}, '1234')
+
+
+def test_migrate_check_time_files_imports_check_times_and_deletes_files():
+    base_path = '~/.borgmatic/checks/1234'
+    flexmock(module).should_receive('make_check_time_path').and_return(f'{base_path}/repository')
+    flexmock(module.os.path).should_receive('isdir').with_args(base_path).and_return(True)
+    flexmock(module).should_receive('upgrade_check_times').once()
+    flexmock(module.os).should_receive('listdir').with_args(base_path).and_return(
+        ['repository', 'archives', 'extract']
+    )
+    flexmock(module.os.path).should_receive('isdir').with_args(f'{base_path}/archives').and_return(
+        True
+    )
+    flexmock(module.os.path).should_receive('isdir').with_args(
+        f'{base_path}/repository'
+    ).and_return(False)
+    flexmock(module.os.path).should_receive('isdir').with_args(f'{base_path}/extract').and_return(
+        False
+    )
+    flexmock(module.os).should_receive('listdir').with_args(f'{base_path}/archives').and_return(
+        ['all', '5678']
+    )
+    flexmock(module).should_receive('read_check_time').with_args(
+        f'{base_path}/repository'
+    ).and_return(module.datetime.datetime.fromtimestamp(10))
+    flexmock(module).should_receive('read_check_time').with_args(
+        f'{base_path}/archives/5678'
+    ).and_return(module.datetime.datetime.fromtimestamp(20))
+    flexmock(module).should_receive('read_check_time').with_args(
+        f'{base_path}/archives/all'
+    ).and_return(module.datetime.datetime.fromtimestamp(30))
+    flexmock(module).should_receive('read_check_time').with_args(f'{base_path}/extract').and_return(
+        None
+    )
+    imported_rows = []
+    connection = flexmock()
+    connection.should_receive('executemany').replace_with(
+        lambda query, rows: imported_rows.extend(rows)
+    ).once()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.shutil).should_receive('rmtree').with_args(base_path).once()
+
+    module.migrate_check_time_files({}, '1234')
+
+    assert imported_rows == [
+        ('1234', 'archives', '5678', 20.0, 20.0),
+        ('1234', 'archives', 'all', 30.0, 30.0),
+        ('1234', 'repository', 'all', 10.0, 10.0),
+    ]
+
+
+def test_get_check_config_returns_matching_check_config():
+    assert module.get_check_config(
+        {'checks': [{'name': 'repository'}, {'name': 'spot', 'sample_count': 5}]}, 'spot'
+    ) == {'name': 'spot', 'sample_count': 5}
+
+
+def test_get_check_config_without_matching_check_returns_empty_dict():
+    assert module.get_check_config({'checks': [{'name': 'repository'}]}, 'spot') == {}
+
+
+def test_collect_spot_check_archive_files_returns_regular_files_outside_borgmatic_directory():
+    flexmock(module.os.path).should_receive('expanduser').and_return('/root/.borgmatic')
+    flexmock(module.borg_list).should_receive('make_list_command').and_return(('borg', 'list'))
+    flexmock(module.environment).should_receive('make_environment')
+    flexmock(module).should_receive('execute_command_and_capture_output').and_return(
+        '\n'.join(
+            (
+                '{"type": "d", "path": "etc", "size": 0, "mtime": "2023-09-01T12:00:00"}',
+                '{"type": "-", "path": "etc/passwd", "size": 10, "mtime": "2023-09-01T12:00:00"}',
+                '{"type": "l", "path": "etc/link", "size": 0, "mtime": "2023-09-01T12:00:00"}',
+                '{"type": "-", "path": "root/.borgmatic/postgresql_databases/localhost/foo", "size": 5, "mtime": "2023-09-01T12:00:00"}',
+                '',
+                '{"type": "-", "path": "root/.borgmatic-other", "size": 7, "mtime": "2023-09-01T12:00:00"}',
+            )
+        )
+    )
+
+    assert module.collect_spot_check_archive_files(
+        'repo',
+        'archive',
+        {},
+        '1.2.3',
+        flexmock(log_json=False),
+    ) == (
+        {'path': 'etc/passwd', 'size': 10, 'mtime': '2023-09-01T12:00:00'},
+        {'path': 'root/.borgmatic-other', 'size': 7, 'mtime': '2023-09-01T12:00:00'},
+    )
+
+
+def test_sample_spot_check_files_respects_sample_count():
+    archive_files = tuple({'path': str(index), 'size': 10} for index in range(100))
+
+    assert len(module.sample_spot_check_files(archive_files, 5, 1000000)) == 5
+
+
+def test_sample_spot_check_files_respects_sample_bytes():
+    archive_files = tuple({'path': str(index), 'size': 10} for index in range(100))
+
+    sampled_files = module.sample_spot_check_files(archive_files, 50, 95)
+
+    assert len(sampled_files) == 9
+    assert len({archive_file['path'] for archive_file in sampled_files}) == 9
+
+
+def test_sample_spot_check_files_skips_files_larger_than_budget():
+    archive_files = ({'path': 'big', 'size': 1000}, {'path': 'small', 'size': 10})
+
+    assert module.sample_spot_check_files(archive_files, 10, 100) == (
+        {'path': 'small', 'size': 10},
+    )
+
+
+def test_sample_spot_check_files_favors_larger_files():
+    flexmock(module.random).should_receive('random').and_return(0.5)
+    archive_files = (
+        {'path': 'small', 'size': 1},
+        {'path': 'large', 'size': 1000},
+        {'path': 'medium', 'size': 100},
+    )
+
+    assert tuple(
+        archive_file['path']
+        for archive_file in module.sample_spot_check_files(archive_files, 2, 100000)
+    ) == ('large', 'medium')
+
+
+def test_sample_spot_check_files_without_files_returns_empty_tuple():
+    assert module.sample_spot_check_files((), 10, 100) == ()
+
+
+def test_make_spot_check_source_path_without_working_directory_makes_path_absolute():
+    assert module.make_spot_check_source_path('etc/passwd') == '/etc/passwd'
+
+
+def test_make_spot_check_source_path_with_working_directory_uses_it_when_path_exists():
+    flexmock(module.os.path).should_receive('exists').with_args('/srv/data/file').and_return(True)
+
+    assert module.make_spot_check_source_path('data/file', '/srv') == '/srv/data/file'
+
+
+def test_make_spot_check_source_path_with_working_directory_falls_back_to_absolute_path():
+    flexmock(module.os.path).should_receive('exists').with_args('/srv/etc/passwd').and_return(False)
+
+    assert module.make_spot_check_source_path('etc/passwd', '/srv') == '/etc/passwd'
+
+
+def test_source_file_changed_with_matching_mtime_returns_false():
+    archive_mtime = '2023-09-01T12:00:00.000000'
+    flexmock(module.os).should_receive('stat').and_return(
+        flexmock(st_mtime=module.datetime.datetime.fromisoformat(archive_mtime).timestamp() + 0.5)
+    )
+
+    assert not module.source_file_changed({'mtime': archive_mtime}, '/etc/passwd')
+
+
+def test_source_file_changed_with_newer_mtime_returns_true():
+    archive_mtime = '2023-09-01T12:00:00.000000'
+    flexmock(module.os).should_receive('stat').and_return(
+        flexmock(st_mtime=module.datetime.datetime.fromisoformat(archive_mtime).timestamp() + 60)
+    )
+
+    assert module.source_file_changed({'mtime': archive_mtime}, '/etc/passwd')
+
+
+def test_source_file_changed_with_missing_source_file_returns_true():
+    flexmock(module.os).should_receive('stat').and_raise(FileNotFoundError)
+
+    assert module.source_file_changed({'mtime': '2023-09-01T12:00:00'}, '/etc/passwd')
+
+
+def test_compare_spot_check_files_returns_mismatched_paths_and_skipped_count():
+    sampled_files = (
+        {'path': 'etc/same'},
+        {'path': 'etc/different'},
+        {'path': 'etc/changed'},
+        {'path': 'etc/unextracted'},
+    )
+    flexmock(module).should_receive('source_file_changed').and_return(False)
+    flexmock(module).should_receive('source_file_changed').with_args(
+        {'path': 'etc/changed'}, '/etc/changed'
+    ).and_return(True)
+    flexmock(module).should_receive('hash_file').with_args('/tmp/extract/etc/same').and_return(
+        'abc'
+    )
+    flexmock(module).should_receive('hash_file').with_args('/etc/same').and_return('abc')
+    flexmock(module).should_receive('hash_file').with_args('/tmp/extract/etc/different').and_return(
+        'abc'
+    )
+    flexmock(module).should_receive('hash_file').with_args('/etc/different').and_return('def')
+    flexmock(module).should_receive('hash_file').with_args(
+        '/tmp/extract/etc/unextracted'
+    ).and_return(None)
+    flexmock(module).should_receive('hash_file').with_args('/etc/unextracted').and_return('abc')
+
+    assert module.compare_spot_check_files(sampled_files, '/tmp/extract') == (
+        ('etc/different', 'etc/unextracted'),
+        1,
+    )
+
+
+def test_spot_check_without_archives_bails():
+    flexmock(module.rlist).should_receive('resolve_archive_name').and_raise(ValueError)
+    flexmock(module).should_receive('collect_spot_check_archive_files').never()
+    flexmock(module.extract).should_receive('extract_archive').never()
+
+    module.spot_check('repo', {}, '1.2.3', flexmock(log_json=False))
+
+
+def test_spot_check_without_sampled_files_bails():
+    flexmock(module.rlist).should_receive('resolve_archive_name').and_return('archive')
+    flexmock(module).should_receive('collect_spot_check_archive_files').and_return(())
+    flexmock(module).should_receive('sample_spot_check_files').and_return(())
+    flexmock(module.extract).should_receive('extract_archive').never()
+
+    module.spot_check('repo', {}, '1.2.3', flexmock(log_json=False))
+
+
+def test_spot_check_extracts_sampled_files_and_compares_them():
+    config = {'checks': [{'name': 'spot', 'sample_count': 5, 'sample_bytes': 500}]}
+    sampled_files = ({'path': 'etc/passwd'}, {'path': 'etc/group'})
+    flexmock(module.rlist).should_receive('resolve_archive_name').and_return('archive')
+    flexmock(module).should_receive('collect_spot_check_archive_files').and_return(sampled_files)
+    flexmock(module).should_receive('sample_spot_check_files').with_args(
+        sampled_files, 5, 500
+    ).and_return(sampled_files)
+    flexmock(module.extract).should_receive('extract_archive').with_args(
+        dry_run=False,
+        repository='repo',
+        archive='archive',
+        paths=('etc/passwd', 'etc/group'),
+        config=config,
+        local_borg_version='1.2.3',
+        global_arguments=object,
+        local_path='borg',
+        remote_path=None,
+        destination_path=str,
+    ).once()
+    flexmock(module).should_receive('compare_spot_check_files').and_return(((), 0))
+
+    module.spot_check('repo', config, '1.2.3', flexmock(log_json=False))
+
+
+def test_spot_check_with_mismatched_files_raises():
+    sampled_files = ({'path': 'etc/passwd'}, {'path': 'etc/group'})
+    flexmock(module.rlist).should_receive('resolve_archive_name').and_return('archive')
+    flexmock(module).should_receive('collect_spot_check_archive_files').and_return(sampled_files)
+    flexmock(module).should_receive('sample_spot_check_files').with_args(
+        sampled_files,
+        module.DEFAULT_SPOT_CHECK_SAMPLE_COUNT,
+        module.DEFAULT_SPOT_CHECK_SAMPLE_BYTES,
+    ).and_return(sampled_files)
+    flexmock(module.extract).should_receive('extract_archive')
+    flexmock(module).should_receive('compare_spot_check_files').and_return((('etc/group',), 0))
+
+    with pytest.raises(ValueError):
+        module.spot_check('repo', {}, '1.2.3', flexmock(log_json=False))
+
+
 def test_check_archives_with_progress_calls_borg_with_progress_parameter():
     checks = ('repository',)
     config = {'check_last': None}
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -627,8 +932,7 @@ def test_check_archives_with_progress_calls_borg_with_progress_parameter():
         output_file=module.DO_NOT_CAPTURE,
         extra_environment=None,
     ).once()
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -645,7 +949,7 @@ def test_check_archives_with_repair_calls_borg_with_repair_parameter():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -659,8 +963,7 @@ def test_check_archives_with_repair_calls_borg_with_repair_parameter():
         output_file=module.DO_NOT_CAPTURE,
         extra_environment=None,
     ).once()
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -686,7 +989,7 @@ def test_check_archives_calls_borg_with_parameters(checks):
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -694,14 +997,16 @@ def test_check_archives_calls_borg_with_parameters(checks):
     flexmock(module).should_receive('make_check_flags').with_args(checks, ()).and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_execute_command_mock(('borg', 'check', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
-    module.check_archives(
-        repository_path='repo',
-        config=config,
-        local_borg_version='1.2.3',
-        global_arguments=flexmock(log_json=False),
+    assert (
+        module.check_archives(
+            repository_path='repo',
+            config=config,
+            local_borg_version='1.2.3',
+            global_arguments=flexmock(log_json=False),
+        )
+        == checks
     )
 
 
@@ -712,7 +1017,7 @@ def test_check_archives_with_json_error_raises():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"unexpected": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -732,7 +1037,7 @@ def test_check_archives_with_missing_json_keys_raises():
     check_last = flexmock()
     config = {'check_last': check_last}
     flexmock(module.rinfo).should_receive('display_repository_info').and_return('{invalid JSON')
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -754,7 +1059,7 @@ def test_check_archives_with_extract_check_calls_extract_only():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -762,7 +1067,7 @@ def test_check_archives_with_extract_check_calls_extract_only():
     flexmock(module).should_receive('make_check_flags').never()
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.extract).should_receive('extract_last_archive_dry_run').once()
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
     insert_execute_command_never()
 
     module.check_archives(
@@ -773,13 +1078,125 @@ def test_check_archives_with_extract_check_calls_extract_only():
     )
 
 
+def test_check_archives_with_spot_check_calls_spot_check_only():
+    checks = ('spot',)
+    config = {'check_last': None}
+    flexmock(module.rinfo).should_receive('display_repository_info').and_return(
+        '{"repository": {"id": "repo"}}'
+    )
+    flexmock(module).should_receive('migrate_check_time_files')
+    flexmock(module).should_receive('parse_checks')
+    flexmock(module).should_receive('make_archive_filter_flags').and_return(())
+    flexmock(module).should_receive('make_archives_check_id').and_return(None)
+    flexmock(module).should_receive('filter_checks_on_frequency').and_return(checks)
+    flexmock(module).should_receive('make_check_flags').never()
+    flexmock(module.extract).should_receive('extract_last_archive_dry_run').never()
+    flexmock(module).should_receive('spot_check').once()
+    flexmock(module).should_receive('write_check_times').with_args(
+        config, 'repo', ('spot',), run_time=object, duration=object
+    ).once()
+    insert_execute_command_never()
+
+    module.check_archives(
+        repository_path='repo',
+        config=config,
+        local_borg_version='1.2.3',
+        global_arguments=flexmock(log_json=False),
+    )
+
+
+def test_check_archives_with_failing_extract_check_records_failure():
+    checks = ('extract',)
+    config = {'check_last': None}
+    flexmock(module.rinfo).should_receive('display_repository_info').and_return(
+        '{"repository": {"id": "repo"}}'
+    )
+    flexmock(module).should_receive('migrate_check_time_files')
+    flexmock(module).should_receive('parse_checks')
+    flexmock(module).should_receive('make_archive_filter_flags').and_return(())
+    flexmock(module).should_receive('make_archives_check_id').and_return(None)
+    flexmock(module).should_receive('filter_checks_on_frequency').and_return(checks)
+    flexmock(module.extract).should_receive('extract_last_archive_dry_run').and_raise(
+        subprocess.CalledProcessError(1, 'borg extract')
+    )
+    flexmock(module).should_receive('write_check_times').with_args(
+        config, 'repo', ('extract',), run_time=object, duration=object, succeeded=False
+    ).once()
+    insert_execute_command_never()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        module.check_archives(
+            repository_path='repo',
+            config=config,
+            local_borg_version='1.2.3',
+            global_arguments=flexmock(log_json=False),
+        )
+
+
+def test_check_archives_with_failing_spot_check_records_failure():
+    checks = ('spot',)
+    config = {'check_last': None}
+    flexmock(module.rinfo).should_receive('display_repository_info').and_return(
+        '{"repository": {"id": "repo"}}'
+    )
+    flexmock(module).should_receive('migrate_check_time_files')
+    flexmock(module).should_receive('parse_checks')
+    flexmock(module).should_receive('make_archive_filter_flags').and_return(())
+    flexmock(module).should_receive('make_archives_check_id').and_return(None)
+    flexmock(module).should_receive('filter_checks_on_frequency').and_return(checks)
+    flexmock(module).should_receive('spot_check').and_raise(ValueError)
+    flexmock(module).should_receive('write_check_times').with_args(
+        config, 'repo', ('spot',), run_time=object, duration=object, succeeded=False
+    ).once()
+    insert_execute_command_never()
+
+    with pytest.raises(ValueError):
+        module.check_archives(
+            repository_path='repo',
+            config=config,
+            local_borg_version='1.2.3',
+            global_arguments=flexmock(log_json=False),
+        )
+
+
+def test_check_archives_with_failing_borg_check_and_state_database_error_raises_check_error():
+    checks = ('repository',)
+    config = {'check_last': None}
+    flexmock(module.rinfo).should_receive('display_repository_info').and_return(
+        '{"repository": {"id": "repo"}}'
+    )
+    flexmock(module).should_receive('migrate_check_time_files')
+    flexmock(module).should_receive('parse_checks')
+    flexmock(module).should_receive('make_archive_filter_flags').and_return(())
+    flexmock(module).should_receive('make_archives_check_id').and_return(None)
+    flexmock(module).should_receive('filter_checks_on_frequency').and_return(checks)
+    flexmock(module).should_receive('make_check_flags').and_return(())
+    flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
+    flexmock(module.environment).should_receive('make_environment')
+    flexmock(module).should_receive('execute_command').and_raise(
+        subprocess.CalledProcessError(1, 'borg check')
+    )
+    flexmock(module).should_receive('write_check_times').with_args(
+        config, 'repo', ('repository',), None, (), object, object, succeeded=False
+    ).and_raise(sqlite3.OperationalError('database is locked')).once()
+    flexmock(module.logger).should_receive('warning').once()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        module.check_archives(
+            repository_path='repo',
+            config=config,
+            local_borg_version='1.2.3',
+            global_arguments=flexmock(log_json=False),
+        )
+
+
 def test_check_archives_with_log_info_calls_borg_with_info_parameter():
     checks = ('repository',)
     config = {'check_last': None}
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -788,8 +1205,7 @@ def test_check_archives_with_log_info_calls_borg_with_info_parameter():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_logging_mock(logging.INFO)
     insert_execute_command_mock(('borg', 'check', '--info', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -805,7 +1221,7 @@ def test_check_archives_with_log_debug_calls_borg_with_debug_parameter():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -814,8 +1230,7 @@ def test_check_archives_with_log_debug_calls_borg_with_debug_parameter():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_logging_mock(logging.DEBUG)
     insert_execute_command_mock(('borg', 'check', '--debug', '--show-rc', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -830,18 +1245,21 @@ def test_check_archives_without_any_checks_bails():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
     flexmock(module).should_receive('filter_checks_on_frequency').and_return(())
     insert_execute_command_never()
 
-    module.check_archives(
-        repository_path='repo',
-        config=config,
-        local_borg_version='1.2.3',
-        global_arguments=flexmock(log_json=False),
+    assert (
+        module.check_archives(
+            repository_path='repo',
+            config=config,
+            local_borg_version='1.2.3',
+            global_arguments=flexmock(log_json=False),
+        )
+        == ()
     )
 
 
@@ -852,7 +1270,7 @@ def test_check_archives_with_local_path_calls_borg_via_local_path():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -860,8 +1278,7 @@ def test_check_archives_with_local_path_calls_borg_via_local_path():
     flexmock(module).should_receive('make_check_flags').with_args(checks, ()).and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_execute_command_mock(('borg1', 'check', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -879,7 +1296,7 @@ def test_check_archives_with_remote_path_calls_borg_with_remote_path_parameters(
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -887,8 +1304,7 @@ def test_check_archives_with_remote_path_calls_borg_with_remote_path_parameters(
     flexmock(module).should_receive('make_check_flags').with_args(checks, ()).and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_execute_command_mock(('borg', 'check', '--remote-path', 'borg1', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -906,7 +1322,7 @@ def test_check_archives_with_log_json_calls_borg_with_log_json_parameters():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -914,8 +1330,7 @@ def test_check_archives_with_log_json_calls_borg_with_log_json_parameters():
     flexmock(module).should_receive('make_check_flags').with_args(checks, ()).and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_execute_command_mock(('borg', 'check', '--log-json', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -932,7 +1347,7 @@ def test_check_archives_with_lock_wait_calls_borg_with_lock_wait_parameters():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -940,8 +1355,7 @@ def test_check_archives_with_lock_wait_calls_borg_with_lock_wait_parameters():
     flexmock(module).should_receive('make_check_flags').with_args(checks, ()).and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_execute_command_mock(('borg', 'check', '--lock-wait', '5', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -959,7 +1373,7 @@ def test_check_archives_with_retention_prefix():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -967,8 +1381,7 @@ def test_check_archives_with_retention_prefix():
     flexmock(module).should_receive('make_check_flags').with_args(checks, ()).and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_execute_command_mock(('borg', 'check', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
@@ -984,7 +1397,7 @@ def test_check_archives_with_extra_borg_options_calls_borg_with_extra_options():
     flexmock(module.rinfo).should_receive('display_repository_info').and_return(
         '{"repository": {"id": "repo"}}'
     )
-    flexmock(module).should_receive('upgrade_check_times')
+    flexmock(module).should_receive('migrate_check_time_files')
     flexmock(module).should_receive('parse_checks')
     flexmock(module).should_receive('make_archive_filter_flags').and_return(())
     flexmock(module).should_receive('make_archives_check_id').and_return(None)
@@ -992,8 +1405,7 @@ def test_check_archives_with_extra_borg_options_calls_borg_with_extra_options():
     flexmock(module).should_receive('make_check_flags').and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     insert_execute_command_mock(('borg', 'check', '--extra', '--options', 'repo'))
-    flexmock(module).should_receive('make_check_time_path')
-    flexmock(module).should_receive('write_check_time')
+    flexmock(module).should_receive('write_check_times')
 
     module.check_archives(
         repository_path='repo',
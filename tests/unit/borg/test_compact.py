@@ -195,3 +195,126 @@ def test_compact_segments_with_extra_borg_options_calls_borg_with_extra_options(
         local_borg_version='1.2.3',
         global_arguments=flexmock(log_json=False),
     )
+
+
+def test_get_repository_unique_size_parses_rinfo_json():
+    flexmock(module.rinfo).should_receive('display_repository_info').and_return(
+        '{"cache": {"stats": {"unique_csize": 1000}}}'
+    )
+
+    assert module.get_repository_unique_size('repo', {}, '1.2.3', flexmock(log_json=False)) == 1000
+
+
+def test_get_repository_unique_size_without_stats_returns_none():
+    flexmock(module.rinfo).should_receive('display_repository_info').and_return('{}')
+
+    assert module.get_repository_unique_size('repo', {}, '1.2.3', flexmock(log_json=False)) is None
+
+
+def test_compact_due_without_frequency_or_threshold_is_always_due():
+    flexmock(module.state).should_receive('open_state_database').never()
+
+    assert module.compact_due('repo', {}) == 'always'
+
+
+def mock_compact_state(compact_state):
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').and_return(compact_state)
+
+
+def test_compact_due_without_previous_compact_is_due():
+    mock_compact_state({})
+
+    assert module.compact_due('repo', {'compact_frequency': '1 week'})
+
+
+def test_compact_due_with_reclaimable_space_over_threshold_is_due():
+    mock_compact_state(
+        {
+            'last_compact_time': module.datetime.datetime(2023, 9, 1).timestamp(),
+            'reclaimable_bytes': 2000,
+        }
+    )
+
+    assert module.compact_due(
+        'repo',
+        {'compact_frequency': '1 week', 'compact_threshold_bytes': 1000},
+        now=module.datetime.datetime(2023, 9, 2),
+    )
+
+
+def test_compact_due_with_reclaimable_space_under_threshold_and_frequency_not_elapsed_is_not_due():
+    mock_compact_state(
+        {
+            'last_compact_time': module.datetime.datetime(2023, 9, 1).timestamp(),
+            'reclaimable_bytes': 500,
+        }
+    )
+
+    assert (
+        module.compact_due(
+            'repo',
+            {'compact_frequency': '1 week', 'compact_threshold_bytes': 1000},
+            now=module.datetime.datetime(2023, 9, 2),
+        )
+        is None
+    )
+
+
+def test_compact_due_with_frequency_elapsed_is_due():
+    mock_compact_state(
+        {
+            'last_compact_time': module.datetime.datetime(2023, 9, 1).timestamp(),
+            'reclaimable_bytes': 0,
+        }
+    )
+
+    assert module.compact_due(
+        'repo',
+        {'compact_frequency': '1 week', 'compact_threshold_bytes': 1000},
+        now=module.datetime.datetime(2023, 9, 8),
+    )
+
+
+def test_compact_due_with_threshold_only_ignores_elapsed_time():
+    mock_compact_state(
+        {
+            'last_compact_time': module.datetime.datetime(2023, 9, 1).timestamp(),
+            'reclaimable_bytes': 500,
+        }
+    )
+
+    assert (
+        module.compact_due(
+            'repo', {'compact_threshold_bytes': 1000}, now=module.datetime.datetime(2024, 9, 1)
+        )
+        is None
+    )
+
+
+def test_record_compaction_defaults_to_current_time():
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection, module.COMPACT_STATE_NAMESPACE, 'repo', dict
+    ).once()
+
+    module.record_compaction('repo', {})
+
+
+def test_compact_due_with_threshold_and_unknown_reclaimable_space_is_due():
+    mock_compact_state(
+        {
+            'last_compact_time': module.datetime.datetime(2023, 9, 1).timestamp(),
+            'reclaimable_bytes': 0,
+            'reclaimable_unknown': True,
+        }
+    )
+
+    assert (
+        module.compact_due(
+            'repo', {'compact_threshold_bytes': 1000}, now=module.datetime.datetime(2023, 9, 2)
+        )
+        == 'reclaimable space unknown'
+    )
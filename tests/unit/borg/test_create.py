@@ -496,6 +496,7 @@ def test_create_archive_calls_borg_with_parameters():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -539,6 +540,7 @@ def test_create_archive_calls_borg_with_environment():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=environment,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -584,6 +586,7 @@ def test_create_archive_with_patterns_calls_borg_with_patterns_including_convert
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -633,6 +636,7 @@ def test_create_archive_with_sources_and_used_config_paths_calls_borg_with_sourc
         borg_local_path='borg',
         working_directory=None,
         extra_environment=environment,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -679,6 +683,7 @@ def test_create_archive_with_sources_and_used_config_paths_with_store_config_fil
         borg_local_path='borg',
         working_directory=None,
         extra_environment=environment,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -724,6 +729,7 @@ def test_create_archive_with_exclude_patterns_calls_borg_with_excludes():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -766,6 +772,7 @@ def test_create_archive_with_log_info_calls_borg_with_info_parameter():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     insert_logging_mock(logging.INFO)
 
@@ -851,6 +858,7 @@ def test_create_archive_with_log_debug_calls_borg_with_debug_parameter():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     insert_logging_mock(logging.DEBUG)
 
@@ -936,6 +944,7 @@ def test_create_archive_with_dry_run_calls_borg_with_dry_run_parameter():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -980,6 +989,7 @@ def test_create_archive_with_stats_and_dry_run_calls_borg_without_stats_paramete
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     insert_logging_mock(logging.INFO)
 
@@ -1024,6 +1034,7 @@ def test_create_archive_with_checkpoint_interval_calls_borg_with_checkpoint_inte
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1067,6 +1078,7 @@ def test_create_archive_with_checkpoint_volume_calls_borg_with_checkpoint_volume
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1110,6 +1122,7 @@ def test_create_archive_with_chunker_params_calls_borg_with_chunker_params_param
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1153,6 +1166,7 @@ def test_create_archive_with_compression_calls_borg_with_compression_parameters(
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1202,6 +1216,7 @@ def test_create_archive_with_upload_rate_limit_calls_borg_with_upload_ratelimit_
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1247,6 +1262,7 @@ def test_create_archive_with_working_directory_calls_borg_with_working_directory
         borg_local_path='borg',
         working_directory='/working/dir',
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1290,6 +1306,7 @@ def test_create_archive_with_one_file_system_calls_borg_with_one_file_system_par
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1339,6 +1356,7 @@ def test_create_archive_with_numeric_ids_calls_borg_with_numeric_ids_parameter(
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1384,6 +1402,7 @@ def test_create_archive_with_read_special_calls_borg_with_read_special_parameter
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module).should_receive('execute_command').with_args(
         create_command,
@@ -1392,6 +1411,7 @@ def test_create_archive_with_read_special_calls_borg_with_read_special_parameter
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1447,6 +1467,7 @@ def test_create_archive_with_basic_option_calls_borg_with_corresponding_paramete
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1501,6 +1522,7 @@ def test_create_archive_with_atime_option_calls_borg_with_corresponding_paramete
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1555,6 +1577,7 @@ def test_create_archive_with_flags_option_calls_borg_with_corresponding_paramete
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1598,6 +1621,7 @@ def test_create_archive_with_files_cache_calls_borg_with_files_cache_parameters(
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1641,6 +1665,7 @@ def test_create_archive_with_local_path_calls_borg_via_local_path():
         borg_local_path='borg1',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1684,6 +1709,7 @@ def test_create_archive_with_remote_path_calls_borg_with_remote_path_parameters(
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1727,6 +1753,7 @@ def test_create_archive_with_umask_calls_borg_with_umask_parameters():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1770,6 +1797,7 @@ def test_create_archive_with_log_json_calls_borg_with_log_json_parameters():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1812,6 +1840,7 @@ def test_create_archive_with_lock_wait_calls_borg_with_lock_wait_parameters():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1855,6 +1884,7 @@ def test_create_archive_with_stats_calls_borg_with_stats_parameter_and_answer_ou
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1898,6 +1928,7 @@ def test_create_archive_with_files_calls_borg_with_list_parameter_and_answer_out
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -1914,6 +1945,97 @@ def test_create_archive_with_files_calls_borg_with_list_parameter_and_answer_out
     )
 
 
+def test_create_archive_with_list_summary_calls_borg_with_list_parameter_and_summarizes_output():
+    flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels')
+    flexmock(module.logging).ANSWER = module.borgmatic.logger.ANSWER
+    flexmock(module).should_receive('collect_borgmatic_source_directories').and_return([])
+    flexmock(module).should_receive('deduplicate_directories').and_return(('foo', 'bar'))
+    flexmock(module).should_receive('map_directories_to_devices').and_return({})
+    flexmock(module).should_receive('expand_directories').and_return(())
+    flexmock(module).should_receive('pattern_root_directories').and_return([])
+    flexmock(module.os.path).should_receive('expanduser').and_raise(TypeError)
+    flexmock(module).should_receive('expand_home_directories').and_return(())
+    flexmock(module).should_receive('write_pattern_file').and_return(None)
+    flexmock(module).should_receive('make_list_filter_flags').and_return('FOO')
+    flexmock(module.feature).should_receive('available').and_return(True)
+    flexmock(module).should_receive('ensure_files_readable')
+    flexmock(module).should_receive('make_pattern_flags').and_return(())
+    flexmock(module).should_receive('make_exclude_flags').and_return(())
+    flexmock(module.flags).should_receive('make_repository_archive_flags').and_return(
+        (f'repo::{DEFAULT_ARCHIVE_NAME}',)
+    )
+    flexmock(module.environment).should_receive('make_environment')
+    handle_line = lambda line: True  # noqa: E731
+    summarizer = flexmock(handle_line=handle_line)
+    summarizer.should_receive('finish').once()
+    flexmock(module.file_status).should_receive('File_list_summarizer').with_args(
+        'repo', '/tmp/files.log.gz'
+    ).and_return(summarizer)
+    flexmock(module).should_receive('execute_command').with_args(
+        ('borg', 'create', '--list', '--filter', 'FOO') + REPO_ARCHIVE_WITH_PATHS,
+        output_log_level=module.borgmatic.logger.ANSWER,
+        output_file=None,
+        borg_local_path='borg',
+        working_directory=None,
+        extra_environment=None,
+        line_handler=handle_line,
+    ).once()
+
+    module.create_archive(
+        dry_run=False,
+        repository_path='repo',
+        config={
+            'source_directories': ['foo', 'bar'],
+            'repositories': ['repo'],
+            'exclude_patterns': None,
+            'list_files_log_path': '/tmp/files.log.gz',
+        },
+        local_borg_version='1.2.3',
+        global_arguments=flexmock(log_json=False, used_config_paths=[]),
+        list_summary=True,
+    )
+
+
+def test_create_archive_with_list_summary_and_borg_error_still_finishes_summary():
+    flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels')
+    flexmock(module.logging).ANSWER = module.borgmatic.logger.ANSWER
+    flexmock(module).should_receive('collect_borgmatic_source_directories').and_return([])
+    flexmock(module).should_receive('deduplicate_directories').and_return(('foo', 'bar'))
+    flexmock(module).should_receive('map_directories_to_devices').and_return({})
+    flexmock(module).should_receive('expand_directories').and_return(())
+    flexmock(module).should_receive('pattern_root_directories').and_return([])
+    flexmock(module.os.path).should_receive('expanduser').and_raise(TypeError)
+    flexmock(module).should_receive('expand_home_directories').and_return(())
+    flexmock(module).should_receive('write_pattern_file').and_return(None)
+    flexmock(module).should_receive('make_list_filter_flags').and_return('FOO')
+    flexmock(module.feature).should_receive('available').and_return(True)
+    flexmock(module).should_receive('ensure_files_readable')
+    flexmock(module).should_receive('make_pattern_flags').and_return(())
+    flexmock(module).should_receive('make_exclude_flags').and_return(())
+    flexmock(module.flags).should_receive('make_repository_archive_flags').and_return(
+        (f'repo::{DEFAULT_ARCHIVE_NAME}',)
+    )
+    flexmock(module.environment).should_receive('make_environment')
+    summarizer = flexmock(handle_line=lambda line: True)
+    summarizer.should_receive('finish').once()
+    flexmock(module.file_status).should_receive('File_list_summarizer').and_return(summarizer)
+    flexmock(module).should_receive('execute_command').and_raise(OSError)
+
+    with pytest.raises(OSError):
+        module.create_archive(
+            dry_run=False,
+            repository_path='repo',
+            config={
+                'source_directories': ['foo', 'bar'],
+                'repositories': ['repo'],
+                'exclude_patterns': None,
+            },
+            local_borg_version='1.2.3',
+            global_arguments=flexmock(log_json=False, used_config_paths=[]),
+            list_summary=True,
+        )
+
+
 def test_create_archive_with_progress_and_log_info_calls_borg_with_progress_parameter_and_no_list():
     flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels')
     flexmock(module.logging).ANSWER = module.borgmatic.logger.ANSWER
@@ -1946,6 +2068,7 @@ def test_create_archive_with_progress_and_log_info_calls_borg_with_progress_para
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     insert_logging_mock(logging.INFO)
 
@@ -1990,6 +2113,7 @@ def test_create_archive_with_progress_calls_borg_with_progress_parameter():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2041,6 +2165,7 @@ def test_create_archive_with_progress_and_stream_processes_calls_borg_with_progr
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module).should_receive('execute_command_with_processes').with_args(
         create_command,
@@ -2050,6 +2175,7 @@ def test_create_archive_with_progress_and_stream_processes_calls_borg_with_progr
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2104,6 +2230,7 @@ def test_create_archive_with_stream_processes_ignores_read_special_false_and_log
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module).should_receive('execute_command_with_processes').with_args(
         create_command,
@@ -2113,6 +2240,7 @@ def test_create_archive_with_stream_processes_ignores_read_special_false_and_log
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2172,6 +2300,7 @@ def test_create_archive_with_stream_processes_adds_special_files_to_excludes():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module).should_receive('execute_command_with_processes').with_args(
         create_command + ('--exclude-from', '/excludes'),
@@ -2181,6 +2310,7 @@ def test_create_archive_with_stream_processes_adds_special_files_to_excludes():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2235,6 +2365,7 @@ def test_create_archive_with_stream_processes_and_read_special_does_not_add_spec
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module).should_receive('execute_command_with_processes').with_args(
         create_command,
@@ -2244,6 +2375,7 @@ def test_create_archive_with_stream_processes_and_read_special_does_not_add_spec
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2375,6 +2507,7 @@ def test_create_archive_with_source_directories_glob_expands():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module.glob).should_receive('glob').with_args('foo*').and_return(['foo', 'food'])
 
@@ -2418,6 +2551,7 @@ def test_create_archive_with_non_matching_source_directories_glob_passes_through
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module.glob).should_receive('glob').with_args('foo*').and_return([])
 
@@ -2461,6 +2595,7 @@ def test_create_archive_with_glob_calls_borg_with_expanded_directories():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2503,6 +2638,7 @@ def test_create_archive_with_archive_name_format_calls_borg_with_archive_name():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2547,6 +2683,7 @@ def test_create_archive_with_archive_name_format_accepts_borg_placeholders():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2591,6 +2728,7 @@ def test_create_archive_with_repository_accepts_borg_placeholders():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2634,6 +2772,7 @@ def test_create_archive_with_extra_borg_options_calls_borg_with_extra_options():
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -2686,6 +2825,7 @@ def test_create_archive_with_stream_processes_calls_borg_with_processes_and_read
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
     flexmock(module).should_receive('execute_command_with_processes').with_args(
         create_command,
@@ -2695,6 +2835,7 @@ def test_create_archive_with_stream_processes_calls_borg_with_processes_and_read
         borg_local_path='borg',
         working_directory=None,
         extra_environment=None,
+        line_handler=None,
     )
 
     module.create_archive(
@@ -0,0 +1,126 @@
+import collections
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.borg import file_status as module
+
+
+@pytest.mark.parametrize(
+    'line,expected_result',
+    (
+        ('A /home/user/file.txt', ('A', '/home/user/file.txt')),
+        ('U etc/hosts', ('U', 'etc/hosts')),
+        ('- /tmp/file with spaces', ('-', '/tmp/file with spaces')),
+        ('x /var/cache/junk', ('x', '/var/cache/junk')),
+        ('Creating archive at "repo::archive"', None),
+        ('Archive name: archive', None),
+        ('', None),
+        ('{"type": "file_status", "status": "M", "path": "/etc/hosts"}', ('M', '/etc/hosts')),
+        ('{"type": "file_status", "path": "/etc/hosts"}', ('?', '/etc/hosts')),
+        ('{"type": "log_message", "message": "A /etc/hosts"}', None),
+        ('{"type": "file_status", ', None),
+        ('{}', None),
+    ),
+)
+def test_parse_file_status_parses_plain_and_json_status_lines(line, expected_result):
+    assert module.parse_file_status(line) == expected_result
+
+
+@pytest.mark.parametrize(
+    'path,expected_result',
+    (
+        ('/home/user/file.txt', '/home'),
+        ('etc/hosts', 'etc'),
+        ('/vmlinuz', '/vmlinuz'),
+        ('file.txt', 'file.txt'),
+    ),
+)
+def test_top_level_directory_returns_first_path_component(path, expected_result):
+    assert module.top_level_directory(path) == expected_result
+
+
+def test_format_counts_orders_known_statuses_first():
+    assert (
+        module.format_counts(collections.Counter({'U': 4052, 'd': 1, 'A': 12, 'M': 3}))
+        == 'A 12, M 3, U 4052, d 1'
+    )
+
+
+def test_file_list_summarizer_counts_file_statuses_without_logging_them():
+    flexmock(module.logger).should_receive('log').never()
+    summarizer = module.File_list_summarizer('repo', clock=lambda: 0)
+
+    assert summarizer.handle_line('A /home/user/new.txt')
+    assert summarizer.handle_line('U /home/user/old.txt')
+    assert summarizer.handle_line('M /etc/hosts')
+
+    assert summarizer.counts == {
+        '/home': collections.Counter({'A': 1, 'U': 1}),
+        '/etc': collections.Counter({'M': 1}),
+    }
+    assert summarizer.total_counts == collections.Counter({'A': 1, 'U': 1, 'M': 1})
+
+
+def test_file_list_summarizer_passes_on_other_lines():
+    summarizer = module.File_list_summarizer('repo', clock=lambda: 0)
+
+    assert not summarizer.handle_line('Archive name: archive')
+    assert not summarizer.total_counts
+
+
+def test_file_list_summarizer_logs_rollup_once_interval_has_elapsed():
+    times = iter((0, 10, module.ROLLUP_INTERVAL_SECONDS + 1, module.ROLLUP_INTERVAL_SECONDS + 2))
+    flexmock(module.logging).ANSWER = 25
+    flexmock(module.logger).should_receive('log').with_args(
+        25, 'repo: 2 files so far (A 1, U 1)'
+    ).once()
+    summarizer = module.File_list_summarizer('repo', clock=lambda: next(times))
+
+    summarizer.handle_line('A /home/user/new.txt')
+    summarizer.handle_line('U /home/user/old.txt')
+    summarizer.handle_line('U /home/user/older.txt')
+
+
+def test_file_list_summarizer_finish_logs_table_per_top_level_directory():
+    logged_messages = []
+    flexmock(module.logging).ANSWER = 25
+    flexmock(module.logger).should_receive('log').replace_with(
+        lambda level, message: logged_messages.append(message)
+    )
+    summarizer = module.File_list_summarizer('repo', clock=lambda: 0)
+    summarizer.handle_line('A /home/user/new.txt')
+    summarizer.handle_line('U /home/user/old.txt')
+    summarizer.handle_line('M /etc/hosts')
+
+    summarizer.finish()
+
+    assert logged_messages == [
+        'repo: 3 files listed (A 1, M 1, U 1)',
+        '/etc            1  M 1',
+        '/home           2  A 1, U 1',
+    ]
+
+
+def test_file_list_summarizer_finish_without_any_files_logs_nothing():
+    flexmock(module.logger).should_receive('log').never()
+    summarizer = module.File_list_summarizer('repo', clock=lambda: 0)
+
+    summarizer.finish()
+
+
+def test_file_list_summarizer_with_listing_path_writes_listing_and_closes_it():
+    listing_file = flexmock()
+    listing_file.should_receive('write').with_args('A /home/user/new.txt\n').once()
+    listing_file.should_receive('close').once()
+    flexmock(module.os.path).should_receive('expanduser').and_return('/var/log/files.log.gz')
+    flexmock(module.os).should_receive('makedirs').with_args('/var/log', exist_ok=True).once()
+    flexmock(module.gzip).should_receive('open').with_args(
+        '/var/log/files.log.gz', 'wt'
+    ).and_return(listing_file)
+    flexmock(module.logger).should_receive('log')
+    summarizer = module.File_list_summarizer('repo', '~/files.log.gz', clock=lambda: 0)
+
+    summarizer.handle_line('A /home/user/new.txt')
+    summarizer.finish()
+    summarizer.finish()
@@ -0,0 +1,210 @@
+import pytest
+from flexmock import flexmock
+
+from borgmatic.borg import history as module
+
+
+@pytest.mark.parametrize(
+    'config,expected_result',
+    (
+        ({}, False),
+        ({'statistics_history': False}, False),
+        ({'statistics_history': True}, True),
+        ({'prometheus': {'textfile_path': 'borgmatic.prom'}}, True),
+    ),
+)
+def test_history_enabled_checks_statistics_history_option(config, expected_result):
+    assert module.history_enabled(config) is expected_result
+
+
+def test_parse_archive_statistics_extracts_sizes_and_timing():
+    assert module.parse_archive_statistics(
+        {
+            'name': 'archive',
+            'start': '2023-09-01T12:30:00.000000',
+            'duration': 12.5,
+            'stats': {
+                'original_size': 4000,
+                'compressed_size': 3000,
+                'deduplicated_size': 1000,
+                'nfiles': 10,
+            },
+        }
+    ) == {
+        'name': 'archive',
+        'start_time': module.datetime.datetime(2023, 9, 1, 12, 30).timestamp(),
+        'duration': 12.5,
+        'original_size': 4000,
+        'compressed_size': 3000,
+        'deduplicated_size': 1000,
+        'file_count': 10,
+    }
+
+
+def test_parse_archive_statistics_without_stats_leaves_sizes_empty():
+    archive_statistics = module.parse_archive_statistics(
+        {'name': 'archive', 'start': '2023-09-01T12:30:00.000000'}
+    )
+
+    assert archive_statistics['duration'] is None
+    assert archive_statistics['original_size'] is None
+    assert archive_statistics['file_count'] is None
+
+
+def test_fetch_latest_archive_statistics_calls_borg_info_for_last_archive():
+    flexmock(module.info).should_receive('display_archives_info').with_args(
+        'repo',
+        {},
+        '1.2.3',
+        module.argparse.Namespace(
+            repository='repo',
+            archive=None,
+            json=True,
+            prefix=None,
+            match_archives=None,
+            sort_by=None,
+            first=None,
+            last=1,
+            oldest=None,
+            newest=None,
+            older=None,
+            newer=None,
+        ),
+        object,
+        'borg',
+        None,
+    ).and_return('{"archives": []}')
+
+    assert module.fetch_latest_archive_statistics(
+        'repo', {}, '1.2.3', flexmock(log_json=False)
+    ) == {'archives': []}
+
+
+@pytest.mark.parametrize(
+    'durations,expected_result',
+    (
+        ((), None),
+        ((0,), None),
+        ((10, 20, 60), 20),
+        ((1000,) * 10 + (10, 20), 1000),
+        ((1000,) * 5 + (10,) * 10, 10),
+    ),
+)
+def test_estimate_duration_takes_median_of_recent_durations(durations, expected_result):
+    assert module.estimate_duration(durations) == expected_result
+
+
+def test_record_action_run_records_elapsed_duration():
+    flexmock(module.time).should_receive('time').and_return(110.0)
+    flexmock(module).should_receive('record_action_duration').with_args(
+        {'statistics_history': True}, 'repo', 'prune', 100.0, 10.0
+    ).once()
+
+    module.record_action_run({'statistics_history': True}, 'repo', 'prune', 100.0, dry_run=False)
+
+
+def test_record_action_run_without_statistics_history_does_not_record():
+    flexmock(module).should_receive('record_action_duration').never()
+
+    module.record_action_run({}, 'repo', 'prune', 100.0, dry_run=False)
+
+
+def test_record_action_run_with_dry_run_does_not_record():
+    flexmock(module).should_receive('record_action_duration').never()
+
+    module.record_action_run({'statistics_history': True}, 'repo', 'prune', 100.0, dry_run=True)
+
+
+def test_estimate_action_duration_estimates_from_recorded_durations_for_action():
+    flexmock(module).should_receive('read_action_durations').and_return(
+        {'create': [10, 20, 30], 'prune': [5]}
+    )
+
+    assert module.estimate_action_duration({}, 'repo', 'create') == 20
+    assert module.estimate_action_duration({}, 'repo', 'check') is None
+
+
+def test_deduplication_ratio_divides_total_original_by_total_deduplicated_size():
+    assert (
+        module.deduplication_ratio(
+            (
+                {'original_size': 3000, 'deduplicated_size': 1000},
+                {'original_size': 5000, 'deduplicated_size': None},
+            )
+        )
+        == 8
+    )
+
+
+def test_deduplication_ratio_without_deduplicated_size_returns_none():
+    assert module.deduplication_ratio(({'original_size': 3000, 'deduplicated_size': 0},)) is None
+
+
+def test_growth_per_day_fits_line_to_repository_size():
+    assert (
+        module.growth_per_day(
+            (
+                {'start_time': 0, 'repository_unique_size': 1000},
+                {'start_time': 86400, 'repository_unique_size': None},
+                {'start_time': 2 * 86400, 'repository_unique_size': 3000},
+                {'start_time': 4 * 86400, 'repository_unique_size': 5000},
+            )
+        )
+        == 1000
+    )
+
+
+@pytest.mark.parametrize(
+    'archive_statistics',
+    (
+        (),
+        ({'start_time': 0, 'repository_unique_size': 1000},),
+        (
+            {'start_time': 0, 'repository_unique_size': 1000},
+            {'start_time': 0, 'repository_unique_size': 2000},
+        ),
+    ),
+)
+def test_growth_per_day_without_enough_data_returns_none(archive_statistics):
+    assert module.growth_per_day(archive_statistics) is None
+
+
+def test_summarize_history_without_history_returns_empty_summary():
+    assert module.summarize_history((), {}) == {
+        'archive_count': 0,
+        'latest_archive': None,
+        'deduplication_ratio': None,
+        'recent_deduplication_ratio': None,
+        'growth_per_day': None,
+        'forecast_days': module.FORECAST_DAYS,
+        'forecast_size': None,
+        'estimated_durations': {},
+    }
+
+
+def test_summarize_history_forecasts_repository_size():
+    archive_statistics = [
+        {
+            'name': 'archive1',
+            'start_time': 0,
+            'original_size': 2000,
+            'deduplicated_size': 1000,
+            'repository_unique_size': 1000,
+        },
+        {
+            'name': 'archive2',
+            'start_time': 86400,
+            'original_size': 2000,
+            'deduplicated_size': 1000,
+            'repository_unique_size': 2000,
+        },
+    ]
+
+    summary = module.summarize_history(archive_statistics, {'create': [10, 30]})
+
+    assert summary['archive_count'] == 2
+    assert summary['latest_archive'] == archive_statistics[-1]
+    assert summary['deduplication_ratio'] == 2
+    assert summary['growth_per_day'] == 1000
+    assert summary['forecast_size'] == 2000 + 1000 * module.FORECAST_DAYS
+    assert summary['estimated_durations'] == {'create': 20}
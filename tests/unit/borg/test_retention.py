@@ -0,0 +1,433 @@
+import datetime
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.borg import create, prune
+from borgmatic.borg import retention as module
+
+
+def make_archives(*name_times, sizes=None):
+    if sizes is None:
+        return tuple({'name': name, 'time': time} for name, time in name_times)
+
+    return tuple(
+        {'name': name, 'time': time, 'deduplicated_size': size}
+        for (name, time), size in zip(name_times, sizes)
+    )
+
+
+@pytest.mark.parametrize(
+    'keep_within,expected_result',
+    (
+        ('3H', datetime.timedelta(hours=3)),
+        ('2d', datetime.timedelta(days=2)),
+        ('1w', datetime.timedelta(weeks=1)),
+        ('1m', datetime.timedelta(days=31)),
+        ('1y', datetime.timedelta(days=365)),
+    ),
+)
+def test_parse_keep_within_parses_into_timedeltas(keep_within, expected_result):
+    assert module.parse_keep_within(keep_within) == expected_result
+
+
+@pytest.mark.parametrize('keep_within', ('', '3', 'd', '3 days', '3x'))
+def test_parse_keep_within_raises_on_parse_error(keep_within):
+    with pytest.raises(ValueError):
+        module.parse_keep_within(keep_within)
+
+
+@pytest.mark.parametrize(
+    'match_flags,name,expected_result',
+    (
+        ({}, 'anything', True),
+        ({'--glob-archives': 'host-*'}, 'host-2023', True),
+        ({'--glob-archives': 'host-*'}, 'other-2023', False),
+        ({'--match-archives': 'sh:host-*'}, 'host-2023', True),
+        ({'--match-archives': 'sh:host-*'}, 'other-2023', False),
+        ({'--match-archives': 're:^host-\\d+$'}, 'host-2023', True),
+        ({'--match-archives': 're:^host-\\d+$'}, 'host-abc', False),
+        ({'--match-archives': 'pp:host'}, 'host-2023', True),
+        ({'--match-archives': 'host-2023'}, 'host-2023', True),
+        ({'--match-archives': 'host-2023'}, 'host-2024', False),
+    ),
+)
+def test_make_archive_matcher_matches_like_borg(match_flags, name, expected_result):
+    assert module.make_archive_matcher(match_flags)(name) is expected_result
+
+
+def mock_placeholder_values():
+    flexmock(module.socket).should_receive('gethostname').and_return('myhost.example.org')
+    flexmock(module.socket).should_receive('getfqdn').and_return('myhost.example.org')
+    flexmock(module.os).should_receive('getuid').and_return(1000)
+    flexmock(module.pwd).should_receive('getpwuid').with_args(1000).and_return(
+        flexmock(pw_name='alice')
+    )
+
+
+def test_expand_placeholders_replaces_stable_borg_placeholders():
+    mock_placeholder_values()
+
+    assert (
+        module.expand_placeholders('{hostname} {fqdn} {reverse-fqdn} {user} {other}')
+        == 'myhost myhost.example.org org.example.myhost alice {other}'
+    )
+
+
+@pytest.mark.parametrize(
+    'local_borg_version,name,expected_result',
+    (
+        ('1.2.4', 'myhost-2023-09-01T12:30:00.000000', True),
+        ('1.2.4', 'otherhost-2023-09-01T12:30:00.000000', False),
+        ('1.1.7', 'myhost-2023-09-01T12:30:00.000000', True),
+        ('1.1.7', 'otherhost-2023-09-01T12:30:00.000000', False),
+    ),
+)
+def test_make_archive_matcher_with_default_archive_name_format_matches_this_host(
+    local_borg_version, name, expected_result
+):
+    mock_placeholder_values()
+    prune_flags = prune.make_prune_flags(
+        {'archive_name_format': create.DEFAULT_ARCHIVE_NAME_FORMAT}, local_borg_version
+    )
+    match_flags = dict(zip(prune_flags[::2], prune_flags[1::2]))
+
+    assert module.make_archive_matcher(match_flags)(name) is expected_result
+
+
+def test_parse_archive_time_parses_naive_time():
+    assert module.parse_archive_time({'time': '2023-09-01T12:30:00.000000'}) == datetime.datetime(
+        2023, 9, 1, 12, 30
+    )
+
+
+def test_parse_archive_time_converts_aware_time_to_naive_local_time():
+    archive_time = module.parse_archive_time({'time': '2023-09-01T12:30:00+00:00'})
+
+    assert archive_time.tzinfo is None
+    assert archive_time == datetime.datetime(
+        2023, 9, 1, 12, 30, tzinfo=datetime.timezone.utc
+    ).astimezone().replace(tzinfo=None)
+
+
+def test_simulate_prune_keeps_newest_archive_per_day():
+    archives = make_archives(
+        ('host-1', '2023-09-01T01:00:00'),
+        ('host-2', '2023-09-01T13:00:00'),
+        ('host-3', '2023-09-02T01:00:00'),
+        ('host-4', '2023-09-03T01:00:00'),
+        ('host-5', '2023-09-03T13:00:00'),
+    )
+
+    assert module.simulate_prune(archives, ('--keep-daily', '2')) == (
+        {'host-5': ('daily', 1), 'host-3': ('daily', 2)},
+        ('host-4', 'host-2', 'host-1'),
+    )
+
+
+def test_simulate_prune_keeps_oldest_archive_when_not_enough_periods():
+    archives = make_archives(
+        ('host-1', '2023-09-01T01:00:00'),
+        ('host-2', '2023-09-01T13:00:00'),
+        ('host-3', '2023-09-02T01:00:00'),
+    )
+
+    assert module.simulate_prune(archives, ('--keep-daily', '5')) == (
+        {'host-3': ('daily', 1), 'host-2': ('daily', 2), 'host-1': ('daily[oldest]', 3)},
+        (),
+    )
+
+
+def test_simulate_prune_applies_rules_in_order_without_double_counting():
+    archives = make_archives(
+        ('host-1', '2023-07-15T01:00:00'),
+        ('host-2', '2023-08-15T01:00:00'),
+        ('host-3', '2023-08-31T01:00:00'),
+        ('host-4', '2023-09-01T01:00:00'),
+        ('host-5', '2023-09-02T01:00:00'),
+    )
+
+    assert module.simulate_prune(archives, ('--keep-daily', '2', '--keep-monthly', '2')) == (
+        {
+            'host-5': ('daily', 1),
+            'host-4': ('daily', 2),
+            'host-3': ('monthly', 1),
+            'host-1': ('monthly', 2),
+        },
+        ('host-2',),
+    )
+
+
+def test_simulate_prune_with_zero_count_keeps_nothing_for_that_rule():
+    archives = make_archives(('host-1', '2023-09-01T01:00:00'))
+
+    assert module.simulate_prune(archives, ('--keep-daily', '0')) == ({}, ('host-1',))
+
+
+def test_simulate_prune_keeps_archives_within_interval():
+    archives = make_archives(
+        ('host-1', '2023-09-01T01:00:00'),
+        ('host-2', '2023-09-02T11:00:00'),
+        ('host-3', '2023-09-02T12:00:00'),
+    )
+
+    assert module.simulate_prune(
+        archives, ('--keep-within', '1H'), now=datetime.datetime(2023, 9, 2, 12, 30)
+    ) == ({'host-3': ('within', 1)}, ('host-2', 'host-1'))
+
+
+def test_simulate_prune_ignores_archives_not_matching_filter():
+    archives = make_archives(
+        ('host-1', '2023-09-01T01:00:00'),
+        ('other-1', '2023-09-02T01:00:00'),
+        ('host-2', '2023-09-03T01:00:00'),
+    )
+
+    assert module.simulate_prune(
+        archives, ('--keep-daily', '1', '--match-archives', 'sh:host-*')
+    ) == ({'host-2': ('daily', 1)}, ('host-1',))
+
+
+def test_simulate_prune_keeps_latest_checkpoint_newer_than_all_completed_archives():
+    archives = make_archives(
+        ('host-1', '2023-09-01T01:00:00'),
+        ('host-2.checkpoint', '2023-09-01T02:00:00'),
+        ('host-3.checkpoint.1', '2023-09-02T01:00:00'),
+    )
+
+    assert module.simulate_prune(archives, ('--keep-daily', '1')) == (
+        {'host-3.checkpoint.1': ('checkpoint', 1), 'host-1': ('daily', 1)},
+        ('host-2.checkpoint',),
+    )
+
+
+def test_simulate_prune_prunes_checkpoints_older_than_completed_archive():
+    archives = make_archives(
+        ('host-1.checkpoint', '2023-09-01T01:00:00'),
+        ('host-2', '2023-09-01T02:00:00'),
+    )
+
+    assert module.simulate_prune(archives, ('--keep-daily', '7')) == (
+        {'host-2': ('daily', 1)},
+        ('host-1.checkpoint',),
+    )
+
+
+def test_get_archive_list_age_measures_time_since_cached():
+    assert module.get_archive_list_age(
+        {'cached_at': '2023-09-01T12:30:00'}, now=datetime.datetime(2023, 9, 1, 12, 45)
+    ) == datetime.timedelta(minutes=15)
+
+
+def test_get_archive_list_age_defaults_to_measuring_from_now():
+    assert module.get_archive_list_age({'cached_at': '2023-09-01T12:30:00'}) > datetime.timedelta(
+        days=1
+    )
+
+
+def test_get_archive_list_with_fresh_cached_archive_list_uses_it():
+    archive_list = {'archives': [], 'cached_at': '2023-09-01T12:30:00'}
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').and_return(archive_list)
+    flexmock(module).should_receive('get_archive_list_age').and_return(
+        datetime.timedelta(minutes=59)
+    )
+    flexmock(module.info).should_receive('display_archives_info').never()
+    flexmock(module.state).should_receive('set_value').never()
+
+    assert module.get_archive_list('repo', {}, '1.2.3', flexmock(log_json=False)) == archive_list
+
+
+def test_get_archive_list_with_stale_cached_archive_list_fetches_it_again():
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').and_return(
+        {'archives': [], 'cached_at': '2023-09-01T12:30:00'}
+    )
+    flexmock(module).should_receive('get_archive_list_age').and_return(
+        datetime.timedelta(minutes=31)
+    )
+    flexmock(module.info).should_receive('display_archives_info').and_return(
+        '{"archives": []}'
+    ).once()
+    flexmock(module.state).should_receive('set_value').once()
+
+    assert (
+        module.get_archive_list(
+            'repo', {'archive_list_cache_max_age': '30 minutes'}, '1.2.3', flexmock(log_json=False)
+        )['archives']
+        == []
+    )
+
+
+def test_get_archive_list_with_cache_max_age_always_fetches_it_every_time():
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').and_return(
+        {'archives': [], 'cached_at': '2023-09-01T12:30:00'}
+    )
+    flexmock(module).should_receive('get_archive_list_age').never()
+    flexmock(module.info).should_receive('display_archives_info').and_return(
+        '{"archives": []}'
+    ).once()
+    flexmock(module.state).should_receive('set_value').once()
+
+    module.get_archive_list(
+        'repo', {'archive_list_cache_max_age': 'always'}, '1.2.3', flexmock(log_json=False)
+    )
+
+
+def test_get_archive_list_with_invalid_cache_max_age_raises():
+    flexmock(module.state).should_receive('open_state_database').never()
+
+    with pytest.raises(ValueError):
+        module.get_archive_list(
+            'repo', {'archive_list_cache_max_age': 'soon'}, '1.2.3', flexmock(log_json=False)
+        )
+
+
+def test_get_archive_list_without_cached_archive_list_fetches_and_caches_it():
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').and_return(None)
+    flexmock(module.info).should_receive('display_archives_info').with_args(
+        'repo', {'lock_wait': 5}, '1.2.3', object, object, 'borg', None
+    ).and_return(
+        '''{"archives": [
+            {"name": "host-1", "start": "2023-09-01T01:00:00", "id": "abc",
+             "stats": {"original_size": 5000, "deduplicated_size": 1000}},
+            {"name": "host-2", "start": "2023-09-02T01:00:00", "id": "def"}
+        ]}'''
+    )
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection, module.ARCHIVE_LIST_STATE_NAMESPACE, 'repo', dict
+    ).once()
+
+    archive_list = module.get_archive_list(
+        'repo',
+        {'lock_wait': 5},
+        '1.2.3',
+        flexmock(log_json=False),
+    )
+
+    assert archive_list['archives'] == [
+        {'name': 'host-1', 'time': '2023-09-01T01:00:00', 'deduplicated_size': 1000},
+        {'name': 'host-2', 'time': '2023-09-02T01:00:00', 'deduplicated_size': None},
+    ]
+    assert archive_list['cached_at']
+
+
+def test_invalidate_archive_list_deletes_cached_archive_list():
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('delete_value').with_args(
+        connection, module.ARCHIVE_LIST_STATE_NAMESPACE, 'repo'
+    ).once()
+
+    module.invalidate_archive_list('repo', {})
+
+
+@pytest.mark.parametrize(
+    'size,expected_result',
+    (
+        (5, '5 B'),
+        (1500, '1.50 kB'),
+        (2500000, '2.50 MB'),
+        (3000000000000000, '3000.00 TB'),
+    ),
+)
+def test_format_size_makes_size_human_readable(size, expected_result):
+    assert module.format_size(size) == expected_result
+
+
+def test_preview_prune_logs_summary_with_lower_bound_on_space_freed_and_cache_age():
+    flexmock(module).should_receive('get_archive_list').and_return(
+        {
+            'archives': make_archives(
+                ('host-1', '2023-09-01T01:00:00'),
+                ('host-2', '2023-09-01T02:00:00'),
+                ('host-3', '2023-09-02T01:00:00'),
+                sizes=(1000, 500, 9000),
+            ),
+            'cached_at': '2023-09-02T12:30:00',
+        }
+    )
+    flexmock(module).should_receive('get_archive_list_age').and_return(
+        datetime.timedelta(minutes=5, seconds=12.6)
+    )
+    flexmock(module.prune).should_receive('make_prune_flags').and_return(('--keep-daily', '1'))
+    logged_messages = []
+    flexmock(module.logger).answer = lambda message: logged_messages.append(message)
+
+    module.preview_prune(
+        'repo', {}, '1.2.3', flexmock(list_archives=False), flexmock(log_json=False)
+    )
+
+    assert logged_messages == [
+        'repo: Would keep 1 and prune 2 of 3 matching archives; at least 1.50 kB freed once compacted (archive list cached 0:05:13 ago)'
+    ]
+
+
+def test_preview_prune_with_unknown_archive_size_omits_space_freed():
+    flexmock(module).should_receive('get_archive_list').and_return(
+        {
+            'archives': make_archives(
+                ('host-1', '2023-09-01T01:00:00'),
+                ('host-2', '2023-09-02T01:00:00'),
+                sizes=(None, 500),
+            ),
+            'cached_at': '2023-09-02T12:30:00',
+        }
+    )
+    flexmock(module).should_receive('get_archive_list_age').and_return(datetime.timedelta(0))
+    flexmock(module.prune).should_receive('make_prune_flags').and_return(('--keep-daily', '1'))
+    logged_messages = []
+    flexmock(module.logger).answer = lambda message: logged_messages.append(message)
+
+    module.preview_prune(
+        'repo', {}, '1.2.3', flexmock(list_archives=False), flexmock(log_json=False)
+    )
+
+    assert logged_messages == [
+        'repo: Would keep 1 and prune 1 of 2 matching archives (archive list cached 0:00:00 ago)'
+    ]
+
+
+def test_preview_prune_with_list_archives_logs_each_archive():
+    flexmock(module).should_receive('get_archive_list').and_return(
+        {
+            'archives': make_archives(
+                ('host-1', '2023-09-01T01:00:00'), ('host-2', '2023-09-02T01:00:00')
+            ),
+            'cached_at': '2023-09-02T12:30:00',
+        }
+    )
+    flexmock(module).should_receive('get_archive_list_age').and_return(datetime.timedelta(0))
+    flexmock(module.prune).should_receive('make_prune_flags').and_return(('--keep-daily', '1'))
+    logged_messages = []
+    flexmock(module.logger).answer = lambda message: logged_messages.append(message)
+
+    module.preview_prune(
+        'repo', {}, '1.2.3', flexmock(list_archives=True), flexmock(log_json=False)
+    )
+
+    assert logged_messages == [
+        'Keeping archive (rule: daily #1): host-2 2023-09-02T01:00:00',
+        'Would prune: host-1 2023-09-01T01:00:00',
+        'repo: Would keep 1 and prune 1 of 2 matching archives (archive list cached 0:00:00 ago)',
+    ]
+
+
+def test_preview_prune_adds_custom_log_levels():
+    flexmock(module).should_receive('get_archive_list').and_return(
+        {'archives': (), 'cached_at': '2023-09-02T12:30:00'}
+    )
+    flexmock(module).should_receive('get_archive_list_age').and_return(datetime.timedelta(0))
+    flexmock(module.prune).should_receive('make_prune_flags').and_return(())
+    flexmock(module.logger).answer = lambda message: None
+    flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels').once()
+
+    module.preview_prune(
+        'repo', {}, '1.2.3', flexmock(list_archives=False), flexmock(log_json=False)
+    )
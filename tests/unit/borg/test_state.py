@@ -0,0 +1,22 @@
+from flexmock import flexmock
+
+from borgmatic.borg import state as module
+
+
+def test_make_state_database_path_with_borgmatic_source_directory_includes_it():
+    flexmock(module.os.path).should_receive('expanduser').with_args('~/.borgmatic').and_return(
+        '/home/user/.borgmatic'
+    )
+
+    assert (
+        module.make_state_database_path({'borgmatic_source_directory': '~/.borgmatic'})
+        == '/home/user/.borgmatic/state.db'
+    )
+
+
+def test_make_state_database_path_without_borgmatic_source_directory_uses_default():
+    flexmock(module.os.path).should_receive('expanduser').with_args(
+        module.DEFAULT_BORGMATIC_SOURCE_DIRECTORY
+    ).and_return('/home/user/.borgmatic')
+
+    assert module.make_state_database_path({}) == '/home/user/.borgmatic/state.db'
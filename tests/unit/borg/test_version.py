@@ -13,6 +13,7 @@ VERSION = '1.2.3'
 def insert_execute_command_and_capture_output_mock(
     command, borg_local_path='borg', version_output=f'borg {VERSION}'
 ):
+    flexmock(module).should_receive('get_version_cache_key').and_return(None)
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module).should_receive('execute_command_and_capture_output').with_args(
         command,
@@ -57,3 +58,51 @@ def test_local_borg_version_with_invalid_version_raises():
 
     with pytest.raises(ValueError):
         module.local_borg_version({})
+
+
+def test_local_borg_version_caches_version_for_binary():
+    flexmock(module, version_cache={})
+    flexmock(module).should_receive('get_version_cache_key').and_return(('/usr/bin/borg', 1234.5))
+    flexmock(module.environment).should_receive('make_environment')
+    flexmock(module).should_receive('execute_command_and_capture_output').once().and_return(
+        f'borg {VERSION}'
+    )
+
+    assert module.local_borg_version({}) == VERSION
+    assert module.local_borg_version({}) == VERSION
+
+
+def test_local_borg_version_with_changed_binary_runs_borg_again():
+    flexmock(module, version_cache={})
+    flexmock(module).should_receive('get_version_cache_key').and_return(
+        ('/usr/bin/borg', 1234.5)
+    ).and_return(('/usr/bin/borg', 6789.0))
+    flexmock(module.environment).should_receive('make_environment')
+    flexmock(module).should_receive('execute_command_and_capture_output').and_return(
+        'borg 1.2.3'
+    ).and_return('borg 1.2.4')
+
+    assert module.local_borg_version({}) == '1.2.3'
+    assert module.local_borg_version({}) == '1.2.4'
+
+
+def test_get_version_cache_key_returns_resolved_path_and_modification_time():
+    flexmock(module.shutil).should_receive('which').with_args('borg').and_return('/usr/bin/borg')
+    flexmock(module.os).should_receive('stat').with_args('/usr/bin/borg').and_return(
+        flexmock(st_mtime=1234.5)
+    )
+
+    assert module.get_version_cache_key('borg') == ('/usr/bin/borg', 1234.5)
+
+
+def test_get_version_cache_key_without_binary_returns_none():
+    flexmock(module.shutil).should_receive('which').and_return(None)
+
+    assert module.get_version_cache_key('borg') is None
+
+
+def test_get_version_cache_key_with_stat_error_returns_none():
+    flexmock(module.shutil).should_receive('which').and_return('/usr/bin/borg')
+    flexmock(module.os).should_receive('stat').and_raise(OSError)
+
+    assert module.get_version_cache_key('borg') is None
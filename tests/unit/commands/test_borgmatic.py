@@ -11,6 +11,7 @@ from borgmatic.commands import borgmatic as module
 def test_run_configuration_runs_actions_for_each_repository():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     expected_results = [flexmock(), flexmock()]
     flexmock(module).should_receive('run_actions').and_return(expected_results[:1]).and_return(
         expected_results[1:]
@@ -38,6 +39,7 @@ def test_run_configuration_with_invalid_borg_version_errors():
 def test_run_configuration_logs_monitor_start_error():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.dispatch).should_receive('call_hooks').and_raise(OSError).and_return(
         None
     ).and_return(None).and_return(None)
@@ -55,6 +57,7 @@ def test_run_configuration_logs_monitor_start_error():
 def test_run_configuration_bails_for_monitor_start_soft_failure():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     error = subprocess.CalledProcessError(borgmatic.hooks.command.SOFT_FAIL_EXIT_CODE, 'try again')
     flexmock(module.dispatch).should_receive('call_hooks').and_raise(error)
     flexmock(module).should_receive('log_error_records').never()
@@ -70,6 +73,7 @@ def test_run_configuration_bails_for_monitor_start_soft_failure():
 def test_run_configuration_logs_actions_error():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module.dispatch).should_receive('call_hooks')
     expected_results = [flexmock()]
@@ -86,6 +90,7 @@ def test_run_configuration_logs_actions_error():
 def test_run_configuration_bails_for_actions_soft_failure():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.dispatch).should_receive('call_hooks')
     error = subprocess.CalledProcessError(borgmatic.hooks.command.SOFT_FAIL_EXIT_CODE, 'try again')
     flexmock(module).should_receive('run_actions').and_raise(error)
@@ -102,9 +107,10 @@ def test_run_configuration_bails_for_actions_soft_failure():
 def test_run_configuration_logs_monitor_log_error():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
-    flexmock(module.dispatch).should_receive('call_hooks').and_return(None).and_return(
-        None
-    ).and_raise(OSError)
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
+    flexmock(module.dispatch).should_receive('call_hooks')
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').and_return({})
+    flexmock(module.dispatch).should_receive('wait_for_hooks').and_return(None).and_raise(OSError)
     expected_results = [flexmock()]
     flexmock(module).should_receive('log_error_records').and_return(expected_results)
     flexmock(module).should_receive('run_actions').and_return([])
@@ -119,10 +125,11 @@ def test_run_configuration_logs_monitor_log_error():
 def test_run_configuration_bails_for_monitor_log_soft_failure():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     error = subprocess.CalledProcessError(borgmatic.hooks.command.SOFT_FAIL_EXIT_CODE, 'try again')
-    flexmock(module.dispatch).should_receive('call_hooks').and_return(None).and_return(
-        None
-    ).and_raise(error)
+    flexmock(module.dispatch).should_receive('call_hooks')
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').and_return({})
+    flexmock(module.dispatch).should_receive('wait_for_hooks').and_return(None).and_raise(error)
     flexmock(module).should_receive('log_error_records').never()
     flexmock(module).should_receive('run_actions').and_return([])
     flexmock(module.command).should_receive('considered_soft_failure').and_return(True)
@@ -137,9 +144,12 @@ def test_run_configuration_bails_for_monitor_log_soft_failure():
 def test_run_configuration_logs_monitor_finish_error():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
-    flexmock(module.dispatch).should_receive('call_hooks').and_return(None).and_return(
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
+    flexmock(module.dispatch).should_receive('call_hooks')
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').and_return({})
+    flexmock(module.dispatch).should_receive('wait_for_hooks').and_return(None).and_return(
         None
-    ).and_return(None).and_raise(OSError)
+    ).and_raise(OSError)
     expected_results = [flexmock()]
     flexmock(module).should_receive('log_error_records').and_return(expected_results)
     flexmock(module).should_receive('run_actions').and_return([])
@@ -154,10 +164,13 @@ def test_run_configuration_logs_monitor_finish_error():
 def test_run_configuration_bails_for_monitor_finish_soft_failure():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     error = subprocess.CalledProcessError(borgmatic.hooks.command.SOFT_FAIL_EXIT_CODE, 'try again')
-    flexmock(module.dispatch).should_receive('call_hooks').and_return(None).and_return(
+    flexmock(module.dispatch).should_receive('call_hooks')
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').and_return({})
+    flexmock(module.dispatch).should_receive('wait_for_hooks').and_return(None).and_return(
         None
-    ).and_raise(None).and_raise(error)
+    ).and_raise(error)
     flexmock(module).should_receive('log_error_records').never()
     flexmock(module).should_receive('run_actions').and_return([])
     flexmock(module.command).should_receive('considered_soft_failure').and_return(True)
@@ -169,11 +182,88 @@ def test_run_configuration_bails_for_monitor_finish_soft_failure():
     assert results == []
 
 
+def test_run_configuration_waits_for_start_pings_before_log_ping():
+    flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
+    flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
+    flexmock(module.dispatch).should_receive('call_hooks')
+    start_pings = {'healthchecks': flexmock()}
+    log_pings = {'healthchecks': flexmock()}
+    finish_pings = {'healthchecks': flexmock()}
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').and_return(
+        start_pings
+    ).and_return(log_pings).and_return(finish_pings)
+    flexmock(module.dispatch).should_receive('wait_for_hooks').with_args(
+        start_pings
+    ).once().ordered()
+    flexmock(module.dispatch).should_receive('wait_for_hooks').with_args(log_pings).once().ordered()
+    flexmock(module.dispatch).should_receive('wait_for_hooks').with_args(
+        finish_pings
+    ).once().ordered()
+    flexmock(module).should_receive('run_actions').and_return([])
+    config = {'repositories': [{'path': 'foo'}]}
+    arguments = {'global': flexmock(monitoring_verbosity=1, dry_run=False), 'create': flexmock()}
+
+    results = list(module.run_configuration('test.yaml', config, arguments))
+
+    assert results == []
+
+
+def test_run_configuration_flushes_monitor_outbox_after_actions_and_before_finish_pings():
+    flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
+    flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.dispatch).should_receive('call_hooks')
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').and_return({})
+    flexmock(module.dispatch).should_receive('wait_for_hooks')
+    flexmock(module).should_receive('run_actions').and_return([]).once().ordered()
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests').with_args(
+        {'repositories': [{'path': 'foo'}]}, 'test.yaml', False
+    ).once().ordered()
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').with_args(
+        'ping_monitor',
+        object,
+        'test.yaml',
+        module.monitor.MONITOR_HOOK_NAMES,
+        module.monitor.State.LOG,
+        object,
+        object,
+    ).and_return({}).once().ordered()
+    config = {'repositories': [{'path': 'foo'}]}
+    arguments = {'global': flexmock(monitoring_verbosity=1, dry_run=False), 'create': flexmock()}
+
+    results = list(module.run_configuration('test.yaml', config, arguments))
+
+    assert results == []
+
+
+def test_run_configuration_with_monitor_flush_action_runs_it_instead_of_flushing_outbox_again():
+    flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
+    flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.actions.monitor_flush).should_receive('run_monitor_flush').once()
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests').never()
+    flexmock(module.dispatch).should_receive('call_hooks')
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').and_return({})
+    flexmock(module.dispatch).should_receive('wait_for_hooks')
+    flexmock(module).should_receive('run_actions').and_return([])
+    config = {'repositories': [{'path': 'foo'}]}
+    arguments = {
+        'global': flexmock(monitoring_verbosity=1, dry_run=False),
+        'monitor-flush': flexmock(),
+        'create': flexmock(),
+    }
+
+    results = list(module.run_configuration('test.yaml', config, arguments))
+
+    assert results == []
+
+
 def test_run_configuration_does_not_call_monitoring_hooks_if_monitoring_hooks_are_disabled():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(module.DISABLED)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
 
     flexmock(module.dispatch).should_receive('call_hooks').never()
+    flexmock(module.dispatch).should_receive('call_hooks_concurrently').never()
     flexmock(module).should_receive('run_actions').and_return([])
 
     config = {'repositories': [{'path': 'foo'}]}
@@ -185,6 +275,7 @@ def test_run_configuration_does_not_call_monitoring_hooks_if_monitoring_hooks_ar
 def test_run_configuration_logs_on_error_hook_error():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook').and_raise(OSError)
     expected_results = [flexmock(), flexmock()]
     flexmock(module).should_receive('log_error_records').and_return(
@@ -202,6 +293,7 @@ def test_run_configuration_logs_on_error_hook_error():
 def test_run_configuration_bails_for_on_error_hook_soft_failure():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     error = subprocess.CalledProcessError(borgmatic.hooks.command.SOFT_FAIL_EXIT_CODE, 'try again')
     flexmock(module.command).should_receive('execute_hook').and_raise(error)
     expected_results = [flexmock()]
@@ -219,6 +311,7 @@ def test_run_configuration_retries_soft_error():
     # Run action first fails, second passes
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module).should_receive('run_actions').and_raise(OSError).and_return([])
     flexmock(module).should_receive('log_error_records').and_return([flexmock()]).once()
@@ -232,6 +325,7 @@ def test_run_configuration_retries_hard_error():
     # Run action fails twice
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module).should_receive('run_actions').and_raise(OSError).times(2)
     flexmock(module).should_receive('log_error_records').with_args(
@@ -254,6 +348,7 @@ def test_run_configuration_retries_hard_error():
 def test_run_configuration_repos_ordered():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module).should_receive('run_actions').and_raise(OSError).times(2)
     expected_results = [flexmock(), flexmock()]
@@ -272,6 +367,7 @@ def test_run_configuration_repos_ordered():
 def test_run_configuration_retries_round_robin():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module).should_receive('run_actions').and_raise(OSError).times(4)
     flexmock(module).should_receive('log_error_records').with_args(
@@ -306,6 +402,7 @@ def test_run_configuration_retries_round_robin():
 def test_run_configuration_retries_one_passes():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module).should_receive('run_actions').and_raise(OSError).and_raise(OSError).and_return(
         []
@@ -338,6 +435,7 @@ def test_run_configuration_retries_one_passes():
 def test_run_configuration_retry_wait():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module).should_receive('run_actions').and_raise(OSError).times(4)
     flexmock(module).should_receive('log_error_records').with_args(
@@ -381,6 +479,7 @@ def test_run_configuration_retry_wait():
 def test_run_configuration_retries_timeout_multiple_repos():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.command).should_receive('execute_hook')
     flexmock(module).should_receive('run_actions').and_raise(OSError).and_raise(OSError).and_return(
         []
@@ -504,6 +603,30 @@ def test_run_actions_runs_create():
     assert result == (expected,)
 
 
+def test_run_actions_emits_start_and_end_events_for_each_action():
+    flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module.command).should_receive('execute_hook')
+    flexmock(borgmatic.actions.create).should_receive('run_create').and_yield(flexmock())
+    flexmock(module.borgmatic.events).should_receive('emit').with_args(
+        'action_start', repository='repo', action='create'
+    ).once()
+    flexmock(module.borgmatic.events).should_receive('emit').with_args(
+        'action_end', repository='repo', action='create', duration=float
+    ).once()
+
+    tuple(
+        module.run_actions(
+            arguments={'global': flexmock(dry_run=False, log_file='foo'), 'create': flexmock()},
+            config_filename=flexmock(),
+            config={'repositories': []},
+            local_path=flexmock(),
+            remote_path=flexmock(),
+            local_borg_version=flexmock(),
+            repository={'path': 'repo'},
+        )
+    )
+
+
 def test_run_actions_runs_prune():
     flexmock(module).should_receive('add_custom_log_levels')
     flexmock(module.command).should_receive('execute_hook')
@@ -766,6 +889,26 @@ def test_run_actions_runs_borg():
     )
 
 
+def test_run_actions_runs_stats():
+    flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module.command).should_receive('execute_hook')
+    expected = flexmock()
+    flexmock(borgmatic.actions.stats).should_receive('run_stats').and_yield(expected).once()
+
+    result = tuple(
+        module.run_actions(
+            arguments={'global': flexmock(dry_run=False, log_file='foo'), 'stats': flexmock()},
+            config_filename=flexmock(),
+            config={'repositories': []},
+            local_path=flexmock(),
+            remote_path=flexmock(),
+            local_borg_version=flexmock(),
+            repository={'path': 'repo'},
+        )
+    )
+    assert result == (expected,)
+
+
 def test_run_actions_runs_multiple_actions_in_argument_order():
     flexmock(module).should_receive('add_custom_log_levels')
     flexmock(module.command).should_receive('execute_hook')
@@ -896,6 +1039,7 @@ def test_get_local_path_without_local_path_defaults_to_borg():
 
 def test_collect_highlander_action_summary_logs_info_for_success_with_bootstrap():
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.borgmatic.actions.config.bootstrap).should_receive('run_bootstrap')
     arguments = {
         'bootstrap': flexmock(repository='repo'),
@@ -912,6 +1056,7 @@ def test_collect_highlander_action_summary_logs_info_for_success_with_bootstrap(
 
 def test_collect_highlander_action_summary_logs_error_on_bootstrap_failure():
     flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.outbox).should_receive('flush_undelivered_requests')
     flexmock(module.borgmatic.actions.config.bootstrap).should_receive('run_bootstrap').and_raise(
         ValueError
     )
@@ -1028,6 +1173,56 @@ def test_collect_highlander_action_summary_logs_error_on_run_validate_failure():
     assert {log.levelno for log in logs} == {logging.CRITICAL}
 
 
+def test_collect_highlander_action_summary_logs_info_for_daemon_stopping():
+    flexmock(module.borgmatic.actions.daemon).should_receive('run_daemon').once()
+    arguments = {
+        'daemon': flexmock(status=False, trigger=False, reload=False),
+        'global': flexmock(dry_run=False),
+    }
+
+    logs = tuple(
+        module.collect_highlander_action_summary_logs(
+            {'test.yaml': {}}, arguments=arguments, configuration_parse_errors=False
+        )
+    )
+
+    assert {log.levelno for log in logs} == {logging.ANSWER}
+    assert logs[0].msg == 'Daemon stopped'
+
+
+def test_collect_highlander_action_summary_logs_info_for_success_with_daemon_command():
+    flexmock(module.borgmatic.actions.daemon).should_receive('run_daemon').once()
+    arguments = {
+        'daemon': flexmock(status=True, trigger=False, reload=False),
+        'global': flexmock(dry_run=False),
+    }
+
+    logs = tuple(
+        module.collect_highlander_action_summary_logs(
+            {'test.yaml': {}}, arguments=arguments, configuration_parse_errors=False
+        )
+    )
+
+    assert {log.levelno for log in logs} == {logging.ANSWER}
+    assert logs[0].msg == 'Daemon command successful'
+
+
+def test_collect_highlander_action_summary_logs_error_on_daemon_failure():
+    flexmock(module.borgmatic.actions.daemon).should_receive('run_daemon').and_raise(OSError)
+    arguments = {
+        'daemon': flexmock(status=True, trigger=False, reload=False),
+        'global': flexmock(dry_run=False),
+    }
+
+    logs = tuple(
+        module.collect_highlander_action_summary_logs(
+            {'test.yaml': {}}, arguments=arguments, configuration_parse_errors=False
+        )
+    )
+
+    assert {log.levelno for log in logs} == {logging.CRITICAL}
+
+
 def test_collect_configuration_run_summary_logs_info_for_success():
     flexmock(module.command).should_receive('execute_hook').never()
     flexmock(module.validate).should_receive('guard_configuration_contains_repository')
@@ -0,0 +1,19 @@
+from flexmock import flexmock
+
+from borgmatic.daemon import control as module
+
+
+def test_make_socket_path_expands_given_path():
+    flexmock(module.os.path).should_receive('expanduser').with_args('~/daemon.sock').and_return(
+        '/root/daemon.sock'
+    )
+
+    assert module.make_socket_path('~/daemon.sock') == '/root/daemon.sock'
+
+
+def test_make_socket_path_without_path_defaults_to_borgmatic_source_directory():
+    flexmock(module.os.path).should_receive('expanduser').with_args(
+        '~/.borgmatic/daemon.sock'
+    ).and_return('/root/.borgmatic/daemon.sock')
+
+    assert module.make_socket_path(None) == '/root/.borgmatic/daemon.sock'
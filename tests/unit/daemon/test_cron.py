@@ -0,0 +1,109 @@
+import datetime
+
+import pytest
+
+from borgmatic.daemon import cron as module
+
+
+@pytest.mark.parametrize(
+    'field,field_name,minimum,maximum,expected_values',
+    (
+        ('*', 'hour', 0, 23, frozenset(range(0, 24))),
+        ('5', 'minute', 0, 59, frozenset({5})),
+        ('1-3', 'hour', 0, 23, frozenset({1, 2, 3})),
+        ('*/15', 'minute', 0, 59, frozenset({0, 15, 30, 45})),
+        ('10-20/5', 'minute', 0, 59, frozenset({10, 15, 20})),
+        ('50/5', 'minute', 0, 59, frozenset({50, 55})),
+        ('1,3,5-6', 'day of month', 1, 31, frozenset({1, 3, 5, 6})),
+        ('jan,Mar', 'month', 1, 12, frozenset({1, 3})),
+        ('mon-fri', 'day of week', 0, 7, frozenset({1, 2, 3, 4, 5})),
+    ),
+)
+def test_parse_field_returns_matching_values(field, field_name, minimum, maximum, expected_values):
+    assert module.parse_field(field, field_name, minimum, maximum) == expected_values
+
+
+@pytest.mark.parametrize(
+    'field,field_name,minimum,maximum',
+    (
+        ('60', 'minute', 0, 59),
+        ('0', 'day of month', 1, 31),
+        ('5-1', 'hour', 0, 23),
+        ('*/0', 'minute', 0, 59),
+        ('foo', 'minute', 0, 59),
+        ('mon', 'month', 1, 12),
+    ),
+)
+def test_parse_field_with_invalid_field_raises(field, field_name, minimum, maximum):
+    with pytest.raises(ValueError):
+        module.parse_field(field, field_name, minimum, maximum)
+
+
+def test_parse_expression_returns_values_for_each_field():
+    parsed = module.parse_expression('30 4 * * *')
+
+    assert parsed['minute'] == frozenset({30})
+    assert parsed['hour'] == frozenset({4})
+    assert parsed['day of month'] == frozenset(range(1, 32))
+    assert parsed['month'] == frozenset(range(1, 13))
+    assert parsed['day of week'] == frozenset(range(0, 7))
+    assert parsed['day_or'] is False
+
+
+def test_parse_expression_expands_alias():
+    parsed = module.parse_expression('@daily')
+
+    assert parsed['minute'] == frozenset({0})
+    assert parsed['hour'] == frozenset({0})
+
+
+def test_parse_expression_treats_seven_as_sunday():
+    assert module.parse_expression('0 0 * * 7')['day of week'] == frozenset({0})
+
+
+def test_parse_expression_with_day_of_month_and_day_of_week_restricted_matches_either():
+    assert module.parse_expression('0 0 1 * mon')['day_or'] is True
+
+
+@pytest.mark.parametrize(
+    'expression',
+    ('0 0 * *', '0 0 * * * *', '61 0 * * *', '@fortnightly'),
+)
+def test_parse_expression_with_invalid_expression_raises(expression):
+    with pytest.raises(ValueError):
+        module.parse_expression(expression)
+
+
+@pytest.mark.parametrize(
+    'expression,after,expected_next_run',
+    (
+        (
+            '0 * * * *',
+            datetime.datetime(2023, 5, 1, 10, 0, 0),
+            datetime.datetime(2023, 5, 1, 11, 0),
+        ),
+        (
+            '0 * * * *',
+            datetime.datetime(2023, 5, 1, 10, 59, 59),
+            datetime.datetime(2023, 5, 1, 11, 0),
+        ),
+        (
+            '*/15 * * * *',
+            datetime.datetime(2023, 5, 1, 10, 7),
+            datetime.datetime(2023, 5, 1, 10, 15),
+        ),
+        ('30 2 * * *', datetime.datetime(2023, 5, 1, 10, 0), datetime.datetime(2023, 5, 2, 2, 30)),
+        ('0 0 1 * *', datetime.datetime(2023, 12, 15, 0, 0), datetime.datetime(2024, 1, 1, 0, 0)),
+        ('0 3 * * sun', datetime.datetime(2023, 5, 1, 10, 0), datetime.datetime(2023, 5, 7, 3, 0)),
+        ('0 0 29 2 *', datetime.datetime(2023, 3, 1, 0, 0), datetime.datetime(2024, 2, 29, 0, 0)),
+        # Either the first of the month or a Friday.
+        ('0 0 1 * fri', datetime.datetime(2023, 5, 1, 10, 0), datetime.datetime(2023, 5, 5, 0, 0)),
+    ),
+)
+def test_next_run_time_returns_next_matching_minute(expression, after, expected_next_run):
+    assert module.next_run_time(expression, after) == expected_next_run
+
+
+def test_next_run_time_with_expression_that_never_matches_raises():
+    with pytest.raises(ValueError):
+        module.next_run_time('0 0 30 2 *', datetime.datetime(2023, 5, 1))
@@ -0,0 +1,434 @@
+import datetime
+import logging
+
+from flexmock import flexmock
+
+from borgmatic.daemon import run as module
+
+NOW = datetime.datetime(2023, 5, 1, 10, 0)
+
+
+def make_daemon(**attributes):
+    daemon = module.Daemon(flexmock(config_paths=['test.yaml'], overrides=None, resolve_env=True))
+
+    for name, value in attributes.items():
+        setattr(daemon, name, value)
+
+    return daemon
+
+
+def test_get_modification_times_returns_time_for_each_config_file():
+    flexmock(module.collect).should_receive('collect_config_filenames').and_return(
+        ('/etc/borgmatic/a.yaml', '/etc/borgmatic/b.yaml')
+    )
+    flexmock(module.os).should_receive('stat').with_args('/etc/borgmatic/a.yaml').and_return(
+        flexmock(st_mtime=1.0)
+    )
+    flexmock(module.os).should_receive('stat').with_args('/etc/borgmatic/b.yaml').and_raise(
+        FileNotFoundError
+    )
+
+    assert module.get_modification_times(['/etc/borgmatic']) == {
+        '/etc/borgmatic/a.yaml': 1.0,
+        '/etc/borgmatic/b.yaml': None,
+    }
+
+
+def test_make_schedule_entries_returns_entry_for_each_schedule():
+    flexmock(module.cron).should_receive('next_run_time').with_args('0 * * * *', NOW).and_return(
+        datetime.datetime(2023, 5, 1, 11, 0)
+    )
+    flexmock(module.cron).should_receive('next_run_time').with_args('0 3 * * *', NOW).and_return(
+        datetime.datetime(2023, 5, 2, 3, 0)
+    )
+
+    entries = module.make_schedule_entries(
+        {
+            'a.yaml': {
+                'schedule': [
+                    {'cron': '0 * * * *', 'actions': ['create']},
+                    {'cron': '0 3 * * *'},
+                ]
+            },
+            'b.yaml': {},
+        },
+        NOW,
+    )
+
+    assert entries == [
+        {
+            'config_filename': 'a.yaml',
+            'cron': '0 * * * *',
+            'actions': ('create',),
+            'next_run': datetime.datetime(2023, 5, 1, 11, 0),
+        },
+        {
+            'config_filename': 'a.yaml',
+            'cron': '0 3 * * *',
+            'actions': module.DEFAULT_SCHEDULED_ACTIONS,
+            'next_run': datetime.datetime(2023, 5, 2, 3, 0),
+        },
+    ]
+
+
+def test_make_schedule_entries_skips_invalid_cron_expression():
+    flexmock(module.cron).should_receive('next_run_time').and_raise(ValueError)
+    flexmock(module.logger).should_receive('warning').once()
+
+    assert module.make_schedule_entries({'a.yaml': {'schedule': [{'cron': 'nope'}]}}, NOW) == []
+
+
+def test_run_scheduled_configuration_runs_actions_in_order_and_returns_success():
+    global_arguments = flexmock()
+    flexmock(module.borgmatic.commands.arguments).should_receive('parse_arguments').with_args(
+        'create', 'prune', 'check'
+    ).and_return({'create': flexmock(), 'prune': flexmock(), 'check': flexmock()})
+    flexmock(module.borgmatic.commands.borgmatic).should_receive(
+        'collect_configuration_run_summary_logs'
+    ).with_args({'a.yaml': {}}, dict).replace_with(
+        lambda configs, arguments: iter(
+            (logging.makeLogRecord(dict(levelno=logging.INFO, msg=str(arguments['global']))),)
+        )
+    )
+    flexmock(module.logger).should_receive('handle').once()
+
+    assert module.run_scheduled_configuration(
+        'a.yaml', {}, {'check', 'create', 'prune'}, global_arguments
+    )
+
+
+def test_run_scheduled_configuration_with_error_returns_failure():
+    flexmock(module.borgmatic.commands.arguments).should_receive('parse_arguments').and_return({})
+    flexmock(module.borgmatic.commands.borgmatic).should_receive(
+        'collect_configuration_run_summary_logs'
+    ).and_return(
+        iter(
+            (
+                logging.makeLogRecord(dict(levelno=logging.CRITICAL, msg='Oops')),
+                logging.makeLogRecord(dict(levelno=logging.CRITICAL, msg='Error')),
+            )
+        )
+    )
+    flexmock(module.logger).should_receive('handle').twice()
+
+    assert not module.run_scheduled_configuration('a.yaml', {}, {'create'}, flexmock())
+
+
+def test_reload_loads_new_configuration_files_and_computes_schedule():
+    daemon = make_daemon()
+    flexmock(module).should_receive('get_modification_times').and_return({'a.yaml': 1.0})
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('load_configurations').with_args(
+        ('a.yaml',), None, True
+    ).and_return(({'a.yaml': {'schedule': []}}, [flexmock()]))
+    flexmock(module.logger).should_receive('handle').once()
+    flexmock(module).should_receive('make_schedule_entries').and_return(
+        [{'config_filename': 'a.yaml'}]
+    )
+
+    assert daemon.reload()
+
+    assert daemon.configs == {'a.yaml': {'schedule': []}}
+    assert daemon.modification_times == {'a.yaml': 1.0}
+    assert daemon.schedule_entries == [{'config_filename': 'a.yaml'}]
+    assert daemon.global_arguments.used_config_paths == ['a.yaml']
+
+
+def test_reload_without_changes_does_nothing():
+    daemon = make_daemon(modification_times={'a.yaml': 1.0})
+    flexmock(module).should_receive('get_modification_times').and_return({'a.yaml': 1.0})
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('load_configurations').never()
+
+    assert not daemon.reload()
+
+
+def test_reload_loads_only_changed_configuration_files_and_drops_removed_ones():
+    daemon = make_daemon(
+        configs={'a.yaml': {'old': True}, 'b.yaml': {}, 'c.yaml': {}},
+        modification_times={'a.yaml': 1.0, 'b.yaml': 1.0, 'c.yaml': 1.0},
+    )
+    flexmock(module).should_receive('get_modification_times').and_return(
+        {'a.yaml': 1.0, 'b.yaml': 2.0}
+    )
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('load_configurations').with_args(
+        ('b.yaml',), None, True
+    ).and_return(({'b.yaml': {'new': True}}, []))
+    flexmock(module).should_receive('make_schedule_entries').and_return([])
+    flexmock(module.logger).should_receive('warning').never()
+
+    assert daemon.reload()
+
+    assert daemon.configs == {'a.yaml': {'old': True}, 'b.yaml': {'new': True}}
+
+
+def test_reload_keeps_previous_configuration_when_changed_file_fails_to_parse():
+    daemon = make_daemon(configs={'a.yaml': {'old': True}}, modification_times={'a.yaml': 1.0})
+    flexmock(module).should_receive('get_modification_times').and_return({'a.yaml': 2.0})
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('load_configurations').and_return(
+        ({}, [])
+    )
+    flexmock(module).should_receive('make_schedule_entries').and_return([])
+    flexmock(module.logger).should_receive('warning').once()
+
+    assert daemon.reload()
+
+    assert daemon.configs == {'a.yaml': {'old': True}}
+    assert daemon.modification_times == {'a.yaml': 2.0}
+
+
+def test_reload_with_force_loads_all_configuration_files():
+    daemon = make_daemon(configs={'a.yaml': {}}, modification_times={'a.yaml': 1.0})
+    flexmock(module).should_receive('get_modification_times').and_return({'a.yaml': 1.0})
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('load_configurations').with_args(
+        ('a.yaml',), None, True
+    ).and_return(({'a.yaml': {'new': True}}, [])).once()
+    flexmock(module).should_receive('make_schedule_entries').and_return([])
+
+    assert daemon.reload(force=True)
+
+    assert daemon.configs == {'a.yaml': {'new': True}}
+
+
+def test_enqueue_queues_configuration_file():
+    daemon = make_daemon()
+
+    daemon.enqueue('a.yaml', ('create',))
+
+    assert daemon.pending_actions == {'a.yaml': {'create'}}
+    assert daemon.work_queue.get_nowait() == 'a.yaml'
+
+
+def test_enqueue_with_configuration_file_already_pending_merges_actions():
+    daemon = make_daemon()
+
+    daemon.enqueue('a.yaml', ('create',))
+    daemon.enqueue('a.yaml', ('check',))
+
+    assert daemon.pending_actions == {'a.yaml': {'create', 'check'}}
+    assert daemon.work_queue.qsize() == 1
+
+
+def test_enqueue_due_runs_queues_due_entries_and_reschedules_them():
+    due_entry = {
+        'config_filename': 'a.yaml',
+        'cron': '0 * * * *',
+        'actions': ('create',),
+        'next_run': NOW,
+    }
+    later_entry = {
+        'config_filename': 'b.yaml',
+        'cron': '0 3 * * *',
+        'actions': ('check',),
+        'next_run': NOW + datetime.timedelta(hours=1),
+    }
+    daemon = make_daemon(schedule_entries=[due_entry, later_entry])
+    flexmock(daemon).should_receive('enqueue').with_args('a.yaml', ('create',)).once()
+    flexmock(module.cron).should_receive('next_run_time').with_args('0 * * * *', NOW).and_return(
+        NOW + datetime.timedelta(hours=1)
+    )
+
+    daemon.enqueue_due_runs(NOW)
+
+    assert due_entry['next_run'] == NOW + datetime.timedelta(hours=1)
+
+
+def test_seconds_until_next_run_returns_time_until_earliest_entry():
+    daemon = make_daemon(
+        schedule_entries=[
+            {'next_run': NOW + datetime.timedelta(minutes=10)},
+            {'next_run': NOW + datetime.timedelta(minutes=5)},
+        ]
+    )
+
+    assert daemon.seconds_until_next_run(NOW) == 300
+
+
+def test_seconds_until_next_run_with_overdue_entry_returns_zero():
+    daemon = make_daemon(schedule_entries=[{'next_run': NOW - datetime.timedelta(minutes=5)}])
+
+    assert daemon.seconds_until_next_run(NOW) == 0
+
+
+def test_seconds_until_next_run_without_schedule_returns_none():
+    assert make_daemon().seconds_until_next_run(NOW) is None
+
+
+def test_run_next_runs_pending_actions_and_records_outcome():
+    daemon = make_daemon(configs={'a.yaml': {}})
+    daemon.enqueue('a.yaml', ('create',))
+    flexmock(module).should_receive('run_scheduled_configuration').with_args(
+        'a.yaml', {}, {'create'}, daemon.global_arguments
+    ).and_return(True).once()
+
+    assert daemon.run_next()
+
+    assert daemon.pending_actions == {}
+    assert daemon.running_config_filename is None
+    assert daemon.last_runs['a.yaml']['actions'] == ['create']
+    assert daemon.last_runs['a.yaml']['succeeded'] is True
+
+
+def test_run_next_with_unexpected_error_logs_it_and_records_failed_run():
+    daemon = make_daemon(configs={'a.yaml': {}})
+    daemon.enqueue('a.yaml', ('create',))
+    flexmock(module).should_receive('run_scheduled_configuration').and_raise(KeyError('oops'))
+    flexmock(module.logger).should_receive('exception').once()
+
+    assert daemon.run_next()
+
+    assert daemon.running_config_filename is None
+    assert daemon.last_runs['a.yaml']['actions'] == ['create']
+    assert daemon.last_runs['a.yaml']['succeeded'] is False
+
+
+def test_run_next_skips_removed_configuration_file():
+    daemon = make_daemon(configs={})
+    daemon.enqueue('a.yaml', ('create',))
+    flexmock(module).should_receive('run_scheduled_configuration').never()
+    flexmock(module.logger).should_receive('warning').once()
+
+    assert daemon.run_next()
+
+    assert daemon.last_runs == {}
+
+
+def test_run_next_when_stopping_returns_false():
+    daemon = make_daemon()
+    daemon.stop_worker()
+
+    assert not daemon.run_next()
+
+
+def test_run_worker_runs_until_stopped():
+    daemon = make_daemon()
+    flexmock(daemon).should_receive('run_next').and_return(True).and_return(False).twice()
+
+    daemon.run_worker()
+
+
+def test_status_describes_each_configuration_file():
+    daemon = make_daemon(
+        configs={'a.yaml': {}, 'b.yaml': {}},
+        schedule_entries=[
+            {'config_filename': 'a.yaml', 'next_run': NOW + datetime.timedelta(hours=2)},
+            {'config_filename': 'a.yaml', 'next_run': NOW + datetime.timedelta(hours=1)},
+        ],
+        pending_actions={'b.yaml': {'create'}},
+        last_runs={'a.yaml': {'succeeded': True}},
+        running_config_filename='a.yaml',
+    )
+    flexmock(module.os).should_receive('getpid').and_return(1234)
+
+    status = daemon.status()
+
+    assert status['pid'] == 1234
+    assert status['running'] == 'a.yaml'
+    assert status['configuration_files'] == {
+        'a.yaml': {
+            'next_run': (NOW + datetime.timedelta(hours=1)).timestamp(),
+            'pending': False,
+            'last_run': {'succeeded': True},
+        },
+        'b.yaml': {'next_run': None, 'pending': True, 'last_run': None},
+    }
+
+
+def test_handle_command_with_status_returns_status():
+    daemon = make_daemon()
+    flexmock(daemon).should_receive('status').and_return({'pid': 1234})
+
+    assert daemon.handle_command('status') == {'pid': 1234}
+
+
+def test_handle_command_with_trigger_queues_every_configuration_file():
+    daemon = make_daemon(configs={'a.yaml': {}, 'b.yaml': {}})
+    flexmock(daemon).should_receive('enqueue').with_args(
+        'a.yaml', module.DEFAULT_SCHEDULED_ACTIONS
+    ).once()
+    flexmock(daemon).should_receive('enqueue').with_args(
+        'b.yaml', module.DEFAULT_SCHEDULED_ACTIONS
+    ).once()
+
+    assert daemon.handle_command('trigger') == {'triggered': ['a.yaml', 'b.yaml']}
+
+
+def test_handle_command_with_reload_forces_reload():
+    daemon = make_daemon(configs={'a.yaml': {}})
+    flexmock(daemon).should_receive('reload').with_args(force=True).once()
+
+    assert daemon.handle_command('reload') == {'configuration_files': ['a.yaml']}
+
+
+def test_tick_queues_due_runs_and_waits_for_command_until_next_run():
+    daemon = make_daemon()
+    server_socket = flexmock()
+    flexmock(daemon).should_receive('enqueue_due_runs').once()
+    flexmock(daemon).should_receive('reload').and_return(False)
+    flexmock(daemon).should_receive('seconds_until_next_run').and_return(2)
+    flexmock(module.select).should_receive('select').with_args(
+        (server_socket,), (), (), 2
+    ).and_return(([], [], []))
+    flexmock(module.control).should_receive('handle_connection').never()
+
+    daemon.tick(server_socket)
+
+
+def test_tick_without_schedule_waits_until_reload_check():
+    daemon = make_daemon()
+    server_socket = flexmock()
+    flexmock(daemon).should_receive('enqueue_due_runs')
+    flexmock(daemon).should_receive('reload').and_return(True)
+    flexmock(daemon).should_receive('seconds_until_next_run').and_return(None)
+    flexmock(module.select).should_receive('select').with_args(
+        (server_socket,), (), (), module.RELOAD_CHECK_INTERVAL_SECONDS
+    ).and_return(([], [], []))
+
+    daemon.tick(server_socket)
+
+
+def test_tick_handles_command_from_control_socket():
+    daemon = make_daemon()
+    connection = flexmock()
+    server_socket = flexmock()
+    server_socket.should_receive('accept').and_return((connection, None))
+    flexmock(daemon).should_receive('enqueue_due_runs')
+    flexmock(daemon).should_receive('reload').and_return(False)
+    flexmock(daemon).should_receive('seconds_until_next_run').and_return(60)
+    flexmock(module.select).should_receive('select').and_return(([server_socket], [], []))
+    flexmock(module.control).should_receive('handle_connection').with_args(
+        connection, daemon.handle_command
+    ).once()
+
+    daemon.tick(server_socket)
+
+
+def test_tick_with_control_socket_error_logs_warning():
+    daemon = make_daemon()
+    server_socket = flexmock()
+    server_socket.should_receive('accept').and_raise(OSError)
+    flexmock(daemon).should_receive('enqueue_due_runs')
+    flexmock(daemon).should_receive('reload').and_return(False)
+    flexmock(daemon).should_receive('seconds_until_next_run').and_return(60)
+    flexmock(module.select).should_receive('select').and_return(([server_socket], [], []))
+    flexmock(module.logger).should_receive('warning').once()
+
+    daemon.tick(server_socket)
+
+
+def test_run_daemon_ticks_until_interrupted_and_then_cleans_up():
+    server_socket = flexmock()
+    server_socket.should_receive('close').once()
+    flexmock(module.control).should_receive('make_socket_path').and_return('/daemon.sock')
+    flexmock(module).should_receive('acquire_daemon_lock').and_return(flexmock())
+    flexmock(module.control).should_receive('open_control_socket').with_args(
+        '/daemon.sock'
+    ).and_return(server_socket)
+    flexmock(module.threading.Thread).should_receive('start').once()
+    flexmock(module.threading.Thread).should_receive('join').once()
+    flexmock(module.Daemon).should_receive('tick').with_args(server_socket).and_return(
+        None
+    ).and_raise(KeyboardInterrupt).twice()
+    flexmock(module.Daemon).should_receive('stop_worker').once()
+    flexmock(module.os).should_receive('remove').with_args('/daemon.sock').once()
+    flexmock(module.logger).answer = lambda message: None
+
+    module.run_daemon(flexmock(socket=None), flexmock())
@@ -5,8 +5,8 @@ from borgmatic.hooks import cronhub as module
 
 def test_ping_monitor_rewrites_ping_url_for_start_state():
     hook_config = {'ping_url': 'https://example.com/start/abcdef'}
-    flexmock(module.requests).should_receive('get').with_args(
-        'https://example.com/start/abcdef'
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET', 'https://example.com/start/abcdef', timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS
     ).and_return(flexmock(ok=True))
 
     module.ping_monitor(
@@ -21,8 +21,8 @@ def test_ping_monitor_rewrites_ping_url_for_start_state():
 
 def test_ping_monitor_rewrites_ping_url_and_state_for_start_state():
     hook_config = {'ping_url': 'https://example.com/ping/abcdef'}
-    flexmock(module.requests).should_receive('get').with_args(
-        'https://example.com/start/abcdef'
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET', 'https://example.com/start/abcdef', timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS
     ).and_return(flexmock(ok=True))
 
     module.ping_monitor(
@@ -37,8 +37,8 @@ def test_ping_monitor_rewrites_ping_url_and_state_for_start_state():
 
 def test_ping_monitor_rewrites_ping_url_for_finish_state():
     hook_config = {'ping_url': 'https://example.com/start/abcdef'}
-    flexmock(module.requests).should_receive('get').with_args(
-        'https://example.com/finish/abcdef'
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET', 'https://example.com/finish/abcdef', timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS
     ).and_return(flexmock(ok=True))
 
     module.ping_monitor(
@@ -53,8 +53,8 @@ def test_ping_monitor_rewrites_ping_url_for_finish_state():
 
 def test_ping_monitor_rewrites_ping_url_for_fail_state():
     hook_config = {'ping_url': 'https://example.com/start/abcdef'}
-    flexmock(module.requests).should_receive('get').with_args(
-        'https://example.com/fail/abcdef'
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET', 'https://example.com/fail/abcdef', timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS
     ).and_return(flexmock(ok=True))
 
     module.ping_monitor(
@@ -69,7 +69,7 @@ def test_ping_monitor_rewrites_ping_url_for_fail_state():
 
 def test_ping_monitor_dry_run_does_not_hit_ping_url():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         hook_config,
@@ -83,10 +83,11 @@ def test_ping_monitor_dry_run_does_not_hit_ping_url():
 
 def test_ping_monitor_with_connection_error_logs_warning():
     hook_config = {'ping_url': 'https://example.com/start/abcdef'}
-    flexmock(module.requests).should_receive('get').and_raise(
+    flexmock(module.monitor.get_session()).should_receive('request').and_raise(
         module.requests.exceptions.ConnectionError
     )
     flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
 
     module.ping_monitor(
         hook_config,
@@ -104,10 +105,11 @@ def test_ping_monitor_with_other_error_logs_warning():
     response.should_receive('raise_for_status').and_raise(
         module.requests.exceptions.RequestException
     )
-    flexmock(module.requests).should_receive('get').with_args(
-        'https://example.com/start/abcdef'
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET', 'https://example.com/start/abcdef', timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS
     ).and_return(response)
     flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
 
     module.ping_monitor(
         hook_config,
@@ -121,7 +123,7 @@ def test_ping_monitor_with_other_error_logs_warning():
 
 def test_ping_monitor_with_unsupported_monitoring_state_bails():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         hook_config,
@@ -131,3 +133,33 @@ def test_ping_monitor_with_unsupported_monitoring_state_bails():
         monitoring_log_level=1,
         dry_run=False,
     )
+
+
+def test_ping_monitor_with_timeout_passes_it_to_request():
+    hook_config = {'ping_url': 'https://example.com/start/abcdef', 'timeout': 3}
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET', 'https://example.com/start/abcdef', timeout=3
+    ).and_return(flexmock(ok=True)).once()
+
+    module.ping_monitor(
+        hook_config,
+        {},
+        'config.yaml',
+        module.monitor.State.START,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_make_request_builds_ping_for_state():
+    assert module.make_request(
+        {'ping_url': 'https://example.com/start/abcdef'},
+        {},
+        'config.yaml',
+        module.monitor.State.FAIL,
+        {},
+    ) == (
+        'GET',
+        'https://example.com/fail/abcdef',
+        {'timeout': module.monitor.DEFAULT_TIMEOUT_SECONDS},
+    )
@@ -5,9 +5,12 @@ from borgmatic.hooks import cronitor as module
 
 def test_ping_monitor_hits_ping_url_for_start_state():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').with_args('https://example.com/run').and_return(
-        flexmock(ok=True)
-    )
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET',
+        'https://example.com/run',
+        params=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
+    ).and_return(flexmock(ok=True))
 
     module.ping_monitor(
         hook_config,
@@ -21,8 +24,11 @@ def test_ping_monitor_hits_ping_url_for_start_state():
 
 def test_ping_monitor_hits_ping_url_for_finish_state():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').with_args(
-        'https://example.com/complete'
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET',
+        'https://example.com/complete',
+        params=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True))
 
     module.ping_monitor(
@@ -37,8 +43,11 @@ def test_ping_monitor_hits_ping_url_for_finish_state():
 
 def test_ping_monitor_hits_ping_url_for_fail_state():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').with_args(
-        'https://example.com/fail'
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET',
+        'https://example.com/fail',
+        params=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True))
 
     module.ping_monitor(
@@ -53,7 +62,7 @@ def test_ping_monitor_hits_ping_url_for_fail_state():
 
 def test_ping_monitor_dry_run_does_not_hit_ping_url():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         hook_config,
@@ -67,10 +76,11 @@ def test_ping_monitor_dry_run_does_not_hit_ping_url():
 
 def test_ping_monitor_with_connection_error_logs_warning():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').and_raise(
+    flexmock(module.monitor.get_session()).should_receive('request').and_raise(
         module.requests.exceptions.ConnectionError
     )
     flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
 
     module.ping_monitor(
         hook_config,
@@ -88,10 +98,14 @@ def test_ping_monitor_with_other_error_logs_warning():
     response.should_receive('raise_for_status').and_raise(
         module.requests.exceptions.RequestException
     )
-    flexmock(module.requests).should_receive('get').with_args('https://example.com/run').and_return(
-        response
-    )
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET',
+        'https://example.com/run',
+        params=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
+    ).and_return(response)
     flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
 
     module.ping_monitor(
         hook_config,
@@ -105,7 +119,7 @@ def test_ping_monitor_with_other_error_logs_warning():
 
 def test_ping_monitor_with_unsupported_monitoring_state_bails():
     hook_config = {'ping_url': 'https://example.com'}
-    flexmock(module.requests).should_receive('get').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         hook_config,
@@ -115,3 +129,99 @@ def test_ping_monitor_with_unsupported_monitoring_state_bails():
         monitoring_log_level=1,
         dry_run=False,
     )
+
+
+def test_initialize_monitor_with_send_logs_adds_log_buffering_handler():
+    flexmock(module.monitor).should_receive('add_log_buffering_handler').with_args(
+        'cronitor', module.MESSAGE_LIMIT_BYTES, 1
+    ).once()
+
+    module.initialize_monitor(
+        {'ping_url': 'https://example.com', 'send_logs': True},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_initialize_monitor_without_send_logs_does_not_add_log_buffering_handler():
+    flexmock(module.monitor).should_receive('add_log_buffering_handler').never()
+
+    module.initialize_monitor(
+        {'ping_url': 'https://example.com'},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_ping_monitor_with_send_logs_sends_logs_as_message_for_finish_state():
+    hook_config = {'ping_url': 'https://example.com', 'send_logs': True}
+    flexmock(module.monitor).should_receive('format_buffered_logs_for_payload').with_args(
+        module.MESSAGE_LIMIT_BYTES
+    ).and_return('Backing up\n')
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET',
+        'https://example.com/complete',
+        params={'msg': 'Backing up\n'},
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
+    ).and_return(flexmock(ok=True)).once()
+
+    module.ping_monitor(
+        hook_config,
+        {},
+        'config.yaml',
+        module.monitor.State.FINISH,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_ping_monitor_with_send_logs_does_not_send_logs_for_start_state():
+    hook_config = {'ping_url': 'https://example.com', 'send_logs': True}
+    flexmock(module.monitor).should_receive('format_buffered_logs_for_payload').never()
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'GET',
+        'https://example.com/run',
+        params=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
+    ).and_return(flexmock(ok=True)).once()
+
+    module.ping_monitor(
+        hook_config,
+        {},
+        'config.yaml',
+        module.monitor.State.START,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_destroy_monitor_removes_log_buffering_handler():
+    flexmock(module.monitor).should_receive('remove_log_buffering_handler').with_args(
+        'cronitor'
+    ).once()
+
+    module.destroy_monitor(
+        {'ping_url': 'https://example.com'},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_make_request_builds_ping_for_state_with_message_from_details():
+    assert module.make_request(
+        {'ping_url': 'https://example.com'},
+        {},
+        'config.yaml',
+        module.monitor.State.FAIL,
+        {'message': 'logs'},
+    ) == (
+        'GET',
+        'https://example.com/fail',
+        {'params': {'msg': 'logs'}, 'timeout': module.monitor.DEFAULT_TIMEOUT_SECONDS},
+    )
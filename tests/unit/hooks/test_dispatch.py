@@ -89,6 +89,53 @@ def test_call_hooks_calls_skips_return_values_for_null_hooks():
     assert return_values == expected_return_values
 
 
+def test_call_hooks_concurrently_calls_each_configured_hook_and_wait_for_hooks_collects_return_values():
+    config = {'super_hook': flexmock(), 'other_hook': None}
+    expected_return_values = {'super_hook': flexmock()}
+    flexmock(module).HOOK_NAME_TO_MODULE = {'super_hook': flexmock(), 'other_hook': flexmock()}
+    flexmock(module).should_receive('call_hook').with_args(
+        'do_stuff', config, 'prefix', 'super_hook', 55, value=66
+    ).and_return(expected_return_values['super_hook']).once()
+
+    hook_futures = module.call_hooks_concurrently(
+        'do_stuff', config, 'prefix', ('super_hook', 'other_hook'), 55, value=66
+    )
+
+    assert set(hook_futures) == {'super_hook'}
+    assert module.wait_for_hooks(hook_futures) == expected_return_values
+
+
+def test_call_hooks_concurrently_without_configured_hooks_does_not_call_anything():
+    flexmock(module).should_receive('call_hook').never()
+    flexmock(module.concurrent.futures).should_receive('ThreadPoolExecutor').never()
+
+    assert module.call_hooks_concurrently('do_stuff', {}, 'prefix', ('super_hook',), 55) == {}
+
+
+def test_call_hooks_concurrently_with_unknown_hook_raises_without_calling_anything():
+    config = {'super_hook': flexmock(), 'other_hook': flexmock()}
+    flexmock(module).HOOK_NAME_TO_MODULE = {'super_hook': flexmock()}
+    flexmock(module).should_receive('call_hook').never()
+
+    with pytest.raises(ValueError):
+        module.call_hooks_concurrently(
+            'do_stuff', config, 'prefix', ('super_hook', 'other_hook'), 55
+        )
+
+
+def test_wait_for_hooks_raises_error_from_hook_after_waiting_for_all_hooks():
+    failed_future = module.concurrent.futures.Future()
+    failed_future.set_exception(OSError())
+    succeeded_future = module.concurrent.futures.Future()
+    succeeded_future.set_result(flexmock())
+    flexmock(module.concurrent.futures).should_receive('wait').with_args(
+        (failed_future, succeeded_future)
+    ).replace_with(lambda futures: None).once()
+
+    with pytest.raises(OSError):
+        module.wait_for_hooks({'super_hook': failed_future, 'other_hook': succeeded_future})
+
+
 def test_call_hooks_even_if_unconfigured_calls_each_hook_and_collects_return_values():
     config = {'super_hook': flexmock(), 'other_hook': flexmock()}
     expected_return_values = {'super_hook': flexmock(), 'other_hook': flexmock()}
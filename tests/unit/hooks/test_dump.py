@@ -47,6 +47,28 @@ def test_create_named_pipe_for_dump_does_not_raise():
     module.create_named_pipe_for_dump('/path/to/pipe')
 
 
+def test_link_or_copy_hard_links_file():
+    flexmock(module.os).should_receive('link').with_args('/source', '/destination').once()
+    flexmock(module.shutil).should_receive('copyfile').never()
+
+    module.link_or_copy('/source', '/destination')
+
+
+def test_link_or_copy_without_hard_link_support_copies_file():
+    flexmock(module.os).should_receive('link').and_raise(PermissionError)
+    flexmock(module.shutil).should_receive('copyfile').with_args('/source', '/destination').once()
+
+    module.link_or_copy('/source', '/destination')
+
+
+def test_link_or_copy_with_missing_source_raises():
+    flexmock(module.os).should_receive('link').and_raise(FileNotFoundError)
+    flexmock(module.shutil).should_receive('copyfile').never()
+
+    with pytest.raises(FileNotFoundError):
+        module.link_or_copy('/source', '/destination')
+
+
 def test_remove_database_dumps_removes_dump_path():
     flexmock(module.os.path).should_receive('expanduser').and_return('databases/localhost')
     flexmock(module.os.path).should_receive('exists').and_return(True)
@@ -121,6 +121,50 @@ def test_dump_databases_runs_mongodump_with_directory_format():
     assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
 
 
+def test_dump_databases_runs_mongodump_with_split_format_as_directory_format():
+    databases = [{'name': 'foo', 'format': 'split'}]
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        'databases/localhost/foo'
+    )
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump')
+    flexmock(module.dump).should_receive('create_named_pipe_for_dump').never()
+
+    flexmock(module).should_receive('execute_command').with_args(
+        ('mongodump', '--out', 'databases/localhost/foo', '--db', 'foo'),
+        shell=True,
+    ).and_return(flexmock()).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_runs_mongodump_with_parallel_collections():
+    databases = [{'name': 'foo', 'parallel_collections': 8}]
+    process = flexmock()
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        'databases/localhost/foo'
+    )
+    flexmock(module.dump).should_receive('create_named_pipe_for_dump')
+
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'mongodump',
+            '--db',
+            'foo',
+            '--numParallelCollections',
+            '8',
+            '--archive',
+            '>',
+            'databases/localhost/foo',
+        ),
+        shell=True,
+        run_to_completion=False,
+    ).and_return(process).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == [process]
+
+
 def test_dump_databases_runs_mongodump_with_options():
     databases = [{'name': 'foo', 'options': '--stuff=such'}]
     process = flexmock()
@@ -444,6 +488,52 @@ def test_restore_database_dump_runs_mongorestore_with_options():
     )
 
 
+def test_restore_database_dump_runs_mongorestore_with_parallel_collections_and_insertion_workers():
+    databases_config = [
+        {
+            'name': 'foo',
+            'parallel_collections': 8,
+            'insertion_workers_per_collection': 4,
+            'schemas': None,
+        }
+    ]
+    extract_process = flexmock(stdout=flexmock())
+
+    flexmock(module).should_receive('make_dump_path')
+    flexmock(module.dump).should_receive('make_database_dump_filename')
+    flexmock(module).should_receive('execute_command_with_processes').with_args(
+        [
+            'mongorestore',
+            '--archive',
+            '--drop',
+            '--db',
+            'foo',
+            '--numParallelCollections',
+            '8',
+            '--numInsertionWorkersPerCollection',
+            '4',
+        ],
+        processes=[extract_process],
+        output_log_level=logging.DEBUG,
+        input_file=extract_process.stdout,
+    ).once()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=False,
+        extract_process=extract_process,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
 def test_restore_databases_dump_runs_mongorestore_with_schemas():
     databases_config = [{'name': 'foo', 'schemas': ['bar', 'baz']}]
     extract_process = flexmock(stdout=flexmock())
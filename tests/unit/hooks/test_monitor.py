@@ -0,0 +1,240 @@
+import gzip
+
+from flexmock import flexmock
+
+from borgmatic.hooks import monitor as module
+
+
+def emit_messages(handler, *messages):
+    for message in messages:
+        handler.emit(flexmock(getMessage=lambda message=message: message))
+
+
+def test_forgetful_buffering_handler_emit_collects_log_records():
+    handler = module.Forgetful_buffering_handler(byte_capacity=100, log_level=1)
+    emit_messages(handler, 'foo', 'bar')
+
+    assert list(handler.buffer) == ['foo\n', 'bar\n']
+    assert not handler.forgot
+
+
+def test_forgetful_buffering_handler_emit_collects_log_records_with_zero_byte_capacity():
+    handler = module.Forgetful_buffering_handler(byte_capacity=0, log_level=1, head_byte_capacity=4)
+    emit_messages(handler, 'foo', 'bar')
+
+    assert handler.head == []
+    assert list(handler.buffer) == ['foo\n', 'bar\n']
+    assert not handler.forgot
+
+
+def test_forgetful_buffering_handler_emit_forgets_log_records_when_capacity_reached():
+    handler = module.Forgetful_buffering_handler(byte_capacity=len('foo\nbar\n'), log_level=1)
+    emit_messages(handler, 'foo')
+    assert list(handler.buffer) == ['foo\n']
+    emit_messages(handler, 'bar')
+    assert list(handler.buffer) == ['foo\n', 'bar\n']
+    emit_messages(handler, 'baz')
+    assert list(handler.buffer) == ['bar\n', 'baz\n']
+    emit_messages(handler, 'quux')
+    assert list(handler.buffer) == ['quux\n']
+    assert handler.forgot
+
+
+def test_forgetful_buffering_handler_emit_keeps_head_and_forgets_from_middle():
+    handler = module.Forgetful_buffering_handler(
+        byte_capacity=len('start\nbar\nbaz\n'), log_level=1, head_byte_capacity=len('start\n')
+    )
+    emit_messages(handler, 'start', 'foo', 'bar', 'baz')
+
+    assert handler.head == ['start\n']
+    assert list(handler.buffer) == ['bar\n', 'baz\n']
+    assert handler.forgot
+
+
+def test_forgetful_buffering_handler_emit_only_puts_start_of_run_in_head():
+    handler = module.Forgetful_buffering_handler(
+        byte_capacity=100, log_level=1, head_byte_capacity=len('foo\n')
+    )
+    emit_messages(handler, 'foo', 'quux', 'bar')
+
+    assert handler.head == ['foo\n']
+    assert list(handler.buffer) == ['quux\n', 'bar\n']
+
+
+def test_forgetful_buffering_handler_format_payload_joins_head_and_tail():
+    handler = module.Forgetful_buffering_handler(byte_capacity=100, log_level=1)
+    handler.head = ['start\n']
+    handler.buffer.extend(['foo\n', 'bar\n'])
+
+    assert handler.format_payload() == 'start\nfoo\nbar\n'
+
+
+def test_forgetful_buffering_handler_format_payload_inserts_truncation_indicator_when_logs_forgotten():
+    handler = module.Forgetful_buffering_handler(byte_capacity=100, log_level=1)
+    handler.head = ['start\n']
+    handler.buffer.extend(['foo\n', 'bar\n'])
+    handler.forgot = True
+
+    assert handler.format_payload() == 'start\n...\nfoo\nbar\n'
+
+
+def test_forgetful_buffering_handler_format_payload_within_byte_limit_returns_everything():
+    handler = module.Forgetful_buffering_handler(byte_capacity=100, log_level=1)
+    handler.buffer.extend(['foo\n', 'bar\n'])
+
+    assert handler.format_payload(byte_limit=len('foo\nbar\n')) == 'foo\nbar\n'
+
+
+def test_forgetful_buffering_handler_format_payload_over_byte_limit_keeps_head_share_and_tail():
+    handler = module.Forgetful_buffering_handler(
+        byte_capacity=1000, log_level=1, head_byte_capacity=200
+    )
+    handler.head = ['a' * 9 + '\n', 'b' * 9 + '\n']
+    handler.buffer.extend(['c' * 29 + '\n', 'd' * 29 + '\n', 'e' * 29 + '\n'])
+
+    # The 4-byte truncation indicator leaves 70 bytes, 14 of them for the head.
+    assert handler.format_payload(byte_limit=74) == (
+        'a' * 9 + '\n' + '...\n' + 'd' * 29 + '\n' + 'e' * 29 + '\n'
+    )
+
+
+def test_take_messages_takes_messages_that_fit_within_limit():
+    assert module.take_messages(['foo\n', 'bar\n', 'baz\n'], 9) == ['foo\n', 'bar\n']
+    assert module.take_messages(['foo\n'], 0) == []
+
+
+def test_get_log_buffering_handler_finds_handler_on_root_logger():
+    handler = module.Forgetful_buffering_handler(byte_capacity=100, log_level=1)
+    flexmock(module.logging).should_receive('getLogger').and_return(
+        flexmock(handlers=[module.logging.Handler(), handler])
+    )
+
+    assert module.get_log_buffering_handler() == handler
+
+
+def test_get_log_buffering_handler_without_handler_returns_none():
+    flexmock(module.logging).should_receive('getLogger').and_return(
+        flexmock(handlers=[module.logging.Handler()])
+    )
+
+    assert module.get_log_buffering_handler() is None
+
+
+def test_add_log_buffering_handler_without_existing_handler_adds_one():
+    flexmock(module).should_receive('get_log_buffering_handler').and_return(None)
+    handler = flexmock(hook_names=set())
+    flexmock(module).should_receive('Forgetful_buffering_handler').with_args(
+        1000, 1, 200
+    ).and_return(handler)
+    root_logger = flexmock()
+    root_logger.should_receive('addHandler').with_args(handler).once()
+    flexmock(module.logging).should_receive('getLogger').and_return(root_logger)
+
+    module.add_log_buffering_handler('healthchecks', 1000, 1)
+
+    assert handler.hook_names == {'healthchecks'}
+
+
+def test_add_log_buffering_handler_with_existing_handler_grows_its_capacity():
+    handler = module.Forgetful_buffering_handler(
+        byte_capacity=1000, log_level=1, head_byte_capacity=200
+    )
+    handler.hook_names.add('cronitor')
+    flexmock(module).should_receive('get_log_buffering_handler').and_return(handler)
+    flexmock(module).should_receive('Forgetful_buffering_handler').never()
+
+    module.add_log_buffering_handler('healthchecks', 5000, 1)
+
+    assert handler.byte_capacity == 5000
+    assert handler.head_byte_capacity == 1000
+    assert handler.hook_names == {'cronitor', 'healthchecks'}
+
+
+def test_add_log_buffering_handler_with_existing_larger_handler_leaves_its_capacity_alone():
+    handler = module.Forgetful_buffering_handler(
+        byte_capacity=5000, log_level=1, head_byte_capacity=1000
+    )
+    flexmock(module).should_receive('get_log_buffering_handler').and_return(handler)
+
+    module.add_log_buffering_handler('cronitor', 1000, 1)
+
+    assert handler.byte_capacity == 5000
+    assert handler.head_byte_capacity == 1000
+
+
+def test_add_log_buffering_handler_with_zero_capacity_makes_existing_handler_unlimited():
+    handler = module.Forgetful_buffering_handler(
+        byte_capacity=1000, log_level=1, head_byte_capacity=200
+    )
+    flexmock(module).should_receive('get_log_buffering_handler').and_return(handler)
+
+    module.add_log_buffering_handler('healthchecks', 0, 1)
+
+    assert handler.byte_capacity == 0
+
+
+def test_format_buffered_logs_for_payload_formats_handler_payload():
+    handler = flexmock()
+    handler.should_receive('format_payload').with_args(100).and_return('foo\n')
+    flexmock(module).should_receive('get_log_buffering_handler').and_return(handler)
+
+    assert module.format_buffered_logs_for_payload(100) == 'foo\n'
+
+
+def test_format_buffered_logs_for_payload_without_handler_produces_empty_payload():
+    flexmock(module).should_receive('get_log_buffering_handler').and_return(None)
+
+    assert module.format_buffered_logs_for_payload() == ''
+
+
+def test_compress_payload_gzips_payload():
+    assert gzip.decompress(module.compress_payload('foo\n')) == b'foo\n'
+
+
+def test_remove_log_buffering_handler_keeps_handler_used_by_other_hooks():
+    handler = module.Forgetful_buffering_handler(byte_capacity=100, log_level=1)
+    handler.hook_names.update({'healthchecks', 'ntfy'})
+    root_logger = flexmock(handlers=[handler])
+    root_logger.should_receive('removeHandler').never()
+    flexmock(module.logging).should_receive('getLogger').and_return(root_logger)
+
+    module.remove_log_buffering_handler('healthchecks')
+
+    assert handler.hook_names == {'ntfy'}
+
+
+def test_remove_log_buffering_handler_removes_handler_once_unused():
+    handler = module.Forgetful_buffering_handler(byte_capacity=100, log_level=1)
+    handler.hook_names.add('healthchecks')
+    root_logger = flexmock(handlers=[module.logging.Handler(), handler])
+    root_logger.should_receive('removeHandler').with_args(handler).once()
+    flexmock(module.logging).should_receive('getLogger').and_return(root_logger)
+
+    module.remove_log_buffering_handler('healthchecks')
+
+
+def test_make_session_mounts_retrying_pooled_adapter():
+    session = module.make_session()
+
+    adapter = session.get_adapter('https://example.com')
+    assert adapter.max_retries.total == module.MAX_RETRIES
+    assert adapter.max_retries.status_forcelist == module.RETRY_STATUS_CODES
+    assert adapter.max_retries.allowed_methods is None
+    assert session.get_adapter('http://example.com') is adapter
+
+
+def test_get_session_creates_session_once_and_reuses_it():
+    session = flexmock()
+    flexmock(module).session = None
+    flexmock(module).should_receive('make_session').and_return(session).once()
+
+    assert module.get_session() is session
+    assert module.get_session() is session
+
+
+def test_get_timeout_uses_configured_timeout():
+    assert module.get_timeout({'timeout': 3}) == 3
+
+
+def test_get_timeout_without_configured_timeout_uses_default():
+    assert module.get_timeout({}) == module.DEFAULT_TIMEOUT_SECONDS
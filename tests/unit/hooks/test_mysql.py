@@ -125,6 +125,278 @@ def test_dump_databases_dumps_all_databases_separately_when_format_configured():
     assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == processes
 
 
+def test_dump_databases_with_jobs_dumps_all_databases_in_parallel_by_size():
+    databases = [{'name': 'all', 'jobs': 2}]
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('foo', 'bar'))
+    flexmock(module).should_receive('order_database_names_by_size').and_return(('bar', 'foo'))
+    flexmock(module.mysql_parallel).should_receive('hold_global_read_lock').never()
+    flexmock(module.mysql_parallel).should_receive('dump_in_parallel').with_args(
+        object, ('bar', 'foo'), 2, None, 'test.yaml'
+    ).once()
+    flexmock(module).should_receive('execute_dump_command').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_with_jobs_and_global_read_lock_holds_lock_for_parallel_dumps():
+    databases = [{'name': 'all', 'jobs': 2, 'global_read_lock': True}]
+    lock_process = flexmock()
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('foo', 'bar'))
+    flexmock(module).should_receive('order_database_names_by_size').and_return(('bar', 'foo'))
+    flexmock(module).should_receive('make_lock_command').and_return(('mysql',))
+    flexmock(module.mysql_parallel).should_receive('hold_global_read_lock').with_args(
+        ('mysql',), None, 'test.yaml'
+    ).and_return(lock_process).once()
+    flexmock(module.mysql_parallel).should_receive('dump_in_parallel').with_args(
+        object, ('bar', 'foo'), 2, lock_process, 'test.yaml'
+    ).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_with_jobs_and_dry_run_dumps_all_databases_separately():
+    databases = [{'name': 'all', 'jobs': 2}]
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('foo', 'bar'))
+    flexmock(module.mysql_parallel).should_receive('dump_in_parallel').never()
+
+    for name in ('foo', 'bar'):
+        flexmock(module).should_receive('execute_dump_command').with_args(
+            database={'name': name, 'jobs': 2},
+            log_prefix=object,
+            dump_path=object,
+            database_names=(name,),
+            extra_environment=object,
+            dry_run=True,
+            dry_run_label=object,
+        ).and_return(None).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=True) == []
+
+
+def test_execute_parallel_dump_command_dumps_named_database_with_snapshot_started_function():
+    snapshot_started = flexmock()
+    flexmock(module).should_receive('execute_dump_command').with_args(
+        {'name': 'foo', 'jobs': 2},
+        'test.yaml',
+        '/dump',
+        ('foo',),
+        None,
+        dry_run=False,
+        dry_run_label='',
+        snapshot_started=snapshot_started,
+    ).once()
+
+    module.execute_parallel_dump_command(
+        {'name': 'all', 'jobs': 2}, 'test.yaml', '/dump', None, 'foo', snapshot_started
+    )
+
+
+def test_dump_databases_with_binlog_incrementals_dumps_incrementally():
+    databases = [{'name': 'all', 'jobs': 2, 'binlog_incrementals': True}]
+    flexmock(module).should_receive('make_dump_path').and_return('/dump')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('foo', 'bar'))
+    flexmock(module).should_receive('execute_binlog_dump_command').with_args(
+        databases[0], {}, 'test.yaml', '/dump', ('foo', 'bar'), None, False, ''
+    ).once()
+    flexmock(module.mysql_parallel).should_receive('dump_in_parallel').never()
+    flexmock(module).should_receive('execute_dump_command').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+@pytest.mark.parametrize(
+    'version_output,expected_flag',
+    (
+        (
+            'mysqldump  Ver 8.0.36 for Linux on x86_64 (MySQL Community Server - GPL)',
+            '--source-data=2',
+        ),
+        (
+            'mysqldump  Ver 8.0.26 for Linux on x86_64 (MySQL Community Server - GPL)',
+            '--source-data=2',
+        ),
+        (
+            'mysqldump  Ver 8.0.25 for Linux on x86_64 (MySQL Community Server - GPL)',
+            '--master-data=2',
+        ),
+        ('mysqldump  Ver 10.13 Distrib 5.7.44, for Linux (x86_64)', '--master-data=2'),
+        (
+            'mysqldump  Ver 10.19 Distrib 10.11.6-MariaDB, for debian-linux-gnu (x86_64)',
+            '--master-data=2',
+        ),
+        ('mysqldump from 11.2.2-MariaDB, client 10.19 for Linux (x86_64)', '--master-data=2'),
+        ('mysqldump, some future version', '--source-data=2'),
+    ),
+)
+def test_make_source_data_flag_uses_flag_known_to_mysqldump_version(version_output, expected_flag):
+    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+        ('mysqldump', '--version'), extra_environment=None
+    ).and_return(version_output)
+
+    assert module.make_source_data_flag(None, 'test.yaml') == expected_flag
+
+
+def test_execute_binlog_dump_command_dumps_incrementally_with_connection_flags():
+    database = {
+        'name': 'foo',
+        'options': '--skip-comments',
+        'hostname': 'db.example.org',
+        'port': 3306,
+        'username': 'root',
+        'binlog_incrementals': True,
+    }
+    connection_flags = (
+        '--host',
+        'db.example.org',
+        '--port',
+        '3306',
+        '--protocol',
+        'tcp',
+        '--user',
+        'root',
+    )
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        '/dump/db.example.org/foo'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump')
+    flexmock(module).should_receive('make_source_data_flag').with_args(
+        {'MYSQL_PWD': 'trustsome1'}, 'test.yaml'
+    ).and_return('--source-data=2')
+    flexmock(module.mysql_binlog).should_receive('make_cache_directory').with_args(
+        {}, 'mysql_binlog_cache', database
+    ).and_return('/cache')
+    flexmock(module.mysql_binlog).should_receive('dump_incrementally').with_args(
+        {},
+        database,
+        '/cache',
+        '/dump/db.example.org/foo',
+        ('mysqldump', '--skip-comments', '--add-drop-database')
+        + connection_flags
+        + ('--single-transaction', '--flush-logs', '--source-data=2', '--databases', 'foo'),
+        ('mysql',) + connection_flags + ('--skip-column-names', '--batch'),
+        ('mysqlbinlog', '--read-from-remote-server') + connection_flags,
+        {'MYSQL_PWD': 'trustsome1'},
+        'test.yaml',
+    ).once()
+
+    module.execute_binlog_dump_command(
+        database,
+        {},
+        'test.yaml',
+        '/dump',
+        ('foo',),
+        {'MYSQL_PWD': 'trustsome1'},
+        dry_run=False,
+        dry_run_label='',
+    )
+
+
+def test_execute_binlog_dump_command_with_dry_run_skips_dump():
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        '/dump/localhost/foo'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump').never()
+    flexmock(module).should_receive('make_source_data_flag').never()
+    flexmock(module.mysql_binlog).should_receive('dump_incrementally').never()
+
+    module.execute_binlog_dump_command(
+        {'name': 'foo', 'binlog_incrementals': True},
+        {},
+        'test.yaml',
+        '/dump',
+        ('foo',),
+        None,
+        dry_run=True,
+        dry_run_label='SO DRY',
+    )
+
+
+def test_execute_binlog_dump_command_with_duplicate_dump_skips_dump():
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        '/dump/localhost/foo'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.mysql_binlog).should_receive('dump_incrementally').never()
+
+    module.execute_binlog_dump_command(
+        {'name': 'foo', 'binlog_incrementals': True},
+        {},
+        'test.yaml',
+        '/dump',
+        ('foo',),
+        None,
+        dry_run=False,
+        dry_run_label='',
+    )
+
+
+def test_order_database_names_by_size_queries_sizes_with_connection_flags():
+    database = {
+        'name': 'all',
+        'list_options': '--defaults-extra-file=my.cnf',
+        'hostname': 'db.example.org',
+        'port': 3306,
+        'username': 'root',
+    }
+    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+        (
+            'mysql',
+            '--defaults-extra-file=my.cnf',
+            '--host',
+            'db.example.org',
+            '--port',
+            '3306',
+            '--protocol',
+            'tcp',
+            '--user',
+            'root',
+            '--skip-column-names',
+            '--batch',
+            '--execute',
+            module.mysql_parallel.DATABASE_SIZES_QUERY,
+        ),
+        extra_environment=None,
+    ).and_return('foo\t10\nbar\t20\n').once()
+
+    assert module.order_database_names_by_size(database, ('foo', 'bar'), None, 'test.yaml') == (
+        'bar',
+        'foo',
+    )
+
+
+def test_make_lock_command_includes_connection_flags():
+    assert module.make_lock_command(
+        {'name': 'all', 'hostname': 'db.example.org', 'port': 3306, 'username': 'root'}
+    ) == (
+        'mysql',
+        '--host',
+        'db.example.org',
+        '--port',
+        '3306',
+        '--protocol',
+        'tcp',
+        '--user',
+        'root',
+        '--skip-column-names',
+        '--batch',
+        '--unbuffered',
+    )
+
+
+def test_make_lock_command_without_connection_flags_omits_them():
+    assert module.make_lock_command({'name': 'all'}) == (
+        'mysql',
+        '--skip-column-names',
+        '--batch',
+        '--unbuffered',
+    )
+
+
 def test_database_names_to_dump_runs_mysql_with_list_options():
     database = {'name': 'all', 'list_options': '--defaults-extra-file=my.cnf'}
     flexmock(module).should_receive('execute_command_and_capture_output').with_args(
@@ -356,6 +628,103 @@ def test_execute_dump_command_with_dry_run_skips_mysqldump():
     )
 
 
+def test_execute_dump_command_with_split_format_splits_mysqldump_output_into_directory():
+    process = flexmock()
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return('dump')
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump').with_args('dump')
+    flexmock(module.dump).should_receive('create_named_pipe_for_dump').never()
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'mysqldump',
+            '--add-drop-database',
+            '--single-transaction',
+            '--order-by-primary',
+            '--skip-dump-date',
+            '--databases',
+            'foo',
+        ),
+        output_file=module.subprocess.PIPE,
+        extra_environment=None,
+        run_to_completion=False,
+    ).and_return(process).once()
+    flexmock(module.mysql_split).should_receive('split_dump').with_args(
+        process, 'dump', None
+    ).once()
+
+    assert (
+        module.execute_dump_command(
+            database={'name': 'foo', 'format': 'split'},
+            log_prefix='log',
+            dump_path=flexmock(),
+            database_names=('foo',),
+            extra_environment=None,
+            dry_run=False,
+            dry_run_label='',
+        )
+        is None
+    )
+
+
+def test_execute_dump_command_with_snapshot_started_function_copies_dump_output_to_file():
+    process = flexmock()
+    snapshot_started = flexmock()
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return('dump')
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump').with_args('dump')
+    flexmock(module.dump).should_receive('create_named_pipe_for_dump').never()
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'mysqldump',
+            '--add-drop-database',
+            '--single-transaction',
+            '--databases',
+            'foo',
+        ),
+        output_file=module.subprocess.PIPE,
+        extra_environment=None,
+        run_to_completion=False,
+    ).and_return(process).once()
+    flexmock(module.mysql_parallel).should_receive('copy_dump').with_args(
+        process, 'dump', snapshot_started
+    ).once()
+    flexmock(module.mysql_split).should_receive('split_dump').never()
+
+    assert (
+        module.execute_dump_command(
+            database={'name': 'foo'},
+            log_prefix='log',
+            dump_path=flexmock(),
+            database_names=('foo',),
+            extra_environment=None,
+            dry_run=False,
+            dry_run_label='',
+            snapshot_started=snapshot_started,
+        )
+        is None
+    )
+
+
+def test_execute_dump_command_with_split_format_and_dry_run_skips_mysqldump():
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return('dump')
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module).should_receive('execute_command').never()
+    flexmock(module.mysql_split).should_receive('split_dump').never()
+
+    assert (
+        module.execute_dump_command(
+            database={'name': 'foo', 'format': 'split'},
+            log_prefix='log',
+            dump_path=flexmock(),
+            database_names=('foo',),
+            extra_environment=None,
+            dry_run=True,
+            dry_run_label='SO DRY',
+        )
+        is None
+    )
+
+
 def test_dump_databases_errors_for_missing_all_databases():
     databases = [{'name': 'all'}]
     flexmock(module).should_receive('make_dump_path').and_return('')
@@ -407,6 +776,161 @@ def test_restore_database_dump_runs_mysql_to_restore():
     )
 
 
+def test_restore_database_dump_with_split_format_restores_dump_directory_concurrently():
+    databases_config = [{'name': 'foo', 'format': 'split', 'jobs': 4, 'password': 'trustsome1'}]
+    flexmock(module).should_receive('make_dump_path').and_return('/dump/path')
+    flexmock(module.dump).should_receive('make_database_dump_filename').with_args(
+        '/dump/path', 'foo', None
+    ).and_return('/dump/path/localhost/foo')
+    flexmock(module).should_receive('execute_command_with_processes').never()
+    flexmock(module.mysql_split).should_receive('restore_split_dump').with_args(
+        ('mysql', '--batch'),
+        '/dump/path/localhost/foo',
+        4,
+        {'MYSQL_PWD': 'trustsome1'},
+        'test.yaml',
+        None,
+    ).once()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=False,
+        extract_process=None,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
+def test_restore_database_dump_with_binlog_incrementals_restores_to_target_time():
+    databases_config = [{'name': 'foo', 'binlog_incrementals': True, 'password': 'trustsome1'}]
+    flexmock(module).should_receive('make_dump_path').and_return('/dump/path')
+    flexmock(module.dump).should_receive('make_database_dump_filename').with_args(
+        '/dump/path', 'foo', None
+    ).and_return('/dump/path/localhost/foo')
+    flexmock(module).should_receive('execute_command_with_processes').never()
+    flexmock(module.mysql_binlog).should_receive('restore_incrementally').with_args(
+        ('mysql', '--batch'),
+        ('mysqlbinlog', '--skip-gtids'),
+        '/dump/path/localhost/foo',
+        'foo',
+        '2024-01-31 12:00:00',
+        {'MYSQL_PWD': 'trustsome1'},
+        'test.yaml',
+        None,
+    ).once()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=False,
+        extract_process=None,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+            'target_time': '2024-01-31 12:00:00',
+        },
+    )
+
+
+def test_restore_database_dump_with_fast_restore_wraps_restore_in_session_statements():
+    databases_config = [{'name': 'foo', 'fast_restore': True}]
+    extract_process = flexmock()
+    flexmock(module.mysql_fast_restore).should_receive('can_disable_binary_log').with_args(
+        ('mysql', '--batch'), None, 'test.yaml'
+    ).and_return(True)
+    flexmock(module.mysql_fast_restore).should_receive('make_session_statements').with_args(
+        True
+    ).and_return((b'prelude', b'epilogue'))
+    flexmock(module.mysql_fast_restore).should_receive('restore_stream').with_args(
+        ('mysql', '--batch'), extract_process, (b'prelude', b'epilogue'), None
+    ).once()
+    flexmock(module).should_receive('execute_command_with_processes').never()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=False,
+        extract_process=extract_process,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
+def test_restore_database_dump_with_fast_restore_and_split_format_passes_session_statements():
+    databases_config = [{'name': 'foo', 'format': 'split', 'fast_restore': True}]
+    flexmock(module).should_receive('make_dump_path').and_return('/dump/path')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        '/dump/path/localhost/foo'
+    )
+    flexmock(module.mysql_fast_restore).should_receive('can_disable_binary_log').and_return(False)
+    flexmock(module.mysql_fast_restore).should_receive('make_session_statements').with_args(
+        False
+    ).and_return((b'prelude', b'epilogue'))
+    flexmock(module.mysql_split).should_receive('restore_split_dump').with_args(
+        ('mysql', '--batch'),
+        '/dump/path/localhost/foo',
+        1,
+        None,
+        'test.yaml',
+        (b'prelude', b'epilogue'),
+    ).once()
+    flexmock(module.mysql_fast_restore).should_receive('restore_stream').never()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=False,
+        extract_process=None,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
+def test_restore_database_dump_with_fast_restore_and_dry_run_skips_binary_log_check():
+    databases_config = [{'name': 'foo', 'fast_restore': True}]
+    flexmock(module.mysql_fast_restore).should_receive('can_disable_binary_log').never()
+    flexmock(module.mysql_fast_restore).should_receive('restore_stream').never()
+    flexmock(module).should_receive('execute_command_with_processes').never()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=True,
+        extract_process=flexmock(),
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
 def test_restore_database_dump_errors_when_database_missing_from_configuration():
     databases_config = [{'name': 'foo'}, {'name': 'bar'}]
     extract_process = flexmock(stdout=flexmock())
@@ -0,0 +1,410 @@
+import logging
+import subprocess
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.hooks import mysql_binlog as module
+
+HEADER = b'''-- MySQL dump 10.13  Distrib 8.0.35, for Linux (x86_64)
+--
+-- Host: localhost    Database: shop
+-- ------------------------------------------------------
+
+--
+-- Position to start replication or point-in-time recovery from
+--
+
+-- CHANGE REPLICATION SOURCE TO SOURCE_LOG_FILE='binlog.000003', SOURCE_LOG_POS=157;
+
+--
+-- Current Database: `shop`
+--
+'''
+
+
+def test_make_cache_directory_uses_hostname_and_database_name():
+    assert (
+        module.make_cache_directory(
+            {'borgmatic_source_directory': '/root/.borgmatic'},
+            'mysql_binlog_cache',
+            {'name': 'shop', 'hostname': 'db.example.org'},
+        )
+        == '/root/.borgmatic/mysql_binlog_cache/db.example.org/shop'
+    )
+
+
+def test_make_cache_directory_without_hostname_or_source_directory_uses_defaults():
+    flexmock(module.os.path).should_receive('expanduser').replace_with(
+        lambda path: path.replace('~', '/root')
+    )
+
+    assert (
+        module.make_cache_directory({}, 'mariadb_binlog_cache', {'name': 'shop'})
+        == '/root/.borgmatic/mariadb_binlog_cache/localhost/shop'
+    )
+
+
+def test_get_full_dump_reason_with_always_frequency_returns_always():
+    assert (
+        module.get_full_dump_reason(
+            {'full_dump_frequency': 'always'},
+            {'full_dump_time': 1000, 'next_file': 'binlog.000003'},
+            '/cache',
+        )
+        == 'always'
+    )
+
+
+def test_get_full_dump_reason_without_position_returns_reason():
+    assert module.get_full_dump_reason({}, None, '/cache') == 'no previous full dump recorded'
+
+
+def test_get_full_dump_reason_with_missing_full_dump_returns_reason():
+    flexmock(module.os.path).should_receive('exists').with_args('/cache/full.sql').and_return(False)
+
+    assert (
+        module.get_full_dump_reason(
+            {}, {'full_dump_time': 1000, 'next_file': 'binlog.000003'}, '/cache', now=1001
+        )
+        == 'previous full dump missing'
+    )
+
+
+def test_get_full_dump_reason_with_elapsed_frequency_returns_reason():
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+
+    assert module.get_full_dump_reason(
+        {'full_dump_frequency': '1 hour'},
+        {'full_dump_time': 1000, 'next_file': 'binlog.000003'},
+        '/cache',
+        now=1000 + 60 * 60,
+    ).startswith('last full dump at')
+
+
+def test_get_full_dump_reason_within_default_frequency_returns_none():
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+
+    assert (
+        module.get_full_dump_reason(
+            {},
+            {'full_dump_time': 1000, 'next_file': 'binlog.000003'},
+            '/cache',
+            now=1000 + 60 * 60,
+        )
+        is None
+    )
+
+
+def test_get_full_dump_reason_without_now_uses_current_time():
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.time).should_receive('time').and_return(1001)
+
+    assert (
+        module.get_full_dump_reason(
+            {}, {'full_dump_time': 1000, 'next_file': 'binlog.000003'}, '/cache'
+        )
+        is None
+    )
+
+
+def test_get_full_dump_reason_with_invalid_frequency_raises():
+    with pytest.raises(ValueError):
+        module.get_full_dump_reason({'full_dump_frequency': 'often'}, None, '/cache')
+
+
+def test_read_binlog_coordinates_parses_source_coordinates(tmp_path):
+    full_dump_path = tmp_path / 'full.sql'
+    full_dump_path.write_bytes(HEADER + b'INSERT INTO `orders` VALUES (1);\n')
+
+    assert module.read_binlog_coordinates(str(full_dump_path)) == ('binlog.000003', 157)
+
+
+def test_read_binlog_coordinates_parses_master_coordinates(tmp_path):
+    full_dump_path = tmp_path / 'full.sql'
+    full_dump_path.write_bytes(
+        b"-- CHANGE MASTER TO MASTER_LOG_FILE='mysql-bin.000012', MASTER_LOG_POS=385;\n"
+    )
+
+    assert module.read_binlog_coordinates(str(full_dump_path)) == ('mysql-bin.000012', 385)
+
+
+def test_read_binlog_coordinates_without_coordinates_in_header_raises(tmp_path):
+    full_dump_path = tmp_path / 'full.sql'
+    full_dump_path.write_bytes(
+        b"-- Current Database: `shop`\n-- MASTER_LOG_FILE='binlog.000003', MASTER_LOG_POS=4;\n"
+    )
+
+    with pytest.raises(ValueError):
+        module.read_binlog_coordinates(str(full_dump_path))
+
+
+def test_dump_full_replaces_cache_with_full_dump_and_returns_binlog_file():
+    dump_process = flexmock()
+    flexmock(module.shutil).should_receive('rmtree').with_args('/cache', ignore_errors=True).once()
+    flexmock(module.os).should_receive('makedirs').with_args('/cache/binlogs', mode=0o700).once()
+    flexmock(module).should_receive('execute_command').with_args(
+        ('mysqldump', '--source-data=2'),
+        output_file=subprocess.PIPE,
+        extra_environment=None,
+        run_to_completion=False,
+    ).and_return(dump_process)
+    flexmock(module.mysql_parallel).should_receive('copy_dump').with_args(
+        dump_process, '/cache/full.sql'
+    ).once()
+    flexmock(module).should_receive('read_binlog_coordinates').with_args(
+        '/cache/full.sql'
+    ).and_return(('binlog.000003', 157))
+
+    assert module.dump_full(('mysqldump', '--source-data=2'), '/cache', None) == 'binlog.000003'
+
+
+def test_list_binary_logs_flushes_and_parses_binary_log_names():
+    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+        ('mysql', '--batch', '--execute', 'FLUSH BINARY LOGS; SHOW BINARY LOGS'),
+        extra_environment={'MYSQL_PWD': 'trustsome1'},
+    ).and_return('binlog.000003\t1024\tNo\nbinlog.000004\t157\tNo\n')
+
+    assert module.list_binary_logs(('mysql', '--batch'), {'MYSQL_PWD': 'trustsome1'}) == (
+        'binlog.000003',
+        'binlog.000004',
+    )
+
+
+def test_fetch_binary_logs_copies_raw_binary_logs_into_cache():
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'mysqlbinlog',
+            '--read-from-remote-server',
+            '--raw',
+            '--result-file=/cache/binlogs/',
+            'binlog.000003',
+            'binlog.000004',
+        ),
+        extra_environment=None,
+    ).once()
+
+    module.fetch_binary_logs(
+        ('mysqlbinlog', '--read-from-remote-server'),
+        ('binlog.000003', 'binlog.000004'),
+        '/cache',
+        None,
+    )
+
+
+def test_link_cache_copies_cache_with_hard_links():
+    flexmock(module.shutil).should_receive('copytree').with_args(
+        '/cache', '/dump/localhost/shop', copy_function=module.dump.link_or_copy
+    ).once()
+
+    module.link_cache('/cache', '/dump/localhost/shop')
+
+
+def mock_state(position):
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').with_args(
+        connection, module.POSITIONS_NAMESPACE, '/cache'
+    ).and_return(position)
+
+    return connection
+
+
+def dump_incrementally(database=None):
+    module.dump_incrementally(
+        {},
+        database or {'name': 'shop'},
+        '/cache',
+        '/dump/localhost/shop',
+        ('mysqldump',),
+        ('mysql',),
+        ('mysqlbinlog',),
+        None,
+        'test.yaml',
+    )
+
+
+def test_dump_incrementally_with_full_dump_due_makes_full_dump_and_records_position():
+    connection = mock_state(None)
+    flexmock(module).should_receive('get_full_dump_reason').and_return('no previous full dump')
+    flexmock(module).should_receive('list_binary_logs').never()
+    flexmock(module.state).should_receive('delete_value').with_args(
+        connection, module.POSITIONS_NAMESPACE, '/cache'
+    ).once()
+    flexmock(module.time).should_receive('time').and_return(1000)
+    flexmock(module).should_receive('dump_full').with_args(
+        ('mysqldump',), '/cache', None
+    ).and_return('binlog.000003')
+    flexmock(module).should_receive('fetch_binary_logs').never()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'full_dump_time': 1000, 'next_file': 'binlog.000003'},
+    ).once()
+    flexmock(module).should_receive('link_cache').with_args('/cache', '/dump/localhost/shop').once()
+
+    dump_incrementally()
+
+
+def test_dump_incrementally_without_full_dump_due_fetches_closed_binary_logs():
+    connection = mock_state({'full_dump_time': 1000, 'next_file': 'binlog.000004'})
+    flexmock(module).should_receive('get_full_dump_reason').and_return(None)
+    flexmock(module).should_receive('list_binary_logs').with_args(('mysql',), None).and_return(
+        ('binlog.000003', 'binlog.000004', 'binlog.000005', 'binlog.000006')
+    )
+    flexmock(module.state).should_receive('delete_value').never()
+    flexmock(module).should_receive('dump_full').never()
+    flexmock(module).should_receive('fetch_binary_logs').with_args(
+        ('mysqlbinlog',), ('binlog.000004', 'binlog.000005'), '/cache', None
+    ).once()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'full_dump_time': 1000, 'next_file': 'binlog.000006'},
+    ).once()
+    flexmock(module).should_receive('link_cache').with_args('/cache', '/dump/localhost/shop').once()
+
+    dump_incrementally()
+
+
+def test_dump_incrementally_without_closed_binary_logs_skips_fetch():
+    connection = mock_state({'full_dump_time': 1000, 'next_file': 'binlog.000004'})
+    flexmock(module).should_receive('get_full_dump_reason').and_return(None)
+    flexmock(module).should_receive('list_binary_logs').and_return(('binlog.000004',))
+    flexmock(module).should_receive('dump_full').never()
+    flexmock(module).should_receive('fetch_binary_logs').never()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'full_dump_time': 1000, 'next_file': 'binlog.000004'},
+    ).once()
+    flexmock(module).should_receive('link_cache').once()
+
+    dump_incrementally()
+
+
+def test_dump_incrementally_with_purged_binary_log_makes_full_dump():
+    connection = mock_state({'full_dump_time': 1000, 'next_file': 'binlog.000002'})
+    flexmock(module).should_receive('get_full_dump_reason').and_return(None)
+    flexmock(module).should_receive('list_binary_logs').and_return(
+        ('binlog.000003', 'binlog.000004')
+    )
+    flexmock(module.state).should_receive('delete_value').once()
+    flexmock(module.time).should_receive('time').and_return(2000)
+    flexmock(module).should_receive('dump_full').and_return('binlog.000005').once()
+    flexmock(module).should_receive('fetch_binary_logs').never()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'full_dump_time': 2000, 'next_file': 'binlog.000005'},
+    ).once()
+    flexmock(module).should_receive('link_cache').once()
+
+    dump_incrementally()
+
+
+def test_dump_incrementally_with_failed_full_dump_leaves_position_forgotten():
+    mock_state(None)
+    flexmock(module).should_receive('get_full_dump_reason').and_return('always')
+    flexmock(module.state).should_receive('delete_value').once()
+    flexmock(module).should_receive('dump_full').and_raise(
+        subprocess.CalledProcessError(1, 'mysqldump')
+    )
+    flexmock(module.state).should_receive('set_value').never()
+    flexmock(module).should_receive('link_cache').never()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        dump_incrementally()
+
+
+def test_restore_incrementally_restores_full_dump_and_replays_binary_logs_up_to_target_time():
+    replay_process = flexmock(stdout=flexmock())
+    flexmock(module).should_receive('read_binlog_coordinates').with_args(
+        '/dump/full.sql'
+    ).and_return(('binlog.000003', 157))
+    flexmock(module.os).should_receive('listdir').with_args('/dump/binlogs').and_return(
+        ['binlog.000004', 'binlog.000002', 'binlog.000003']
+    )
+    flexmock(module.mysql_split).should_receive('restore_file').with_args(
+        ('mysql', '--batch'), '/dump/full.sql', None, (b'prelude', b'epilogue')
+    ).once()
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'mysqlbinlog',
+            '--start-position',
+            '157',
+            '--stop-datetime',
+            '2024-01-31 12:00:00',
+            '--database',
+            'shop',
+            '/dump/binlogs/binlog.000003',
+            '/dump/binlogs/binlog.000004',
+        ),
+        output_file=subprocess.PIPE,
+        run_to_completion=False,
+    ).and_return(replay_process).once()
+    flexmock(module).should_receive('execute_command_with_processes').with_args(
+        ('mysql', '--batch'),
+        [replay_process],
+        output_log_level=logging.DEBUG,
+        input_file=replay_process.stdout,
+        extra_environment=None,
+    ).once()
+
+    module.restore_incrementally(
+        ('mysql', '--batch'),
+        ('mysqlbinlog',),
+        '/dump',
+        'shop',
+        '2024-01-31 12:00:00',
+        None,
+        'test.yaml',
+        (b'prelude', b'epilogue'),
+    )
+
+
+def test_restore_incrementally_for_all_databases_without_target_time_replays_everything():
+    replay_process = flexmock(stdout=flexmock())
+    flexmock(module).should_receive('read_binlog_coordinates').and_return(('binlog.000003', 4))
+    flexmock(module.os).should_receive('listdir').and_return(['binlog.000003'])
+    flexmock(module.mysql_split).should_receive('restore_file').with_args(
+        ('mysql', '--batch'), '/dump/full.sql', {'MYSQL_PWD': 'trustsome1'}, None
+    ).once()
+    flexmock(module).should_receive('execute_command').with_args(
+        ('mysqlbinlog', '--start-position', '4', '/dump/binlogs/binlog.000003'),
+        output_file=subprocess.PIPE,
+        run_to_completion=False,
+    ).and_return(replay_process).once()
+    flexmock(module).should_receive('execute_command_with_processes').once()
+
+    module.restore_incrementally(
+        ('mysql', '--batch'),
+        ('mysqlbinlog',),
+        '/dump',
+        'all',
+        None,
+        {'MYSQL_PWD': 'trustsome1'},
+        'test.yaml',
+    )
+
+
+def test_restore_incrementally_without_binary_logs_restores_only_full_dump():
+    flexmock(module).should_receive('read_binlog_coordinates').and_return(('binlog.000003', 4))
+    flexmock(module.os).should_receive('listdir').and_return([])
+    flexmock(module.mysql_split).should_receive('restore_file').once()
+    flexmock(module).should_receive('execute_command').never()
+    flexmock(module).should_receive('execute_command_with_processes').never()
+
+    module.restore_incrementally(
+        ('mysql', '--batch'),
+        ('mysqlbinlog',),
+        '/dump',
+        'shop',
+        '2024-01-31 12:00:00',
+        None,
+        'test.yaml',
+    )
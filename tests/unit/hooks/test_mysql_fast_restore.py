@@ -0,0 +1,91 @@
+import io
+import logging
+import subprocess
+
+from flexmock import flexmock
+
+from borgmatic.hooks import mysql_fast_restore as module
+
+
+def test_can_disable_binary_log_with_permitted_statement_returns_true():
+    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+        ('mysql', '--batch', '--execute', module.DISABLE_BINARY_LOG_STATEMENT),
+        capture_stderr=True,
+        extra_environment={'MYSQL_PWD': 'trustsome1'},
+    ).and_return('').once()
+
+    assert module.can_disable_binary_log(
+        ('mysql', '--batch'), {'MYSQL_PWD': 'trustsome1'}, 'test.yaml'
+    )
+
+
+def test_can_disable_binary_log_with_denied_statement_returns_false():
+    flexmock(module).should_receive('execute_command_and_capture_output').and_raise(
+        subprocess.CalledProcessError(1, 'mysql')
+    )
+
+    assert not module.can_disable_binary_log(('mysql', '--batch'), None, 'test.yaml')
+
+
+def test_make_session_statements_without_disable_binary_log_leaves_binary_log_alone():
+    (prelude, epilogue) = module.make_session_statements(disable_binary_log=False)
+
+    assert b'foreign_key_checks = 0' in prelude
+    assert b'sql_log_bin' not in prelude
+    assert epilogue.startswith(b'COMMIT;\n')
+    assert b'sql_log_bin' not in epilogue
+
+
+def test_make_session_statements_with_disable_binary_log_disables_and_restores_it():
+    (prelude, epilogue) = module.make_session_statements(disable_binary_log=True)
+
+    assert prelude.endswith(b'SET SESSION sql_log_bin = 0;\n')
+    assert epilogue.startswith(b'COMMIT;\n')
+    assert epilogue.endswith(b'SET SESSION sql_log_bin = @borgmatic_sql_log_bin;\n')
+
+
+def test_write_restore_input_wraps_input_in_session_statements():
+    input_pipe = flexmock(io.BytesIO(), close=lambda: None)
+
+    module.write_restore_input(
+        input_pipe, io.BytesIO(b'SELECT 1;\n'), (b'prelude\n', b'epilogue\n')
+    )
+
+    assert input_pipe.getvalue() == b'prelude\nSELECT 1;\nepilogue\n'
+
+
+def test_write_restore_input_with_broken_pipe_stops_quietly():
+    input_pipe = flexmock(io.BytesIO())
+    input_pipe.should_receive('write').and_raise(BrokenPipeError)
+
+    module.write_restore_input(
+        input_pipe, io.BytesIO(b'SELECT 1;\n'), (b'prelude\n', b'epilogue\n')
+    )
+
+
+def test_restore_input_yields_pipe_with_wrapped_input():
+    with module.restore_input(io.BytesIO(b'SELECT 1;\n'), (b'prelude\n', b'epilogue\n')) as pipe:
+        assert pipe.read() == b'prelude\nSELECT 1;\nepilogue\n'
+
+
+def test_restore_stream_feeds_wrapped_extract_output_to_restore_command():
+    extract_process = flexmock(stdout=io.BytesIO(b'SELECT 1;\n'))
+    restore_process = flexmock()
+    input_pipe = flexmock()
+    flexmock(module).should_receive('restore_input').with_args(
+        extract_process.stdout, (b'prelude', b'epilogue')
+    ).and_return(input_pipe)
+    flexmock(module).should_receive('execute_command').with_args(
+        ('mysql', '--batch'),
+        input_file=input_pipe,
+        extra_environment=None,
+        run_to_completion=False,
+    ).and_return(restore_process).once()
+    flexmock(module).should_receive('log_outputs').with_args(
+        (extract_process, restore_process),
+        (extract_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    ).once()
+
+    module.restore_stream(('mysql', '--batch'), extract_process, (b'prelude', b'epilogue'), None)
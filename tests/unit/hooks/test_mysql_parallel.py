@@ -0,0 +1,206 @@
+import io
+import logging
+import subprocess
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.hooks import mysql_parallel as module
+
+PREAMBLE = b'''-- MySQL dump 10.13  Distrib 8.0.35, for Linux (x86_64)
+--
+-- Host: localhost    Database: shop
+-- ------------------------------------------------------
+
+/*!40101 SET NAMES utf8mb4 */;
+
+--
+-- Current Database: `shop`
+'''
+
+BODY = b'''--
+
+CREATE DATABASE /*!32312 IF NOT EXISTS*/ `shop`;
+INSERT INTO `orders` VALUES (1),(2);
+'''
+
+
+def test_order_by_size_orders_largest_first():
+    assert module.order_by_size(('small', 'big', 'medium'), 'small\t1\nbig\t100\nmedium\t10\n') == (
+        'big',
+        'medium',
+        'small',
+    )
+
+
+def test_order_by_size_puts_unknown_sizes_last_in_given_order():
+    assert module.order_by_size(
+        ('empty', 'big', 'missing'), 'empty\tNULL\nbig\t100\nunrelated\t1000\n'
+    ) == ('big', 'empty', 'missing')
+
+
+def test_copy_dump_writes_dump_to_file_and_calls_snapshot_started_after_preamble(tmp_path):
+    dump_process = flexmock(stdout=io.BytesIO(PREAMBLE + BODY))
+    dump_path = tmp_path / 'shop'
+    written_when_started = []
+    flexmock(module).should_receive('log_outputs').with_args(
+        (dump_process,),
+        (dump_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    ).once()
+
+    def snapshot_started():
+        written_when_started.append(dump_process.stdout.tell())
+
+    module.copy_dump(dump_process, str(dump_path), snapshot_started)
+
+    assert dump_path.read_bytes() == PREAMBLE + BODY
+    assert written_when_started == [len(PREAMBLE)]
+
+
+def test_copy_dump_without_snapshot_started_function_writes_dump_to_file(tmp_path):
+    dump_process = flexmock(stdout=io.BytesIO(PREAMBLE + BODY))
+    dump_path = tmp_path / 'shop'
+    flexmock(module).should_receive('log_outputs').once()
+
+    module.copy_dump(dump_process, str(dump_path))
+
+    assert dump_path.read_bytes() == PREAMBLE + BODY
+
+
+def test_copy_dump_with_dump_error_raises(tmp_path):
+    dump_process = flexmock(stdout=io.BytesIO(b'mysqldump: Got error\n'))
+    flexmock(module).should_receive('log_outputs').and_raise(
+        subprocess.CalledProcessError(2, 'mysqldump')
+    )
+
+    with pytest.raises(subprocess.CalledProcessError):
+        module.copy_dump(dump_process, str(tmp_path / 'shop'), lambda: None)
+
+
+def test_hold_global_read_lock_returns_process_once_locked():
+    lock_process = flexmock(stdin=io.BytesIO(), stdout=io.BytesIO(b'locked\n'))
+    flexmock(module).should_receive('execute_command').with_args(
+        ('mysql', '--unbuffered'),
+        output_file=subprocess.PIPE,
+        input_file=subprocess.PIPE,
+        extra_environment={'MYSQL_PWD': 'trustsome1'},
+        run_to_completion=False,
+    ).and_return(lock_process).once()
+    flexmock(module).should_receive('release_global_read_lock').never()
+
+    assert (
+        module.hold_global_read_lock(
+            ('mysql', '--unbuffered'), {'MYSQL_PWD': 'trustsome1'}, 'test.yaml'
+        )
+        == lock_process
+    )
+    assert lock_process.stdin.getvalue() == module.LOCK_STATEMENTS
+
+
+def test_hold_global_read_lock_without_lock_confirmation_releases_and_raises():
+    lock_process = flexmock(stdin=io.BytesIO(), stdout=io.BytesIO(b''))
+    flexmock(module).should_receive('execute_command').and_return(lock_process)
+    flexmock(module).should_receive('release_global_read_lock').with_args(
+        lock_process, 'test.yaml'
+    ).once()
+
+    with pytest.raises(ValueError):
+        module.hold_global_read_lock(('mysql',), None, 'test.yaml')
+
+
+def test_release_global_read_lock_ends_session_and_logs_its_output():
+    lock_process = flexmock(stdin=io.BytesIO(), stdout=flexmock())
+    flexmock(module).should_receive('log_outputs').with_args(
+        (lock_process,),
+        (lock_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    ).once()
+
+    module.release_global_read_lock(lock_process, 'test.yaml')
+
+    assert lock_process.stdin.closed
+
+
+def test_run_dump_passes_event_setter_to_dump_function():
+    event = module.threading.Event()
+    setters = []
+
+    module.run_dump(lambda name, started: setters.append((name, started)), 'foo', event)
+
+    assert setters == [('foo', event.set)]
+    assert event.is_set()
+
+
+def test_run_dump_with_dump_error_still_sets_event():
+    event = module.threading.Event()
+
+    def dump_function(name, started):
+        raise OSError()
+
+    with pytest.raises(OSError):
+        module.run_dump(dump_function, 'foo', event)
+
+    assert event.is_set()
+
+
+def test_dump_in_parallel_dumps_each_database():
+    dumped = []
+
+    def dump_function(name, snapshot_started):
+        snapshot_started()
+        dumped.append(name)
+
+    flexmock(module).should_receive('release_global_read_lock').never()
+
+    module.dump_in_parallel(dump_function, ('foo', 'bar', 'baz'), 2, log_prefix='test.yaml')
+
+    assert sorted(dumped) == ['bar', 'baz', 'foo']
+
+
+def test_dump_in_parallel_with_lock_process_releases_lock_once_all_snapshots_started():
+    lock_process = flexmock()
+    events = []
+
+    def dump_function(name, snapshot_started):
+        events.append(f'{name} started')
+        snapshot_started()
+
+    flexmock(module).should_receive('release_global_read_lock').with_args(
+        lock_process, 'test.yaml'
+    ).replace_with(lambda *args: events.append('released')).once()
+
+    module.dump_in_parallel(dump_function, ('foo', 'bar'), 2, lock_process, 'test.yaml')
+
+    assert sorted(events[:2]) == ['bar started', 'foo started']
+    assert events[2] == 'released'
+
+
+def test_dump_in_parallel_with_dump_error_releases_lock_and_raises():
+    lock_process = flexmock()
+
+    def dump_function(name, snapshot_started):
+        if name == 'bar':
+            raise subprocess.CalledProcessError(2, 'mysqldump')
+
+        snapshot_started()
+
+    flexmock(module).should_receive('release_global_read_lock').with_args(
+        lock_process, 'test.yaml'
+    ).once()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        module.dump_in_parallel(dump_function, ('foo', 'bar'), 2, lock_process, 'test.yaml')
+
+
+def test_dump_in_parallel_with_interrupted_wait_still_releases_lock():
+    lock_process = flexmock()
+    flexmock(module.threading.Event).should_receive('wait').and_raise(KeyboardInterrupt)
+    flexmock(module).should_receive('release_global_read_lock').with_args(
+        lock_process, 'test.yaml'
+    ).once()
+
+    with pytest.raises(KeyboardInterrupt):
+        module.dump_in_parallel(lambda name, started: None, ('foo',), 1, lock_process, 'test.yaml')
@@ -0,0 +1,307 @@
+import io
+import logging
+import os
+import subprocess
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.hooks import mysql_split as module
+
+PRELUDE = b'''-- MySQL dump 10.13  Distrib 8.0.35, for Linux (x86_64)
+--
+-- Host: localhost    Database: shop
+-- ------------------------------------------------------
+-- Server version\t8.0.35
+
+/*!40101 SET NAMES utf8mb4 */;
+/*!40014 SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0 */;
+
+'''
+
+PRE_DATA = b'''--
+-- Current Database: `shop`
+--
+
+CREATE DATABASE /*!32312 IF NOT EXISTS*/ `shop`;
+
+USE `shop`;
+
+--
+-- Table structure for table `orders`
+--
+
+DROP TABLE IF EXISTS `orders`;
+CREATE TABLE `orders` (`id` int NOT NULL, PRIMARY KEY (`id`));
+
+'''
+
+ORDERS_DATA = b'''--
+-- Dumping data for table `orders`
+--
+
+LOCK TABLES `orders` WRITE;
+/*!40000 ALTER TABLE `orders` DISABLE KEYS */;
+INSERT INTO `orders` VALUES (1),(2);
+/*!40000 ALTER TABLE `orders` ENABLE KEYS */;
+UNLOCK TABLES;
+'''
+
+ORDERS_TRIGGER = b'''DELIMITER ;;
+/*!50003 CREATE*/ /*!50003 TRIGGER `count_order` AFTER INSERT ON `orders` FOR EACH ROW SET @count = @count + 1 */;;
+DELIMITER ;
+
+'''
+
+STRANGE_TABLE = b'''--
+-- Table structure for table `we``ird/name`
+--
+
+CREATE TABLE `we``ird/name` (`id` int NOT NULL);
+
+'''
+
+STRANGE_DATA = b'''--
+-- Dumping data for table `we``ird/name`
+--
+
+LOCK TABLES `we``ird/name` WRITE;
+INSERT INTO `we``ird/name` VALUES (3);
+UNLOCK TABLES;
+
+'''
+
+POST_DATA = b'''--
+-- Final view structure for view `order_ids`
+--
+
+CREATE VIEW `order_ids` AS SELECT `id` FROM `orders`;
+
+/*!40014 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS */;
+
+-- Dump completed
+'''
+
+SESSION_LINES = b'''/*!40101 SET NAMES utf8mb4 */;
+/*!40014 SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0 */;
+USE `shop`;
+'''
+
+
+def read_file(path):
+    with open(path, 'rb') as split_file:
+        return split_file.read()
+
+
+def test_make_table_filename_unquotes_and_percent_encodes_table_name():
+    assert (
+        module.make_table_filename('/dump', b'-- Dumping data for table `we``ird/name`\n')
+        == '/dump/tables/we%60ird%2Fname.sql'
+    )
+
+
+def test_split_dump_writes_schema_tables_and_post_data_to_separate_files(tmp_path):
+    dump_process = flexmock(
+        stdout=io.BytesIO(
+            PRELUDE
+            + PRE_DATA
+            + ORDERS_DATA
+            + ORDERS_TRIGGER
+            + STRANGE_TABLE
+            + STRANGE_DATA
+            + POST_DATA
+        )
+    )
+    flexmock(module).should_receive('log_outputs').with_args(
+        (dump_process,),
+        (dump_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    ).once()
+    dump_directory = str(tmp_path / 'shop')
+
+    module.split_dump(dump_process, dump_directory)
+
+    assert read_file(os.path.join(dump_directory, 'pre-data.sql')) == (
+        PRELUDE + PRE_DATA + STRANGE_TABLE
+    )
+    assert sorted(os.listdir(os.path.join(dump_directory, 'tables'))) == [
+        'orders.sql',
+        'we%60ird%2Fname.sql',
+    ]
+    assert (
+        read_file(os.path.join(dump_directory, 'tables', 'orders.sql'))
+        == SESSION_LINES + ORDERS_DATA
+    )
+    assert (
+        read_file(os.path.join(dump_directory, 'tables', 'we%60ird%2Fname.sql'))
+        == SESSION_LINES + STRANGE_DATA
+    )
+    assert read_file(os.path.join(dump_directory, 'post-data.sql')) == (
+        SESSION_LINES + ORDERS_TRIGGER + POST_DATA
+    )
+
+
+def test_split_dump_with_data_as_last_section_puts_footer_in_post_data(tmp_path):
+    footer = b'/*!40014 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS */;\n'
+    dump_process = flexmock(stdout=io.BytesIO(PRELUDE + PRE_DATA + ORDERS_DATA + b'\n' + footer))
+    flexmock(module).should_receive('log_outputs')
+    dump_directory = str(tmp_path / 'shop')
+
+    module.split_dump(dump_process, dump_directory)
+
+    assert (
+        read_file(os.path.join(dump_directory, 'tables', 'orders.sql'))
+        == SESSION_LINES + ORDERS_DATA + b'\n'
+    )
+    assert read_file(os.path.join(dump_directory, 'post-data.sql')) == SESSION_LINES + footer
+
+
+def test_split_dump_with_trailing_section_marker_keeps_it(tmp_path):
+    dump_process = flexmock(stdout=io.BytesIO(PRELUDE + PRE_DATA + b'--\n'))
+    flexmock(module).should_receive('log_outputs')
+    dump_directory = str(tmp_path / 'shop')
+
+    module.split_dump(dump_process, dump_directory)
+
+    assert read_file(os.path.join(dump_directory, 'pre-data.sql')) == PRELUDE + PRE_DATA + b'--\n'
+
+
+def test_split_dump_without_tables_writes_empty_post_data(tmp_path):
+    dump_process = flexmock(stdout=io.BytesIO(PRELUDE + PRE_DATA))
+    flexmock(module).should_receive('log_outputs')
+    dump_directory = str(tmp_path / 'shop')
+
+    module.split_dump(dump_process, dump_directory)
+
+    assert read_file(os.path.join(dump_directory, 'pre-data.sql')) == PRELUDE + PRE_DATA
+    assert os.listdir(os.path.join(dump_directory, 'tables')) == []
+    assert read_file(os.path.join(dump_directory, 'post-data.sql')) == SESSION_LINES
+
+
+def test_split_dump_with_routines_section_after_data_puts_it_in_post_data(tmp_path):
+    routines = (
+        b'--\n-- Dumping routines for database \'shop\'\n--\n\nCREATE PROCEDURE p() SELECT 1;\n'
+    )
+    dump_process = flexmock(stdout=io.BytesIO(PRELUDE + PRE_DATA + ORDERS_DATA + routines))
+    flexmock(module).should_receive('log_outputs')
+    dump_directory = str(tmp_path / 'shop')
+
+    module.split_dump(dump_process, dump_directory)
+
+    assert (
+        read_file(os.path.join(dump_directory, 'tables', 'orders.sql'))
+        == SESSION_LINES + ORDERS_DATA
+    )
+    assert read_file(os.path.join(dump_directory, 'post-data.sql')) == SESSION_LINES + routines
+
+
+def test_split_dump_with_routines_section_before_data_puts_it_in_post_data(tmp_path):
+    routines = b'--\n-- Dumping events for database \'shop\'\n--\n\n'
+    dump_process = flexmock(stdout=io.BytesIO(PRELUDE + PRE_DATA + routines))
+    flexmock(module).should_receive('log_outputs')
+    dump_directory = str(tmp_path / 'shop')
+
+    module.split_dump(dump_process, dump_directory)
+
+    assert read_file(os.path.join(dump_directory, 'post-data.sql')) == SESSION_LINES + routines
+
+
+def test_split_dump_with_dump_error_raises(tmp_path):
+    dump_process = flexmock(stdout=io.BytesIO(PRELUDE + PRE_DATA + ORDERS_DATA))
+    flexmock(module).should_receive('log_outputs').and_raise(
+        subprocess.CalledProcessError(2, 'mysqldump')
+    )
+    dump_directory = str(tmp_path / 'shop')
+
+    with pytest.raises(subprocess.CalledProcessError):
+        module.split_dump(dump_process, dump_directory)
+
+
+def test_restore_file_runs_restore_command_with_file_as_input(tmp_path):
+    path = tmp_path / 'pre-data.sql'
+    path.write_bytes(b'SELECT 1;\n')
+    flexmock(module).should_receive('execute_command').with_args(
+        ('mysql', '--batch'),
+        output_log_level=logging.DEBUG,
+        input_file=object,
+        extra_environment={'MYSQL_PWD': 'trustsome1'},
+    ).once()
+
+    module.restore_file(('mysql', '--batch'), str(path), {'MYSQL_PWD': 'trustsome1'})
+
+
+def test_restore_split_dump_restores_pre_data_then_tables_then_post_data():
+    flexmock(module.os).should_receive('listdir').with_args('/dump/tables').and_return(
+        ['b.sql', 'a.sql']
+    )
+    flexmock(module).should_receive('restore_file').with_args(
+        ('mysql',), '/dump/pre-data.sql', None, None
+    ).once().ordered()
+    flexmock(module).should_receive('restore_file').with_args(
+        ('mysql',), '/dump/tables/a.sql', None, None
+    ).once()
+    flexmock(module).should_receive('restore_file').with_args(
+        ('mysql',), '/dump/tables/b.sql', None, None
+    ).once()
+    flexmock(module).should_receive('restore_file').with_args(
+        ('mysql',), '/dump/post-data.sql', None, None
+    ).once().ordered()
+
+    module.restore_split_dump(('mysql',), '/dump', 2, None, 'test.yaml')
+
+
+def test_restore_split_dump_with_table_error_raises_without_restoring_post_data():
+    flexmock(module.os).should_receive('listdir').and_return(['a.sql'])
+    flexmock(module).should_receive('restore_file').with_args(
+        ('mysql',), '/dump/pre-data.sql', None, None
+    ).once()
+    flexmock(module).should_receive('restore_file').with_args(
+        ('mysql',), '/dump/tables/a.sql', None, None
+    ).and_raise(OSError)
+    flexmock(module).should_receive('restore_file').with_args(
+        ('mysql',), '/dump/post-data.sql', None, None
+    ).never()
+
+    with pytest.raises(OSError):
+        module.restore_split_dump(('mysql',), '/dump', 2, None, 'test.yaml')
+
+
+def test_split_dump_calls_snapshot_started_once_past_header(tmp_path):
+    dump_process = flexmock(stdout=io.BytesIO(PRELUDE + PRE_DATA + ORDERS_DATA + POST_DATA))
+    flexmock(module).should_receive('log_outputs')
+    calls = []
+
+    module.split_dump(
+        dump_process, str(tmp_path / 'shop'), lambda: calls.append(dump_process.stdout.tell())
+    )
+
+    assert calls == [len(PRELUDE) + len(b'--\n-- Current Database: `shop`\n')]
+
+
+def test_restore_file_with_session_statements_wraps_file_in_them(tmp_path):
+    path = tmp_path / 'pre-data.sql'
+    path.write_bytes(b'SELECT 1;\n')
+    input_pipe = flexmock()
+    flexmock(module.mysql_fast_restore).should_receive('restore_input').with_args(
+        object, (b'prelude', b'epilogue')
+    ).and_return(input_pipe).once()
+    flexmock(module).should_receive('execute_command').with_args(
+        ('mysql', '--batch'),
+        output_log_level=logging.DEBUG,
+        input_file=input_pipe,
+        extra_environment=None,
+    ).once()
+
+    module.restore_file(('mysql', '--batch'), str(path), None, (b'prelude', b'epilogue'))
+
+
+def test_restore_split_dump_passes_session_statements_to_each_file():
+    flexmock(module.os).should_receive('listdir').and_return(['a.sql'])
+
+    for path in ('/dump/pre-data.sql', '/dump/tables/a.sql', '/dump/post-data.sql'):
+        flexmock(module).should_receive('restore_file').with_args(
+            ('mysql',), path, None, (b'prelude', b'epilogue')
+        ).once()
+
+    module.restore_split_dump(('mysql',), '/dump', 2, None, 'test.yaml', (b'prelude', b'epilogue'))
@@ -36,10 +36,13 @@ def return_default_message_headers(state=Enum):
 
 def test_ping_monitor_minimal_config_hits_hosted_ntfy_on_fail():
     hook_config = {'topic': topic}
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{default_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
         auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True)).once()
 
     module.ping_monitor(
@@ -58,10 +61,13 @@ def test_ping_monitor_with_auth_hits_hosted_ntfy_on_fail():
         'username': 'testuser',
         'password': 'fakepassword',
     }
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{default_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
         auth=module.requests.auth.HTTPBasicAuth('testuser', 'fakepassword'),
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True)).once()
 
     module.ping_monitor(
@@ -76,10 +82,13 @@ def test_ping_monitor_with_auth_hits_hosted_ntfy_on_fail():
 
 def test_ping_monitor_auth_with_no_username_warning():
     hook_config = {'topic': topic, 'password': 'fakepassword'}
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{default_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
         auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True)).once()
     flexmock(module.logger).should_receive('warning').once()
 
@@ -95,10 +104,13 @@ def test_ping_monitor_auth_with_no_username_warning():
 
 def test_ping_monitor_auth_with_no_password_warning():
     hook_config = {'topic': topic, 'username': 'testuser'}
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{default_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
         auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True)).once()
     flexmock(module.logger).should_receive('warning').once()
 
@@ -114,7 +126,7 @@ def test_ping_monitor_auth_with_no_password_warning():
 
 def test_ping_monitor_minimal_config_does_not_hit_hosted_ntfy_on_start():
     hook_config = {'topic': topic}
-    flexmock(module.requests).should_receive('post').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         hook_config,
@@ -128,7 +140,7 @@ def test_ping_monitor_minimal_config_does_not_hit_hosted_ntfy_on_start():
 
 def test_ping_monitor_minimal_config_does_not_hit_hosted_ntfy_on_finish():
     hook_config = {'topic': topic}
-    flexmock(module.requests).should_receive('post').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         hook_config,
@@ -142,10 +154,13 @@ def test_ping_monitor_minimal_config_does_not_hit_hosted_ntfy_on_finish():
 
 def test_ping_monitor_minimal_config_hits_selfhosted_ntfy_on_fail():
     hook_config = {'topic': topic, 'server': custom_base_url}
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{custom_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
         auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True)).once()
 
     module.ping_monitor(
@@ -160,7 +175,7 @@ def test_ping_monitor_minimal_config_hits_selfhosted_ntfy_on_fail():
 
 def test_ping_monitor_minimal_config_does_not_hit_hosted_ntfy_on_fail_dry_run():
     hook_config = {'topic': topic}
-    flexmock(module.requests).should_receive('post').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         hook_config,
@@ -174,8 +189,13 @@ def test_ping_monitor_minimal_config_does_not_hit_hosted_ntfy_on_fail_dry_run():
 
 def test_ping_monitor_custom_message_hits_hosted_ntfy_on_fail():
     hook_config = {'topic': topic, 'fail': custom_message_config}
-    flexmock(module.requests).should_receive('post').with_args(
-        f'{default_base_url}/{topic}', headers=custom_message_headers, auth=None
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
+        f'{default_base_url}/{topic}',
+        headers=custom_message_headers,
+        auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True)).once()
 
     module.ping_monitor(
@@ -190,10 +210,13 @@ def test_ping_monitor_custom_message_hits_hosted_ntfy_on_fail():
 
 def test_ping_monitor_custom_state_hits_hosted_ntfy_on_start():
     hook_config = {'topic': topic, 'states': ['start', 'fail']}
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{default_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.START),
         auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(flexmock(ok=True)).once()
 
     module.ping_monitor(
@@ -208,12 +231,16 @@ def test_ping_monitor_custom_state_hits_hosted_ntfy_on_start():
 
 def test_ping_monitor_with_connection_error_logs_warning():
     hook_config = {'topic': topic}
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{default_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
         auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_raise(module.requests.exceptions.ConnectionError)
     flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
 
     module.ping_monitor(
         hook_config,
@@ -231,12 +258,72 @@ def test_ping_monitor_with_other_error_logs_warning():
     response.should_receive('raise_for_status').and_raise(
         module.requests.exceptions.RequestException
     )
-    flexmock(module.requests).should_receive('post').with_args(
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
         f'{default_base_url}/{topic}',
         headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
         auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
     ).and_return(response)
     flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
+
+    module.ping_monitor(
+        hook_config,
+        {},
+        'config.yaml',
+        borgmatic.hooks.monitor.State.FAIL,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_initialize_monitor_with_send_logs_adds_log_buffering_handler():
+    flexmock(module.monitor).should_receive('add_log_buffering_handler').with_args(
+        'ntfy', module.LOGS_LIMIT_BYTES, 1
+    ).once()
+
+    module.initialize_monitor(
+        {'topic': topic, 'send_logs': True},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_initialize_monitor_without_send_logs_does_not_add_log_buffering_handler():
+    flexmock(module.monitor).should_receive('add_log_buffering_handler').never()
+
+    module.initialize_monitor(
+        {'topic': topic},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_ping_monitor_with_send_logs_attaches_compressed_logs_on_fail():
+    hook_config = {'topic': topic, 'send_logs': True}
+    flexmock(module.monitor).should_receive('format_buffered_logs_for_payload').with_args(
+        module.LOGS_LIMIT_BYTES
+    ).and_return('Backing up\n')
+    flexmock(module.monitor).should_receive('compress_payload').with_args(
+        'Backing up\n'
+    ).and_return(b'compressed')
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
+        f'{default_base_url}/{topic}',
+        headers=dict(
+            return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
+            **{'X-Filename': module.LOGS_FILENAME},
+        ),
+        auth=None,
+        data=b'compressed',
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
+    ).and_return(flexmock(ok=True)).once()
 
     module.ping_monitor(
         hook_config,
@@ -246,3 +333,58 @@ def test_ping_monitor_with_other_error_logs_warning():
         monitoring_log_level=1,
         dry_run=False,
     )
+
+
+def test_ping_monitor_with_send_logs_and_empty_logs_does_not_attach_anything():
+    hook_config = {'topic': topic, 'send_logs': True}
+    flexmock(module.monitor).should_receive('format_buffered_logs_for_payload').and_return('')
+    flexmock(module.monitor).should_receive('compress_payload').never()
+    flexmock(module.monitor.get_session()).should_receive('request').with_args(
+        'POST',
+        f'{default_base_url}/{topic}',
+        headers=return_default_message_headers(borgmatic.hooks.monitor.State.FAIL),
+        auth=None,
+        data=None,
+        timeout=module.monitor.DEFAULT_TIMEOUT_SECONDS,
+    ).and_return(flexmock(ok=True)).once()
+
+    module.ping_monitor(
+        hook_config,
+        {},
+        'config.yaml',
+        borgmatic.hooks.monitor.State.FAIL,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_destroy_monitor_removes_log_buffering_handler():
+    flexmock(module.monitor).should_receive('remove_log_buffering_handler').with_args('ntfy').once()
+
+    module.destroy_monitor(
+        {'topic': topic},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_make_request_builds_notification_with_auth_from_config_and_logs_from_details():
+    flexmock(module.monitor).should_receive('compress_payload').with_args('logs').and_return(
+        b'compressed'
+    )
+
+    (method, url, request_kwargs) = module.make_request(
+        {'topic': topic, 'username': 'testuser', 'password': 'fakepassword'},
+        {},
+        'config.yaml',
+        borgmatic.hooks.monitor.State.FAIL,
+        {'logs': 'logs'},
+    )
+
+    assert method == 'POST'
+    assert url == f'{default_base_url}/{topic}'
+    assert request_kwargs['auth'] == module.requests.auth.HTTPBasicAuth('testuser', 'fakepassword')
+    assert request_kwargs['data'] == b'compressed'
+    assert request_kwargs['headers']['X-Filename'] == module.LOGS_FILENAME
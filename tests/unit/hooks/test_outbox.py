@@ -0,0 +1,248 @@
+import sqlite3
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.hooks import outbox as module
+
+
+def test_get_max_age_seconds_uses_configured_max_age():
+    assert module.get_max_age_seconds({'monitor_outbox_max_age': '2 hours'}) == 7200
+
+
+def test_get_max_age_seconds_without_configured_max_age_uses_default():
+    assert module.get_max_age_seconds({}) == 86400
+
+
+def test_get_max_age_seconds_with_zero_max_age_returns_zero():
+    assert module.get_max_age_seconds({'monitor_outbox_max_age': '0 seconds'}) == 0
+
+
+def test_get_max_age_seconds_with_always_max_age_returns_zero():
+    assert module.get_max_age_seconds({'monitor_outbox_max_age': 'always'}) == 0
+
+
+def test_get_max_age_seconds_with_invalid_max_age_raises():
+    with pytest.raises(ValueError):
+        module.get_max_age_seconds({'monitor_outbox_max_age': 'eventually'})
+
+
+@pytest.mark.parametrize(
+    'response,expected_result',
+    (
+        (None, True),
+        (flexmock(status_code=503), True),
+        (flexmock(status_code=429), True),
+        (flexmock(status_code=404), False),
+        (flexmock(status_code=400), False),
+    ),
+)
+def test_is_transient_error_checks_response_status(response, expected_result):
+    error = module.requests.exceptions.RequestException(response=response)
+
+    assert module.is_transient_error(error) is expected_result
+
+
+def test_save_undelivered_request_saves_only_details_of_request():
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.time).should_receive('time').and_return(9000)
+    connection.should_receive('execute').with_args(
+        str,
+        ('healthchecks', 'test.yaml', 'fail', 9000, '{"payload": "logs"}'),
+    ).once()
+
+    module.save_undelivered_request(
+        module.requests.exceptions.ConnectionError(),
+        {},
+        'test.yaml',
+        'healthchecks',
+        module.monitor.State.FAIL,
+        {'payload': 'logs'},
+    )
+
+
+def test_save_undelivered_request_skips_start_state():
+    flexmock(module.state).should_receive('open_state_database').never()
+
+    module.save_undelivered_request(
+        module.requests.exceptions.ConnectionError(),
+        {},
+        'test.yaml',
+        'healthchecks',
+        module.monitor.State.START,
+        {'payload': 'logs'},
+    )
+
+
+def test_save_undelivered_request_skips_request_rejected_by_monitoring_service():
+    flexmock(module.state).should_receive('open_state_database').never()
+
+    module.save_undelivered_request(
+        module.requests.exceptions.HTTPError(response=flexmock(status_code=404)),
+        {},
+        'test.yaml',
+        'healthchecks',
+        module.monitor.State.FAIL,
+        {'payload': 'logs'},
+    )
+
+
+def test_save_undelivered_request_with_disabled_outbox_skips_request():
+    flexmock(module.state).should_receive('open_state_database').never()
+
+    module.save_undelivered_request(
+        module.requests.exceptions.ConnectionError(),
+        {'monitor_outbox_max_age': '0 seconds'},
+        'test.yaml',
+        'healthchecks',
+        module.monitor.State.FAIL,
+        {'payload': 'logs'},
+    )
+
+
+def test_save_undelivered_request_with_database_error_logs_warning():
+    flexmock(module.state).should_receive('open_state_database').and_raise(sqlite3.OperationalError)
+    flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.logger).should_receive('info').never()
+
+    module.save_undelivered_request(
+        module.requests.exceptions.ConnectionError(),
+        {},
+        'test.yaml',
+        'healthchecks',
+        module.monitor.State.FAIL,
+        {'payload': 'logs'},
+    )
+
+
+CONFIG = {'healthchecks': {'ping_url': 'https://example.com'}, 'ntfy': {'topic': 'topic'}}
+
+
+def mock_outbox(*undelivered_requests):
+    flexmock(module).should_receive('read_undelivered_requests').and_return(
+        list(undelivered_requests)
+    )
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hook').replace_with(
+        lambda function_name, config, config_filename, hook_name, state, details: (
+            'POST',
+            details['url'],
+            {'timeout': 10},
+        )
+    )
+    flexmock(module.time).should_receive('time').and_return(10000)
+
+
+def test_flush_undelivered_requests_delivers_requests_and_deletes_them():
+    mock_outbox(
+        ('healthchecks', 'fail', 9000, '{"url": "https://example.com/fail"}'),
+        ('ntfy', 'finish', 9500, '{"url": "https://ntfy.sh/topic"}'),
+    )
+    session = flexmock()
+    session.should_receive('request').with_args(
+        'POST', 'https://example.com/fail', timeout=10
+    ).and_return(flexmock(ok=True)).once()
+    session.should_receive('request').with_args(
+        'POST', 'https://ntfy.sh/topic', timeout=10
+    ).and_return(flexmock(ok=True)).once()
+    flexmock(module.monitor).should_receive('get_session').and_return(session)
+    flexmock(module).should_receive('delete_undelivered_requests').with_args(
+        CONFIG, 'test.yaml', [('healthchecks', 'fail', 9000), ('ntfy', 'finish', 9500)]
+    ).once()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=False) == (2, 0, 0)
+
+
+def test_flush_undelivered_requests_discards_requests_older_than_max_age():
+    mock_outbox(('healthchecks', 'fail', 1000, '{"url": "https://example.com/fail"}'))
+    flexmock(module.monitor).should_receive('get_session').never()
+    config = dict(CONFIG, monitor_outbox_max_age='1 hour')
+    flexmock(module).should_receive('delete_undelivered_requests').with_args(
+        config, 'test.yaml', [('healthchecks', 'fail', 1000)]
+    ).once()
+
+    assert module.flush_undelivered_requests(config, 'test.yaml', dry_run=False) == (0, 1, 0)
+
+
+def test_flush_undelivered_requests_discards_requests_for_hooks_no_longer_configured():
+    mock_outbox(('cronhub', 'fail', 9000, '{}'))
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hook').never()
+    flexmock(module.monitor).should_receive('get_session').never()
+    flexmock(module).should_receive('delete_undelivered_requests').with_args(
+        CONFIG, 'test.yaml', [('cronhub', 'fail', 9000)]
+    ).once()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=False) == (0, 1, 0)
+
+
+def test_flush_undelivered_requests_keeps_later_requests_for_hook_after_transient_error():
+    mock_outbox(
+        ('healthchecks', 'fail', 9000, '{"url": "https://example.com/fail"}'),
+        ('ntfy', 'fail', 9100, '{"url": "https://ntfy.sh/topic"}'),
+        ('healthchecks', 'finish', 9500, '{"url": "https://example.com"}'),
+    )
+    session = flexmock()
+    session.should_receive('request').with_args(
+        'POST', 'https://example.com/fail', timeout=10
+    ).and_raise(module.requests.exceptions.ConnectionError).once()
+    session.should_receive('request').with_args(
+        'POST', 'https://ntfy.sh/topic', timeout=10
+    ).and_return(flexmock(ok=True)).once()
+    session.should_receive('request').with_args('POST', 'https://example.com', timeout=10).never()
+    flexmock(module.monitor).should_receive('get_session').and_return(session)
+    flexmock(module).should_receive('delete_undelivered_requests').with_args(
+        CONFIG, 'test.yaml', [('ntfy', 'fail', 9100)]
+    ).once()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=False) == (1, 0, 2)
+
+
+def test_flush_undelivered_requests_discards_request_rejected_by_monitoring_service():
+    mock_outbox(('healthchecks', 'fail', 9000, '{"url": "https://example.com/fail"}'))
+    response = flexmock(ok=False)
+    response.should_receive('raise_for_status').and_raise(
+        module.requests.exceptions.HTTPError(response=flexmock(status_code=404))
+    )
+    flexmock(module.monitor).should_receive('get_session').and_return(
+        flexmock(request=lambda *args, **kwargs: response)
+    )
+    flexmock(module).should_receive('delete_undelivered_requests').with_args(
+        CONFIG, 'test.yaml', [('healthchecks', 'fail', 9000)]
+    ).once()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=False) == (0, 1, 0)
+
+
+def test_flush_undelivered_requests_with_dry_run_does_not_deliver_or_delete_anything():
+    mock_outbox(('healthchecks', 'fail', 9000, '{"url": "https://example.com/fail"}'))
+    flexmock(module.monitor).should_receive('get_session').never()
+    flexmock(module).should_receive('delete_undelivered_requests').never()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=True) == (0, 0, 1)
+
+
+def test_flush_undelivered_requests_with_empty_outbox_does_not_delete_anything():
+    mock_outbox()
+    flexmock(module).should_receive('delete_undelivered_requests').never()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=False) == (0, 0, 0)
+
+
+def test_flush_undelivered_requests_with_read_error_logs_warning():
+    flexmock(module).should_receive('read_undelivered_requests').and_raise(OSError)
+    flexmock(module.logger).should_receive('warning').once()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=False) == (0, 0, 0)
+
+
+def test_flush_undelivered_requests_with_delete_error_logs_warning():
+    mock_outbox(('healthchecks', 'fail', 9000, '{"url": "https://example.com/fail"}'))
+    flexmock(module.monitor).should_receive('get_session').and_return(
+        flexmock(request=lambda *args, **kwargs: flexmock(ok=True))
+    )
+    flexmock(module).should_receive('delete_undelivered_requests').and_raise(
+        sqlite3.OperationalError
+    )
+    flexmock(module.logger).should_receive('warning').once()
+
+    assert module.flush_undelivered_requests(CONFIG, 'test.yaml', dry_run=False) == (1, 0, 0)
@@ -1,10 +1,12 @@
+import json
+
 from flexmock import flexmock
 
 from borgmatic.hooks import pagerduty as module
 
 
 def test_ping_monitor_ignores_start_state():
-    flexmock(module.requests).should_receive('post').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         {'integration_key': 'abc123'},
@@ -17,7 +19,7 @@ def test_ping_monitor_ignores_start_state():
 
 
 def test_ping_monitor_ignores_finish_state():
-    flexmock(module.requests).should_receive('post').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         {'integration_key': 'abc123'},
@@ -30,7 +32,7 @@ def test_ping_monitor_ignores_finish_state():
 
 
 def test_ping_monitor_calls_api_for_fail_state():
-    flexmock(module.requests).should_receive('post').and_return(flexmock(ok=True))
+    flexmock(module.monitor.get_session()).should_receive('request').and_return(flexmock(ok=True))
 
     module.ping_monitor(
         {'integration_key': 'abc123'},
@@ -43,7 +45,7 @@ def test_ping_monitor_calls_api_for_fail_state():
 
 
 def test_ping_monitor_dry_run_does_not_call_api():
-    flexmock(module.requests).should_receive('post').never()
+    flexmock(module.monitor.get_session()).should_receive('request').never()
 
     module.ping_monitor(
         {'integration_key': 'abc123'},
@@ -56,10 +58,11 @@ def test_ping_monitor_dry_run_does_not_call_api():
 
 
 def test_ping_monitor_with_connection_error_logs_warning():
-    flexmock(module.requests).should_receive('post').and_raise(
+    flexmock(module.monitor.get_session()).should_receive('request').and_raise(
         module.requests.exceptions.ConnectionError
     )
     flexmock(module.logger).should_receive('warning').once()
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
 
     module.ping_monitor(
         {'integration_key': 'abc123'},
@@ -76,8 +79,75 @@ def test_ping_monitor_with_other_error_logs_warning():
     response.should_receive('raise_for_status').and_raise(
         module.requests.exceptions.RequestException
     )
-    flexmock(module.requests).should_receive('post').and_return(response)
+    flexmock(module.monitor.get_session()).should_receive('request').and_return(response)
     flexmock(module.logger).should_receive('warning')
+    flexmock(module.outbox).should_receive('save_undelivered_request').once()
+
+    module.ping_monitor(
+        {'integration_key': 'abc123'},
+        {},
+        'config.yaml',
+        module.monitor.State.FAIL,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_initialize_monitor_with_send_logs_adds_log_buffering_handler():
+    flexmock(module.monitor).should_receive('add_log_buffering_handler').with_args(
+        'pagerduty', module.LOGS_LIMIT_BYTES, 1
+    ).once()
+
+    module.initialize_monitor(
+        {'integration_key': 'abc123', 'send_logs': True},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_initialize_monitor_without_send_logs_does_not_add_log_buffering_handler():
+    flexmock(module.monitor).should_receive('add_log_buffering_handler').never()
+
+    module.initialize_monitor(
+        {'integration_key': 'abc123'},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_ping_monitor_with_send_logs_includes_logs_in_event():
+    flexmock(module.monitor).should_receive('format_buffered_logs_for_payload').with_args(
+        module.LOGS_LIMIT_BYTES
+    ).and_return('Backing up\n')
+    flexmock(module.monitor.get_session()).should_receive('request').replace_with(
+        lambda method, url, data, timeout: flexmock(
+            ok=json.loads(data)['payload']['custom_details']['logs'] == 'Backing up\n'
+        )
+    ).once()
+    flexmock(module.logger).should_receive('warning').never()
+
+    module.ping_monitor(
+        {'integration_key': 'abc123', 'send_logs': True},
+        {},
+        'config.yaml',
+        module.monitor.State.FAIL,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_ping_monitor_without_send_logs_omits_logs_from_event():
+    flexmock(module.monitor).should_receive('format_buffered_logs_for_payload').never()
+    flexmock(module.monitor.get_session()).should_receive('request').replace_with(
+        lambda method, url, data, timeout: flexmock(
+            ok='logs' not in json.loads(data)['payload']['custom_details']
+        )
+    ).once()
+    flexmock(module.logger).should_receive('warning').never()
 
     module.ping_monitor(
         {'integration_key': 'abc123'},
@@ -87,3 +157,34 @@ def test_ping_monitor_with_other_error_logs_warning():
         monitoring_log_level=1,
         dry_run=False,
     )
+
+
+def test_destroy_monitor_removes_log_buffering_handler():
+    flexmock(module.monitor).should_receive('remove_log_buffering_handler').with_args(
+        'pagerduty'
+    ).once()
+
+    module.destroy_monitor(
+        {'integration_key': 'abc123'},
+        {},
+        'config.yaml',
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_make_request_builds_event_with_integration_key_from_config_and_details():
+    (method, url, request_kwargs) = module.make_request(
+        {'integration_key': 'abc123'},
+        {},
+        'config.yaml',
+        module.monitor.State.FAIL,
+        {'timestamp': '2024-01-31T12:00:00+00:00', 'logs': 'logs'},
+    )
+    event = json.loads(request_kwargs['data'])
+
+    assert method == 'POST'
+    assert url == module.EVENTS_API_URL
+    assert event['routing_key'] == 'abc123'
+    assert event['payload']['timestamp'] == '2024-01-31T12:00:00+00:00'
+    assert event['payload']['custom_details']['logs'] == 'logs'
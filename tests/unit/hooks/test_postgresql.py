@@ -74,6 +74,15 @@ def test_database_names_to_dump_passes_through_all_without_format():
     )
 
 
+def test_database_names_to_dump_passes_through_all_with_physical_format():
+    database = {'name': 'all', 'format': 'physical'}
+    flexmock(module).should_receive('execute_command_and_capture_output').never()
+
+    assert module.database_names_to_dump(database, flexmock(), flexmock(), dry_run=False) == (
+        'all',
+    )
+
+
 def test_database_names_to_dump_with_all_and_format_and_dry_run_bails():
     database = {'name': 'all', 'format': 'custom'}
     flexmock(module).should_receive('execute_command_and_capture_output').never()
@@ -376,6 +385,205 @@ def test_dump_databases_runs_pg_dump_with_directory_format():
     assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
 
 
+def test_make_physical_dump_command_streams_pg_basebackup_tar_with_wal():
+    assert module.make_physical_dump_command(
+        {
+            'name': 'all',
+            'format': 'physical',
+            'hostname': 'database.example.org',
+            'port': 5433,
+            'username': 'replicator',
+            'options': '--checkpoint=fast',
+            'pg_basebackup_command': 'docker exec mycontainer pg_basebackup',
+        },
+        'databases/localhost/all',
+    ) == (
+        'docker exec mycontainer pg_basebackup',
+        '--no-password',
+        '--pgdata',
+        '-',
+        '--format',
+        'tar',
+        '--wal-method',
+        'fetch',
+        '--host',
+        'database.example.org',
+        '--port',
+        '5433',
+        '--username',
+        'replicator',
+        '--checkpoint=fast',
+        '>',
+        'databases/localhost/all',
+    )
+
+
+def test_dump_databases_with_physical_format_streams_pg_basebackup_to_named_pipe():
+    databases = [{'name': 'all', 'format': 'physical'}]
+    process = flexmock()
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('all',))
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        'databases/localhost/all'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module).should_receive('make_physical_dump_command').with_args(
+        databases[0], 'databases/localhost/all'
+    ).and_return(('pg_basebackup',))
+    flexmock(module.dump).should_receive('create_named_pipe_for_dump').once()
+    flexmock(module).should_receive('execute_command').with_args(
+        ('pg_basebackup',),
+        shell=True,
+        extra_environment={'PGSSLMODE': 'disable'},
+        run_to_completion=False,
+    ).and_return(process).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == [process]
+
+
+def test_dump_databases_with_physical_format_and_named_database_errors():
+    databases = [{'name': 'foo', 'format': 'physical'}]
+    flexmock(module).should_receive('execute_command').never()
+
+    with pytest.raises(ValueError):
+        module.dump_databases(databases, {}, 'test.yaml', dry_run=False)
+
+
+def test_dump_databases_with_physical_format_and_wal_archive_directory_dumps_with_wal_archive():
+    databases = [{'name': 'all', 'format': 'physical', 'wal_archive_directory': '/wal'}]
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('all',))
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        'databases/localhost/all'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module).should_receive('dump_with_wal_archive').with_args(
+        databases[0], {}, 'test.yaml', 'databases/localhost/all', {'PGSSLMODE': 'disable'}
+    ).once()
+    flexmock(module.dump).should_receive('create_named_pipe_for_dump').never()
+    flexmock(module).should_receive('execute_command').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_with_wal_archive_directory_and_dry_run_skips_dump():
+    databases = [{'name': 'all', 'format': 'physical', 'wal_archive_directory': '/wal'}]
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('all',))
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        'databases/localhost/all'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module).should_receive('dump_with_wal_archive').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=True) == []
+
+
+def test_dump_databases_with_wal_archive_directory_without_physical_format_errors():
+    databases = [{'name': 'all', 'wal_archive_directory': '/wal'}]
+    flexmock(module).should_receive('dump_with_wal_archive').never()
+    flexmock(module).should_receive('execute_command').never()
+
+    with pytest.raises(ValueError):
+        module.dump_databases(databases, {}, 'test.yaml', dry_run=False)
+
+
+def test_dump_with_wal_archive_dumps_incrementally_with_base_backup_into_cache():
+    database = {'name': 'all', 'format': 'physical', 'wal_archive_directory': '/wal'}
+    flexmock(module.postgresql_wal).should_receive('make_cache_directory').with_args(
+        {}, database
+    ).and_return('/cache')
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump').with_args(
+        'databases/localhost/all'
+    ).once()
+    flexmock(module).should_receive('make_physical_dump_command').with_args(
+        database, '/cache/base.tar'
+    ).and_return(('pg_basebackup',))
+    flexmock(module.postgresql_wal).should_receive('dump_incrementally').with_args(
+        {},
+        database,
+        '/cache',
+        'databases/localhost/all',
+        ('pg_basebackup',),
+        {'PGSSLMODE': 'disable'},
+        'test.yaml',
+    ).once()
+
+    module.dump_with_wal_archive(
+        database, {}, 'test.yaml', 'databases/localhost/all', {'PGSSLMODE': 'disable'}
+    )
+
+
+def test_dump_databases_runs_pg_dump_with_split_format_as_uncompressed_directory_format():
+    databases = [{'name': 'foo', 'format': 'split', 'jobs': 4}]
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('foo',))
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        'databases/localhost/foo'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump')
+    flexmock(module.dump).should_receive('create_named_pipe_for_dump').never()
+
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'pg_dump',
+            '--no-password',
+            '--clean',
+            '--if-exists',
+            '--format',
+            'directory',
+            '--compress',
+            '0',
+            '--jobs',
+            '4',
+            '--file',
+            'databases/localhost/foo',
+            'foo',
+        ),
+        shell=True,
+        extra_environment={'PGSSLMODE': 'disable'},
+    ).and_return(flexmock()).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_runs_pg_dump_with_split_format_without_jobs():
+    databases = [{'name': 'foo', 'format': 'split'}]
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path').and_return('')
+    flexmock(module).should_receive('database_names_to_dump').and_return(('foo',))
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        'databases/localhost/foo'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump')
+
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'pg_dump',
+            '--no-password',
+            '--clean',
+            '--if-exists',
+            '--format',
+            'directory',
+            '--compress',
+            '0',
+            '--file',
+            'databases/localhost/foo',
+            'foo',
+        ),
+        shell=True,
+        extra_environment={'PGSSLMODE': 'disable'},
+    ).and_return(flexmock()).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
 def test_dump_databases_runs_pg_dump_with_options():
     databases = [{'name': 'foo', 'options': '--stuff=such'}]
     process = flexmock()
@@ -515,6 +723,195 @@ def test_restore_database_dump_runs_pg_restore():
     )
 
 
+def test_restore_database_dump_with_analyze_jobs_analyzes_in_stages_with_vacuumdb():
+    databases_config = [
+        {
+            'name': 'foo',
+            'hostname': 'database.example.org',
+            'port': 5433,
+            'username': 'postgres',
+            'analyze_jobs': 4,
+            'vacuumdb_command': 'docker exec mycontainer vacuumdb',
+        }
+    ]
+    extract_process = flexmock(stdout=flexmock())
+
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path')
+    flexmock(module.dump).should_receive('make_database_dump_filename')
+    flexmock(module).should_receive('execute_command_with_processes').once()
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'docker',
+            'exec',
+            'mycontainer',
+            'vacuumdb',
+            '--no-password',
+            '--analyze-in-stages',
+            '--jobs',
+            '4',
+            '--host',
+            'database.example.org',
+            '--port',
+            '5433',
+            '--username',
+            'postgres',
+            '--dbname',
+            'foo',
+        ),
+        extra_environment={'PGSSLMODE': 'disable'},
+    ).once()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=False,
+        extract_process=extract_process,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
+def test_restore_database_dump_with_analyze_jobs_and_all_databases_analyzes_all_with_vacuumdb():
+    databases_config = [{'name': 'all', 'analyze_jobs': 4}]
+    extract_process = flexmock(stdout=flexmock())
+
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path')
+    flexmock(module.dump).should_receive('make_database_dump_filename')
+    flexmock(module).should_receive('execute_command_with_processes').once()
+    flexmock(module).should_receive('execute_command').with_args(
+        ('vacuumdb', '--no-password', '--analyze-in-stages', '--jobs', '4', '--all'),
+        extra_environment={'PGSSLMODE': 'disable'},
+    ).once()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='all',
+        dry_run=False,
+        extract_process=extract_process,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
+def test_restore_database_dump_with_physical_format_unpacks_backup_without_analyzing():
+    databases_config = [
+        {'name': 'all', 'format': 'physical', 'restore_data_directory': '/var/lib/pg/restored'}
+    ]
+    extract_process = flexmock(stdout=flexmock())
+
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return('dump')
+    flexmock(module).should_receive('restore_physical_backup').with_args(
+        databases_config[0], extract_process, 'dump', '2024-01-31 12:00:00'
+    ).once()
+    flexmock(module).should_receive('execute_command_with_processes').never()
+    flexmock(module).should_receive('execute_command').never()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='all',
+        dry_run=False,
+        extract_process=extract_process,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+            'target_time': '2024-01-31 12:00:00',
+        },
+    )
+
+
+def test_restore_physical_backup_unpacks_extract_stream_into_data_directory():
+    extract_process = flexmock(stdout=flexmock())
+    flexmock(module.os).should_receive('makedirs').with_args(
+        '/var/lib/pg/restored', mode=0o700, exist_ok=True
+    ).once()
+    flexmock(module.os).should_receive('listdir').and_return([])
+    flexmock(module).should_receive('execute_command_with_processes').with_args(
+        ('tar', '--extract', '--file', '-', '--directory', '/var/lib/pg/restored'),
+        [extract_process],
+        output_log_level=logging.DEBUG,
+        input_file=extract_process.stdout,
+    ).once()
+
+    module.restore_physical_backup(
+        {'name': 'all', 'restore_data_directory': '/var/lib/pg/restored'}, extract_process, 'dump'
+    )
+
+
+def test_restore_physical_backup_without_extract_process_unpacks_dump_file():
+    flexmock(module.os).should_receive('makedirs')
+    flexmock(module.os).should_receive('listdir').and_return([])
+    flexmock(module).should_receive('execute_command_with_processes').with_args(
+        ('tar', '--extract', '--file', 'dump', '--directory', '/var/lib/pg/restored'),
+        [],
+        output_log_level=logging.DEBUG,
+        input_file=None,
+    ).once()
+
+    module.restore_physical_backup(
+        {'name': 'all', 'restore_data_directory': '/var/lib/pg/restored'}, None, 'dump'
+    )
+
+
+def test_restore_physical_backup_with_wal_archive_directory_restores_incrementally():
+    flexmock(module.os).should_receive('makedirs')
+    flexmock(module.os).should_receive('listdir').and_return([])
+    flexmock(module).should_receive('execute_command_with_processes').never()
+    flexmock(module.postgresql_wal).should_receive('restore_incrementally').with_args(
+        'dump', '/var/lib/pg/restored', '2024-01-31 12:00:00'
+    ).once()
+
+    module.restore_physical_backup(
+        {
+            'name': 'all',
+            'restore_data_directory': '/var/lib/pg/restored',
+            'wal_archive_directory': '/wal',
+        },
+        None,
+        'dump',
+        '2024-01-31 12:00:00',
+    )
+
+
+def test_restore_physical_backup_without_data_directory_errors():
+    flexmock(module).should_receive('execute_command_with_processes').never()
+
+    with pytest.raises(ValueError):
+        module.restore_physical_backup({'name': 'all'}, flexmock(stdout=flexmock()), 'dump')
+
+
+def test_restore_physical_backup_with_non_empty_data_directory_errors():
+    flexmock(module.os).should_receive('makedirs')
+    flexmock(module.os).should_receive('listdir').and_return(['PG_VERSION'])
+    flexmock(module).should_receive('execute_command_with_processes').never()
+
+    with pytest.raises(ValueError):
+        module.restore_physical_backup(
+            {'name': 'all', 'restore_data_directory': '/var/lib/pg/restored'},
+            flexmock(stdout=flexmock()),
+            'dump',
+        )
+
+
 def test_restore_database_dump_errors_when_database_missing_from_configuration():
     databases_config = [{'name': 'foo', 'schemas': None}, {'name': 'bar'}]
     extract_process = flexmock(stdout=flexmock())
@@ -1104,6 +1501,48 @@ def test_restore_database_dump_without_extract_process_restores_from_disk():
     )
 
 
+def test_restore_database_dump_with_split_format_restores_from_disk_with_jobs():
+    databases_config = [{'name': 'foo', 'schemas': None, 'format': 'split', 'jobs': 4}]
+
+    flexmock(module).should_receive('make_extra_environment').and_return({'PGSSLMODE': 'disable'})
+    flexmock(module).should_receive('make_dump_path')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return('/dump/path')
+    flexmock(module).should_receive('execute_command_with_processes').with_args(
+        (
+            'pg_restore',
+            '--no-password',
+            '--if-exists',
+            '--exit-on-error',
+            '--clean',
+            '--dbname',
+            'foo',
+            '--jobs',
+            '4',
+            '/dump/path',
+        ),
+        processes=[],
+        output_log_level=logging.DEBUG,
+        input_file=None,
+        extra_environment={'PGSSLMODE': 'disable'},
+    ).once()
+    flexmock(module).should_receive('execute_command')
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='foo',
+        dry_run=False,
+        extract_process=None,
+        connection_params={
+            'hostname': None,
+            'port': None,
+            'username': None,
+            'password': None,
+        },
+    )
+
+
 def test_restore_database_dump_with_schemas_restores_schemas():
     databases_config = [{'name': 'foo', 'schemas': ['bar', 'baz']}]
 
@@ -0,0 +1,317 @@
+import logging
+import subprocess
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.hooks import postgresql_wal as module
+
+
+def test_make_cache_directory_uses_hostname_and_database_name():
+    assert (
+        module.make_cache_directory(
+            {'borgmatic_source_directory': '/root/.borgmatic'},
+            {'name': 'all', 'hostname': 'db.example.org'},
+        )
+        == '/root/.borgmatic/postgresql_wal_cache/db.example.org/all'
+    )
+
+
+def test_make_cache_directory_without_hostname_or_source_directory_uses_defaults():
+    flexmock(module.os.path).should_receive('expanduser').replace_with(
+        lambda path: path.replace('~', '/root')
+    )
+
+    assert (
+        module.make_cache_directory({}, {'name': 'all'})
+        == '/root/.borgmatic/postgresql_wal_cache/localhost/all'
+    )
+
+
+def test_get_base_backup_reason_with_always_frequency_returns_always():
+    assert (
+        module.get_base_backup_reason(
+            {'base_backup_frequency': 'always'},
+            {'base_backup_time': 1000, 'last_wal': None},
+            '/cache',
+        )
+        == 'always'
+    )
+
+
+def test_get_base_backup_reason_without_position_returns_reason():
+    assert module.get_base_backup_reason({}, None, '/cache') == 'no previous base backup recorded'
+
+
+def test_get_base_backup_reason_with_missing_base_backup_returns_reason():
+    flexmock(module.os.path).should_receive('exists').with_args('/cache/base.tar').and_return(False)
+
+    assert (
+        module.get_base_backup_reason(
+            {}, {'base_backup_time': 1000, 'last_wal': None}, '/cache', now=1001
+        )
+        == 'previous base backup missing'
+    )
+
+
+def test_get_base_backup_reason_with_elapsed_frequency_returns_reason():
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+
+    assert module.get_base_backup_reason(
+        {'base_backup_frequency': '1 hour'},
+        {'base_backup_time': 1000, 'last_wal': None},
+        '/cache',
+        now=1000 + 60 * 60,
+    ).startswith('last base backup at')
+
+
+def test_get_base_backup_reason_within_default_frequency_returns_none():
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+
+    assert (
+        module.get_base_backup_reason(
+            {}, {'base_backup_time': 1000, 'last_wal': None}, '/cache', now=1000 + 60 * 60
+        )
+        is None
+    )
+
+
+def test_get_base_backup_reason_without_now_uses_current_time():
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.time).should_receive('time').and_return(1001)
+
+    assert (
+        module.get_base_backup_reason({}, {'base_backup_time': 1000, 'last_wal': None}, '/cache')
+        is None
+    )
+
+
+def test_get_base_backup_reason_with_invalid_frequency_raises():
+    with pytest.raises(ValueError):
+        module.get_base_backup_reason({'base_backup_frequency': 'often'}, None, '/cache')
+
+
+ARCHIVED_FILENAMES = [
+    '000000020000000000000001',
+    '00000002.history',
+    '000000010000000000000002',
+    '000000010000000000000001.00000028.backup',
+    '000000010000000000000001',
+    '000000010000000000000003.tmp',
+    'archive_status',
+]
+
+
+def test_list_archived_wal_orders_wal_files_and_skips_other_files():
+    flexmock(module.os).should_receive('listdir').with_args('/wal').and_return(ARCHIVED_FILENAMES)
+
+    assert module.list_archived_wal('/wal') == (
+        '000000010000000000000001',
+        '000000010000000000000001.00000028.backup',
+        '000000010000000000000002',
+        '00000002.history',
+        '000000020000000000000001',
+    )
+
+
+def test_list_archived_wal_with_after_skips_wal_files_up_to_it():
+    flexmock(module.os).should_receive('listdir').with_args('/wal').and_return(ARCHIVED_FILENAMES)
+
+    assert module.list_archived_wal('/wal', after='000000010000000000000002') == (
+        '00000002.history',
+        '000000020000000000000001',
+    )
+
+
+def test_ingest_wal_links_wal_files_into_cache():
+    for name in ('000000010000000000000001', '000000010000000000000002'):
+        flexmock(module.dump).should_receive('link_or_copy').with_args(
+            f'/wal/{name}', f'/cache/wal/{name}'
+        ).once()
+
+    module.ingest_wal('/wal', ('000000010000000000000001', '000000010000000000000002'), '/cache')
+
+
+DATABASE = {'name': 'all', 'format': 'physical', 'wal_archive_directory': '/wal'}
+
+
+def mock_state(position):
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').with_args(
+        connection, module.POSITIONS_NAMESPACE, '/cache'
+    ).and_return(position)
+
+    return connection
+
+
+def dump_incrementally():
+    module.dump_incrementally(
+        {},
+        DATABASE,
+        '/cache',
+        '/dump/localhost/all',
+        ('pg_basebackup',),
+        {'PGSSLMODE': 'disable'},
+        'test.yaml',
+    )
+
+
+def test_dump_incrementally_with_base_backup_due_makes_base_backup_and_records_position():
+    connection = mock_state(None)
+    flexmock(module).should_receive('get_base_backup_reason').and_return('no previous base backup')
+    flexmock(module.state).should_receive('delete_value').with_args(
+        connection, module.POSITIONS_NAMESPACE, '/cache'
+    ).once()
+    flexmock(module.shutil).should_receive('rmtree').with_args('/cache', ignore_errors=True).once()
+    flexmock(module.os).should_receive('makedirs').with_args('/cache/wal', mode=0o700).once()
+    flexmock(module).should_receive('list_archived_wal').with_args('/wal').and_return(
+        ('000000010000000000000001', '000000010000000000000002')
+    )
+    flexmock(module.time).should_receive('time').and_return(1000)
+    flexmock(module).should_receive('execute_command').with_args(
+        ('pg_basebackup',), shell=True, extra_environment={'PGSSLMODE': 'disable'}
+    ).once()
+    flexmock(module).should_receive('ingest_wal').never()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'base_backup_time': 1000, 'last_wal': '000000010000000000000002'},
+    ).once()
+    flexmock(module.shutil).should_receive('copytree').with_args(
+        '/cache', '/dump/localhost/all', copy_function=module.dump.link_or_copy
+    ).once()
+
+    dump_incrementally()
+
+
+def test_dump_incrementally_with_base_backup_due_and_empty_wal_archive_records_no_last_wal():
+    connection = mock_state(None)
+    flexmock(module).should_receive('get_base_backup_reason').and_return('always')
+    flexmock(module.state).should_receive('delete_value')
+    flexmock(module.shutil).should_receive('rmtree')
+    flexmock(module.os).should_receive('makedirs')
+    flexmock(module).should_receive('list_archived_wal').and_return(())
+    flexmock(module.time).should_receive('time').and_return(1000)
+    flexmock(module).should_receive('execute_command').once()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'base_backup_time': 1000, 'last_wal': None},
+    ).once()
+    flexmock(module.shutil).should_receive('copytree').once()
+
+    dump_incrementally()
+
+
+def test_dump_incrementally_without_base_backup_due_ingests_newly_archived_wal_but_the_newest():
+    connection = mock_state({'base_backup_time': 1000, 'last_wal': '000000010000000000000002'})
+    flexmock(module).should_receive('get_base_backup_reason').and_return(None)
+    flexmock(module.state).should_receive('delete_value').never()
+    flexmock(module).should_receive('list_archived_wal').with_args(
+        '/wal', '000000010000000000000002'
+    ).and_return(
+        (
+            '000000010000000000000003',
+            '000000010000000000000004',
+            '000000010000000000000005',
+        )
+    )
+    flexmock(module).should_receive('execute_command').never()
+    flexmock(module).should_receive('ingest_wal').with_args(
+        '/wal', ('000000010000000000000003', '000000010000000000000004'), '/cache'
+    ).once()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'base_backup_time': 1000, 'last_wal': '000000010000000000000004'},
+    ).once()
+    flexmock(module.shutil).should_receive('copytree').once()
+
+    dump_incrementally()
+
+
+@pytest.mark.parametrize('archived_names', ((), ('000000010000000000000003',)))
+def test_dump_incrementally_without_newly_archived_wal_but_the_newest_keeps_position(
+    archived_names,
+):
+    connection = mock_state({'base_backup_time': 1000, 'last_wal': '000000010000000000000002'})
+    flexmock(module).should_receive('get_base_backup_reason').and_return(None)
+    flexmock(module).should_receive('list_archived_wal').and_return(archived_names)
+    flexmock(module).should_receive('ingest_wal').never()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection,
+        module.POSITIONS_NAMESPACE,
+        '/cache',
+        {'base_backup_time': 1000, 'last_wal': '000000010000000000000002'},
+    ).once()
+    flexmock(module.shutil).should_receive('copytree').once()
+
+    dump_incrementally()
+
+
+def test_dump_incrementally_with_failed_base_backup_leaves_position_forgotten():
+    mock_state(None)
+    flexmock(module).should_receive('get_base_backup_reason').and_return('always')
+    flexmock(module.state).should_receive('delete_value').once()
+    flexmock(module.shutil).should_receive('rmtree')
+    flexmock(module.os).should_receive('makedirs')
+    flexmock(module).should_receive('list_archived_wal').and_return(())
+    flexmock(module).should_receive('execute_command').and_raise(
+        subprocess.CalledProcessError(1, 'pg_basebackup')
+    )
+    flexmock(module.state).should_receive('set_value').never()
+    flexmock(module.shutil).should_receive('copytree').never()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        dump_incrementally()
+
+
+def test_make_recovery_settings_with_target_time_stops_recovery_there():
+    settings = module.make_recovery_settings('2024-01-31 12:00:00')
+
+    assert "restore_command = 'cp borgmatic_wal/%f %p'\n" in settings
+    assert "recovery_target_time = '2024-01-31 12:00:00'\n" in settings
+    assert "recovery_target_action = 'promote'\n" in settings
+
+
+def test_make_recovery_settings_without_target_time_recovers_all_wal():
+    settings = module.make_recovery_settings(None)
+
+    assert "restore_command = 'cp borgmatic_wal/%f %p'\n" in settings
+    assert 'recovery_target' not in settings
+
+
+def test_restore_incrementally_unpacks_base_backup_and_wal_and_configures_recovery(tmp_path):
+    data_directory = tmp_path / 'restored'
+    data_directory.mkdir()
+    (data_directory / 'postgresql.auto.conf').write_text("wal_level = 'replica'\n")
+    flexmock(module).should_receive('execute_command').with_args(
+        (
+            'tar',
+            '--extract',
+            '--file',
+            '/dump/base.tar',
+            '--directory',
+            str(data_directory),
+        ),
+        output_log_level=logging.DEBUG,
+    ).once()
+    flexmock(module.shutil).should_receive('copytree').with_args(
+        '/dump/wal',
+        str(data_directory / 'borgmatic_wal'),
+        copy_function=module.dump.link_or_copy,
+    ).once()
+    flexmock(module).should_receive('make_recovery_settings').with_args(
+        '2024-01-31 12:00:00'
+    ).and_return('settings\n')
+
+    module.restore_incrementally('/dump', str(data_directory), '2024-01-31 12:00:00')
+
+    assert (data_directory / 'postgresql.auto.conf').read_text() == (
+        "wal_level = 'replica'\nsettings\n"
+    )
+    assert (data_directory / 'recovery.signal').exists()
@@ -0,0 +1,189 @@
+import sqlite3
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.hooks import prometheus as module
+
+
+def test_collect_repository_metrics_uses_latest_archive_and_durations():
+    flexmock(module.history).should_receive('read_archive_statistics').and_return(
+        [
+            {'name': 'old', 'start_time': 1, 'original_size': 1, 'deduplicated_size': 1},
+            {
+                'name': 'new',
+                'start_time': 2,
+                'duration': 30,
+                'original_size': 400,
+                'deduplicated_size': 100,
+            },
+        ]
+    )
+    flexmock(module.history).should_receive('read_action_durations').and_return(
+        {'create': [10, 20], 'prune': []}
+    )
+
+    assert module.collect_repository_metrics({}, 'repo') == {
+        'start_time': 2,
+        'original_size': 400,
+        'deduplicated_size': 100,
+        'deduplication_ratio': 4,
+        'action_durations': {'create': 20},
+    }
+
+
+def test_collect_repository_metrics_without_history_returns_no_archive_metrics():
+    flexmock(module.history).should_receive('read_archive_statistics').and_return([])
+    flexmock(module.history).should_receive('read_action_durations').and_return({})
+
+    assert module.collect_repository_metrics({}, 'repo') == {
+        'deduplication_ratio': None,
+        'action_durations': {},
+    }
+
+
+def test_update_metrics_for_finish_records_success():
+    assert module.update_metrics(
+        {'error_count': 2},
+        'borgmatic.prom',
+        {'repo': {'original_size': 400}},
+        module.monitor.State.FINISH,
+        now=1000,
+    ) == {
+        'textfile_path': 'borgmatic.prom',
+        'last_run_time': 1000,
+        'last_run_success': 1,
+        'error_count': 2,
+        'repositories': {'repo': {'original_size': 400, 'last_success_time': 1000}},
+    }
+
+
+def test_update_metrics_for_fail_counts_error_and_keeps_last_success_time():
+    assert module.update_metrics(
+        {'error_count': 2, 'repositories': {'repo': {'last_success_time': 500}}},
+        'borgmatic.prom',
+        {'repo': {'original_size': 400}, 'new': {}},
+        module.monitor.State.FAIL,
+        now=1000,
+    ) == {
+        'textfile_path': 'borgmatic.prom',
+        'last_run_time': 1000,
+        'last_run_success': 0,
+        'error_count': 3,
+        'repositories': {
+            'repo': {'original_size': 400, 'last_success_time': 500},
+            'new': {'last_success_time': None},
+        },
+    }
+
+
+def test_update_metrics_without_previous_metrics_starts_error_count():
+    assert (
+        module.update_metrics(None, 'borgmatic.prom', {}, module.monitor.State.FAIL, now=1000)[
+            'error_count'
+        ]
+        == 1
+    )
+
+
+def test_escape_label_value_escapes_special_characters():
+    assert module.escape_label_value('a\\b"c\nd') == 'a\\\\b\\"c\\nd'
+
+
+def test_format_sample_formats_labels_and_value():
+    assert (
+        module.format_sample('metric', {'config': 'test.yaml', 'repository': 'repo'}, 5)
+        == 'metric{config="test.yaml",repository="repo"} 5.0\n'
+    )
+
+
+def test_format_metrics_groups_samples_under_headers_and_skips_missing_values():
+    formatted = module.format_metrics(
+        {
+            'test.yaml': {
+                'last_run_time': 1000,
+                'last_run_success': 1,
+                'error_count': 0,
+                'repositories': {
+                    'repo': {
+                        'last_success_time': 1000,
+                        'original_size': 400,
+                        'action_durations': {'create': 20, 'check': 5},
+                    },
+                },
+            },
+            'other.yaml': {
+                'last_run_time': 900,
+                'last_run_success': 0,
+                'error_count': 1,
+                'repositories': {},
+            },
+        }
+    )
+
+    assert formatted.count('# TYPE borgmatic_last_run_timestamp_seconds gauge\n') == 1
+    assert '# TYPE borgmatic_errors_total counter\n' in formatted
+    assert 'borgmatic_errors_total{config="other.yaml"} 1.0\n' in formatted
+    assert (
+        'borgmatic_archive_original_size_bytes{config="test.yaml",repository="repo"} 400.0\n'
+        in formatted
+    )
+    assert (
+        'borgmatic_action_duration_seconds{config="test.yaml",repository="repo",action="check"} 5.0\n'
+        'borgmatic_action_duration_seconds{config="test.yaml",repository="repo",action="create"} 20.0\n'
+    ) in formatted
+    assert 'borgmatic_archive_files' not in formatted
+    assert formatted.index('config="other.yaml"') < formatted.index('config="test.yaml"')
+
+
+def test_write_textfile_with_error_replacing_file_removes_temporary_file(tmp_path):
+    flexmock(module.os).should_receive('replace').and_raise(OSError)
+
+    with pytest.raises(OSError):
+        module.write_textfile(str(tmp_path / 'borgmatic.prom'), 'content')
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ping_monitor_ignores_start_state():
+    flexmock(module.state).should_receive('open_state_database').never()
+    flexmock(module).should_receive('write_textfile').never()
+
+    module.ping_monitor(
+        {'textfile_path': 'borgmatic.prom'},
+        {'repositories': [{'path': 'repo'}]},
+        'test.yaml',
+        module.monitor.State.START,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
+
+
+def test_ping_monitor_dry_run_does_not_write_anything():
+    flexmock(module.state).should_receive('open_state_database').never()
+    flexmock(module).should_receive('write_textfile').never()
+
+    module.ping_monitor(
+        {'textfile_path': 'borgmatic.prom'},
+        {'repositories': [{'path': 'repo'}]},
+        'test.yaml',
+        module.monitor.State.FINISH,
+        monitoring_log_level=1,
+        dry_run=True,
+    )
+
+
+def test_ping_monitor_with_database_error_logs_warning():
+    flexmock(module).should_receive('collect_repository_metrics').and_return({})
+    flexmock(module.state).should_receive('open_state_database').and_raise(sqlite3.OperationalError)
+    flexmock(module).should_receive('write_textfile').never()
+    flexmock(module.logger).should_receive('warning').once()
+
+    module.ping_monitor(
+        {'textfile_path': 'borgmatic.prom'},
+        {'repositories': [{'path': 'repo'}]},
+        'test.yaml',
+        module.monitor.State.FINISH,
+        monitoring_log_level=1,
+        dry_run=False,
+    )
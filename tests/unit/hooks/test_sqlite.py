@@ -209,3 +209,347 @@ def test_restore_database_dump_raises_error_if_database_config_is_empty():
             extract_process=extract_process,
             connection_params={'restore_path': None},
         )
+
+
+def test_dump_databases_with_binary_format_backs_up_database_without_process():
+    databases = [{'path': '/path/to/database', 'name': 'database', 'format': 'binary'}]
+
+    flexmock(module).should_receive('make_dump_path').and_return('/path/to/dump')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        '/path/to/dump/database'
+    )
+    flexmock(module.os.path).should_receive('exists').with_args('/path/to/database').and_return(
+        True
+    )
+    flexmock(module.os.path).should_receive('exists').with_args(
+        '/path/to/dump/database'
+    ).and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump')
+    flexmock(module).should_receive('backup_database').with_args(
+        '/path/to/database', '/path/to/dump/database'
+    ).once()
+    flexmock(module).should_receive('execute_command').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_with_binary_format_does_not_back_up_database_if_dry_run():
+    databases = [{'path': '/path/to/database', 'name': 'database', 'format': 'binary'}]
+
+    flexmock(module).should_receive('make_dump_path').and_return('/path/to/dump')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        '/path/to/dump/database'
+    )
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump').never()
+    flexmock(module).should_receive('backup_database').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=True) == []
+
+
+def mock_dump_paths():
+    flexmock(module).should_receive('make_dump_path').and_return('/path/to/dump')
+    flexmock(module.dump).should_receive('make_database_dump_filename').and_return(
+        '/path/to/dump/database'
+    )
+    flexmock(module.os.path).should_receive('exists').with_args('/path/to/database').and_return(
+        True
+    )
+    flexmock(module.os.path).should_receive('exists').with_args(
+        '/path/to/dump/database'
+    ).and_return(False)
+    flexmock(module.dump).should_receive('create_parent_directory_for_dump')
+
+
+def test_dump_databases_with_skip_unchanged_reuses_cached_dump_of_unchanged_database():
+    databases = [{'path': '/path/to/database', 'name': 'database', 'skip_unchanged': True}]
+    mock_dump_paths()
+    flexmock(module).should_receive('get_database_fingerprint').with_args(
+        '/path/to/database', 'sql'
+    ).and_return(['fingerprint'])
+    flexmock(module).should_receive('link_cached_dump').with_args(
+        {}, 'database', ['fingerprint'], '/path/to/dump/database'
+    ).and_return(True)
+    flexmock(module).should_receive('execute_command').never()
+    flexmock(module).should_receive('cache_dump').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_with_skip_unchanged_dumps_changed_database_to_completion_and_caches_it():
+    databases = [{'path': '/path/to/database', 'name': 'database', 'skip_unchanged': True}]
+    mock_dump_paths()
+    flexmock(module).should_receive('get_database_fingerprint').and_return(['fingerprint'])
+    flexmock(module).should_receive('link_cached_dump').and_return(False)
+    flexmock(module).should_receive('execute_command').with_args(
+        ('sqlite3', '/path/to/database', '.dump', '>', '/path/to/dump/database'), shell=True
+    ).once()
+    flexmock(module).should_receive('cache_dump').with_args(
+        {}, 'database', ['fingerprint'], '/path/to/dump/database'
+    ).once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_with_skip_unchanged_and_binary_format_backs_up_and_caches_database():
+    databases = [
+        {
+            'path': '/path/to/database',
+            'name': 'database',
+            'format': 'binary',
+            'skip_unchanged': True,
+        }
+    ]
+    mock_dump_paths()
+    flexmock(module).should_receive('get_database_fingerprint').with_args(
+        '/path/to/database', 'binary'
+    ).and_return(['fingerprint'])
+    flexmock(module).should_receive('link_cached_dump').and_return(False)
+    flexmock(module).should_receive('backup_database').once()
+    flexmock(module).should_receive('execute_command').never()
+    flexmock(module).should_receive('cache_dump').once()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_dump_databases_with_skip_unchanged_does_not_cache_dump_of_missing_database():
+    databases = [{'path': '/path/to/database', 'name': 'database', 'skip_unchanged': True}]
+    mock_dump_paths()
+    flexmock(module).should_receive('get_database_fingerprint').and_return(None)
+    flexmock(module).should_receive('link_cached_dump').and_return(False)
+    flexmock(module).should_receive('execute_command').once()
+    flexmock(module).should_receive('cache_dump').never()
+
+    assert module.dump_databases(databases, {}, 'test.yaml', dry_run=False) == []
+
+
+def test_make_dump_cache_filename_uses_borgmatic_source_directory():
+    assert (
+        module.make_dump_cache_filename({'borgmatic_source_directory': '/borgmatic'}, 'database')
+        == '/borgmatic/sqlite_dump_cache/database'
+    )
+
+
+def test_make_dump_cache_filename_defaults_borgmatic_source_directory():
+    flexmock(module.os.path).should_receive('expanduser').with_args('~/.borgmatic').and_return(
+        '/root/.borgmatic'
+    )
+
+    assert (
+        module.make_dump_cache_filename({}, 'database')
+        == '/root/.borgmatic/sqlite_dump_cache/database'
+    )
+
+
+def mock_state_database(fingerprint):
+    # A flexmock object is a context manager that enters as itself.
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module.state).should_receive('get_value').with_args(
+        connection, module.FINGERPRINTS_NAMESPACE, 'database'
+    ).and_return(fingerprint)
+
+    return connection
+
+
+def test_link_cached_dump_with_matching_fingerprint_links_cached_dump():
+    mock_state_database(['fingerprint'])
+    flexmock(module).should_receive('make_dump_cache_filename').and_return('/cache/database')
+    flexmock(module.dump).should_receive('link_or_copy').with_args(
+        '/cache/database', '/path/to/dump/database'
+    ).once()
+
+    assert module.link_cached_dump({}, 'database', ['fingerprint'], '/path/to/dump/database')
+
+
+def test_link_cached_dump_with_changed_fingerprint_does_not_link_cached_dump():
+    mock_state_database(['old fingerprint'])
+    flexmock(module.dump).should_receive('link_or_copy').never()
+
+    assert not module.link_cached_dump({}, 'database', ['fingerprint'], '/path/to/dump/database')
+
+
+def test_link_cached_dump_without_fingerprint_does_not_check_state():
+    flexmock(module.state).should_receive('open_state_database').never()
+    flexmock(module.dump).should_receive('link_or_copy').never()
+
+    assert not module.link_cached_dump({}, 'database', None, '/path/to/dump/database')
+
+
+def test_link_cached_dump_with_missing_cached_dump_does_not_link_it():
+    mock_state_database(['fingerprint'])
+    flexmock(module).should_receive('make_dump_cache_filename').and_return('/cache/database')
+    flexmock(module.dump).should_receive('link_or_copy').and_raise(FileNotFoundError)
+
+    assert not module.link_cached_dump({}, 'database', ['fingerprint'], '/path/to/dump/database')
+
+
+def test_cache_dump_forgets_fingerprint_then_replaces_cached_dump_then_records_fingerprint():
+    connection = flexmock()
+    flexmock(module.state).should_receive('open_state_database').and_return(connection)
+    flexmock(module).should_receive('make_dump_cache_filename').and_return('/cache/database')
+    flexmock(module.os).should_receive('makedirs').with_args('/cache', mode=0o700, exist_ok=True)
+    flexmock(module.state).should_receive('delete_value').with_args(
+        connection, module.FINGERPRINTS_NAMESPACE, 'database'
+    ).once().ordered()
+    flexmock(module.os).should_receive('remove').with_args('/cache/database.tmp').and_raise(
+        FileNotFoundError
+    ).once().ordered()
+    flexmock(module.dump).should_receive('link_or_copy').with_args(
+        '/path/to/dump/database', '/cache/database.tmp'
+    ).once().ordered()
+    flexmock(module.os).should_receive('replace').with_args(
+        '/cache/database.tmp', '/cache/database'
+    ).once().ordered()
+    flexmock(module.state).should_receive('set_value').with_args(
+        connection, module.FINGERPRINTS_NAMESPACE, 'database', ['fingerprint']
+    ).once().ordered()
+
+    module.cache_dump({}, 'database', ['fingerprint'], '/path/to/dump/database')
+
+
+def test_cache_dump_removes_leftover_temporary_file():
+    flexmock(module.state).should_receive('open_state_database').and_return(flexmock())
+    flexmock(module).should_receive('make_dump_cache_filename').and_return('/cache/database')
+    flexmock(module.os).should_receive('makedirs')
+    flexmock(module.state).should_receive('delete_value')
+    flexmock(module.os).should_receive('remove').with_args('/cache/database.tmp').once()
+    flexmock(module.dump).should_receive('link_or_copy')
+    flexmock(module.os).should_receive('replace')
+    flexmock(module.state).should_receive('set_value')
+
+    module.cache_dump({}, 'database', ['fingerprint'], '/path/to/dump/database')
+
+
+def test_backup_database_copies_database_in_steps_and_closes_connections():
+    source = flexmock()
+    destination = flexmock()
+    flexmock(module.sqlite3).should_receive('connect').with_args('/path/to/database').and_return(
+        source
+    )
+    flexmock(module.sqlite3).should_receive('connect').with_args('/path/to/dump').and_return(
+        destination
+    )
+    source.should_receive('backup').with_args(
+        destination, pages=module.BACKUP_PAGES_PER_STEP
+    ).once()
+    source.should_receive('close').once()
+    destination.should_receive('close').once()
+
+    module.backup_database('/path/to/database', '/path/to/dump')
+
+
+def test_backup_database_with_sqlite_error_raises_value_error_and_closes_connections():
+    source = flexmock()
+    destination = flexmock()
+    flexmock(module.sqlite3).should_receive('connect').with_args('/path/to/database').and_return(
+        source
+    )
+    flexmock(module.sqlite3).should_receive('connect').with_args('/path/to/dump').and_return(
+        destination
+    )
+    source.should_receive('backup').and_raise(module.sqlite3.OperationalError('locked'))
+    source.should_receive('close').once()
+    destination.should_receive('close').once()
+
+    with pytest.raises(ValueError, match='locked'):
+        module.backup_database('/path/to/database', '/path/to/dump')
+
+
+def test_restore_database_dump_with_binary_format_restores_database_file():
+    databases_config = [{'path': '/path/to/database', 'name': 'database', 'format': 'binary'}]
+    extract_process = flexmock(stdout=flexmock())
+
+    flexmock(module).should_receive('restore_database_file').with_args(
+        extract_process, '/path/to/database', 'test.yaml'
+    ).once()
+    flexmock(module).should_receive('execute_command_with_processes').never()
+    flexmock(module.os).should_receive('remove').never()
+
+    module.restore_database_dump(
+        databases_config,
+        {},
+        'test.yaml',
+        database_name='database',
+        dry_run=False,
+        extract_process=extract_process,
+        connection_params={'restore_path': None},
+    )
+
+
+def make_temporary_file():
+    temporary_file = flexmock(name='/path/to/.borgmatic-restore-1234', write=lambda data: None)
+    temporary_file.should_receive('__enter__').and_return(temporary_file)
+    temporary_file.should_receive('__exit__')
+
+    return temporary_file
+
+
+def test_restore_database_file_copies_dump_and_replaces_database_and_journals():
+    extract_process = flexmock(stdout=flexmock())
+    extract_process.stdout.should_receive('read').and_return(module.SQLITE_FILE_HEADER)
+    temporary_file = make_temporary_file()
+    flexmock(module.tempfile).should_receive('NamedTemporaryFile').with_args(
+        dir='/path/to', prefix='.borgmatic-restore-', delete=False
+    ).and_return(temporary_file)
+    flexmock(module.shutil).should_receive('copyfileobj').with_args(
+        extract_process.stdout, temporary_file
+    ).once()
+    flexmock(module).should_receive('log_outputs').with_args(
+        (extract_process,),
+        (extract_process.stdout,),
+        output_log_level=logging.DEBUG,
+        borg_local_path=None,
+    ).once()
+    flexmock(module.os).should_receive('remove').with_args('/path/to/database-journal').and_raise(
+        FileNotFoundError
+    )
+    flexmock(module.os).should_receive('remove').with_args('/path/to/database-wal').once()
+    flexmock(module.os).should_receive('remove').with_args('/path/to/database-shm').once()
+    flexmock(module.os).should_receive('replace').with_args(
+        '/path/to/.borgmatic-restore-1234', '/path/to/database'
+    ).once()
+
+    module.restore_database_file(extract_process, '/path/to/database', 'test.yaml')
+
+
+def test_restore_database_file_with_empty_dump_restores_empty_database():
+    extract_process = flexmock(stdout=flexmock())
+    extract_process.stdout.should_receive('read').and_return(b'')
+    extract_process.should_receive('kill').never()
+    flexmock(module.tempfile).should_receive('NamedTemporaryFile').and_return(make_temporary_file())
+    flexmock(module.shutil).should_receive('copyfileobj')
+    flexmock(module).should_receive('log_outputs')
+    flexmock(module.os).should_receive('remove').and_raise(FileNotFoundError)
+    flexmock(module.os).should_receive('replace').once()
+
+    module.restore_database_file(extract_process, '/path/to/database', 'test.yaml')
+
+
+def test_restore_database_file_with_non_database_dump_stops_extract_and_raises():
+    extract_process = flexmock(stdout=flexmock())
+    extract_process.stdout.should_receive('read').and_return(b'PRAGMA foreign_k')
+    extract_process.should_receive('kill').once()
+    extract_process.should_receive('wait').once()
+    flexmock(module.tempfile).should_receive('NamedTemporaryFile').never()
+    flexmock(module.os).should_receive('replace').never()
+
+    with pytest.raises(ValueError, match='"sql"'):
+        module.restore_database_file(extract_process, '/path/to/database', 'test.yaml')
+
+
+def test_restore_database_file_with_extract_error_removes_temporary_file_and_raises():
+    extract_process = flexmock(stdout=flexmock())
+    extract_process.stdout.should_receive('read').and_return(module.SQLITE_FILE_HEADER)
+    flexmock(module.tempfile).should_receive('NamedTemporaryFile').and_return(make_temporary_file())
+    flexmock(module.shutil).should_receive('copyfileobj')
+    flexmock(module).should_receive('log_outputs').and_raise(
+        module.subprocess.CalledProcessError(2, 'borg extract')
+    )
+    flexmock(module.os).should_receive('remove').with_args(
+        '/path/to/.borgmatic-restore-1234'
+    ).once()
+    flexmock(module.os).should_receive('replace').never()
+
+    with pytest.raises(module.subprocess.CalledProcessError):
+        module.restore_database_file(extract_process, '/path/to/database', 'test.yaml')
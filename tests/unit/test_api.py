@@ -0,0 +1,202 @@
+import asyncio
+import logging
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic import api as module
+
+
+def test_load_config_with_dict_validates_copy_of_it():
+    config = {'repositories': [{'path': 'repo.borg'}]}
+    flexmock(module.validate).should_receive('schema_filename').and_return('schema.yaml')
+    flexmock(module.load).should_receive('load_configuration').with_args('schema.yaml').and_return(
+        {'schema': True}
+    )
+    flexmock(module.validate).should_receive('validate_configuration').with_args(
+        'backups', config, {'schema': True}, None, True
+    ).replace_with(
+        lambda config_filename, config, schema, overrides, resolve_env: (
+            dict(config, validated=True),
+            [],
+        )
+    )
+
+    assert module.load_config(config, 'backups') == (
+        'backups',
+        {'repositories': [{'path': 'repo.borg'}], 'validated': True},
+    )
+    assert config == {'repositories': [{'path': 'repo.borg'}]}
+
+
+def test_load_config_with_dict_and_no_filename_uses_default_filename():
+    flexmock(module.validate).should_receive('schema_filename')
+    flexmock(module.load).should_receive('load_configuration')
+    flexmock(module.validate).should_receive('validate_configuration').and_return(({}, []))
+
+    assert module.load_config({})[0] == module.DEFAULT_CONFIG_FILENAME
+
+
+def test_load_config_with_filename_parses_configuration_file_and_logs_warnings():
+    flexmock(module.validate).should_receive('schema_filename').and_return('schema.yaml')
+    flexmock(module.validate).should_receive('parse_configuration').with_args(
+        '/etc/borgmatic/config.yaml', 'schema.yaml', ['keep_daily=7'], False
+    ).and_return(({'keep_daily': 7}, [flexmock()]))
+    flexmock(module.logger).should_receive('handle').once()
+
+    assert module.load_config(
+        '/etc/borgmatic/config.yaml', overrides=['keep_daily=7'], resolve_env=False
+    ) == ('/etc/borgmatic/config.yaml', {'keep_daily': 7})
+
+
+def test_make_arguments_with_action_names_parses_them_and_sets_global_arguments():
+    flexmock(module.borgmatic.commands.arguments).should_receive('parse_arguments').with_args(
+        'create', 'check'
+    ).and_return(
+        {
+            'global': flexmock(),
+            'create': flexmock(json=False),
+            'check': flexmock(only=None),
+        }
+    )
+
+    arguments = module.make_arguments('config.yaml', ('create', 'check'), True, 1)
+
+    assert arguments['create'].json is True
+    assert arguments['check'].only is None
+    assert arguments['global'].config_paths == ['config.yaml']
+    assert arguments['global'].used_config_paths == ['config.yaml']
+    assert arguments['global'].dry_run is True
+    assert arguments['global'].monitoring_verbosity == 1
+
+
+def test_make_arguments_with_action_options_sets_them():
+    flexmock(module.borgmatic.commands.arguments).should_receive('parse_arguments').with_args(
+        'create', 'check'
+    ).and_return(
+        {
+            'global': flexmock(),
+            'create': flexmock(json=False),
+            'check': flexmock(only=None),
+        }
+    )
+
+    arguments = module.make_arguments(
+        'config.yaml', {'create': {'json': False}, 'check': {'only': ['repository']}}, False, 0
+    )
+
+    assert arguments['create'].json is False
+    assert arguments['check'].only == ['repository']
+
+
+def test_make_arguments_with_unknown_option_raises():
+    flexmock(module.borgmatic.commands.arguments).should_receive('parse_arguments').and_return(
+        {'global': flexmock(), 'check': flexmock(only=None)}
+    )
+
+    with pytest.raises(ValueError, match='Unknown option'):
+        module.make_arguments('config.yaml', {'check': {'explode': True}}, False, 0)
+
+
+def test_make_arguments_with_unsupported_action_raises():
+    flexmock(module.borgmatic.commands.arguments).should_receive('parse_arguments').never()
+
+    with pytest.raises(ValueError, match='not supported'):
+        module.make_arguments('config.yaml', ('daemon',), False, 0)
+
+
+def test_make_arguments_with_invalid_action_arguments_raises():
+    flexmock(module.borgmatic.commands.arguments).should_receive('parse_arguments').and_raise(
+        SystemExit(2)
+    )
+
+    with pytest.raises(ValueError, match='Invalid actions'):
+        module.make_arguments('config.yaml', ('extract',), False, 0)
+
+
+def fake_run_configuration(config_filename, config, arguments):
+    module.borgmatic.events.emit('action_start', repository='repo.borg', action='create')
+    yield {'archive': {'name': 'archive'}}
+    module.borgmatic.events.emit(
+        'action_end', repository='repo.borg', action='create', duration=1.0
+    )
+    yield logging.makeLogRecord(dict(levelno=logging.CRITICAL, msg='Oops'))
+
+
+def test_run_returns_events_outputs_and_errors():
+    arguments = flexmock()
+    flexmock(module).should_receive('load_config').with_args(
+        {'repositories': []}, None, None, True
+    ).and_return(('<api>', {'repositories': []}))
+    flexmock(module).should_receive('make_arguments').with_args(
+        '<api>', module.DEFAULT_ACTIONS, False, 0
+    ).and_return(arguments)
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('run_configuration').with_args(
+        '<api>', {'repositories': []}, arguments
+    ).replace_with(fake_run_configuration)
+    received = []
+
+    result = module.run({'repositories': []}, on_event=received.append)
+
+    assert [event['type'] for event in result['events']] == [
+        'run_start',
+        'action_start',
+        'output',
+        'action_end',
+        'error',
+        'run_end',
+    ]
+    assert received == result['events']
+    assert {event['config_filename'] for event in result['events']} == {'<api>'}
+    assert result['outputs'][0]['repository'] == 'repo.borg'
+    assert result['outputs'][0]['action'] == 'create'
+    assert result['outputs'][0]['data'] == {'archive': {'name': 'archive'}}
+    assert result['errors'] == ['Oops']
+    assert result['succeeded'] is False
+    assert result['events'][-1]['succeeded'] is False
+    assert result['duration'] == result['events'][-1]['duration']
+    assert module.borgmatic.events.handler.get() is None
+
+
+def test_run_without_errors_succeeds():
+    flexmock(module).should_receive('load_config').and_return(('config.yaml', {}))
+    flexmock(module).should_receive('make_arguments')
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('run_configuration').and_return(
+        iter(())
+    )
+
+    result = module.run('config.yaml', actions=('check',))
+
+    assert result['succeeded'] is True
+    assert result['errors'] == []
+    assert result['outputs'] == []
+
+
+def test_run_async_runs_in_executor_and_calls_on_event_on_event_loop():
+    flexmock(module).should_receive('load_config').and_return(('config.yaml', {}))
+    flexmock(module).should_receive('make_arguments')
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('run_configuration').replace_with(
+        fake_run_configuration
+    )
+    received = []
+
+    async def run_and_collect():
+        result = await module.run_async('config.yaml', on_event=received.append, dry_run=True)
+        await asyncio.sleep(0)
+
+        return result
+
+    result = asyncio.run(run_and_collect())
+
+    assert result['errors'] == ['Oops']
+    assert received == result['events']
+
+
+def test_run_async_without_on_event_returns_results():
+    flexmock(module).should_receive('load_config').and_return(('config.yaml', {}))
+    flexmock(module).should_receive('make_arguments')
+    flexmock(module.borgmatic.commands.borgmatic).should_receive('run_configuration').and_return(
+        iter(())
+    )
+
+    assert asyncio.run(module.run_async('config.yaml'))['succeeded'] is True
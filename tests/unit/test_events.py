@@ -0,0 +1,22 @@
+from flexmock import flexmock
+
+from borgmatic import events as module
+
+
+def test_emit_passes_event_to_handler():
+    received = []
+    token = module.handler.set(received.append)
+    flexmock(module.time).should_receive('time').and_return(1234.5)
+
+    try:
+        module.emit('action_start', action='create')
+    finally:
+        module.handler.reset(token)
+
+    assert received == [{'type': 'action_start', 'time': 1234.5, 'action': 'create'}]
+
+
+def test_emit_without_handler_does_nothing():
+    flexmock(module.time).should_receive('time').never()
+
+    module.emit('action_start', action='create')
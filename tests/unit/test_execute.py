@@ -100,6 +100,37 @@ def test_append_last_lines_with_output_log_level_none_appends_captured_output():
     assert captured_output == ['captured', 'line']
 
 
+def test_append_last_lines_with_line_handler_taking_line_does_not_log_it():
+    last_lines = ['last']
+    flexmock(module.logger).should_receive('log').never()
+
+    module.append_last_lines(
+        last_lines,
+        captured_output=flexmock(),
+        line='line',
+        output_log_level=flexmock(),
+        line_handler=lambda line: True,
+    )
+
+    assert last_lines == ['last', 'line']
+
+
+def test_append_last_lines_with_line_handler_passing_on_line_logs_it():
+    last_lines = ['last']
+    handled_lines = []
+    flexmock(module.logger).should_receive('log').once()
+
+    module.append_last_lines(
+        last_lines,
+        captured_output=flexmock(),
+        line='line',
+        output_log_level=flexmock(),
+        line_handler=lambda line: handled_lines.append(line),
+    )
+
+    assert handled_lines == ['line']
+
+
 def test_execute_command_calls_full_command():
     full_command = ['foo', 'bar']
     flexmock(module.os, environ={'a': 'b'})
@@ -147,6 +178,7 @@ def test_execute_command_calls_full_command_without_capturing_output():
     ).and_return(flexmock(wait=lambda: 0)).once()
     flexmock(module).should_receive('exit_code_indicates_error').and_return(False)
     flexmock(module).should_receive('log_outputs')
+    flexmock(module.borgmatic.logger).should_receive('flush_logging').once()
 
     output = module.execute_command(full_command, output_file=module.DO_NOT_CAPTURE)
 
@@ -420,6 +452,7 @@ def test_execute_command_with_processes_calls_full_command_without_capturing_out
     ).and_return(flexmock(wait=lambda: 0)).once()
     flexmock(module).should_receive('exit_code_indicates_error').and_return(False)
     flexmock(module).should_receive('log_outputs')
+    flexmock(module.borgmatic.logger).should_receive('flush_logging').once()
 
     output = module.execute_command_with_processes(
         full_command, processes, output_file=module.DO_NOT_CAPTURE
@@ -1,5 +1,7 @@
+import io
 import logging
 import sys
+import time
 
 import pytest
 from flexmock import flexmock
@@ -125,6 +127,239 @@ def test_multi_stream_handler_logs_to_handler_for_log_level():
     multi_handler.emit(flexmock(levelno=module.logging.ERROR))
 
 
+def test_multi_stream_handler_flush_batch_flushes_each_handler():
+    batched_handler = flexmock(flush_batch=lambda: None)
+    batched_handler.should_receive('flush_batch').once()
+    plain_handler = flexmock(flush=lambda: None)
+    plain_handler.should_receive('flush').once()
+
+    multi_handler = module.Multi_stream_handler(
+        {module.logging.ERROR: batched_handler, module.logging.INFO: plain_handler}
+    )
+    multi_handler.flush_batch()
+
+
+def test_batched_stream_handler_defers_flush_until_flush_batch():
+    stream = flexmock(write=lambda data: None)
+    handler = module.Batched_stream_handler(stream)
+    stream.should_receive('flush').never()
+
+    handler.emit(logging.makeLogRecord({'msg': 'hi', 'levelno': logging.INFO}))
+    handler.flush()
+
+    stream.should_receive('flush').once()
+    handler.flush_batch()
+
+
+def test_log_queue_allows_reentrant_put():
+    log_queue = module.Log_queue(2)
+
+    with log_queue.mutex:
+        log_queue.put('record')
+
+    assert log_queue.get() == 'record'
+
+
+def test_log_queue_put_while_puts_when_there_is_room():
+    log_queue = module.Log_queue(2)
+
+    assert log_queue.put_while('record', lambda: True)
+    assert log_queue.get() == 'record'
+
+
+def test_log_queue_put_while_gives_up_once_told_to_stop_waiting():
+    flexmock(module).LOG_QUEUE_POLL_SECONDS = 0.01
+    log_queue = module.Log_queue(1)
+    log_queue.put('record')
+    keep_waiting = iter((True, True, False))
+
+    assert not log_queue.put_while('other', lambda: next(keep_waiting))
+
+
+def test_log_queue_join_while_gives_up_once_told_to_stop_waiting():
+    flexmock(module).LOG_QUEUE_POLL_SECONDS = 0.01
+    log_queue = module.Log_queue(1)
+    log_queue.put('record')
+    keep_waiting = iter((True, True, False))
+
+    log_queue.join_while(lambda: next(keep_waiting))
+
+    assert log_queue.unfinished_tasks == 1
+
+
+def make_recording_handler(records, level=logging.INFO):
+    handler = logging.Handler(level)
+    handler.emit = lambda record: records.append(record.msg)
+
+    return handler
+
+
+def wait_for_queue(log_queue, timeout_seconds=5):
+    deadline = time.monotonic() + timeout_seconds
+    log_queue.join_while(lambda: time.monotonic() < deadline)
+
+    assert not log_queue.unfinished_tasks
+
+
+def make_record(message, level=logging.INFO):
+    return logging.makeLogRecord(
+        {'msg': message, 'levelno': level, 'levelname': logging.getLevelName(level)}
+    )
+
+
+def test_log_queue_listener_writes_queued_records_and_flushes_once_caught_up():
+    log_queue = module.Log_queue(10)
+    records = []
+    handler = make_recording_handler(records)
+    flushes = []
+    handler.flush_batch = lambda: flushes.append(True)
+    listener = module.Log_queue_listener(log_queue, handler)
+    queue_handler = module.Blocking_queue_handler(log_queue, listener)
+    listener.start()
+
+    try:
+        for message in ('one', 'two', 'three'):
+            queue_handler.handle(make_record(message))
+        queue_handler.handle(make_record('skipped', logging.DEBUG))
+        wait_for_queue(log_queue)
+    finally:
+        listener.stop()
+
+    assert records == ['one', 'two', 'three']
+    assert flushes
+    assert not listener.alive()
+
+
+def test_log_queue_listener_survives_handler_and_flush_errors():
+    log_queue = module.Log_queue(10)
+    records = []
+    handler = make_recording_handler(records)
+    errors = []
+    handler.handleError = lambda record: errors.append(record)
+
+    def flush_batch():
+        raise OSError()
+
+    handler.flush_batch = flush_batch
+    listener = module.Log_queue_listener(log_queue, handler)
+    queue_handler = module.Blocking_queue_handler(log_queue, listener)
+    listener.start()
+
+    try:
+        queue_handler.handle(make_record('one'))
+        wait_for_queue(log_queue)
+        queue_handler.handle(make_record('two'))
+        wait_for_queue(log_queue)
+
+        assert listener.alive()
+    finally:
+        listener.stop()
+
+    assert records == ['one', 'two']
+    assert errors
+
+
+def test_log_queue_listener_handle_sends_handler_errors_to_handle_error():
+    handler = flexmock(level=logging.INFO, flush_batch=lambda: None)
+    handler.should_receive('handle').and_raise(ValueError)
+    handler.should_receive('handleError').once()
+    listener = module.Log_queue_listener(module.Log_queue(10), handler)
+
+    listener.handle(make_record('one'))
+
+
+def test_log_queue_listener_stop_without_start_does_not_raise():
+    listener = module.Log_queue_listener(module.Log_queue(10))
+
+    listener.stop()
+
+
+def test_blocking_queue_handler_formats_records_only_with_each_sink_formatter():
+    log_queue = module.Log_queue(10)
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('[{levelname}] {message}', style='{'))  # noqa: FS003
+    listener = module.Log_queue_listener(log_queue, handler)
+    queue_handler = module.Blocking_queue_handler(log_queue, listener)
+    # Like logging.basicConfig(), give the queue handler a formatter of its own.
+    queue_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    record = logging.makeLogRecord(
+        {
+            'name': 'borgmatic.foo',
+            'msg': 'hello %s',
+            'args': ('world',),
+            'levelno': logging.WARNING,
+            'levelname': 'WARNING',
+        }
+    )
+    listener.start()
+
+    try:
+        queue_handler.handle(record)
+        wait_for_queue(log_queue)
+    finally:
+        listener.stop()
+
+    assert stream.getvalue() == '[WARNING] hello world\n'
+    assert record.msg == 'hello %s'
+
+
+def test_blocking_queue_handler_waits_for_room_in_queue():
+    listener = flexmock(alive=lambda: True)
+    log_queue = flexmock()
+    log_queue.should_receive('put_while').with_args('record', listener.alive).and_return(True)
+    listener.should_receive('handle').never()
+
+    module.Blocking_queue_handler(log_queue, listener).enqueue('record')
+
+
+def test_blocking_queue_handler_without_live_listener_handles_record_directly():
+    listener = flexmock(alive=lambda: False)
+    log_queue = flexmock()
+    log_queue.should_receive('put_while').and_return(False)
+    listener.should_receive('handle').with_args('record').once()
+
+    module.Blocking_queue_handler(log_queue, listener).enqueue('record')
+
+
+def test_blocking_queue_handler_after_listener_stopped_writes_directly():
+    records = []
+    log_queue = module.Log_queue(10)
+    listener = module.Log_queue_listener(log_queue, make_recording_handler(records))
+    listener.start()
+    listener.stop()
+
+    module.Blocking_queue_handler(log_queue, listener).handle(make_record('late'))
+
+    assert records == ['late']
+
+
+def test_start_log_queue_starts_listener_and_stops_it_at_exit():
+    handler = flexmock()
+    listener = flexmock(stop=lambda: None)
+    listener.should_receive('start').once()
+    flexmock(module).should_receive('Log_queue_listener').with_args(object, handler).and_return(
+        listener
+    )
+    flexmock(module.atexit).should_receive('register').with_args(listener.stop).once()
+
+    queue_handler = module.start_log_queue((handler,))
+
+    assert queue_handler.listener == listener
+
+
+def test_flush_logging_waits_for_queue_while_listener_is_alive():
+    listener = flexmock(alive=lambda: True)
+    log_queue = flexmock()
+    log_queue.should_receive('join_while').with_args(listener.alive).once()
+    queue_handler = module.Blocking_queue_handler(log_queue, listener)
+    flexmock(module.logging).should_receive('getLogger').and_return(
+        flexmock(handlers=[flexmock(), queue_handler])
+    )
+
+    module.flush_logging()
+
+
 def test_console_color_formatter_format_includes_log_message():
     flexmock(module).should_receive('add_custom_log_levels')
     flexmock(module.logging).ANSWER = module.ANSWER
@@ -176,6 +411,7 @@ def test_add_logging_level_skips_global_setting_if_already_set():
 
 def test_configure_logging_probes_for_log_socket_on_linux():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -196,6 +432,7 @@ def test_configure_logging_probes_for_log_socket_on_linux():
 
 def test_configure_logging_probes_for_log_socket_on_macos():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -217,6 +454,7 @@ def test_configure_logging_probes_for_log_socket_on_macos():
 
 def test_configure_logging_probes_for_log_socket_on_freebsd():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -239,6 +477,7 @@ def test_configure_logging_probes_for_log_socket_on_freebsd():
 
 def test_configure_logging_sets_global_logger_to_most_verbose_log_level():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -254,6 +493,7 @@ def test_configure_logging_sets_global_logger_to_most_verbose_log_level():
 
 def test_configure_logging_skips_syslog_if_not_found():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -270,6 +510,7 @@ def test_configure_logging_skips_syslog_if_not_found():
 
 def test_configure_logging_skips_syslog_if_interactive_console():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -287,6 +528,7 @@ def test_configure_logging_skips_syslog_if_interactive_console():
 
 def test_configure_logging_skips_syslog_if_syslog_logging_is_disabled():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).DISABLED = module.DISABLED
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -304,6 +546,7 @@ def test_configure_logging_skips_syslog_if_syslog_logging_is_disabled():
 
 def test_configure_logging_skips_log_file_if_log_file_logging_is_disabled():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).DISABLED = module.DISABLED
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -316,7 +559,7 @@ def test_configure_logging_skips_log_file_if_log_file_logging_is_disabled():
     )
     flexmock(module.os.path).should_receive('exists').never()
     flexmock(module.logging.handlers).should_receive('SysLogHandler').never()
-    flexmock(module.logging.handlers).should_receive('WatchedFileHandler').never()
+    flexmock(module).should_receive('Batched_watched_file_handler').never()
 
     module.configure_logging(
         console_log_level=logging.INFO, log_file_log_level=logging.DISABLED, log_file='/tmp/logfile'
@@ -325,6 +568,7 @@ def test_configure_logging_skips_log_file_if_log_file_logging_is_disabled():
 
 def test_configure_logging_to_log_file_instead_of_syslog():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -338,7 +582,7 @@ def test_configure_logging_to_log_file_instead_of_syslog():
     flexmock(module.os.path).should_receive('exists').never()
     flexmock(module.logging.handlers).should_receive('SysLogHandler').never()
     file_handler = logging.handlers.WatchedFileHandler('/tmp/logfile')
-    flexmock(module.logging.handlers).should_receive('WatchedFileHandler').with_args(
+    flexmock(module).should_receive('Batched_watched_file_handler').with_args(
         '/tmp/logfile'
     ).and_return(file_handler).once()
 
@@ -349,6 +593,7 @@ def test_configure_logging_to_log_file_instead_of_syslog():
 
 def test_configure_logging_to_log_file_formats_with_custom_log_format():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module.logging).should_receive('Formatter').with_args(
         '{message}', style='{'  # noqa: FS003
@@ -364,7 +609,7 @@ def test_configure_logging_to_log_file_formats_with_custom_log_format():
     flexmock(module.os.path).should_receive('exists').with_args('/dev/log').and_return(True)
     flexmock(module.logging.handlers).should_receive('SysLogHandler').never()
     file_handler = logging.handlers.WatchedFileHandler('/tmp/logfile')
-    flexmock(module.logging.handlers).should_receive('WatchedFileHandler').with_args(
+    flexmock(module).should_receive('Batched_watched_file_handler').with_args(
         '/tmp/logfile'
     ).and_return(file_handler).once()
 
@@ -378,6 +623,7 @@ def test_configure_logging_to_log_file_formats_with_custom_log_format():
 
 def test_configure_logging_skips_log_file_if_argument_is_none():
     flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('start_log_queue').and_return(flexmock())
     flexmock(module.logging).ANSWER = module.ANSWER
     flexmock(module).should_receive('Multi_stream_handler').and_return(
         flexmock(setFormatter=lambda formatter: None, setLevel=lambda level: None)
@@ -389,6 +635,6 @@ def test_configure_logging_skips_log_file_if_argument_is_none():
         level=logging.INFO, handlers=tuple
     )
     flexmock(module.os.path).should_receive('exists').and_return(False)
-    flexmock(module.logging.handlers).should_receive('WatchedFileHandler').never()
+    flexmock(module).should_receive('Batched_watched_file_handler').never()
 
     module.configure_logging(console_log_level=logging.INFO, log_file=None)